@@ -0,0 +1,127 @@
+"""
+Benchmark: latency of paged lead queries at scale
+
+Seeds --leads leads spread over 100 days (500 companies, 500 email domains)
+into the JSON log and the SQLite database, then times crm.query_leads-style
+page lookups on each backend: by company, by email domain, by a 7-day window,
+company within a window, and a page deep into a company's results via its
+cursor. The "scan" row is the old way for comparison: filter every record
+until the page is full.
+
+The JSON backend's indexes are in memory; the time and traced memory to
+build them from the log are printed after seeding.
+
+Usage (from backend/):
+    python -m benchmarks.bench_crm_query --leads 1000000
+"""
+import argparse
+import itertools
+import random
+import tempfile
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+from unittest.mock import patch
+from benchmarks.common import print_table, summarize_latencies
+
+from services.config_manager import config_manager
+from database import mock_crm, sqlite_crm
+from database.sqlite_crm import INSERT_LEAD_SQL, _lead_row
+from database.query_index import LeadQueryIndex
+
+DAY = 86400.0
+SEED_BATCH = 10000
+PAGE = 50
+
+def _lead(index: int) -> dict:
+    return {"name": f"Lead {index}", "email": f"lead{index}@example{index % 500}.com",
+            "company": f"Company {index % 500}"}
+
+def seed(total: int) -> float:
+    """Write `total` leads over 100 days to both backends; returns the first save time"""
+    store = mock_crm.get_store()
+    db = sqlite_crm.get_db()
+    start = time.time() - 100 * DAY
+    step = 100 * DAY / total
+    for first in range(0, total, SEED_BATCH):
+        batch = range(first, min(first + SEED_BATCH, total))
+        store.append_many([{"id": uuid.uuid4().hex, "ts": start + i * step, "lead": _lead(i)} for i in batch])
+        with db._conn:
+            db._conn.executemany(INSERT_LEAD_SQL, [_lead_row(_lead(i), start + i * step) for i in batch])
+    db.rebuild_counters()
+    return start
+
+def time_queries(query, cases, repeat: int) -> dict:
+    """Run each case `repeat` times through query(**case) and summarize the latencies"""
+    latencies = []
+    started = time.perf_counter()
+    for case in itertools.islice(itertools.cycle(cases), repeat):
+        began = time.perf_counter()
+        query(**case)
+        latencies.append(time.perf_counter() - began)
+    return summarize_latencies(latencies, time.perf_counter() - started)
+
+def scan_page(company=None, start=None, end=None, limit=PAGE) -> list:
+    return list(itertools.islice(mock_crm.iter_records(start, end, company), limit))
+
+def main(args) -> None:
+    rng = random.Random(7)
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        crm_settings = {**config_manager.get_config("crm_settings"), "backend": "json"}
+        with patch.object(mock_crm, "CRM_FILE", Path(temp_dir) / "crm.json"), \
+                patch.object(sqlite_crm, "CRM_DB_FILE", Path(temp_dir) / "crm.db"), \
+                patch.dict(config_manager.config, {"crm_settings": crm_settings}):
+            print(f"Seeding {args.leads} leads...")
+            first = seed(args.leads)
+
+            # Tracing slows the build several times over: time it separately
+            tracemalloc.start()
+            LeadQueryIndex(mock_crm.get_store()).refresh()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            started = time.perf_counter()
+            indexed = mock_crm.get_query_index().refresh()
+            build_s = time.perf_counter() - started
+            print(f"  JSON query index: {indexed} leads in {build_s:.1f}s, {peak / 1e6:.0f} MB traced")
+
+            def window():
+                day = rng.uniform(0, 93)
+                return {"start": first + day * DAY, "end": first + (day + 7) * DAY}
+
+            companies = [{"company": f"company {rng.randrange(500)}"} for _ in range(50)]
+            domains = [{"email_domain": f"EXAMPLE{rng.randrange(500)}.com"} for _ in range(50)]
+            windows = [window() for _ in range(50)]
+            company_windows = [{**company, **window()} for company in companies]
+
+            for backend_name, backend in (("json", mock_crm), ("sqlite", sqlite_crm)):
+                # A cursor halfway through each company's leads
+                deep = []
+                for case in companies[:10]:
+                    after = None
+                    for _ in range(args.leads // 500 // PAGE // 2):
+                        _, after = backend.query_leads(limit=PAGE, after=after, **case)
+                    deep.append({**case, "after": after})
+
+                def query(**case):
+                    return backend.query_leads(limit=PAGE, **case)
+
+                for label, cases in (("company", companies), ("email domain", domains), ("7-day window", windows),
+                                     ("company + window", company_windows), ("company, deep page", deep)):
+                    results[f"{backend_name}: {label}"] = time_queries(query, cases, args.queries)
+
+            if not args.skip_scan:
+                results["json scan: company"] = time_queries(scan_page, companies[:5], 5)
+                results["json scan: window"] = time_queries(scan_page, windows[:5], 5)
+            mock_crm.close_all()
+            sqlite_crm.close_all()
+
+    print_table(f"Page of {PAGE} leads out of {args.leads}", results)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leads", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=500, help="Queries per variant")
+    parser.add_argument("--skip-scan", action="store_true", help="Skip the full-scan baseline")
+    main(parser.parse_args())
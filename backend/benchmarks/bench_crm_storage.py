@@ -0,0 +1,96 @@
+"""
+Benchmark: JSON-array read-modify-write CRM vs. append-only JSONL log
+
+The legacy engine rewrites the whole file per lead, so inserting 100k leads
+with it would take hours. Its per-insert cost is therefore sampled at each
+checkpoint by pre-seeding a file of that size. The new engine really inserts
+all the leads, and the latency of the inserts just before each checkpoint is
+reported.
+
+Usage (from backend/):
+    python -m benchmarks.bench_crm_storage --leads 100000
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+from benchmarks.common import percentile, print_table
+
+from database import mock_crm
+
+SAMPLE_INSERTS = 20
+
+def _lead(index: int) -> dict:
+    return {"name": f"Lead {index}", "email": f"lead{index}@example{index % 500}.com", "company": f"Company {index % 500}"}
+
+def _legacy_save(crm_file: Path, data: dict) -> None:
+    # Previous engine: parse every lead, append one, rewrite with indent=2
+    if not crm_file.exists():
+        crm_file.write_text("[]")
+    leads = json.loads(crm_file.read_text())
+    leads.append(data)
+    crm_file.write_text(json.dumps(leads, indent=2))
+
+def legacy_latency_at(size: int, workdir: Path) -> float:
+    """Median per-insert latency (ms) of the legacy engine on a file of `size` leads"""
+    crm_file = workdir / f"legacy_{size}.json"
+    crm_file.write_text(json.dumps([_lead(i) for i in range(size)], indent=2))
+    samples = []
+    for index in range(SAMPLE_INSERTS):
+        start = time.perf_counter()
+        _legacy_save(crm_file, _lead(size + index))
+        samples.append(time.perf_counter() - start)
+    return percentile(samples, 50) * 1000
+
+def run_log_engine(total: int, checkpoints: list, workdir: Path, fsync: str) -> dict:
+    """Insert `total` leads through save_to_crm; per-insert ms just before each checkpoint"""
+    crm_file = workdir / f"log_{fsync}.json"
+    latencies = []
+    settings = {**mock_crm.DEFAULT_STORAGE_SETTINGS, "fsync": fsync}
+    # No simulated failures: the retry sleeps would swamp the write cost
+    with patch.object(mock_crm, "CRM_FILE", crm_file), \
+            patch.object(mock_crm.random, "random", return_value=1.0), \
+            patch.object(mock_crm, "get_storage_settings", return_value=settings):
+        start_all = time.perf_counter()
+        for index in range(total):
+            start = time.perf_counter()
+            mock_crm.save_to_crm(_lead(index))
+            latencies.append(time.perf_counter() - start)
+        elapsed = time.perf_counter() - start_all
+
+    at_checkpoint = {}
+    for size in checkpoints:
+        window = latencies[max(0, size - SAMPLE_INSERTS):size] or latencies[:SAMPLE_INSERTS]
+        at_checkpoint[size] = percentile(window, 50) * 1000
+    return {"per_checkpoint_ms": at_checkpoint, "total_s": elapsed, "p99_ms": percentile(latencies, 99) * 1000}
+
+def main(args) -> None:
+    checkpoints = sorted({1, *(int(args.leads * f) for f in (0.01, 0.1, 0.25, 0.5, 1.0))} - {0})
+    with tempfile.TemporaryDirectory() as temp_dir:
+        workdir = Path(temp_dir)
+        log_result = run_log_engine(args.leads, checkpoints, workdir, args.fsync)
+
+        rows = {}
+        for size in checkpoints:
+            legacy_ms = legacy_latency_at(size, workdir) if size <= args.legacy_max else float("nan")
+            rows[f"{size} leads"] = {
+                "legacy_insert_ms": legacy_ms,
+                "jsonl_insert_ms": log_result["per_checkpoint_ms"][size],
+                "speedup_x": legacy_ms / log_result["per_checkpoint_ms"][size]
+            }
+
+    print_table(f"Per-insert latency as the store grows (median of {SAMPLE_INSERTS} inserts)", rows)
+    print(
+        f"\nJSONL engine: {args.leads} inserts in {log_result['total_s']:.2f}s "
+        f"(p99 {log_result['p99_ms']:.3f} ms, fsync={args.fsync})"
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leads", type=int, default=100000)
+    parser.add_argument("--fsync", choices=("never", "interval", "always"), default="never")
+    parser.add_argument("--legacy-max", type=int, default=100000,
+                        help="Skip legacy sampling above this size (it is slow to seed)")
+    main(parser.parse_args())
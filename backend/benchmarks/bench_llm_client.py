@@ -0,0 +1,74 @@
+"""
+Benchmark: per-call httpx client vs. shared pooled LLM client
+
+Usage (from backend/):
+    python -m benchmarks.bench_llm_client --requests 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+import time
+from benchmarks.common import summarize_latencies, print_table
+from benchmarks.fake_llm_server import FakeLLMServer
+
+import httpx
+from services.llm_client import llm_client
+
+PAYLOAD = {
+    "messages": [{"role": "user", "content": "Hi, I'm Jane Roe from Acme, jane@acme.com"}],
+    "model": "llama3-70b-8192",
+    "temperature": 0.2,
+    "max_tokens": 200
+}
+
+async def _post_per_call_client(url: str) -> None:
+    # Previous behaviour: a fresh client (and connection) for every request
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        response = await client.post(url, json=PAYLOAD)
+        response.raise_for_status()
+
+async def _post_pooled_client(url: str) -> None:
+    response = await llm_client.get_client().post(url, json=PAYLOAD)
+    response.raise_for_status()
+
+async def run_variant(post, url: str, total: int, concurrency: int) -> dict:
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await post(url)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return summarize_latencies(latencies, time.perf_counter() - start)
+
+async def main(args) -> None:
+    server = FakeLLMServer(latency_ms=args.latency_ms)
+    url = server.start()
+    try:
+        await llm_client.startup()
+        # Warm up both paths so import/JIT costs don't skew the first variant
+        await run_variant(_post_per_call_client, url, 20, 5)
+        await run_variant(_post_pooled_client, url, 20, 5)
+
+        results = {
+            "before (per-call client)": await run_variant(_post_per_call_client, url, args.requests, args.concurrency),
+            "after (pooled client)": await run_variant(_post_pooled_client, url, args.requests, args.concurrency)
+        }
+        print_table(
+            f"LLM client: {args.requests} requests, concurrency {args.concurrency}, "
+            f"server latency {args.latency_ms}ms",
+            results
+        )
+    finally:
+        await llm_client.shutdown()
+        server.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    asyncio.run(main(parser.parse_args()))
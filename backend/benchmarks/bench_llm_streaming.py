@@ -0,0 +1,67 @@
+"""
+Benchmark: full-body completions vs. streamed completions with early termination
+
+The fake server generates a lead JSON object followed by `--trailing-words`
+of explanation, one word every `--chunk-delay-ms`. The streamed variant
+returns as soon as the JSON object closes and abandons the rest.
+
+Usage (from backend/):
+    python -m benchmarks.bench_llm_streaming --requests 200 --trailing-words 60
+"""
+import argparse
+import asyncio
+import time
+from benchmarks.common import summarize_latencies, print_table
+from benchmarks.fake_llm_server import FakeLLMServer
+
+from services.config_manager import config_manager
+from services.llm_client import llm_client
+from services import agent
+
+async def run_variant(stream: bool, total: int, concurrency: int, url: str) -> dict:
+    llm_settings = {**config_manager.get_config("llm_settings"), "api_url": url, "stream": stream}
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            result = await agent._request_extraction(f"benchmark message {index}", llm_settings)
+            latencies.append(time.perf_counter() - start)
+            assert result is not None, "extraction failed"
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(total)))
+    return summarize_latencies(latencies, time.perf_counter() - start)
+
+async def main(args) -> None:
+    server = FakeLLMServer(chunk_delay_ms=args.chunk_delay_ms, trailing_words=args.trailing_words)
+    url = server.start()
+    # The agent reads the endpoint from llm_settings; point it at the fake server in memory only
+    config_manager.config["llm_settings"] = {**config_manager.get_config("llm_settings"), "api_url": url}
+    try:
+        await llm_client.startup()
+        results = {}
+        for name, stream in (("full body", False), ("streamed, early stop", True)):
+            chunks_before = server.chunks_sent
+            results[name] = await run_variant(stream, args.requests, args.concurrency, url)
+            if stream:
+                results[name]["chunks_per_req"] = (server.chunks_sent - chunks_before) / args.requests
+        results["full body"]["chunks_per_req"] = float(len(server._completion_words()))
+
+        print_table(
+            f"Streaming: {args.requests} requests, concurrency {args.concurrency}, "
+            f"{args.chunk_delay_ms}ms/word, {args.trailing_words} trailing words",
+            results
+        )
+    finally:
+        await llm_client.shutdown()
+        server.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--chunk-delay-ms", type=float, default=5.0)
+    parser.add_argument("--trailing-words", type=int, default=60)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,69 @@
+"""
+Benchmark: fanning webhook log events out to many stream subscribers
+
+Appends --logs entries to the in-memory log, then times one broadcaster poll
+that pushes them to --subscribers admin streams. The "per subscriber" rows
+are the naive alternative for comparison: serialize every entry again for
+every subscriber.
+
+Usage (from backend/):
+    python -m benchmarks.bench_log_stream --logs 1000 --subscribers 1 100 1000
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+from unittest.mock import patch
+from benchmarks.common import print_table
+
+from services.config_manager import config_manager
+from services.log_stream import LogBroadcaster, encode_log
+from services.webhook_log import EGYPT_TIMEZONE, WebhookLogBuffer
+
+def _fill(buffer: WebhookLogBuffer, total: int) -> None:
+    for index in range(total):
+        buffer.append(f"user{index % 50}", "session", f"Met Lead {index} at the expo, email lead{index}@example.com",
+                      {"name": f"Lead {index}", "email": f"lead{index}@example.com", "company": "Acme"},
+                      "success", datetime.now(EGYPT_TIMEZONE))
+
+async def broadcast(total: int, subscribers: int) -> dict:
+    buffer = WebhookLogBuffer(capacity=total)
+    broadcaster = LogBroadcaster(buffer)
+    streams = [await broadcaster.subscribe(None) for _ in range(subscribers)]
+    _fill(buffer, total)
+    started = time.perf_counter()
+    await broadcaster.poll()
+    elapsed = time.perf_counter() - started
+    delivered = sum(stream.queue.qsize() for stream in streams)
+    await broadcaster.shutdown()
+    return {"events_delivered": delivered, "encodings": broadcaster.events_encoded, "ms": elapsed * 1000}
+
+def encode_per_subscriber(total: int, subscribers: int) -> dict:
+    buffer = WebhookLogBuffer(capacity=total)
+    _fill(buffer, total)
+    records = buffer.records_after(0, total)
+    started = time.perf_counter()
+    for _ in range(subscribers):
+        for record in records:
+            encode_log(record)
+    elapsed = time.perf_counter() - started
+    return {"events_delivered": total * subscribers, "encodings": total * subscribers, "ms": elapsed * 1000}
+
+def main(args) -> None:
+    webhook_settings = {
+        **config_manager.get_config("webhook_settings"),
+        "log_store": {"enabled": False},
+        "stream": {"poll_interval_ms": 3600000, "max_queue": args.logs + 10, "max_subscribers": max(args.subscribers)}
+    }
+    results = {}
+    with patch.dict(config_manager.config, {"webhook_settings": webhook_settings}):
+        for subscribers in args.subscribers:
+            results[f"broadcast, {subscribers} subs"] = asyncio.run(broadcast(args.logs, subscribers))
+            results[f"per subscriber, {subscribers}"] = encode_per_subscriber(args.logs, subscribers)
+    print_table(f"{args.logs} new logs pushed to admin streams", results)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logs", type=int, default=1000)
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[1, 100, 1000])
+    main(parser.parse_args())
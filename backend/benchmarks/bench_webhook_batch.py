@@ -0,0 +1,122 @@
+"""
+Benchmark: one POST /webhook/ per message vs. async mode vs. POST /webhook/batch
+
+Every message goes through the full pipeline: LLM extraction against the
+local fake server (with --latency-ms per call), CRM save to a temporary JSON
+log, and the webhook log. Messages are unique and carry no email, so neither
+the fast path nor the extraction cache short-circuits the LLM. Requests go
+through the ASGI app in-process, so the numbers exclude network time. The
+async-mode row posts messages one by one with mode=async and counts until
+the workers have finished them all; the time to the 202 is printed below.
+
+Usage (from backend/):
+    python -m benchmarks.bench_webhook_batch --messages 200 --latency-ms 50
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+from benchmarks.common import percentile, print_table
+from benchmarks.fake_llm_server import FakeLLMServer
+
+import httpx
+from main import app
+from routes.webhook import webhook_jobs
+from services.config_manager import config_manager
+from services.llm_client import llm_client
+from database import mock_crm
+
+ack_latencies = []
+
+def _messages(run: str, total: int) -> list:
+    return [{"message": f"Met a buyer at the expo ({run} #{index}), follow up next week", "user_id": "bench"}
+            for index in range(total)]
+
+async def one_by_one(client: httpx.AsyncClient, messages: list) -> None:
+    for message in messages:
+        response = await client.post("/webhook/", json=message)
+        response.raise_for_status()
+
+async def async_mode(client: httpx.AsyncClient, messages: list) -> None:
+    """202 per message, then wait for the workers to finish them all"""
+    jobs = []
+    for message in messages:
+        started = time.perf_counter()
+        response = await client.post("/webhook/", params={"mode": "async"}, json=message)
+        ack_latencies.append(time.perf_counter() - started)
+        assert response.status_code == 202, response.text
+        jobs.append(webhook_jobs.get_job(response.json()["job_id"]))
+    while any(job.finished_at is None for job in jobs):
+        await asyncio.sleep(0.005)
+
+async def as_batch(client: httpx.AsyncClient, messages: list) -> None:
+    response = await client.post("/webhook/batch", json=messages)
+    response.raise_for_status()
+    assert response.json()["summary"] == {"success": len(messages)}, response.json()["summary"]
+
+async def run_variant(server: FakeLLMServer, send, messages: list, max_concurrency: int = 16) -> dict:
+    webhook_settings = config_manager.get_config("webhook_settings")
+    batch_settings = {**webhook_settings.get("batch", {}), "max_concurrency": max_concurrency,
+                      "max_items": len(messages)}
+    config_manager.config["webhook_settings"] = {**webhook_settings, "batch": batch_settings}
+    llm_calls = server.request_count
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        started = time.perf_counter()
+        await send(client, messages)
+        elapsed = time.perf_counter() - started
+    return {
+        "messages": len(messages),
+        "seconds": elapsed,
+        "msgs_per_s": len(messages) / elapsed,
+        "llm_calls": server.request_count - llm_calls
+    }
+
+async def main(args) -> None:
+    server = FakeLLMServer(latency_ms=args.latency_ms)
+    url = server.start()
+    llm_settings = {**config_manager.get_config("llm_settings"), "api_url": url}
+    extraction_settings = config_manager.get_config("extraction_settings")
+    extraction_settings = {
+        **extraction_settings,
+        "fast_path": {**extraction_settings.get("fast_path", {}), "enabled": False},
+        "cache": {**extraction_settings.get("cache", {}), "enabled": False}
+    }
+    crm_settings = {
+        **config_manager.get_config("crm_settings"), "backend": "json", "failure_rate": 0,
+        "dedup": {**config_manager.get_config("crm_settings").get("dedup", {}), "enabled": False}
+    }
+    with tempfile.TemporaryDirectory() as temp_dir, \
+            patch.object(mock_crm, "CRM_FILE", Path(temp_dir) / "crm.json"), \
+            patch.dict(config_manager.config, {"llm_settings": llm_settings, "crm_settings": crm_settings,
+                                               "extraction_settings": extraction_settings,
+                                               "webhook_settings": config_manager.get_config("webhook_settings")}):
+        try:
+            await llm_client.startup()
+            await run_variant(server, as_batch, _messages("warmup", 10))
+
+            results = {"one POST per message": await run_variant(server, one_by_one, _messages("single", args.messages))}
+            results["async mode (202 + workers)"] = await run_variant(server, async_mode, _messages("async", args.messages))
+            for concurrency in args.concurrency:
+                results[f"batch, {concurrency} at a time"] = await run_variant(
+                    server, as_batch, _messages(f"batch-{concurrency}", args.messages), concurrency
+                )
+        finally:
+            await webhook_jobs.shutdown()
+            await llm_client.shutdown()
+            mock_crm.close_all()
+            server.stop()
+
+    print_table(f"{args.messages} messages, {args.latency_ms:.0f} ms LLM latency", results)
+    print(f"\nAsync mode: 202 answered in p50 {percentile(ack_latencies, 50) * 1000:.2f} ms, "
+          f"p99 {percentile(ack_latencies, 99) * 1000:.2f} ms "
+          f"({webhook_jobs.get_settings()['workers']} workers)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4, 16, 64],
+                        help="webhook_settings.batch.max_concurrency values to try")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,100 @@
+"""
+Benchmark: retried webhook deliveries with and without an Idempotency-Key
+
+Each message is delivered once and then retried --retries times. Without a
+key every retry runs the pipeline again: LLM extraction against the local
+fake server (--latency-ms per call) and another CRM save. With a key the
+retries are answered from the idempotency store. Requests go through the
+ASGI app in-process, so the numbers exclude network time. The store lookup
+itself is timed separately at the end.
+
+Usage (from backend/):
+    python -m benchmarks.bench_webhook_idempotency --messages 50 --retries 3
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from unittest.mock import patch
+from benchmarks.common import print_table, summarize_latencies
+from benchmarks.fake_llm_server import FakeLLMServer
+
+import httpx
+from main import app
+from services.config_manager import config_manager
+from services.idempotency import IdempotencyStore
+from services.llm_client import llm_client
+from database import mock_crm
+
+async def deliver(client: httpx.AsyncClient, server: FakeLLMServer, messages: int, retries: int,
+                  use_key: bool) -> dict:
+    """Deliver each message 1 + retries times; returns retry latencies and LLM calls"""
+    latencies = []
+    llm_calls = server.request_count
+    started = time.perf_counter()
+    for index in range(messages):
+        body = {"message": f"Met a buyer at the expo ({uuid.uuid4().hex[:8]} #{index}), follow up next week"}
+        headers = {"Idempotency-Key": uuid.uuid4().hex} if use_key else {}
+        (await client.post("/webhook/", json=body, headers=headers)).raise_for_status()
+        for _ in range(retries):
+            began = time.perf_counter()
+            (await client.post("/webhook/", json=body, headers=headers)).raise_for_status()
+            latencies.append(time.perf_counter() - began)
+    result = summarize_latencies(latencies, time.perf_counter() - started)
+    del result["req_per_s"]
+    return {**result, "llm_calls": server.request_count - llm_calls}
+
+async def store_lookup(repeat: int) -> float:
+    """Mean microseconds to replay a stored response"""
+    store = IdempotencyStore()
+
+    async def work():
+        return {"save_status": "success"}
+
+    await store.run("key", "fingerprint", work)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await store.run("key", "fingerprint", work)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+async def main(args) -> None:
+    server = FakeLLMServer(latency_ms=args.latency_ms)
+    url = server.start()
+    llm_settings = {**config_manager.get_config("llm_settings"), "api_url": url}
+    extraction_settings = config_manager.get_config("extraction_settings")
+    extraction_settings = {
+        **extraction_settings,
+        "fast_path": {**extraction_settings.get("fast_path", {}), "enabled": False},
+        "cache": {**extraction_settings.get("cache", {}), "enabled": False}
+    }
+    crm_settings = {
+        **config_manager.get_config("crm_settings"), "backend": "json", "failure_rate": 0,
+        "dedup": {**config_manager.get_config("crm_settings").get("dedup", {}), "enabled": False}
+    }
+    with tempfile.TemporaryDirectory() as temp_dir, \
+            patch.object(mock_crm, "CRM_FILE", Path(temp_dir) / "crm.json"), \
+            patch.dict(config_manager.config, {"llm_settings": llm_settings, "crm_settings": crm_settings,
+                                               "extraction_settings": extraction_settings}):
+        try:
+            await llm_client.startup()
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+                results = {
+                    "retries, no key": await deliver(client, server, args.messages, args.retries, False),
+                    "retries, Idempotency-Key": await deliver(client, server, args.messages, args.retries, True)
+                }
+        finally:
+            await llm_client.shutdown()
+            mock_crm.close_all()
+            server.stop()
+
+    print_table(f"{args.messages} messages, {args.retries} retries each, {args.latency_ms:.0f} ms LLM latency", results)
+    print(f"\nStore lookup for a replay: {await store_lookup(100000):.1f} µs")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    asyncio.run(main(parser.parse_args()))
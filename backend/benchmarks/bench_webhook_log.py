@@ -0,0 +1,88 @@
+"""
+Benchmark: memory and append cost of the webhook log at --logs appended entries
+
+Compares the old unbounded list of WebhookLog.model_dump() dicts with the
+ring buffer of compact records at a few capacities. Every entry has its own
+message and extracted dict, as in production. Memory is what tracemalloc
+still holds after the appends; the append rate is timed in a separate run
+without tracing. The "poll" column is one dashboard poll for the last 50
+entries (the old list slice, or page(after=...) on the ring).
+
+Usage (from backend/):
+    python -m benchmarks.bench_webhook_log --logs 1000000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from datetime import datetime
+from benchmarks.common import print_table
+
+from models.lead import WebhookLog
+from services.webhook_log import EGYPT_TIMEZONE, WebhookLogBuffer
+
+def _entry(index: int):
+    message = f"Met Lead {index} from Company {index % 500} at the expo, email lead{index}@example.com"
+    extracted = {"name": f"Lead {index}", "email": f"lead{index}@example.com", "company": f"Company {index % 500}"}
+    return f"user{index % 50}", f"session_{index % 1000:08x}", message, extracted, "success"
+
+def fill_list(total: int):
+    logs = []
+    for index in range(total):
+        user_id, session_id, message, extracted, save_status = _entry(index)
+        logs.append(WebhookLog(
+            id=str(len(logs) + 1), timestamp=datetime.now(EGYPT_TIMEZONE), user_id=user_id,
+            session_id=session_id, message=message, extracted=extracted, save_status=save_status,
+            retry_info={"has_retries": True, "final_status": save_status}
+        ).model_dump())
+    return logs
+
+def fill_ring(capacity: int):
+    def fill(total: int):
+        ring = WebhookLogBuffer(capacity=capacity)
+        for index in range(total):
+            ring.append(*_entry(index), datetime.now(EGYPT_TIMEZONE))
+        return ring
+    return fill
+
+def measure(fill, total: int, poll) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    logs = fill(total)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del logs
+    gc.collect()
+
+    started = time.perf_counter()
+    logs = fill(total)
+    elapsed = time.perf_counter() - started
+    began = time.perf_counter()
+    poll(logs, total - 50)
+    poll_ms = (time.perf_counter() - began) * 1000
+    entries = len(logs) if isinstance(logs, list) else logs.get_stats()["entries"]
+    return {
+        "logs": total,
+        "kept": entries,
+        "held_mb": held / 1e6,
+        "appends_per_s": total / elapsed,
+        "poll_ms": poll_ms
+    }
+
+def main(args) -> None:
+    results = {}
+    if not args.skip_list:
+        results["list of dicts (old)"] = measure(fill_list, args.logs, lambda logs, last: logs[last:])
+    for capacity in args.capacity:
+        results[f"ring, {capacity} entries"] = measure(
+            fill_ring(capacity), args.logs, lambda ring, last: ring.page(limit=50, after=last)
+        )
+    print_table(f"{args.logs} webhook logs appended", results)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logs", type=int, default=1000000)
+    parser.add_argument("--capacity", type=int, nargs="+", default=[10000, 100000],
+                        help="Ring capacities to try (webhook_settings.log_capacity)")
+    parser.add_argument("--skip-list", action="store_true", help="Skip the unbounded list baseline")
+    main(parser.parse_args())
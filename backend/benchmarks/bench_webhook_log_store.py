@@ -0,0 +1,106 @@
+"""
+Benchmark: filtered webhook log pages from the SQLite log store at scale
+
+Seeds --logs entries over 30 days (1,000 users, 100,000 sessions, one in ten
+saves failing) through WebhookLogWriter, the same path the app uses, and
+reports the write rate. Then times /webhook/logs-style pages of 50: newest
+entries, by user, by session, by save status, a one-day window, a user's
+entries within a day, a page deep into a user's entries via its cursor,
+and the per-user stats for one user.
+
+Usage (from backend/):
+    python -m benchmarks.bench_webhook_log_store --logs 1000000
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest.mock import patch
+from benchmarks.common import print_table, summarize_latencies
+
+from services.webhook_log import WebhookLogBuffer
+from database import webhook_log_store
+from database.webhook_log_store import WebhookLogWriter
+
+DAY = 86400.0
+PAGE = 50
+SEED_BATCH = 10000
+
+async def seed(total: int, first: float) -> float:
+    """Append `total` entries to a ring and write them through the log writer; returns entries/s"""
+    buffer = WebhookLogBuffer(capacity=SEED_BATCH)
+    writer = WebhookLogWriter(buffer)
+    step = 30 * DAY / total
+    elapsed = 0.0
+    for batch_start in range(0, total, SEED_BATCH):
+        for index in range(batch_start, min(batch_start + SEED_BATCH, total)):
+            buffer.append(
+                f"user{index % 1000}@example.com", f"session_{index % 100000:08x}",
+                f"Met Lead {index} at the expo, email lead{index}@example.com",
+                {"name": f"Lead {index}", "email": f"lead{index}@example.com", "company": f"Company {index % 500}"},
+                "failure" if index % 10 == 0 else "success",
+                datetime.fromtimestamp(first + index * step, tz=timezone.utc)
+            )
+        started = time.perf_counter()
+        await writer.flush()
+        elapsed += time.perf_counter() - started
+    return total / elapsed
+
+def time_queries(query, cases, repeat: int) -> dict:
+    """Run each case `repeat` times through query(**case) and summarize the latencies"""
+    latencies = []
+    started = time.perf_counter()
+    for case in itertools.islice(itertools.cycle(cases), repeat):
+        began = time.perf_counter()
+        query(**case)
+        latencies.append(time.perf_counter() - began)
+    return summarize_latencies(latencies, time.perf_counter() - started)
+
+def main(args) -> None:
+    rng = random.Random(7)
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir, \
+            patch.object(webhook_log_store, "WEBHOOK_LOG_DB_FILE", Path(temp_dir) / "webhook_logs.db"):
+        first = time.time() - 30 * DAY
+        print(f"Seeding {args.logs} webhook logs...")
+        rate = asyncio.run(seed(args.logs, first))
+        print(f"  Writer: {rate:,.0f} entries/s in batches of {webhook_log_store.get_settings()['batch_size']}")
+
+        def day():
+            start = first + rng.uniform(0, 29) * DAY
+            return {"start": start, "end": start + DAY}
+
+        users = [{"user_id": f"user{rng.randrange(1000)}@example.com"} for _ in range(50)]
+        deep = []
+        for case in users[:10]:
+            # A cursor halfway through the user's entries
+            middle = webhook_log_store.query_logs(limit=1, before=args.logs // 2, **case)
+            deep.append({**case, "after": int(middle[0]["id"])})
+
+        def query(**case):
+            return webhook_log_store.query_logs(limit=PAGE, **case)
+
+        for label, cases in (
+            ("newest", [{}]),
+            ("user", users),
+            ("session", [{"session_id": f"session_{rng.randrange(100000):08x}"} for _ in range(50)]),
+            ("save status", [{"save_status": "failure"}]),
+            ("1-day window", [day() for _ in range(50)]),
+            ("user + 1-day window", [{**user, **day()} for user in users]),
+            ("user, deep page", deep)
+        ):
+            results[label] = time_queries(query, cases, args.queries)
+        results["user stats"] = time_queries(webhook_log_store.get_user_stats, users, args.queries)
+        webhook_log_store.close_all()
+
+    print_table(f"Page of {PAGE} webhook logs out of {args.logs}", results)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logs", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=500, help="Queries per variant")
+    main(parser.parse_args())
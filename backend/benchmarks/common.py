@@ -0,0 +1,44 @@
+"""Shared helpers for the benchmark scripts (run from `backend/`)"""
+import logging
+import os
+import statistics
+from typing import Dict, List
+
+# Services refuse to import without an API key; benchmarks never hit Groq
+os.environ.setdefault("GROQ_API_KEY", "benchmark-key")
+
+# Keep per-request service logging out of the results
+logging.basicConfig(level=logging.WARNING)
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+def summarize_latencies(latencies_s: List[float], elapsed_s: float) -> Dict[str, float]:
+    """Summarize per-request latencies (seconds) into p50/p99/mean in ms and req/s"""
+    return {
+        "requests": len(latencies_s),
+        "p50_ms": percentile(latencies_s, 50) * 1000,
+        "p99_ms": percentile(latencies_s, 99) * 1000,
+        "mean_ms": statistics.mean(latencies_s) * 1000 if latencies_s else 0.0,
+        "req_per_s": len(latencies_s) / elapsed_s if elapsed_s > 0 else 0.0
+    }
+
+def print_table(title: str, rows: Dict[str, Dict[str, float]]) -> None:
+    """Print benchmark results as an aligned table, one row per variant"""
+    print(f"\n{title}")
+    if not rows:
+        return
+    columns = list(next(iter(rows.values())).keys())
+    widths = [max(14, len(col) + 2) for col in columns]
+    print(f"{'variant':<24}" + "".join(f"{col:>{width}}" for col, width in zip(columns, widths)))
+    for name, values in rows.items():
+        cells = "".join(
+            f"{values[col]:>{width}.2f}" if isinstance(values[col], float) else f"{values[col]:>{width}}"
+            for col, width in zip(columns, widths)
+        )
+        print(f"{name:<24}{cells}")
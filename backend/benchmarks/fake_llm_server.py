@@ -0,0 +1,124 @@
+"""
+Local fake chat-completions server used by the benchmarks
+
+Serves an OpenAI-compatible `/openai/v1/chat/completions` endpoint on
+127.0.0.1 from a background thread, with a configurable latency
+distribution: a base latency plus uniform jitter, and an optional slow
+tail (`slow_probability` of requests take `slow_latency_ms` instead).
+Requests with `"stream": true` get an SSE response emitted word by word,
+simulating token generation (`chunk_delay_ms` per word).
+"""
+import json
+import random
+import socket
+import threading
+import time
+import asyncio
+from typing import Optional
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_LEAD = {"name": "Jane Roe", "email": "jane@acme.com", "company": "Acme"}
+
+def _free_port() -> int:
+    """Find a free local TCP port"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class FakeLLMServer:
+    """Fake chat-completions server running in a background thread"""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 port: Optional[int] = None, chunk_delay_ms: float = 0.0,
+                 trailing_words: int = 0, slow_probability: float = 0.0,
+                 slow_latency_ms: float = 0.0, status_code: int = 200):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.slow_probability = slow_probability
+        self.slow_latency_ms = slow_latency_ms
+        # Non-200 makes the server fail every request (for failover runs)
+        self.status_code = status_code
+        self.port = port or _free_port()
+        self.chunk_delay_ms = chunk_delay_ms
+        # Verbose models keep talking after the JSON object; this simulates that
+        self.trailing_words = trailing_words
+        self.request_count = 0
+        self.chunks_sent = 0
+        self.app = self._build_app()
+        self._server: Optional[uvicorn.Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/openai/v1/chat/completions"
+
+    async def _delay(self) -> None:
+        if self.slow_probability and random.random() < self.slow_probability:
+            delay_ms = self.slow_latency_ms
+        else:
+            delay_ms = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+
+    def _completion_words(self) -> list:
+        """The completion split into the word-sized chunks a model would stream"""
+        words = json.dumps(DEFAULT_LEAD).split(" ")
+        chunks = [word + " " for word in words]
+        chunks.append("\n\nExplanation:")
+        chunks.extend(" token" for _ in range(self.trailing_words))
+        return chunks
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.post("/openai/v1/chat/completions")
+        async def chat_completions(request: Request):
+            body = await request.json()
+            self.request_count += 1
+            await self._delay()
+            if self.status_code != 200:
+                return JSONResponse({"error": {"message": "fake failure"}}, status_code=self.status_code)
+            chunks = self._completion_words()
+
+            if body.get("stream"):
+                async def events():
+                    for chunk in chunks:
+                        if self.chunk_delay_ms:
+                            await asyncio.sleep(self.chunk_delay_ms / 1000)
+                        self.chunks_sent += 1
+                        event = {"choices": [{"delta": {"content": chunk}}]}
+                        yield f"data: {json.dumps(event)}\n\n"
+                    yield "data: [DONE]\n\n"
+
+                return StreamingResponse(events(), media_type="text/event-stream")
+
+            # Non-streamed responses still take the full generation time
+            if self.chunk_delay_ms:
+                await asyncio.sleep(self.chunk_delay_ms * len(chunks) / 1000)
+            return {
+                "choices": [{
+                    "message": {"role": "assistant", "content": "".join(chunks)}
+                }]
+            }
+
+        return app
+
+    def start(self) -> str:
+        """Start serving and return the chat-completions URL"""
+        config = uvicorn.Config(self.app, host="127.0.0.1", port=self.port,
+                                log_level="warning", access_log=False)
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self.url
+
+    def stop(self) -> None:
+        """Stop the server thread"""
+        if self._server:
+            self._server.should_exit = True
+        if self._thread:
+            self._thread.join(timeout=5)
@@ -0,0 +1,285 @@
+import asyncio
+import base64
+import binascii
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from services.config_manager import config_manager
+from database import mock_crm, sqlite_crm
+from database.retry import call_with_retries_async
+from database.dedup_index import crm_dedup_index, merge_leads
+
+# crm_settings.backend -> module implementing write_lead/write_leads/update_lead/
+# find_duplicate/dedup_lock/iter_unseen_leads/iter_leads/iter_records/
+# query_leads/get_crm_stats
+BACKENDS = {
+    "json": mock_crm,
+    "sqlite": sqlite_crm
+}
+
+DEFAULT_BACKEND = "json"
+
+# Saves of the same identity key in this process queue here instead of on
+# the backend's dedup lock; each entry is [lock, number of holders and waiters]
+_key_locks: Dict[str, list] = {}
+
+dedup_stats = {"inserted": 0, "merged": 0}
+
+def get_backend_name() -> str:
+    """Get the configured CRM backend name"""
+    name = config_manager.get_config("crm_settings").get("backend", DEFAULT_BACKEND)
+    if name not in BACKENDS:
+        print(f"Unknown CRM backend '{name}', using '{DEFAULT_BACKEND}'")
+        return DEFAULT_BACKEND
+    return name
+
+def get_backend():
+    """Get the module for the configured CRM backend"""
+    return BACKENDS[get_backend_name()]
+
+@asynccontextmanager
+async def _key_lock(key: str):
+    entry = _key_locks.setdefault(key, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            _key_locks.pop(key, None)
+
+def _catch_up_dedup_index(backend) -> None:
+    # Keys other workers (and this one) stored since the last call; a
+    # Bloom-filter miss only means "never stored" once they are in
+    crm_dedup_index.add_leads(backend.iter_unseen_leads())
+
+def _upsert_lead(backend, key: str, data: dict) -> None:
+    """
+    Merge into the stored duplicate if there is one, otherwise insert (blocking)
+
+    The lookup and the write run under the backend's dedup lock, which other
+    worker processes take too, so two of them can't both insert the key.
+    """
+    with backend.dedup_lock():
+        _catch_up_dedup_index(backend)
+        if crm_dedup_index.might_contain(key):
+            duplicate = backend.find_duplicate(key, crm_dedup_index.get_settings()["match_name_company"])
+            crm_dedup_index.record_lookup(duplicate is not None)
+            if duplicate is not None:
+                lead_id, existing = duplicate
+                backend.update_lead(lead_id, merge_leads(existing, data))
+                dedup_stats["merged"] += 1
+                return
+        # Definitely new: no disk lookup needed
+        backend.write_lead(data)
+        _catch_up_dedup_index(backend)
+        dedup_stats["inserted"] += 1
+
+def _insert_new_leads(backend, keys: List[Optional[str]], leads: List[dict]) -> List[int]:
+    """
+    Insert the leads of a batch that are definitely new in one write (blocking)
+
+    Args:
+        backend: CRM backend module
+        keys: Identity key of each lead
+        leads: Lead data
+
+    Returns:
+        Indexes of the leads that may be duplicates (of stored leads or of
+        each other), left for _upsert_lead
+    """
+    with backend.dedup_lock():
+        _catch_up_dedup_index(backend)
+        new_indexes, possible_duplicates, seen = [], [], set()
+        for index, key in enumerate(keys):
+            if key is not None and (key in seen or key in crm_dedup_index.bloom):
+                possible_duplicates.append(index)
+                continue
+            new_indexes.append(index)
+            if key is not None:
+                seen.add(key)
+
+        if new_indexes:
+            backend.write_leads([leads[index] for index in new_indexes])
+            _catch_up_dedup_index(backend)
+            dedup_stats["inserted"] += len(seen)
+    return possible_duplicates
+
+async def save_to_crm(data: dict) -> str:
+    """
+    Save lead data to the configured CRM backend
+
+    The write runs in a worker thread and failures are retried with
+    exponential backoff and jitter (crm_settings.retry_attempts/retry_delay)
+    without blocking the event loop. With crm_settings.dedup enabled, a lead
+    matching a stored one (by normalized email) is merged into it instead of
+    being stored again.
+
+    Args:
+        data: Lead data to save
+
+    Returns:
+        "success" or "failure"
+    """
+    backend = get_backend()
+    key = crm_dedup_index.key_for(data) if crm_dedup_index.is_enabled() else None
+    try:
+        if key is None:
+            await call_with_retries_async(backend.write_lead, data)
+            return "success"
+
+        async with _key_lock(key):
+            await call_with_retries_async(_upsert_lead, backend, key, data)
+        return "success"
+    except Exception:
+        return "failure"
+
+async def save_many_to_crm(leads: List[dict]) -> List[str]:
+    """
+    Save several leads to the configured CRM backend in one write/transaction
+
+    With dedup enabled the batch holds the key lock of every lead in it, as
+    save_to_crm does for one, so a concurrent save of the same email can't
+    insert it a second time. Leads that may be duplicates (of stored leads
+    or of each other) are upserted one by one; the rest go in a single batch.
+    If that batch can't be written every lead is reported as failed.
+
+    Args:
+        leads: Lead data to save
+
+    Returns:
+        "success" or "failure" for each lead, in order
+    """
+    backend = get_backend()
+    if not crm_dedup_index.is_enabled():
+        try:
+            await call_with_retries_async(backend.write_leads, leads)
+            return ["success"] * len(leads)
+        except Exception:
+            return ["failure"] * len(leads)
+
+    keys = [crm_dedup_index.key_for(lead) for lead in leads]
+    statuses = ["success"] * len(leads)
+    async with AsyncExitStack() as stack:
+        # Always locked in the same order, so two batches can't wait on each other
+        for key in sorted({key for key in keys if key is not None}):
+            await stack.enter_async_context(_key_lock(key))
+
+        try:
+            possible_duplicates = await call_with_retries_async(_insert_new_leads, backend, keys, leads)
+        except Exception:
+            return ["failure"] * len(leads)
+
+        for index in possible_duplicates:
+            try:
+                await call_with_retries_async(_upsert_lead, backend, keys[index], leads[index])
+            except Exception:
+                statuses[index] = "failure"
+    return statuses
+
+def iter_leads() -> Iterator[dict]:
+    """Stream every lead from the configured backend (blocking)"""
+    return get_backend().iter_leads()
+
+def iter_records(start: Optional[float] = None, end: Optional[float] = None,
+                 company: Optional[str] = None) -> Iterator[dict]:
+    """
+    Stream lead records from the configured backend (blocking)
+
+    Args:
+        start: Only leads saved at or after this Unix time
+        end: Only leads saved before this Unix time
+        company: Only leads of this company (case-insensitive)
+
+    Yields:
+        Records ({"id", "ts", "lead"}) in the order leads were saved
+    """
+    return get_backend().iter_records(start, end, company)
+
+def encode_cursor(after: int) -> str:
+    """Opaque page cursor: the backend's position of the last lead returned"""
+    return base64.urlsafe_b64encode(f"{get_backend_name()}:{after}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Position a page cursor continues after
+
+    Raises:
+        ValueError: If the cursor is malformed or from another backend
+    """
+    try:
+        decoded = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        backend_name, _, after = decoded.partition(":")
+        if backend_name == get_backend_name():
+            return int(after)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        pass
+    raise ValueError("Invalid cursor")
+
+async def query_leads(company: Optional[str] = None, email_domain: Optional[str] = None,
+                      start: Optional[float] = None, end: Optional[float] = None,
+                      limit: int = 50, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Get one page of leads from the configured backend through its secondary indexes
+
+    Pages are in save order and keyed on the last lead returned, so leads
+    saved while a client is paging show up on later pages instead of
+    shifting earlier ones.
+
+    Args:
+        company: Only leads of this company (case-insensitive)
+        email_domain: Only leads whose email is at this domain (case-insensitive)
+        start: Only leads saved at or after this Unix time
+        end: Only leads saved before this Unix time
+        limit: Page size
+        cursor: next_cursor of the previous page
+
+    Returns:
+        {"leads": [{"id", "ts", "lead"}, ...], "next_cursor": str or None}
+
+    Raises:
+        ValueError: If the cursor is invalid
+    """
+    after = decode_cursor(cursor) if cursor else None
+    records, next_after = await asyncio.to_thread(
+        get_backend().query_leads, company, email_domain, start, end, limit, after
+    )
+    return {
+        "leads": records,
+        "next_cursor": encode_cursor(next_after) if next_after is not None else None
+    }
+
+def rebuild_dedup_index() -> int:
+    """
+    Rebuild the dedup index from the configured backend (blocking; run at startup)
+
+    Returns:
+        Number of keys indexed
+    """
+    return crm_dedup_index.rebuild(get_backend().iter_unseen_leads(from_start=True))
+
+def build_query_index() -> int:
+    """
+    Load the JSON backend's query indexes (blocking; run at startup so the
+    first query doesn't pay for it)
+
+    Returns:
+        Number of leads indexed, 0 for SQLite (its indexes live in the database)
+    """
+    if get_backend_name() != "json":
+        return 0
+    return mock_crm.get_query_index().refresh()
+
+async def get_crm_stats() -> Dict:
+    """
+    Get statistics from the configured CRM backend
+
+    Returns:
+        Dictionary with CRM statistics, the backend name and dedup counters
+    """
+    stats = await asyncio.to_thread(get_backend().get_crm_stats)
+    return {
+        **stats,
+        "backend": get_backend_name(),
+        "dedup": {**crm_dedup_index.get_stats(), **dedup_stats}
+    }
@@ -0,0 +1,195 @@
+"""
+Maintained CRM lead counters, so stats never re-read lead data
+
+Check or rebuild the counters of the configured backend (from backend/):
+    python -m database.crm_stats check
+    python -m database.crm_stats rebuild
+"""
+import argparse
+import json
+import sys
+import threading
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+from services.file_io import atomic_write_text
+
+logger = logging.getLogger(__name__)
+
+# Day bucket for leads without a timestamp (migrated from the legacy file)
+UNDATED = "undated"
+
+def day_of(ts: Optional[float]) -> str:
+    """UTC day (YYYY-MM-DD) a lead was saved on"""
+    if ts is None:
+        return UNDATED
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d")
+
+class LeadCounters:
+    """Running totals for the CRM stats endpoint"""
+
+    def __init__(self):
+        self.total_leads = 0
+        self.per_day: Dict[str, int] = {}
+        self.last_updated: Optional[float] = None
+
+    def add(self, ts: Optional[float], count: int = 1) -> None:
+        """Count leads saved at ts"""
+        self.total_leads += count
+        day = day_of(ts)
+        self.per_day[day] = self.per_day.get(day, 0) + count
+        if ts is not None and (self.last_updated is None or ts > self.last_updated):
+            self.last_updated = ts
+
+    def merge(self, other: "LeadCounters") -> None:
+        """Add another set of counters to these"""
+        self.total_leads += other.total_leads
+        for day, count in other.per_day.items():
+            self.per_day[day] = self.per_day.get(day, 0) + count
+        if other.last_updated is not None and (self.last_updated is None or other.last_updated > self.last_updated):
+            self.last_updated = other.last_updated
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_leads": self.total_leads,
+            "leads_per_day": dict(sorted(self.per_day.items())),
+            "last_updated": self.last_updated
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LeadCounters":
+        counters = cls()
+        counters.total_leads = int(data["total_leads"])
+        counters.per_day = {str(day): int(count) for day, count in data["leads_per_day"].items()}
+        counters.last_updated = data.get("last_updated")
+        return counters
+
+def diff_counters(expected: LeadCounters, actual: LeadCounters) -> List[str]:
+    """Human-readable differences between two sets of counters"""
+    problems = []
+    if expected.total_leads != actual.total_leads:
+        problems.append(f"total_leads: maintained {actual.total_leads}, actual {expected.total_leads}")
+    for day in sorted(set(expected.per_day) | set(actual.per_day)):
+        if expected.per_day.get(day, 0) != actual.per_day.get(day, 0):
+            problems.append(f"{day}: maintained {actual.per_day.get(day, 0)}, actual {expected.per_day.get(day, 0)}")
+    return problems
+
+class JSONLStatsSidecar:
+    """
+    Counters for a segmented lead log, persisted in a small sidecar file
+
+    Every sealed segment's index carries its own counters. The sidecar keeps
+    their sum and the last segment included, so stats only add segments
+    sealed since then to the active segment's counters, which the log keeps
+    up to date as it appends.
+    """
+
+    def __init__(self, path: Path, log):
+        """
+        Args:
+            path: Sidecar file path
+            log: The SegmentedLog the counters describe
+        """
+        self.path = Path(path)
+        self.log = log
+        self.lock = threading.RLock()
+        self.sealed = LeadCounters()
+        self.sealed_through = 0
+        self._loaded = False
+
+    def _load(self) -> None:
+        """Read the sidecar; without one, sealed segments are summed from their indexes"""
+        self._loaded = True
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.sealed = LeadCounters.from_dict(data["sealed"])
+            self.sealed_through = int(data["sealed_through"])
+        except FileNotFoundError:
+            logger.info(f"No stats sidecar at {self.path}, counting from the segment indexes")
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Unreadable stats sidecar {self.path} ({e}), counting from the segment indexes")
+
+    def save(self) -> None:
+        """Persist the sealed-segment counters atomically"""
+        with self.lock:
+            atomic_write_text(self.path, json.dumps({"sealed": self.sealed.to_dict(), "sealed_through": self.sealed_through}))
+
+    def refresh(self) -> LeadCounters:
+        """
+        Current counters: sealed segments plus the active one
+
+        O(1) unless segments were sealed or records appended by another
+        process since the last call.
+        """
+        with self.lock, self.log.lock():
+            if not self._loaded:
+                self._load()
+            active = self.log.sync_active()
+            sealed = self.log.sealed_numbers()
+            if self.sealed_through > (sealed[-1] if sealed else 0):
+                logger.warning(f"Segments counted in {self.path} are gone, recounting")
+                self.sealed, self.sealed_through = LeadCounters(), 0
+            new = [number for number in sealed if number > self.sealed_through]
+            if new:
+                self.sealed.merge(self.log.sealed_counters(new))
+                self.sealed_through = new[-1]
+                self.save()
+
+            counters = LeadCounters()
+            counters.merge(self.sealed)
+            counters.merge(active.counters)
+            return counters
+
+    def rebuild(self) -> None:
+        """Re-index every segment and recount the sidecar"""
+        with self.lock, self.log.lock():
+            self._loaded = True
+            self.log.reindex()
+            sealed = self.log.sealed_numbers()
+            self.sealed = self.log.sealed_counters(sealed)
+            self.sealed_through = sealed[-1] if sealed else 0
+            self.save()
+
+    def check(self) -> List[str]:
+        """
+        Compare the maintained counters against a full scan
+
+        Returns:
+            Differences found (empty when consistent)
+        """
+        # Writers wait for the scan so both sides see the same records
+        with self.lock, self.log.lock():
+            return diff_counters(self.log.count_leads(), self.refresh())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters plus the size and segments of the log"""
+        with self.lock:
+            counters = self.refresh()
+        return {**counters.to_dict(), "file_size": self.log.total_size(), "storage": self.log.get_stats()}
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    from database import crm
+
+    parser = argparse.ArgumentParser(description="Check or rebuild the maintained CRM counters")
+    parser.add_argument("command", choices=("check", "rebuild"))
+    args = parser.parse_args(argv)
+
+    backend = crm.get_backend()
+    if args.command == "rebuild":
+        backend.rebuild_stats()
+        print(f"Rebuilt {crm.get_backend_name()} CRM counters: {backend.get_crm_stats()['total_leads']} leads")
+        return 0
+
+    problems = backend.check_stats()
+    if problems:
+        print(f"{crm.get_backend_name()} CRM counters are stale:")
+        for problem in problems:
+            print(f"  {problem}")
+        print("Run `python -m database.crm_stats rebuild` to fix them.")
+        return 1
+    print(f"{crm.get_backend_name()} CRM counters are consistent")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+import hashlib
+import math
+import time
+import logging
+from typing import Any, Dict, Iterable, Optional
+from services.config_manager import config_manager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEDUP_SETTINGS = {
+    "enabled": True,
+    # Also treat leads without an email as duplicates when name and company match
+    "match_name_company": False,
+    "expected_leads": 1000000,
+    "false_positive_rate": 0.01
+}
+
+# Values the extractor uses for "not found"; they must never make two leads equal
+PLACEHOLDER_VALUES = {"", "unknown", "unknown@example.com"}
+
+def _clean(value: Any) -> str:
+    return " ".join(str(value or "").split()).lower()
+
+def _is_placeholder(value: Any) -> bool:
+    return _clean(value) in PLACEHOLDER_VALUES
+
+def normalize_email(email: Any) -> Optional[str]:
+    """Lowercased, trimmed email, or None for empty/placeholder values"""
+    cleaned = _clean(email)
+    if cleaned in PLACEHOLDER_VALUES or "@" not in cleaned:
+        return None
+    return cleaned
+
+def dedup_key(lead: Any, match_name_company: bool = False) -> Optional[str]:
+    """
+    Identity key of a lead
+
+    Args:
+        lead: Lead data
+        match_name_company: Fall back to name+company when there's no email
+
+    Returns:
+        "email:<email>", "name_company:<name>|<company>", or None if the lead
+        has nothing identifying
+    """
+    if not isinstance(lead, dict):
+        return None
+    email = normalize_email(lead.get("email"))
+    if email:
+        return f"email:{email}"
+    if match_name_company and not _is_placeholder(lead.get("name")) and not _is_placeholder(lead.get("company")):
+        return f"name_company:{_clean(lead['name'])}|{_clean(lead['company'])}"
+    return None
+
+def merge_leads(existing: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Merge a duplicate into the stored lead
+
+    Newer real values win; placeholders never overwrite a known value.
+
+    Args:
+        existing: Stored lead
+        new: Incoming duplicate
+
+    Returns:
+        The merged lead
+    """
+    merged = dict(existing)
+    for field, value in new.items():
+        if field not in merged or not _is_placeholder(value):
+            merged[field] = value
+    return merged
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings"""
+
+    def __init__(self, capacity: int, false_positive_rate: float):
+        """
+        Args:
+            capacity: Number of keys the filter is sized for
+            false_positive_rate: Target false-positive rate at capacity
+        """
+        capacity = max(int(capacity), 1)
+        self.capacity = capacity
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str) -> None:
+        """Add a key"""
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._bits)
+
+    def expected_false_positive_rate(self) -> float:
+        """Theoretical false-positive rate at the current fill"""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+class LeadDedupIndex:
+    """Bloom filter over lead identity keys, in front of the CRM's own lookup"""
+
+    def __init__(self):
+        settings = self.get_settings()
+        self.bloom = BloomFilter(settings["expected_leads"], settings["false_positive_rate"])
+        self.lookups = 0
+        self.bloom_negatives = 0
+        self.confirmed_duplicates = 0
+        self.false_positives = 0
+        self.rebuild_seconds: Optional[float] = None
+
+    def get_settings(self) -> Dict[str, Any]:
+        """Get dedup settings merged over the defaults"""
+        crm_settings = config_manager.get_config("crm_settings")
+        return {**DEFAULT_DEDUP_SETTINGS, **crm_settings.get("dedup", {})}
+
+    def is_enabled(self) -> bool:
+        """Check whether deduplication is switched on"""
+        return bool(self.get_settings()["enabled"])
+
+    def key_for(self, lead: Any) -> Optional[str]:
+        """Identity key for a lead under the current settings"""
+        return dedup_key(lead, self.get_settings()["match_name_company"])
+
+    def might_contain(self, key: str) -> bool:
+        """
+        Check the Bloom filter
+
+        Returns:
+            False if the key was definitely never stored (no disk lookup needed)
+        """
+        self.lookups += 1
+        if key in self.bloom:
+            return True
+        self.bloom_negatives += 1
+        return False
+
+    def add(self, key: str) -> None:
+        """Record a stored key"""
+        self.bloom.add(key)
+
+    def add_leads(self, leads: Iterable[Any]) -> int:
+        """
+        Record the keys of stored leads
+
+        Returns:
+            Number of keys added
+        """
+        count = 0
+        for lead in leads:
+            key = self.key_for(lead)
+            if key:
+                self.bloom.add(key)
+                count += 1
+        return count
+
+    def record_lookup(self, found: bool) -> None:
+        """Record whether a Bloom-filter hit was a real duplicate"""
+        if found:
+            self.confirmed_duplicates += 1
+        else:
+            self.false_positives += 1
+
+    def rebuild(self, leads: Iterable[Any]) -> int:
+        """
+        Rebuild the filter from the stored leads
+
+        Sized for twice the current lead count (at least expected_leads) so
+        the false-positive rate holds while the store grows.
+
+        Args:
+            leads: Every stored lead
+
+        Returns:
+            Number of keys indexed
+        """
+        start = time.perf_counter()
+        settings = self.get_settings()
+        keys = [key for key in (dedup_key(lead, settings["match_name_company"]) for lead in leads) if key]
+        bloom = BloomFilter(max(settings["expected_leads"], 2 * len(keys)), settings["false_positive_rate"])
+        for key in keys:
+            bloom.add(key)
+        self.bloom = bloom
+        # Counters describe the current filter
+        self.lookups = self.bloom_negatives = self.confirmed_duplicates = self.false_positives = 0
+        self.rebuild_seconds = time.perf_counter() - start
+        logger.info(f"Dedup index rebuilt with {len(keys)} keys in {self.rebuild_seconds:.3f}s")
+        return len(keys)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get filter size, fill and observed false-positive rate"""
+        # False positives over all lookups for keys that weren't stored
+        true_negatives = self.bloom_negatives
+        return {
+            "enabled": self.is_enabled(),
+            "keys": self.bloom.count,
+            "memory_bytes": self.bloom.memory_bytes,
+            "hash_functions": self.bloom.num_hashes,
+            "lookups": self.lookups,
+            "disk_lookups_avoided": self.bloom_negatives,
+            "confirmed_duplicates": self.confirmed_duplicates,
+            "false_positives": self.false_positives,
+            "observed_false_positive_rate": (
+                round(self.false_positives / (self.false_positives + true_negatives), 6)
+                if self.false_positives + true_negatives else 0
+            ),
+            "expected_false_positive_rate": round(self.bloom.expected_false_positive_rate(), 6),
+            "rebuild_seconds": round(self.rebuild_seconds, 3) if self.rebuild_seconds is not None else None
+        }
+
+# Global lead dedup index instance
+crm_dedup_index = LeadDedupIndex()
@@ -0,0 +1,195 @@
+import json
+import os
+import time
+import uuid
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ("never", "interval", "always")
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+class JSONLStore:
+    """Append-only newline-delimited JSON log; each record costs one write"""
+
+    def __init__(self, path: Path, fsync: str = "never", fsync_interval_seconds: float = 1.0):
+        """
+        Args:
+            path: Log file path
+            fsync: "never" (leave flushing to the OS), "interval" (at most once
+                per fsync_interval_seconds) or "always" (after every record)
+            fsync_interval_seconds: Minimum gap between fsyncs for "interval"
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}', expected one of {FSYNC_POLICIES}")
+        self.path = Path(path)
+        self.fsync = fsync
+        self.fsync_interval_seconds = fsync_interval_seconds
+        self._last_fsync = 0.0
+
+    def configure(self, fsync: str, fsync_interval_seconds: float) -> None:
+        """Change the fsync policy"""
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}', expected one of {FSYNC_POLICIES}")
+        self.fsync = fsync
+        self.fsync_interval_seconds = fsync_interval_seconds
+
+    def _should_fsync(self) -> bool:
+        if self.fsync == "always":
+            return True
+        if self.fsync == "interval":
+            return time.monotonic() - self._last_fsync >= self.fsync_interval_seconds
+        return False
+
+    def append(self, record: Any) -> int:
+        """
+        Append one record as a single line
+
+        Args:
+            record: JSON-serializable record
+
+        Returns:
+            Bytes written
+        """
+        return self.append_many([record])
+
+    def append_many(self, records: List[Any]) -> int:
+        """
+        Append several records with one write
+
+        Args:
+            records: JSON-serializable records
+
+        Returns:
+            Bytes written
+        """
+        return self.append_lines([(json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8") for record in records])
+
+    def append_lines(self, lines: List[bytes]) -> int:
+        """
+        Append already encoded, newline-terminated lines with one write
+
+        Args:
+            lines: Encoded lines
+
+        Returns:
+            Bytes written
+        """
+        if not lines:
+            return 0
+        payload = b"".join(lines)
+        # O_APPEND makes each write land at the current end of file, whole
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            written = os.write(fd, payload)
+            if written != len(payload):
+                raise OSError(f"Short write to {self.path}: {written} of {len(payload)} bytes")
+            if self._should_fsync():
+                os.fsync(fd)
+                self._last_fsync = time.monotonic()
+        finally:
+            os.close(fd)
+        return written
+
+    def iter_records(self) -> Iterator[Any]:
+        """
+        Stream records from the log in insertion order
+
+        Yields:
+            Decoded records; a torn final line (interrupted write) is skipped
+        """
+        for _, record in self.iter_numbered_records():
+            yield record
+
+    def iter_numbered_records(self, contains: Optional[bytes] = None) -> Iterator[Tuple[int, Any]]:
+        """
+        Stream (line number, record) pairs from the log
+
+        Args:
+            contains: Only decode lines containing these bytes
+
+        Yields:
+            Line number and decoded record; unreadable lines are skipped
+        """
+        if not self.path.exists():
+            return
+        with open(self.path, "rb") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip() or (contains is not None and contains not in line):
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping unreadable record at {self.path}:{line_number}")
+
+    def count(self, exclude: Optional[bytes] = None) -> int:
+        """
+        Count records without decoding them
+
+        Args:
+            exclude: Don't count lines containing these bytes
+        """
+        if not self.path.exists():
+            return 0
+        total = 0
+        with open(self.path, "rb") as f:
+            if exclude is not None:
+                return sum(1 for line in f if line.strip() and exclude not in line)
+            while True:
+                chunk = f.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                total += chunk.count(b"\n")
+        return total
+
+    def migrate_legacy(self, legacy_path: Path) -> Optional[int]:
+        """
+        One-time import of a legacy JSON-array file into the log
+
+        The log is written to a temporary file and moved into place atomically,
+        then the legacy file is renamed with a .migrated suffix so the data is
+        kept but not imported twice.
+
+        Args:
+            legacy_path: Path of the JSON array file
+
+        Returns:
+            Number of records migrated, or None if there was nothing to migrate
+
+        Raises:
+            ValueError: If the legacy file is not a JSON array
+        """
+        legacy_path = Path(legacy_path)
+        if self.path.exists() or not legacy_path.exists():
+            return None
+
+        try:
+            leads = json.loads(legacy_path.read_text(encoding="utf-8") or "[]")
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Cannot migrate {legacy_path}: {e}") from e
+        if not isinstance(leads, list):
+            raise ValueError(f"Cannot migrate {legacy_path}: expected a JSON array")
+
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            for lead in leads:
+                # Legacy leads carry no timestamp
+                record = {"id": uuid.uuid4().hex, "ts": None, "lead": lead}
+                f.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        legacy_path.rename(legacy_path.with_name(legacy_path.name + ".migrated"))
+
+        logger.info(f"Migrated {len(leads)} leads from {legacy_path} to {self.path}")
+        return len(leads)
+
+    def get_file_stats(self) -> Dict[str, Any]:
+        """Size and modification time of the log"""
+        if not self.path.exists():
+            return {"last_updated": None, "file_size": 0}
+        stat = self.path.stat()
+        return {"last_updated": stat.st_mtime, "file_size": stat.st_size}
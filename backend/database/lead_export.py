@@ -0,0 +1,134 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, Optional
+from database.crm import iter_records
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8"
+}
+
+CSV_FIELDS = ("id", "created_at", "name", "email", "company")
+
+# Rows are encoded in batches of about this many bytes per yielded chunk
+CHUNK_BYTES = 64 * 1024
+
+# Spreadsheets run cells starting with these as formulas; lead data comes
+# from arbitrary messages, so such cells are prefixed with a quote
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+def _created_at(ts: Any) -> Optional[str]:
+    if not isinstance(ts, (int, float)):
+        return None
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+def _csv_cell(value: Any) -> str:
+    text = "" if value is None else str(value)
+    return "'" + text if text.startswith(FORMULA_PREFIXES) else text
+
+def iter_ndjson(records: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """
+    Encode records as newline-delimited JSON
+
+    Args:
+        records: Records ({"id", "ts", "lead"})
+
+    Yields:
+        Chunks of about CHUNK_BYTES, one {"id", "created_at", "lead"} object per line
+    """
+    buffer = []
+    size = 0
+    for record in records:
+        line = json.dumps(
+            {"id": record.get("id"), "created_at": _created_at(record.get("ts")), "lead": record.get("lead")},
+            ensure_ascii=False
+        ).encode("utf-8") + b"\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield b"".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+def iter_csv(records: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """
+    Encode records as CSV with a header row
+
+    Args:
+        records: Records ({"id", "ts", "lead"})
+
+    Yields:
+        Chunks of about CHUNK_BYTES of CSV_FIELDS columns
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_FIELDS)
+    for record in records:
+        lead = record.get("lead") if isinstance(record.get("lead"), dict) else {}
+        writer.writerow((
+            _csv_cell(record.get("id")),
+            _csv_cell(_created_at(record.get("ts"))),
+            _csv_cell(lead.get("name")),
+            _csv_cell(lead.get("email")),
+            _csv_cell(lead.get("company"))
+        ))
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """
+    Compress a byte stream into a single gzip member as it goes
+
+    Args:
+        chunks: Uncompressed chunks
+        level: zlib compression level
+
+    Yields:
+        Compressed chunks
+    """
+    # wbits=31: zlib's deflate with a gzip header and trailer
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def export_leads(export_format: str = "ndjson", start: Optional[float] = None, end: Optional[float] = None,
+                 company: Optional[str] = None, gzip: bool = False) -> Iterator[bytes]:
+    """
+    Stream leads from the configured CRM backend in an export format
+
+    Leads are read, encoded and (optionally) compressed one chunk at a time,
+    so memory doesn't grow with the number of leads exported. The JSON
+    backend first collects the position of each lead updated since its last
+    compaction (an id and two integers each), so that part grows with the
+    recent updates; SQLite needs nothing up front. Blocking: iterate it in a
+    worker thread (StreamingResponse does this for plain iterators).
+
+    Args:
+        export_format: "ndjson" or "csv"
+        start: Only leads saved at or after this Unix time
+        end: Only leads saved before this Unix time
+        company: Only leads of this company (case-insensitive)
+        gzip: Compress the stream
+
+    Returns:
+        Iterator of encoded chunks
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{export_format}', expected one of {tuple(EXPORT_FORMATS)}")
+    encode = iter_ndjson if export_format == "ndjson" else iter_csv
+    chunks = encode(iter_records(start, end, company))
+    return gzip_chunks(chunks) if gzip else chunks
@@ -1,72 +1,293 @@
-import json
 import time
 import random
+import threading
+import uuid
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from database.segmented_log import LogPosition, SegmentedLog
+from database.retry import call_with_retries
+from database.crm_stats import JSONLStatsSidecar
+from database.query_index import LeadQueryIndex
+from services.config_manager import config_manager
 
+# Legacy JSON array file; leads now live in the segmented append-only log next to it
 CRM_FILE = Path("database/crm.json")
-MAX_RETRIES = 3
-RETRY_DELAY = 1  # seconds
+DEFAULT_FAILURE_RATE = 0.1
 
-def save_to_crm(data: dict, retry_count: int = 0) -> str:
+DEFAULT_STORAGE_SETTINGS = {
+    "fsync": "never",
+    "fsync_interval_seconds": 1.0,
+    "max_segment_bytes": 64 * 1024 * 1024,
+    "max_segment_seconds": 86400,
+    "index_interval": 1000,
+    "compact_on_rotate": True
+}
+
+# One log/stats sidecar per path (tests point CRM_FILE at temporary directories)
+_stores: Dict[Path, SegmentedLog] = {}
+_sidecars: Dict[Path, JSONLStatsSidecar] = {}
+_query_indexes: Dict[Path, LeadQueryIndex] = {}
+# How far iter_unseen_leads has followed each log
+_unseen_positions: Dict[Path, LogPosition] = {}
+_stores_lock = threading.Lock()
+
+def get_crm_log_path() -> Path:
+    """Path of the active log segment, derived from CRM_FILE"""
+    return CRM_FILE.with_suffix(".jsonl")
+
+def get_storage_settings() -> Dict[str, Any]:
+    """Get CRM storage settings merged over the defaults"""
+    crm_settings = config_manager.get_config("crm_settings")
+    return {**DEFAULT_STORAGE_SETTINGS, **crm_settings.get("storage", {})}
+
+def get_store() -> SegmentedLog:
+    """
+    Get the lead log, migrating the legacy JSON array on first use
+
+    Returns:
+        SegmentedLog for the current CRM_FILE
+
+    Raises:
+        ValueError: If a legacy file exists but can't be migrated
+    """
+    settings = get_storage_settings()
+    policy = (
+        settings["fsync"], settings["fsync_interval_seconds"], settings["max_segment_bytes"],
+        settings["max_segment_seconds"], settings["index_interval"], settings["compact_on_rotate"]
+    )
+    path = get_crm_log_path()
+    # Saves run in worker threads and processes; only one of them may run the migration
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = SegmentedLog(path, *policy)
+            store.migrate_legacy(CRM_FILE)
+            _stores[path] = store
+        else:
+            store.configure(*policy)
+    return store
+
+def get_stats_sidecar() -> JSONLStatsSidecar:
+    """Get the maintained counters for the current lead log"""
+    store = get_store()
+    with _stores_lock:
+        sidecar = _sidecars.get(store.path)
+        if sidecar is None:
+            sidecar = _sidecars[store.path] = JSONLStatsSidecar(CRM_FILE.with_suffix(".stats.json"), store)
+    return sidecar
+
+def get_query_index() -> LeadQueryIndex:
+    """Get the secondary indexes for the current lead log (built on first query)"""
+    store = get_store()
+    with _stores_lock:
+        index = _query_indexes.get(store.path)
+        if index is None:
+            index = _query_indexes[store.path] = LeadQueryIndex(store)
+    return index
+
+def dedup_lock():
+    """
+    Lock held across a dedup lookup and the write it decides on
+
+    It is the log's writer lock, so it excludes the other uvicorn workers
+    too; the writes inside take it again (it is re-entrant per thread).
+    """
+    return get_store().lock()
+
+def iter_unseen_leads(from_start: bool = False) -> Iterator[Any]:
+    """
+    Stream the leads saved (or updated) by any worker since the previous call
+
+    The dedup filter follows the log with this, so it also learns the keys
+    other uvicorn workers stored.
+
+    Args:
+        from_start: Start over from the first record of the log
+
+    Yields:
+        Lead data, oldest first
+    """
+    store = get_store()
+    position = None if from_start else _unseen_positions.get(store.path)
+    for position, _, record in store.iter_since(position):
+        if isinstance(record, dict):
+            yield record.get("lead")
+        _unseen_positions[store.path] = position
+
+def _append(records: List[dict]) -> None:
+    # The log takes a cross-process lock: other uvicorn workers append too
+    get_store().append_many(records)
+
+def _simulate_failure() -> None:
+    # Simulate occasional failures for testing retry logic
+    failure_rate = config_manager.get_config("crm_settings").get("failure_rate", DEFAULT_FAILURE_RATE)
+    if random.random() < failure_rate:
+        raise Exception("Simulated CRM failure")
+
+def write_lead(data: dict) -> None:
+    """
+    Save one lead, single attempt
+
+    Args:
+        data: Lead data to save
+
+    Raises:
+        Exception: If the write (or a simulated failure) fails
+    """
+    _simulate_failure()
+    _append([{"id": uuid.uuid4().hex, "ts": time.time(), "lead": data}])
+
+def write_leads(leads: List[dict]) -> None:
+    """
+    Save several leads with a single append, single attempt
+
+    Args:
+        leads: Lead data to save
+
+    Raises:
+        Exception: If the write (or a simulated failure) fails
+    """
+    _simulate_failure()
+    now = time.time()
+    _append([{"id": uuid.uuid4().hex, "ts": now, "lead": data} for data in leads])
+
+def update_lead(lead_id: str, data: dict) -> None:
+    """
+    Replace a stored lead by appending a newer version of it, single attempt
+
+    Args:
+        lead_id: Id of the stored lead
+        data: The lead's new data
+
+    Raises:
+        Exception: If the write (or a simulated failure) fails
+    """
+    _simulate_failure()
+    _append([{"op": "upsert", "id": lead_id, "ts": time.time(), "lead": data}])
+
+def save_to_crm(data: dict) -> str:
     """
-    Save lead data to CRM with retry logic
-    
+    Save lead data to CRM with retry logic (blocking; the API uses database.crm)
+
     Args:
         data: Lead data to save
-        retry_count: Current retry attempt (internal use)
-    
+
     Returns:
         "success" or "failure"
     """
     try:
-        # Simulate occasional failures for testing retry logic
-        if random.random() < 0.1:  # 10% chance of failure
-            raise Exception("Simulated CRM failure")
-            
-        if not CRM_FILE.exists():
-            CRM_FILE.write_text("[]")
-        
-        leads = json.loads(CRM_FILE.read_text())
-        leads.append(data)
-        CRM_FILE.write_text(json.dumps(leads, indent=2))
+        call_with_retries(write_lead, data)
         return "success"
-        
-    except Exception as e:
-        print(f"CRM save attempt {retry_count + 1} failed: {e}")
-        
-        # Retry logic
-        if retry_count < MAX_RETRIES:
-            print(f"Retrying in {RETRY_DELAY} seconds... (attempt {retry_count + 2}/{MAX_RETRIES + 1})")
-            time.sleep(RETRY_DELAY)
-            return save_to_crm(data, retry_count + 1)
-        else:
-            print(f"All {MAX_RETRIES + 1} attempts failed. Giving up.")
-            return "failure"
+    except Exception:
+        return "failure"
+
+def save_many_to_crm(leads: List[dict]) -> List[str]:
+    """
+    Save several leads with a single append and retry logic (blocking)
+
+    Args:
+        leads: Lead data to save
+
+    Returns:
+        "success" or "failure" for each lead, in order (all or nothing)
+    """
+    try:
+        call_with_retries(write_leads, leads)
+        return ["success"] * len(leads)
+    except Exception:
+        return ["failure"] * len(leads)
+
+def iter_records(start: Optional[float] = None, end: Optional[float] = None,
+                 company: Optional[str] = None) -> Iterator[dict]:
+    """
+    Stream the current version of every saved lead record
+
+    Updated leads are returned at their original position with their latest
+    data. With a time range only the segments (and chunks of them) whose
+    index overlaps it are read.
+
+    Args:
+        start: Only leads saved at or after this Unix time
+        end: Only leads saved before this Unix time
+        company: Only leads of this company (case-insensitive)
+
+    Yields:
+        Records ({"id", "ts", "lead"}) in the order leads were saved
+    """
+    records = get_store().iter_records(start, end)
+    if company is None:
+        return records
+    company = company.lower()
+    return (
+        record for record in records
+        if isinstance(record.get("lead"), dict) and str(record["lead"].get("company", "")).lower() == company
+    )
+
+def iter_leads(start: Optional[float] = None, end: Optional[float] = None) -> Iterator[Optional[dict]]:
+    """
+    Stream saved leads in insertion order
+
+    Args:
+        start: Only leads saved at or after this Unix time
+        end: Only leads saved before this Unix time
+
+    Yields:
+        Lead data as passed to save_to_crm (the latest version of updated leads)
+    """
+    for record in iter_records(start, end):
+        yield record.get("lead")
+
+def find_duplicate(key: str, match_name_company: bool = False) -> Optional[Tuple[str, dict]]:
+    """
+    Find the stored lead with this identity key, through the query index
+
+    Args:
+        key: Key from dedup_index.dedup_key
+        match_name_company: Whether name+company keys are in use
+
+    Returns:
+        (lead id, lead) of the most recent match, or None
+    """
+    if key.startswith("name_company:") and not match_name_company:
+        return None
+    return get_query_index().find_duplicate(key)
+
+def query_leads(company: Optional[str] = None, email_domain: Optional[str] = None,
+                start: Optional[float] = None, end: Optional[float] = None,
+                limit: int = 50, after: Optional[int] = None) -> Tuple[List[dict], Optional[int]]:
+    """
+    Get one page of leads through the in-memory secondary indexes
+
+    Args:
+        company: Only leads of this company (case-insensitive)
+        email_domain: Only leads whose email is at this domain (case-insensitive)
+        start: Only leads saved at or after this Unix time
+        end: Only leads saved before this Unix time
+        limit: Page size
+        after: Position returned with the previous page
+
+    Returns:
+        (records ({"id", "ts", "lead"}) in save order, position to continue
+        after, or None on the last page)
+    """
+    return get_query_index().query(company, email_domain, start, end, limit, after)
 
 def get_crm_stats() -> dict:
     """
-    Get CRM statistics
-    
+    Get CRM statistics from the maintained counters (no lead data is read)
+
     Returns:
         Dictionary with CRM statistics
     """
     try:
-        if not CRM_FILE.exists():
+        if not get_crm_log_path().exists() and not CRM_FILE.exists():
             return {
                 "total_leads": 0,
                 "last_updated": None,
                 "file_size": 0
             }
-        
-        leads = json.loads(CRM_FILE.read_text())
-        file_stats = CRM_FILE.stat()
-        
-        return {
-            "total_leads": len(leads),
-            "last_updated": file_stats.st_mtime,
-            "file_size": file_stats.st_size
-        }
+
+        return get_stats_sidecar().get_stats()
     except Exception as e:
         print(f"Error getting CRM stats: {e}")
         return {
@@ -75,3 +296,31 @@ def get_crm_stats() -> dict:
             "file_size": 0,
             "error": str(e)
         }
+
+def check_stats() -> List[str]:
+    """Compare the maintained counters with a full scan of the log"""
+    return get_stats_sidecar().check()
+
+def rebuild_stats() -> None:
+    """Re-index the log segments and rewrite the stats sidecar"""
+    get_stats_sidecar().rebuild()
+
+def compact() -> Dict[str, int]:
+    """
+    Drop superseded lead versions from the sealed log segments
+
+    Returns:
+        Segments rewritten and records dropped
+    """
+    return get_store().compact()
+
+def close_all() -> None:
+    """Wait for running compactions and forget open logs (app shutdown)"""
+    with _stores_lock:
+        stores = list(_stores.values())
+        _sidecars.clear()
+        _query_indexes.clear()
+        _unseen_positions.clear()
+        _stores.clear()
+    for store in stores:
+        store.close()
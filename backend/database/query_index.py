@@ -0,0 +1,269 @@
+import bisect
+import json
+import math
+import threading
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+from database.segmented_log import LogPosition, SegmentedLog, is_new_lead, is_upsert, record_timestamp
+from database.dedup_index import dedup_key, normalize_email
+
+def company_key(company: Any) -> str:
+    """Company as matched by queries: case-insensitive"""
+    return str(company or "").lower()
+
+def email_domain(email: Any) -> str:
+    """Lowercased domain of an email, "" if it has none"""
+    email = normalize_email(email)
+    return email.split("@", 1)[1] if email else ""
+
+class LeadQueryIndex:
+    """
+    In-memory secondary indexes over the JSON lead log, for paged lookups by
+    company, email domain and save time
+
+    Every lead gets a sequence number in log order. The index keeps a sorted
+    array of sequence numbers per company and per email domain, and the save
+    times in sequence order, so a query is a couple of binary searches plus
+    the page itself. It keeps the log line of each lead's latest version, so
+    pages are served without touching the log.
+
+    It also keeps the leads of each dedup identity key (email, or
+    name+company for leads without one), so finding the stored duplicate of
+    a new lead is a dictionary lookup rather than a scan of the log.
+
+    The index follows the log rather than being told about writes: every
+    query first reads what was appended since the last one, which includes
+    leads saved by other worker processes.
+    """
+
+    def __init__(self, log: SegmentedLog):
+        self.log = log
+        self.lock = threading.Lock()
+        self.position: Optional[LogPosition] = None
+        self.ids: List[Any] = []
+        # Log line of each lead's latest version
+        self.lines: List[bytes] = []
+        self.seq_by_id: Dict[Any, int] = {}
+        self.timestamps = array("d")
+        # Running maximum of the save times, so it can be binary searched even
+        # when workers' appends land slightly out of time order
+        self.sort_times = array("d")
+        self.company_of = array("L")
+        self.domain_of = array("L")
+        self.company_postings: Dict[int, array] = {}
+        self.domain_postings: Dict[int, array] = {}
+        self.keys: Dict[str, int] = {}
+        # Dedup identity key -> sequence number, or a sorted array of them for
+        # keys several leads share; almost every key has one lead, and an
+        # array per key would nearly double the index's memory
+        self.identity_of: List[Optional[str]] = []
+        self.identities: Dict[str, Any] = {}
+
+    def _key_id(self, key: str) -> int:
+        key_id = self.keys.get(key)
+        if key_id is None:
+            key_id = self.keys[key] = len(self.keys)
+        return key_id
+
+    @staticmethod
+    def _move(postings: Dict[int, array], key_of: array, seq: int, key_id: int) -> None:
+        old = key_of[seq]
+        if old == key_id:
+            return
+        old_list = postings[old]
+        del old_list[bisect.bisect_left(old_list, seq)]
+        new_list = postings.setdefault(key_id, array("L"))
+        if not new_list or new_list[-1] < seq:
+            new_list.append(seq)
+        else:
+            new_list.insert(bisect.bisect_left(new_list, seq), seq)
+        key_of[seq] = key_id
+
+    def _keys_of(self, lead: Any) -> Tuple[int, int]:
+        fields = lead if isinstance(lead, dict) else {}
+        return self._key_id(company_key(fields.get("company"))), self._key_id(email_domain(fields.get("email")))
+
+    def _add_identity(self, key: Optional[str], seq: int) -> None:
+        if key is None:
+            return
+        entry = self.identities.get(key)
+        if entry is None:
+            self.identities[key] = seq
+            return
+        if isinstance(entry, int):
+            entry = self.identities[key] = array("L", [entry])
+        if entry[-1] < seq:
+            entry.append(seq)
+        else:
+            entry.insert(bisect.bisect_left(entry, seq), seq)
+
+    def _remove_identity(self, key: Optional[str], seq: int) -> None:
+        if key is None:
+            return
+        entry = self.identities[key]
+        if isinstance(entry, int):
+            del self.identities[key]
+            return
+        del entry[bisect.bisect_left(entry, seq)]
+        if len(entry) == 1:
+            self.identities[key] = entry[0]
+
+    @staticmethod
+    def _identity(lead: Any) -> Optional[str]:
+        # Name+company keys are kept even when unused: leads with an email get the same key either way
+        return dedup_key(lead, match_name_company=True)
+
+    def _set_lead(self, seq: int, line: bytes, lead: Any) -> None:
+        self.lines[seq] = line
+        company, domain = self._keys_of(lead)
+        self._move(self.company_postings, self.company_of, seq, company)
+        self._move(self.domain_postings, self.domain_of, seq, domain)
+        identity = self._identity(lead) if self.ids[seq] is not None else None
+        if identity != self.identity_of[seq]:
+            self._remove_identity(self.identity_of[seq], seq)
+            self._add_identity(identity, seq)
+            self.identity_of[seq] = identity
+
+    def _add_lead(self, lead_id: Any, ts: Optional[float], line: bytes, lead: Any) -> None:
+        seq = len(self.ids)
+        self.ids.append(lead_id)
+        if lead_id is not None:
+            self.seq_by_id[lead_id] = seq
+        self.lines.append(line)
+        self.timestamps.append(math.nan if ts is None else ts)
+        previous = self.sort_times[-1] if self.sort_times else 0.0
+        self.sort_times.append(previous if ts is None else max(ts, previous))
+        company, domain = self._keys_of(lead)
+        self.company_of.append(company)
+        self.domain_of.append(domain)
+        # seq is the largest so far: appending keeps the posting lists sorted
+        self.company_postings.setdefault(company, array("L")).append(seq)
+        self.domain_postings.setdefault(domain, array("L")).append(seq)
+        # A lead without an id can't be updated, so it is never anyone's duplicate
+        identity = self._identity(lead) if lead_id is not None else None
+        self.identity_of.append(identity)
+        self._add_identity(identity, seq)
+
+    def _apply(self, line: bytes, record: Any) -> None:
+        if is_upsert(record):
+            seq = self.seq_by_id.get(record.get("id"))
+            if seq is not None:
+                self._set_lead(seq, line, record.get("lead"))
+        elif is_new_lead(record):
+            lead_id = record.get("id")
+            if lead_id is not None and lead_id in self.seq_by_id:
+                # A compacted segment read again: the original with folded data
+                self._set_lead(self.seq_by_id[lead_id], line, record.get("lead"))
+            else:
+                self._add_lead(lead_id, record_timestamp(record), line, record.get("lead"))
+
+    def refresh(self) -> int:
+        """
+        Catch up with the log
+
+        Returns:
+            Number of leads indexed
+        """
+        with self.lock:
+            self._refresh()
+            return len(self.ids)
+
+    def _refresh(self) -> None:
+        for position, line, record in self.log.iter_since(self.position):
+            self._apply(line, record)
+            self.position = position
+
+    def query(self, company: Optional[str] = None, email_domain: Optional[str] = None,
+              start: Optional[float] = None, end: Optional[float] = None,
+              limit: int = 50, after: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        One page of matching leads in save order
+
+        Time bounds are resolved to positions in save order (the first lead
+        saved at or after the bound), so leads that reached the log a few
+        milliseconds out of order are paged with their neighbours.
+
+        Args:
+            company: Only leads of this company (case-insensitive)
+            email_domain: Only leads whose email is at this domain (case-insensitive)
+            start: Only leads saved at or after this Unix time
+            end: Only leads saved before this Unix time
+            limit: Page size
+            after: Sequence number of the last lead of the previous page
+
+        Returns:
+            (records ({"id", "ts", "lead"}), sequence number to continue after,
+            or None on the last page)
+        """
+        with self.lock:
+            self._refresh()
+            low = 0 if after is None else after + 1
+            if start is not None:
+                low = max(low, bisect.bisect_left(self.sort_times, start))
+            high = len(self.ids) if end is None else bisect.bisect_left(self.sort_times, end)
+
+            filters = []
+            for value, postings, key_of, key in (
+                (company, self.company_postings, self.company_of, company_key),
+                (email_domain, self.domain_postings, self.domain_of, lambda domain: str(domain).lower())
+            ):
+                if value is not None:
+                    key_id = self.keys.get(key(value))
+                    if key_id is None or key_id not in postings:
+                        return [], None
+                    filters.append((postings[key_id], key_of, key_id))
+
+            matches: List[int] = []
+            if filters:
+                # Walk the shortest posting list and check the others per lead
+                filters.sort(key=lambda entry: len(entry[0]))
+                candidates, *others = filters
+                postings = candidates[0]
+                index = bisect.bisect_left(postings, low)
+                while index < len(postings) and len(matches) <= limit:
+                    seq = postings[index]
+                    if seq >= high:
+                        break
+                    if all(key_of[seq] == key_id for _, key_of, key_id in others):
+                        matches.append(seq)
+                    index += 1
+            else:
+                matches = list(range(low, min(high, low + limit + 1)))
+
+            page = matches[:limit]
+            records = [
+                {
+                    "id": self.ids[seq],
+                    "ts": None if math.isnan(self.timestamps[seq]) else self.timestamps[seq],
+                    "lead": json.loads(self.lines[seq]).get("lead")
+                }
+                for seq in page
+            ]
+        return records, page[-1] if len(matches) > limit else None
+
+    def find_duplicate(self, key: str) -> Optional[Tuple[Any, Any]]:
+        """
+        Most recently saved lead with a dedup identity key
+
+        Args:
+            key: Key from dedup_index.dedup_key
+
+        Returns:
+            (lead id, lead), or None
+        """
+        with self.lock:
+            self._refresh()
+            entry = self.identities.get(key)
+            if entry is None:
+                return None
+            seq = entry if isinstance(entry, int) else entry[-1]
+            return self.ids[seq], json.loads(self.lines[seq]).get("lead")
+
+    def get_stats(self) -> Dict[str, int]:
+        """Leads, companies and email domains indexed"""
+        with self.lock:
+            return {
+                "leads": len(self.ids),
+                "companies": sum(1 for postings in self.company_postings.values() if postings),
+                "email_domains": sum(1 for postings in self.domain_postings.values() if postings)
+            }
@@ -0,0 +1,87 @@
+import asyncio
+import random
+import time
+from typing import Any, Callable, Dict, TypeVar
+from services.config_manager import config_manager
+
+T = TypeVar("T")
+
+DEFAULT_RETRY_SETTINGS = {
+    "retry_attempts": 3,
+    "retry_delay": 1,  # seconds, base of the exponential backoff
+    "max_retry_delay": 30  # seconds, cap on a single backoff
+}
+
+def get_retry_settings() -> Dict[str, Any]:
+    """Get CRM retry settings merged over the defaults"""
+    crm_settings = config_manager.get_config("crm_settings")
+    return {key: crm_settings.get(key, default) for key, default in DEFAULT_RETRY_SETTINGS.items()}
+
+def backoff_delay(attempt: int, settings: Dict[str, Any]) -> float:
+    """
+    Delay before retry number attempt + 1: exponential backoff with full jitter
+
+    Args:
+        attempt: Zero-based number of the attempt that just failed
+        settings: Retry settings
+
+    Returns:
+        Seconds to wait, uniformly drawn from [0, min(max_retry_delay, retry_delay * 2 ** attempt)]
+    """
+    ceiling = min(settings["max_retry_delay"], settings["retry_delay"] * 2 ** attempt)
+    # Spreads out callers that failed together so they don't retry in lockstep
+    return random.uniform(0, ceiling)
+
+def call_with_retries(fn: Callable[..., T], *args: Any) -> T:
+    """
+    Call fn, retrying failures with backoff (blocks the calling thread)
+
+    Args:
+        fn: Single-attempt operation that raises on failure
+        *args: Arguments for fn
+
+    Returns:
+        fn's result
+
+    Raises:
+        Exception: The last error once retry_attempts retries have failed
+    """
+    settings = get_retry_settings()
+    for attempt in range(settings["retry_attempts"] + 1):
+        try:
+            return fn(*args)
+        except Exception as e:
+            print(f"CRM save attempt {attempt + 1} failed: {e}")
+            if attempt >= settings["retry_attempts"]:
+                print(f"All {attempt + 1} attempts failed. Giving up.")
+                raise
+            delay = backoff_delay(attempt, settings)
+            print(f"Retrying in {delay:.2f} seconds... (attempt {attempt + 2}/{settings['retry_attempts'] + 1})")
+            time.sleep(delay)
+
+async def call_with_retries_async(fn: Callable[..., T], *args: Any) -> T:
+    """
+    Run blocking fn in a worker thread, retrying failures with non-blocking backoff
+
+    Args:
+        fn: Single-attempt blocking operation that raises on failure
+        *args: Arguments for fn
+
+    Returns:
+        fn's result
+
+    Raises:
+        Exception: The last error once retry_attempts retries have failed
+    """
+    settings = get_retry_settings()
+    for attempt in range(settings["retry_attempts"] + 1):
+        try:
+            return await asyncio.to_thread(fn, *args)
+        except Exception as e:
+            print(f"CRM save attempt {attempt + 1} failed: {e}")
+            if attempt >= settings["retry_attempts"]:
+                print(f"All {attempt + 1} attempts failed. Giving up.")
+                raise
+            delay = backoff_delay(attempt, settings)
+            print(f"Retrying in {delay:.2f} seconds... (attempt {attempt + 2}/{settings['retry_attempts'] + 1})")
+            await asyncio.sleep(delay)
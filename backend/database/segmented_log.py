@@ -0,0 +1,655 @@
+import json
+import mmap
+import os
+import re
+import tempfile
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from services.file_io import atomic_write_text, file_lock
+from database.jsonl_store import JSONLStore
+from database.crm_stats import LeadCounters
+
+logger = logging.getLogger(__name__)
+
+# Lines holding a newer version of an existing lead
+UPSERT_MARKER = b'"op": "upsert"'
+
+SEGMENT_NAME_RE = re.compile(r"^(\d{6})\.jsonl$")
+
+IDENTITY_BYTES = 64
+
+# (segment number, byte offset, segment inode) of a place in the log
+LogPosition = Tuple[int, int, Optional[int]]
+
+def is_upsert(record: Any) -> bool:
+    """Whether a log record is a newer version of an existing lead"""
+    return isinstance(record, dict) and record.get("op") == "upsert"
+
+def is_new_lead(record: Any) -> bool:
+    """Whether a log record adds a lead"""
+    return isinstance(record, dict) and record.get("op") != "upsert"
+
+def record_timestamp(record: Any) -> Optional[float]:
+    """Save time of a log record, None for undated (migrated) ones"""
+    ts = record.get("ts") if isinstance(record, dict) else None
+    return ts if isinstance(ts, (int, float)) else None
+
+def _in_range(ts: Optional[float], start: Optional[float], end: Optional[float]) -> bool:
+    if start is None and end is None:
+        return True
+    if ts is None:
+        return False
+    return (start is None or ts >= start) and (end is None or ts < end)
+
+def _overlaps(min_ts: Optional[float], max_ts: Optional[float], start: Optional[float], end: Optional[float]) -> bool:
+    if start is None and end is None:
+        return True
+    if min_ts is None:
+        return False  # only undated (migrated) records
+    return (start is None or max_ts >= start) and (end is None or min_ts < end)
+
+def _decode(path: Path, offset: int, line: bytes) -> Any:
+    if not line.strip():
+        return None
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        logger.warning(f"Skipping unreadable record at {path}@{offset}")
+        return None
+
+class SegmentIndex:
+    """Per-segment summary: record counts, timestamp range and sparse offsets"""
+
+    def __init__(self, interval: int = 1000):
+        """
+        Args:
+            interval: Records per chunk in the offset index
+        """
+        self.interval = interval
+        self.size = 0
+        self.records = 0
+        self.upserts = 0
+        self.min_ts: Optional[float] = None
+        self.max_ts: Optional[float] = None
+        # [byte offset, min ts, max ts] of every interval-th record onwards
+        self.chunks: List[list] = []
+        self.counters = LeadCounters()
+
+    def add(self, offset: int, line: bytes, record: Any) -> None:
+        """Account for one line (without its newline) starting at offset"""
+        self.size = offset + len(line) + 1
+        if record is None:
+            return
+        if self.records % self.interval == 0:
+            self.chunks.append([offset, None, None])
+        self.records += 1
+        ts = record_timestamp(record)
+        if ts is not None:
+            chunk = self.chunks[-1]
+            chunk[1] = ts if chunk[1] is None else min(chunk[1], ts)
+            chunk[2] = ts if chunk[2] is None else max(chunk[2], ts)
+            self.min_ts = ts if self.min_ts is None else min(self.min_ts, ts)
+            self.max_ts = ts if self.max_ts is None else max(self.max_ts, ts)
+        if is_upsert(record):
+            self.upserts += 1
+        elif is_new_lead(record):
+            self.counters.add(ts)
+
+    def chunk_ranges(self, start: Optional[float], end: Optional[float]) -> Iterator[Tuple[int, int]]:
+        """Byte ranges of the chunks that may hold records in [start, end)"""
+        for i, (offset, min_ts, max_ts) in enumerate(self.chunks):
+            if _overlaps(min_ts, max_ts, start, end):
+                yield offset, self.chunks[i + 1][0] if i + 1 < len(self.chunks) else self.size
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "records": self.records,
+            "upserts": self.upserts,
+            "min_ts": self.min_ts,
+            "max_ts": self.max_ts,
+            "interval": self.interval,
+            "chunks": self.chunks,
+            "counters": self.counters.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SegmentIndex":
+        index = cls(int(data["interval"]))
+        index.size = int(data["size"])
+        index.records = int(data["records"])
+        index.upserts = int(data["upserts"])
+        index.min_ts = data["min_ts"]
+        index.max_ts = data["max_ts"]
+        index.chunks = [list(chunk) for chunk in data["chunks"]]
+        index.counters = LeadCounters.from_dict(data["counters"])
+        return index
+
+class SegmentSnapshot:
+    """A segment mapped into memory; later appends and compactions don't change it"""
+
+    def __init__(self, number: int, path: Path):
+        self.number = number
+        self.path = path
+        self.inode: Optional[int] = None
+        self.data: Any = b""
+        try:
+            with open(path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                self.inode = stat.st_ino
+                if stat.st_size:
+                    self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            pass
+        self.size = len(self.data)
+
+    def lines(self, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, bytes]]:
+        """(offset, line) for lines starting in [start, end); a torn last line is left out"""
+        end = self.size if end is None else end
+        position = start
+        while position < end:
+            newline = self.data.find(b"\n", position)
+            if newline == -1:
+                return
+            yield position, self.data[position:newline]
+            position = newline + 1
+
+    def lines_containing(self, marker: bytes) -> Iterator[Tuple[int, bytes]]:
+        """(offset, line) for lines containing marker, found without splitting the rest"""
+        position = 0
+        while True:
+            hit = self.data.find(marker, position)
+            if hit == -1:
+                return
+            start = self.data.rfind(b"\n", 0, hit) + 1
+            newline = self.data.find(b"\n", hit)
+            if newline == -1:
+                return
+            yield start, self.data[start:newline]
+            position = newline + 1
+
+    def close(self) -> None:
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+class SegmentedLog:
+    """
+    Lead log split into segments: crm.jsonl takes appends and is sealed into
+    crm.segments/NNNNNN.jsonl (with an NNNNNN.idx.json index) once it gets too
+    big or too old
+
+    Reads map the segments into memory and use the indexes to skip segments
+    and chunks outside the requested time range. Compaction rewrites sealed
+    segments without superseded lead versions.
+    """
+
+    def __init__(self, path: Path, fsync: str = "never", fsync_interval_seconds: float = 1.0,
+                 max_segment_bytes: int = 64 * 1024 * 1024, max_segment_seconds: float = 86400,
+                 index_interval: int = 1000, compact_on_rotate: bool = True):
+        """
+        Args:
+            path: Active segment path
+            fsync: fsync policy for appends (see JSONLStore)
+            fsync_interval_seconds: Minimum gap between fsyncs for "interval"
+            max_segment_bytes: Seal the active segment at this size
+            max_segment_seconds: Seal the active segment when its first record is this old (0: never)
+            index_interval: Records per chunk in the offset index
+            compact_on_rotate: Compact in the background after sealing a segment
+        """
+        self.path = Path(path)
+        self.active = JSONLStore(self.path, fsync, fsync_interval_seconds)
+        self.segments_dir = self.path.with_suffix(".segments")
+        self.lock_path = self.path.with_suffix(".lock")
+        self.compact_lock_path = self.path.with_suffix(".compact.lock")
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_seconds = max_segment_seconds
+        self.index_interval = index_interval
+        self.compact_on_rotate = compact_on_rotate
+        self._local = threading.local()
+        self._thread_lock = threading.RLock()
+        self._active_index = SegmentIndex(index_interval)
+        # Identity of the file the active index describes: inode plus its first
+        # bytes (inodes of compacted-away segments can be reused)
+        self._active_identity: Optional[Tuple[int, bytes]] = None
+        self._first_ts: Optional[float] = None
+        self._index_cache: Dict[int, Tuple[int, int, SegmentIndex]] = {}
+        self._compaction: Optional[threading.Thread] = None
+        self.rotations = 0
+        self.compactions = 0
+
+    def configure(self, fsync: str, fsync_interval_seconds: float, max_segment_bytes: int,
+                  max_segment_seconds: float, index_interval: int, compact_on_rotate: bool) -> None:
+        """Change the fsync and rotation policy"""
+        self.active.configure(fsync, fsync_interval_seconds)
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_seconds = max_segment_seconds
+        self.index_interval = index_interval
+        self.compact_on_rotate = compact_on_rotate
+
+    @contextmanager
+    def lock(self):
+        """Exclusive writer lock across threads and worker processes (re-entrant per thread)"""
+        if getattr(self._local, "held", False):
+            yield
+            return
+        with self._thread_lock, file_lock(self.lock_path):
+            self._local.held = True
+            try:
+                yield
+            finally:
+                self._local.held = False
+
+    def segment_path(self, number: int) -> Path:
+        return self.segments_dir / f"{number:06d}.jsonl"
+
+    def index_path(self, number: int) -> Path:
+        return self.segments_dir / f"{number:06d}.idx.json"
+
+    def sealed_numbers(self) -> List[int]:
+        """Numbers of the sealed segments, oldest first"""
+        if not self.segments_dir.exists():
+            return []
+        return sorted(
+            int(match.group(1))
+            for match in (SEGMENT_NAME_RE.match(name) for name in os.listdir(self.segments_dir))
+            if match
+        )
+
+    def sync_active(self) -> SegmentIndex:
+        """
+        Bring the active segment's index up to date with records other
+        processes appended (or a rotation they did)
+
+        Returns:
+            The active segment's index
+        """
+        with self.lock():
+            identity, size = self._identify_active()
+            if identity != self._active_identity:
+                self._active_index = SegmentIndex(self.index_interval)
+                self._active_identity = identity
+                self._first_ts = None
+            if size > self._active_index.size:
+                snapshot = SegmentSnapshot(0, self.path)
+                try:
+                    for offset, line in snapshot.lines(self._active_index.size):
+                        self._add_active(offset, line, _decode(self.path, offset, line))
+                    if snapshot.size > self._active_index.size:
+                        # Nobody else is writing: an unterminated tail is a crashed
+                        # write, so end it before the next append lands after it
+                        logger.warning(f"Terminating torn record at the end of {self.path}")
+                        self.active.append_lines([b"\n"])
+                        self._active_index.size = snapshot.size + 1
+                finally:
+                    snapshot.close()
+            return self._active_index
+
+    def _identify_active(self) -> Tuple[Optional[Tuple[int, bytes]], int]:
+        try:
+            with open(self.path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                return (stat.st_ino, f.read(IDENTITY_BYTES)), stat.st_size
+        except FileNotFoundError:
+            return None, 0
+
+    def _add_active(self, offset: int, line: bytes, record: Any) -> None:
+        self._active_index.add(offset, line, record)
+        if self._first_ts is None:
+            self._first_ts = record_timestamp(record)
+
+    def _should_rotate(self) -> bool:
+        if not self._active_index.records:
+            return False
+        if self._active_index.size >= self.max_segment_bytes:
+            return True
+        return bool(self.max_segment_seconds) and self._first_ts is not None \
+            and time.time() - self._first_ts >= self.max_segment_seconds
+
+    def _rotate(self) -> None:
+        sealed = self.sealed_numbers()
+        number = sealed[-1] + 1 if sealed else 1
+        self.segments_dir.mkdir(parents=True, exist_ok=True)
+        # Index first: a segment file never exists without its index
+        atomic_write_text(self.index_path(number), json.dumps(self._active_index.to_dict()))
+        os.replace(self.path, self.segment_path(number))
+        self._active_index = SegmentIndex(self.index_interval)
+        self._active_identity = None
+        self._first_ts = None
+        self.rotations += 1
+        logger.info(f"Sealed CRM log segment {number}")
+        if self.compact_on_rotate:
+            self.compact_in_background()
+
+    def append_many(self, records: List[Any]) -> int:
+        """
+        Append records to the active segment, sealing it first if it is full
+
+        Args:
+            records: JSON-serializable records
+
+        Returns:
+            Bytes written
+        """
+        if not records:
+            return 0
+        lines = [json.dumps(record, ensure_ascii=False).encode("utf-8") for record in records]
+        with self.lock():
+            self.sync_active()
+            if self._should_rotate():
+                self._rotate()
+            offset = self._active_index.size
+            written = self.active.append_lines([line + b"\n" for line in lines])
+            if self._active_identity is None or len(self._active_identity[1]) < IDENTITY_BYTES:
+                self._active_identity = self._identify_active()[0]
+            for line, record in zip(lines, records):
+                self._add_active(offset, line, record)
+                offset += len(line) + 1
+        return written
+
+    def migrate_legacy(self, legacy_path: Path) -> Optional[int]:
+        """One-time import of a legacy JSON-array file into the active segment"""
+        with self.lock():
+            return self.active.migrate_legacy(legacy_path)
+
+    def snapshot(self, first: int = 0) -> List[SegmentSnapshot]:
+        """
+        Map the segments, sealed ones first; close them when done
+
+        Args:
+            first: Skip sealed segments numbered below this
+        """
+        with self.lock():
+            numbers = self.sealed_numbers()
+            snapshots = [SegmentSnapshot(number, self.segment_path(number)) for number in numbers if number >= first]
+            snapshots.append(SegmentSnapshot((numbers[-1] if numbers else 0) + 1, self.path))
+        return snapshots
+
+    def iter_since(self, position: Optional[LogPosition] = None) -> Iterator[Tuple[LogPosition, bytes, Any]]:
+        """
+        Follow the log: every record appended after position
+
+        A position stays valid when its segment is sealed (the file keeps its
+        number and inode). If compaction has rewritten that segment since, it
+        is read again from the start, so consumers must apply records
+        idempotently.
+
+        Args:
+            position: Position returned with an earlier record, None for the start
+
+        Yields:
+            (position just past the record, raw line, record); unreadable lines
+            give None records
+        """
+        number, offset, inode = position or (0, 0, None)
+        snapshots = self.snapshot(number)
+        try:
+            for snapshot in snapshots:
+                if snapshot.number < number:
+                    continue
+                start = offset if snapshot.number == number and snapshot.inode == inode else 0
+                for line_offset, line in snapshot.lines(start):
+                    yield (snapshot.number, line_offset + len(line) + 1, snapshot.inode), \
+                        line, _decode(snapshot.path, line_offset, line)
+        finally:
+            for snapshot in snapshots:
+                snapshot.close()
+
+    def _build_index(self, snapshot: SegmentSnapshot) -> SegmentIndex:
+        index = SegmentIndex(self.index_interval)
+        for offset, line in snapshot.lines():
+            index.add(offset, line, _decode(snapshot.path, offset, line))
+        return index
+
+    def read_index(self, snapshot: SegmentSnapshot) -> SegmentIndex:
+        """Index of a sealed segment, rebuilt if missing or not matching the snapshot"""
+        cached = self._index_cache.get(snapshot.number)
+        if cached and cached[:2] == (snapshot.inode, snapshot.size):
+            return cached[2]
+        try:
+            index = SegmentIndex.from_dict(json.loads(self.index_path(snapshot.number).read_text(encoding="utf-8")))
+            if index.size != snapshot.size:
+                raise ValueError(f"index covers {index.size} bytes, segment has {snapshot.size}")
+        except FileNotFoundError:
+            logger.warning(f"No index for {snapshot.path}, rebuilding it")
+            index = self._write_index(snapshot)
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Stale index for {snapshot.path} ({e}), rebuilding it")
+            index = self._write_index(snapshot)
+        self._index_cache[snapshot.number] = (snapshot.inode, snapshot.size, index)
+        return index
+
+    def _write_index(self, snapshot: SegmentSnapshot) -> SegmentIndex:
+        index = self._build_index(snapshot)
+        with self.lock():
+            try:
+                current = self.segment_path(snapshot.number).stat().st_ino
+            except FileNotFoundError:
+                current = None
+            # Don't overwrite the index of a segment compaction has replaced since
+            if current == snapshot.inode:
+                atomic_write_text(self.index_path(snapshot.number), json.dumps(index.to_dict()))
+        return index
+
+    def sealed_counters(self, numbers: List[int]) -> LeadCounters:
+        """Sum of the lead counters in the indexes of these sealed segments"""
+        counters = LeadCounters()
+        for number in numbers:
+            snapshot = SegmentSnapshot(number, self.segment_path(number))
+            try:
+                counters.merge(self.read_index(snapshot).counters)
+            finally:
+                snapshot.close()
+        return counters
+
+    def reindex(self) -> None:
+        """Rebuild every sealed index and the active one from the segments"""
+        for snapshot in self.snapshot()[:-1]:
+            try:
+                self._index_cache.pop(snapshot.number, None)
+                self._write_index(snapshot)
+            finally:
+                snapshot.close()
+        with self.lock():
+            self._active_identity = None
+            self.sync_active()
+
+    def _latest_versions(self, snapshots: List[SegmentSnapshot], start: Optional[float]) -> Dict[str, Tuple[int, int]]:
+        """
+        id -> (segment number, offset) of the newest upsert of each updated lead
+
+        Only positions are kept; the lead is read back with _lead_at when it's
+        needed. Compaction folds sealed upserts into their leads, so this holds
+        the leads updated since the last compaction, not every lead.
+        """
+        latest = {}
+        for snapshot in snapshots:
+            if snapshot is not snapshots[-1]:
+                index = self.read_index(snapshot)
+                # Upserts of leads saved at or after start can't be older than start
+                if not index.upserts or (start is not None and index.max_ts is not None and index.max_ts < start):
+                    continue
+            for offset, line in snapshot.lines_containing(UPSERT_MARKER):
+                record = _decode(snapshot.path, offset, line)
+                if is_upsert(record):
+                    latest[record.get("id")] = (snapshot.number, offset)
+        return latest
+
+    @staticmethod
+    def _lead_at(snapshots: List[SegmentSnapshot], position: Tuple[int, int]) -> Any:
+        """Lead data of the record at a _latest_versions position"""
+        number, offset = position
+        snapshot = next(snapshot for snapshot in snapshots if snapshot.number == number)
+        for line_offset, line in snapshot.lines(offset):
+            return _decode(snapshot.path, line_offset, line).get("lead")
+
+    def iter_records(self, start: Optional[float] = None, end: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the current version of every lead, in the order leads were saved
+
+        Before the first record, the positions of the upserts that compaction
+        hasn't folded yet are collected (see _latest_versions). Memory grows
+        with the leads updated since the last compaction, not with the log.
+
+        Args:
+            start: Only leads saved at or after this time
+            end: Only leads saved before this time
+
+        Yields:
+            Records ({"id", "ts", "lead"}) with the lead's latest data
+        """
+        snapshots = self.snapshot()
+        try:
+            latest = self._latest_versions(snapshots, start)
+            for snapshot in snapshots:
+                if snapshot is snapshots[-1]:
+                    ranges = [(0, snapshot.size)]
+                else:
+                    index = self.read_index(snapshot)
+                    if not _overlaps(index.min_ts, index.max_ts, start, end):
+                        continue
+                    ranges = index.chunk_ranges(start, end)
+                for range_start, range_end in ranges:
+                    for offset, line in snapshot.lines(range_start, range_end):
+                        record = _decode(snapshot.path, offset, line)
+                        if not is_new_lead(record) or not _in_range(record_timestamp(record), start, end):
+                            continue
+                        newer = latest.get(record.get("id"))
+                        if newer is not None:
+                            record = {**record, "lead": self._lead_at(snapshots, newer)}
+                        yield record
+        finally:
+            for snapshot in snapshots:
+                snapshot.close()
+
+    def count_leads(self) -> LeadCounters:
+        """Count lead records in every segment from scratch"""
+        counters = LeadCounters()
+        snapshots = self.snapshot()
+        try:
+            for snapshot in snapshots:
+                for offset, line in snapshot.lines():
+                    record = _decode(snapshot.path, offset, line)
+                    if is_new_lead(record):
+                        counters.add(record_timestamp(record))
+        finally:
+            for snapshot in snapshots:
+                snapshot.close()
+        return counters
+
+    def total_size(self) -> int:
+        """Bytes on disk across all segments"""
+        paths = [self.segment_path(number) for number in self.sealed_numbers()] + [self.path]
+        return sum(path.stat().st_size for path in paths if path.exists())
+
+    def _rewrite_segment(self, snapshot: SegmentSnapshot, snapshots: List[SegmentSnapshot],
+                         latest: Dict[str, Tuple[int, int]], active_number: int, folded: set) -> Optional[Tuple[str, SegmentIndex, int]]:
+        """Write a compacted copy of a sealed segment; None if nothing would change"""
+        index = SegmentIndex(self.index_interval)
+        fd, tmp_name = tempfile.mkstemp(dir=self.segments_dir, prefix=snapshot.path.name + ".", suffix=".tmp")
+        dropped = folds = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                offset = 0
+                for line_offset, line in snapshot.lines():
+                    record = _decode(snapshot.path, line_offset, line)
+                    if record is None:
+                        dropped += 1
+                        continue
+                    lead_id = record.get("id") if isinstance(record, dict) else None
+                    newest = latest.get(lead_id)
+                    if is_upsert(record):
+                        # Keep only the newest version, and only if no insert absorbed it
+                        if newest != (snapshot.number, line_offset) or lead_id in folded:
+                            dropped += 1
+                            continue
+                    elif newest is not None and newest[0] != active_number:
+                        # Fold the newest sealed version into the original record,
+                        # keeping its save time so per-day counts don't move
+                        record = {**record, "lead": self._lead_at(snapshots, newest)}
+                        line = json.dumps(record, ensure_ascii=False).encode("utf-8")
+                        folded.add(lead_id)
+                        folds += 1
+                    f.write(line + b"\n")
+                    index.add(offset, line, record)
+                    offset += len(line) + 1
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+        if not dropped and not folds:
+            os.unlink(tmp_name)
+            return None
+        return tmp_name, index, dropped
+
+    def compact(self) -> Dict[str, int]:
+        """
+        Rewrite sealed segments without superseded lead versions
+
+        The newest version of a lead updated in sealed segments is folded into
+        its original record and the upsert lines are dropped. Readers keep
+        their snapshots; the rewritten segments are swapped in atomically.
+
+        Returns:
+            Segments rewritten and records dropped
+        """
+        result = {"segments": 0, "dropped": 0}
+        with file_lock(self.compact_lock_path):
+            snapshots = self.snapshot()
+            try:
+                sealed = snapshots[:-1]
+                if not any(self.read_index(snapshot).upserts for snapshot in sealed):
+                    return result
+                latest = self._latest_versions(snapshots, None)
+                folded: set = set()
+                rewritten = []
+                for snapshot in sealed:
+                    compacted = self._rewrite_segment(snapshot, snapshots, latest, snapshots[-1].number, folded)
+                    if compacted is not None:
+                        rewritten.append((snapshot.number, *compacted))
+
+                with self.lock():
+                    for number, tmp_name, index, dropped in rewritten:
+                        atomic_write_text(self.index_path(number), json.dumps(index.to_dict()))
+                        os.replace(tmp_name, self.segment_path(number))
+                        self._index_cache.pop(number, None)
+                        result["segments"] += 1
+                        result["dropped"] += dropped
+            finally:
+                for snapshot in snapshots:
+                    snapshot.close()
+        self.compactions += 1
+        logger.info(f"Compacted {result['segments']} CRM log segments, dropped {result['dropped']} records")
+        return result
+
+    def compact_in_background(self) -> None:
+        """Start a compaction thread unless one is already running"""
+        if self._compaction is not None and self._compaction.is_alive():
+            return
+
+        def run():
+            try:
+                self.compact()
+            except Exception as e:
+                logger.error(f"CRM log compaction failed: {e}")
+
+        self._compaction = threading.Thread(target=run, name="crm-compaction", daemon=True)
+        self._compaction.start()
+
+    def close(self) -> None:
+        """Wait for a running compaction"""
+        if self._compaction is not None:
+            self._compaction.join()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Segment count, active segment size and maintenance counters"""
+        return {
+            "segments": len(self.sealed_numbers()) + 1,
+            "active_segment_bytes": self._active_index.size,
+            "rotations": self.rotations,
+            "compactions": self.compactions
+        }
@@ -0,0 +1,476 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from services.file_io import file_lock
+from database.retry import call_with_retries
+from database.dedup_index import dedup_key
+from database.crm_stats import LeadCounters, day_of, diff_counters
+
+CRM_DB_FILE = Path("database/crm.db")
+
+# Writers wait this long for a lock held by another connection/process
+BUSY_TIMEOUT_SECONDS = 5.0
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS leads (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        email TEXT COLLATE NOCASE,
+        company TEXT COLLATE NOCASE,
+        created_at REAL NOT NULL,
+        data TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_leads_email ON leads (email)",
+    "CREATE INDEX IF NOT EXISTS idx_leads_company ON leads (company)",
+    "CREATE INDEX IF NOT EXISTS idx_leads_created_at ON leads (created_at)",
+    # Queries must spell EMAIL_DOMAIN_SQL exactly like this for SQLite to use it
+    "CREATE INDEX IF NOT EXISTS idx_leads_email_domain ON leads (lower(substr(email, instr(email, '@') + 1)))",
+    # Maintained in the insert transactions so stats never scan leads
+    "CREATE TABLE IF NOT EXISTS lead_counts (day TEXT PRIMARY KEY, leads INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS crm_meta (key TEXT PRIMARY KEY, value)"
+)
+
+# Constant SQL so sqlite3's statement cache reuses the prepared statements
+INSERT_LEAD_SQL = "INSERT INTO leads (name, email, company, created_at, data) VALUES (?, ?, ?, ?, ?)"
+SELECT_BY_EMAIL_SQL = "SELECT data FROM leads WHERE email = ? ORDER BY id"
+SELECT_BY_COMPANY_SQL = "SELECT data FROM leads WHERE company = ? ORDER BY id"
+SELECT_ALL_SQL = "SELECT data FROM leads ORDER BY id"
+SELECT_RECORDS_SQL = "SELECT id, created_at, data FROM leads"
+SELECT_SINCE_SQL = "SELECT id, data FROM leads WHERE id > ? ORDER BY id"
+SELECT_FIRST_ID_SINCE_SQL = "SELECT id FROM leads WHERE created_at >= ? ORDER BY created_at, id LIMIT 1"
+EMAIL_DOMAIN_SQL = "lower(substr(email, instr(email, '@') + 1))"
+SELECT_ID_BY_EMAIL_SQL = "SELECT id, data FROM leads WHERE email = ? ORDER BY id DESC"
+SELECT_ID_BY_COMPANY_SQL = "SELECT id, data FROM leads WHERE company = ? ORDER BY id DESC"
+UPDATE_LEAD_SQL = "UPDATE leads SET name = ?, email = ?, company = ?, data = ? WHERE id = ?"
+COUNT_LEADS_SQL = (
+    "INSERT INTO lead_counts (day, leads) VALUES (?, ?) "
+    "ON CONFLICT (day) DO UPDATE SET leads = leads + excluded.leads"
+)
+SET_META_SQL = "INSERT OR REPLACE INTO crm_meta (key, value) VALUES (?, ?)"
+SET_LAST_UPDATED_SQL = (
+    "INSERT INTO crm_meta (key, value) VALUES ('last_updated', ?) "
+    "ON CONFLICT (key) DO UPDATE SET value = MAX(value, excluded.value)"
+)
+SELECT_COUNTS_SQL = "SELECT day, leads FROM lead_counts"
+SELECT_META_SQL = "SELECT value FROM crm_meta WHERE key = ?"
+SCAN_COUNTS_SQL = (
+    "SELECT date(created_at, 'unixepoch'), COUNT(*), MAX(created_at) FROM leads "
+    "GROUP BY date(created_at, 'unixepoch')"
+)
+
+def _lead_row(data: Any, created_at: float) -> tuple:
+    fields = data if isinstance(data, dict) else {}
+    return (
+        fields.get("name"),
+        fields.get("email"),
+        fields.get("company"),
+        created_at,
+        json.dumps(data, ensure_ascii=False)
+    )
+
+class SQLiteCRM:
+    """CRM lead store in SQLite (WAL mode) with indexed lookups"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.dedup_lock_path = self.path.with_name(self.path.name + ".dedup.lock")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.path), timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False, cached_statements=64
+        )
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # Workers opening a new database at once would race the journal mode
+        # switch and schema changes, which don't always wait for busy_timeout
+        with file_lock(self.path.with_name(self.path.name + ".lock")):
+            # WAL lets readers run alongside the single writer; NORMAL fsyncs at checkpoints only
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            with self._conn:
+                for statement in SCHEMA:
+                    self._conn.execute(statement)
+            # Databases created before the counters existed get them counted once
+            if self._conn.execute(SELECT_META_SQL, ("counters_ready",)).fetchone() is None:
+                self.rebuild_counters()
+
+    def _count_leads(self, created_at: float, count: int) -> None:
+        self._conn.execute(COUNT_LEADS_SQL, (day_of(created_at), count))
+        self._conn.execute(SET_LAST_UPDATED_SQL, (created_at,))
+
+    def save_lead(self, data: Any) -> None:
+        """Insert one lead"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(INSERT_LEAD_SQL, _lead_row(data, now))
+            self._count_leads(now, 1)
+
+    def save_leads(self, leads: List[Any]) -> None:
+        """Insert several leads in one transaction"""
+        if not leads:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(INSERT_LEAD_SQL, [_lead_row(data, now) for data in leads])
+            self._count_leads(now, len(leads))
+
+    def update_lead(self, lead_id: int, data: Any) -> None:
+        """Replace a stored lead's data"""
+        name, email, company, _, serialized = _lead_row(data, 0)
+        with self._lock, self._conn:
+            self._conn.execute(UPDATE_LEAD_SQL, (name, email, company, serialized, lead_id))
+
+    def find_duplicate(self, key: str, match_name_company: bool) -> Optional[Tuple[int, Any]]:
+        """Most recent lead with this identity key, via the email/company index"""
+        kind, _, value = key.partition(":")
+        if kind == "email":
+            sql, parameter = SELECT_ID_BY_EMAIL_SQL, value
+        else:
+            sql, parameter = SELECT_ID_BY_COMPANY_SQL, value.rsplit("|", 1)[-1]
+        with self._lock:
+            rows = self._conn.execute(sql, (parameter,)).fetchall()
+        for lead_id, serialized in rows:
+            lead = json.loads(serialized)
+            if dedup_key(lead, match_name_company) == key:
+                return lead_id, lead
+        return None
+
+    def iter_leads(self) -> Iterator[Any]:
+        """Stream every lead, oldest first, on a separate read connection"""
+        conn = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT_SECONDS)
+        try:
+            for (serialized,) in conn.execute(SELECT_ALL_SQL):
+                yield json.loads(serialized)
+        finally:
+            conn.close()
+
+    def iter_since(self, after: int) -> Iterator[Tuple[int, Any]]:
+        """Stream (id, lead) of the leads inserted after id after, on a separate read connection"""
+        conn = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT_SECONDS)
+        try:
+            for lead_id, serialized in conn.execute(SELECT_SINCE_SQL, (after,)):
+                yield lead_id, json.loads(serialized)
+        finally:
+            conn.close()
+
+    def iter_records(self, start: Optional[float] = None, end: Optional[float] = None,
+                     company: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Stream {"id", "ts", "lead"} records, oldest first, on a separate read connection"""
+        conditions, parameters = [], []
+        for condition, value in (("created_at >= ?", start), ("created_at < ?", end), ("company = ?", company)):
+            if value is not None:
+                conditions.append(condition)
+                parameters.append(value)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        conn = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT_SECONDS)
+        try:
+            for lead_id, created_at, serialized in conn.execute(SELECT_RECORDS_SQL + where + " ORDER BY id", parameters):
+                yield {"id": lead_id, "ts": created_at, "lead": json.loads(serialized)}
+        finally:
+            conn.close()
+
+    def _first_id_since(self, ts: float) -> Optional[int]:
+        row = self._conn.execute(SELECT_FIRST_ID_SINCE_SQL, (ts,)).fetchone()
+        return row[0] if row else None
+
+    def query(self, company: Optional[str] = None, email_domain: Optional[str] = None,
+              start: Optional[float] = None, end: Optional[float] = None,
+              limit: int = 50, after: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        One page of matching records in id order (keyset pagination)
+
+        Time bounds are resolved to ids through the created_at index, so every
+        page is an id range scan of the primary key or the company/domain index.
+        """
+        conditions, parameters = [], []
+        with self._lock:
+            if start is not None:
+                first = self._first_id_since(start)
+                if first is None:
+                    return [], None
+                conditions.append("id >= ?")
+                parameters.append(first)
+            if end is not None:
+                first = self._first_id_since(end)
+                if first is not None:
+                    conditions.append("id < ?")
+                    parameters.append(first)
+            if email_domain is not None:
+                email_domain = email_domain.lower()
+            for condition, value in (
+                ("id > ?", after), ("company = ?", company), (f"{EMAIL_DOMAIN_SQL} = ?", email_domain)
+            ):
+                if value is not None:
+                    conditions.append(condition)
+                    parameters.append(value)
+            where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+            rows = self._conn.execute(
+                SELECT_RECORDS_SQL + where + " ORDER BY id LIMIT ?", parameters + [limit + 1]
+            ).fetchall()
+        records = [{"id": lead_id, "ts": created_at, "lead": json.loads(data)} for lead_id, created_at, data in rows[:limit]]
+        return records, records[-1]["id"] if len(rows) > limit else None
+
+    def find_by_email(self, email: str) -> List[Any]:
+        """Leads with this email (case-insensitive), oldest first"""
+        with self._lock:
+            rows = self._conn.execute(SELECT_BY_EMAIL_SQL, (email,)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def find_by_company(self, company: str) -> List[Any]:
+        """Leads for this company (case-insensitive), oldest first"""
+        with self._lock:
+            rows = self._conn.execute(SELECT_BY_COMPANY_SQL, (company,)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def get_counters(self) -> LeadCounters:
+        """The maintained counters (reads lead_counts, never the leads)"""
+        counters = LeadCounters()
+        with self._lock:
+            rows = self._conn.execute(SELECT_COUNTS_SQL).fetchall()
+            last_updated = self._conn.execute(SELECT_META_SQL, ("last_updated",)).fetchone()
+        for day, count in rows:
+            counters.total_leads += count
+            counters.per_day[day] = count
+        counters.last_updated = last_updated[0] if last_updated else None
+        return counters
+
+    def _scan_counters(self) -> LeadCounters:
+        counters = LeadCounters()
+        for day, count, last_updated in self._conn.execute(SCAN_COUNTS_SQL):
+            counters.total_leads += count
+            counters.per_day[day] = count
+            if counters.last_updated is None or last_updated > counters.last_updated:
+                counters.last_updated = last_updated
+        return counters
+
+    def scan_counters(self) -> LeadCounters:
+        """Count the leads table from scratch"""
+        with self._lock:
+            return self._scan_counters()
+
+    def rebuild_counters(self) -> None:
+        """Recount the leads table into lead_counts"""
+        with self._lock, self._conn:
+            # Take the write lock before counting so another worker can't insert in between
+            self._conn.execute("BEGIN IMMEDIATE")
+            counters = self._scan_counters()
+            self._conn.execute("DELETE FROM lead_counts")
+            self._conn.executemany(COUNT_LEADS_SQL, list(counters.per_day.items()))
+            self._conn.execute("DELETE FROM crm_meta WHERE key = 'last_updated'")
+            if counters.last_updated is not None:
+                self._conn.execute(SET_META_SQL, ("last_updated", counters.last_updated))
+            self._conn.execute(SET_META_SQL, ("counters_ready", 1))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Lead counts, last insert time and on-disk size (database plus WAL)"""
+        size = sum(
+            path.stat().st_size
+            for path in (self.path, self.path.with_name(self.path.name + "-wal"))
+            if path.exists()
+        )
+        return {**self.get_counters().to_dict(), "file_size": size}
+
+    def close(self) -> None:
+        """Close the connection"""
+        with self._lock:
+            self._conn.close()
+
+# One database per path (tests point CRM_DB_FILE at temporary directories)
+_databases: Dict[Path, SQLiteCRM] = {}
+
+_databases_lock = threading.Lock()
+
+# Last lead id iter_unseen_leads has returned, per database
+_unseen_positions: Dict[Path, int] = {}
+
+def get_db() -> SQLiteCRM:
+    """Get the lead database for the current CRM_DB_FILE"""
+    with _databases_lock:
+        db = _databases.get(CRM_DB_FILE)
+        if db is None:
+            db = _databases[CRM_DB_FILE] = SQLiteCRM(CRM_DB_FILE)
+    return db
+
+def close_all() -> None:
+    """Close every open database (app shutdown)"""
+    with _databases_lock:
+        _unseen_positions.clear()
+        while _databases:
+            _, db = _databases.popitem()
+            db.close()
+
+def write_lead(data: dict) -> None:
+    """Save one lead, single attempt (raises on failure)"""
+    get_db().save_lead(data)
+
+def write_leads(leads: List[dict]) -> None:
+    """Save several leads in one transaction, single attempt (raises on failure)"""
+    get_db().save_leads(leads)
+
+def update_lead(lead_id: int, data: dict) -> None:
+    """Replace a stored lead's data, single attempt (raises on failure)"""
+    get_db().update_lead(lead_id, data)
+
+def find_duplicate(key: str, match_name_company: bool = False) -> Optional[Tuple[int, dict]]:
+    """
+    Find the stored lead with this identity key
+
+    Args:
+        key: Key from dedup_index.dedup_key
+        match_name_company: Whether name+company keys are in use
+
+    Returns:
+        (lead id, lead) of the most recent match, or None
+    """
+    return get_db().find_duplicate(key, match_name_company)
+
+def dedup_lock():
+    """
+    Lock held across a dedup lookup and the write it decides on
+
+    A lock file next to the database, so it excludes the other uvicorn
+    workers too; the lookup and the write stay separate transactions.
+    """
+    return file_lock(get_db().dedup_lock_path)
+
+def iter_unseen_leads(from_start: bool = False) -> Iterator[Any]:
+    """
+    Stream the leads inserted by any worker since the previous call
+
+    The dedup filter follows the database with this, so it also learns the
+    keys other uvicorn workers stored. Updates don't change a lead's key,
+    so only new rows are returned.
+
+    Args:
+        from_start: Start over from the first lead
+
+    Yields:
+        Lead data, oldest first
+    """
+    db = get_db()
+    after = 0 if from_start else _unseen_positions.get(db.path, 0)
+    for lead_id, lead in db.iter_since(after):
+        yield lead
+        _unseen_positions[db.path] = lead_id
+
+def iter_leads() -> Iterator[dict]:
+    """Stream every saved lead, oldest first"""
+    return get_db().iter_leads()
+
+def iter_records(start: Optional[float] = None, end: Optional[float] = None,
+                 company: Optional[str] = None) -> Iterator[dict]:
+    """
+    Stream saved lead records, oldest first
+
+    Args:
+        start: Only leads saved at or after this Unix time
+        end: Only leads saved before this Unix time
+        company: Only leads of this company (case-insensitive, via the index)
+
+    Yields:
+        Records ({"id", "ts", "lead"})
+    """
+    return get_db().iter_records(start, end, company)
+
+def query_leads(company: Optional[str] = None, email_domain: Optional[str] = None,
+                start: Optional[float] = None, end: Optional[float] = None,
+                limit: int = 50, after: Optional[int] = None) -> Tuple[List[dict], Optional[int]]:
+    """
+    Get one page of leads through the company, email domain and created_at indexes
+
+    Args:
+        company: Only leads of this company (case-insensitive)
+        email_domain: Only leads whose email is at this domain (case-insensitive)
+        start: Only leads saved at or after this Unix time
+        end: Only leads saved before this Unix time
+        limit: Page size
+        after: Id returned with the previous page
+
+    Returns:
+        (records ({"id", "ts", "lead"}) oldest first, id to continue after,
+        or None on the last page)
+    """
+    return get_db().query(company, email_domain, start, end, limit, after)
+
+def save_to_crm(data: dict) -> str:
+    """
+    Save lead data to the SQLite CRM with retry logic (blocking)
+
+    Args:
+        data: Lead data to save
+
+    Returns:
+        "success" or "failure"
+    """
+    try:
+        call_with_retries(write_lead, data)
+        return "success"
+    except Exception:
+        return "failure"
+
+def save_many_to_crm(leads: List[dict]) -> List[str]:
+    """
+    Save several leads in one transaction with retry logic (blocking)
+
+    Args:
+        leads: Lead data to save
+
+    Returns:
+        "success" or "failure" for each lead, in order (all or nothing)
+    """
+    try:
+        call_with_retries(write_leads, leads)
+        return ["success"] * len(leads)
+    except Exception:
+        return ["failure"] * len(leads)
+
+def get_crm_stats() -> dict:
+    """
+    Get CRM statistics
+
+    Returns:
+        Dictionary with CRM statistics
+    """
+    try:
+        return get_db().get_stats()
+    except sqlite3.Error as e:
+        print(f"Error getting CRM stats: {e}")
+        return {
+            "total_leads": 0,
+            "last_updated": None,
+            "file_size": 0,
+            "error": str(e)
+        }
+
+def check_stats() -> List[str]:
+    """Compare the maintained counters with a full count of the leads table"""
+    db = get_db()
+    return diff_counters(db.scan_counters(), db.get_counters())
+
+def rebuild_stats() -> None:
+    """Recount the leads table into the maintained counters"""
+    get_db().rebuild_counters()
+
+def find_leads(email: Optional[str] = None, company: Optional[str] = None) -> List[dict]:
+    """
+    Look up leads through the email or company index
+
+    Args:
+        email: Match this email (case-insensitive)
+        company: Match this company (case-insensitive)
+
+    Returns:
+        Matching leads, oldest first
+    """
+    db = get_db()
+    if email is not None:
+        leads = db.find_by_email(email)
+        if company is not None:
+            leads = [lead for lead in leads if isinstance(lead, dict)
+                     and str(lead.get("company", "")).lower() == company.lower()]
+        return leads
+    if company is not None:
+        return db.find_by_company(company)
+    return []
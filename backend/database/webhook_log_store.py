@@ -0,0 +1,340 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from services.config_manager import config_manager
+from services.file_io import file_lock
+from services.metrics import Histogram, LATENCY_BUCKETS_MS
+from services.webhook_log import LogRecord, WebhookLogBuffer, webhook_log
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_LOG_DB_FILE = Path("database/webhook_logs.db")
+
+# Writers wait this long for a lock held by another connection/process
+BUSY_TIMEOUT_SECONDS = 5.0
+
+# How often the writer drops entries older than retention_days
+PRUNE_INTERVAL_SECONDS = 3600.0
+
+DEFAULT_LOG_STORE_SETTINGS = {
+    "enabled": True,
+    # The writer drains the in-memory log this often, up to batch_size entries per transaction
+    "flush_interval_ms": 200,
+    "batch_size": 1000,
+    # 0 keeps entries forever
+    "retention_days": 30
+}
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS webhook_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ts REAL NOT NULL,
+        user_id TEXT,
+        session_id TEXT,
+        save_status TEXT,
+        message TEXT NOT NULL,
+        extracted TEXT NOT NULL
+    )
+    """,
+    # (field, id) so a filtered page is one range scan in id order
+    "CREATE INDEX IF NOT EXISTS idx_webhook_logs_user ON webhook_logs (user_id, id)",
+    "CREATE INDEX IF NOT EXISTS idx_webhook_logs_session ON webhook_logs (session_id, id)",
+    "CREATE INDEX IF NOT EXISTS idx_webhook_logs_status ON webhook_logs (save_status, id)",
+    "CREATE INDEX IF NOT EXISTS idx_webhook_logs_ts ON webhook_logs (ts)"
+)
+
+# Constant SQL so sqlite3's statement cache reuses the prepared statements
+INSERT_LOG_SQL = (
+    "INSERT INTO webhook_logs (ts, user_id, session_id, save_status, message, extracted) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+SELECT_LOGS_SQL = "SELECT id, ts, user_id, session_id, message, extracted, save_status FROM webhook_logs"
+SELECT_LOGS_AFTER_SQL = SELECT_LOGS_SQL + " WHERE id > ? ORDER BY id LIMIT ?"
+SELECT_LAST_ID_SQL = "SELECT COALESCE(MAX(id), 0) FROM webhook_logs"
+SELECT_ID_RANGE_SQL = "SELECT MIN(id), MAX(id) FROM webhook_logs"
+DELETE_BEFORE_SQL = "DELETE FROM webhook_logs WHERE ts < ?"
+USER_STATS_SQL = (
+    "SELECT user_id, COUNT(*), SUM(save_status = 'success'), MAX(ts) FROM webhook_logs"
+)
+
+def get_settings() -> Dict[str, Any]:
+    """Get webhook log store settings merged over the defaults"""
+    webhook_settings = config_manager.get_config("webhook_settings")
+    return {**DEFAULT_LOG_STORE_SETTINGS, **webhook_settings.get("log_store", {})}
+
+def is_enabled() -> bool:
+    """Check whether webhook logs are persisted (and served) from the store"""
+    return bool(get_settings()["enabled"])
+
+def _log_record(row: tuple) -> LogRecord:
+    log_id, ts, user_id, session_id, message, extracted, save_status = row
+    return LogRecord(log_id, ts, user_id, session_id, message, json.loads(extracted), save_status)
+
+def _log_row(record: LogRecord) -> tuple:
+    return (
+        record.ts,
+        record.user_id,
+        record.session_id,
+        record.save_status,
+        record.message,
+        json.dumps(record.extracted, ensure_ascii=False)
+    )
+
+class WebhookLogStore:
+    """
+    Webhook log entries in SQLite (WAL mode), indexed by user, session, save
+    status and time
+
+    Ids are assigned on insert, so they increase in commit order across all
+    worker processes writing to the same file and `after` cursors never skip
+    another worker's entries.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.path), timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False, cached_statements=64
+        )
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # Workers opening a new database at once would race the journal mode switch
+        with file_lock(self.path.with_name(self.path.name + ".lock")):
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            with self._conn:
+                for statement in SCHEMA:
+                    self._conn.execute(statement)
+
+    def insert_many(self, records: List[LogRecord]) -> None:
+        """Insert log entries in one transaction"""
+        if not records:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(INSERT_LOG_SQL, [_log_row(record) for record in records])
+
+    def query(self, limit: int = 50, after: Optional[int] = None, before: Optional[int] = None,
+              user_id: Optional[str] = None, session_id: Optional[str] = None,
+              save_status: Optional[str] = None, start: Optional[float] = None,
+              end: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Get entries oldest first, with the same cursor semantics as
+        WebhookLogBuffer.page
+
+        Time bounds are checked against each entry's ts: entries from several
+        workers don't reach the table in exact time order, so an id can't
+        stand in for a time. The ts index gives the id range the matches lie
+        in, so the page is still an id range scan instead of a sort of the
+        whole window.
+
+        Returns:
+            Log entries as WebhookLog dicts
+        """
+        conditions, parameters = [], []
+        with self._lock:
+            time_conditions = [(condition, value) for condition, value in (("ts >= ?", start), ("ts < ?", end))
+                               if value is not None]
+            if time_conditions:
+                low, high = self._conn.execute(
+                    f"{SELECT_ID_RANGE_SQL} WHERE {' AND '.join(condition for condition, _ in time_conditions)}",
+                    [value for _, value in time_conditions]
+                ).fetchone()
+                if low is None:
+                    return []
+                # "+ts" keeps the planner on the id range rather than the ts index
+                conditions += ["id >= ?", "id <= ?"] + [f"+{condition}" for condition, _ in time_conditions]
+                parameters += [low, high] + [value for _, value in time_conditions]
+            for condition, value in (
+                ("id > ?", after), ("id < ?", before), ("user_id = ?", user_id),
+                ("session_id = ?", session_id), ("save_status = ?", save_status)
+            ):
+                if value is not None:
+                    conditions.append(condition)
+                    parameters.append(value)
+            where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+            order = "id" if after is not None else "id DESC"
+            rows = self._conn.execute(
+                f"{SELECT_LOGS_SQL}{where} ORDER BY {order} LIMIT ?", parameters + [limit]
+            ).fetchall()
+        if after is None:
+            rows.reverse()
+        return [WebhookLogBuffer.to_dict(_log_record(row)) for row in rows]
+
+    def records_after(self, after: int, limit: int) -> List[LogRecord]:
+        """Up to `limit` entries with a larger id than `after`, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(SELECT_LOGS_AFTER_SQL, (after, limit)).fetchall()
+        return [_log_record(row) for row in rows]
+
+    def last_id(self) -> int:
+        """Id of the newest entry, 0 if there are none"""
+        with self._lock:
+            return self._conn.execute(SELECT_LAST_ID_SQL).fetchone()[0]
+
+    def user_stats(self, user_id: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Entries, successful saves and last entry time per user
+
+        Args:
+            user_id: Only this user (an index range scan); every user if None
+        """
+        with self._lock:
+            if user_id is None:
+                rows = self._conn.execute(f"{USER_STATS_SQL} GROUP BY user_id").fetchall()
+            else:
+                rows = self._conn.execute(f"{USER_STATS_SQL} WHERE user_id = ?", (user_id,)).fetchall()
+        return {
+            row_user_id: {"total": total, "successful": successful or 0, "last_ts": last_ts}
+            for row_user_id, total, successful, last_ts in rows
+            if total
+        }
+
+    def prune(self, before_ts: float) -> int:
+        """
+        Delete entries logged before a Unix time
+
+        Returns:
+            Number of entries deleted
+        """
+        with self._lock, self._conn:
+            return self._conn.execute(DELETE_BEFORE_SQL, (before_ts,)).rowcount
+
+    def close(self) -> None:
+        """Close the connection"""
+        with self._lock:
+            self._conn.close()
+
+# One store per path (tests point WEBHOOK_LOG_DB_FILE at temporary directories)
+_stores: Dict[Path, WebhookLogStore] = {}
+
+_stores_lock = threading.Lock()
+
+def get_store() -> WebhookLogStore:
+    """Get the webhook log store for the current WEBHOOK_LOG_DB_FILE"""
+    with _stores_lock:
+        store = _stores.get(WEBHOOK_LOG_DB_FILE)
+        if store is None:
+            store = _stores[WEBHOOK_LOG_DB_FILE] = WebhookLogStore(WEBHOOK_LOG_DB_FILE)
+    return store
+
+def close_all() -> None:
+    """Close every open store (app shutdown)"""
+    with _stores_lock:
+        while _stores:
+            _, store = _stores.popitem()
+            store.close()
+
+def query_logs(**filters: Any) -> List[Dict[str, Any]]:
+    """Get a page of stored log entries (see WebhookLogStore.query)"""
+    return get_store().query(**filters)
+
+def get_user_stats(user_id: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Get stored entry counts per user (see WebhookLogStore.user_stats)"""
+    return get_store().user_stats(user_id)
+
+class WebhookLogWriter:
+    """
+    Background task that copies new webhook log entries into the store
+
+    Requests only append to the in-memory ring buffer; the writer drains it
+    every flush_interval_ms in batches of one transaction each, so disk
+    writes never hold up a webhook. The ring is the write buffer: if the
+    store falls further behind than its capacity, the overwritten entries
+    are counted as dropped.
+    """
+
+    def __init__(self, buffer: WebhookLogBuffer):
+        self.buffer = buffer
+        self.written_seq = buffer.next_seq - 1
+        self._task: Optional[asyncio.Task] = None
+        self._last_prune = 0.0
+        self.flushes = 0
+        self.entries_written = 0
+        self.entries_dropped = 0
+        self.failed_flushes = 0
+        self.flush_ms_histogram = Histogram(LATENCY_BUCKETS_MS)
+
+    def start(self) -> None:
+        """Start writing in the background (app startup)"""
+        if self._task is None or self._task.done():
+            # Entries logged while no writer was running are not written
+            self.written_seq = self.buffer.next_seq - 1
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(get_settings()["flush_interval_ms"] / 1000)
+            if not is_enabled():
+                self.written_seq = self.buffer.next_seq - 1
+                continue
+            try:
+                await self.flush()
+                await self._prune()
+            except Exception as e:
+                self.failed_flushes += 1
+                logger.error(f"Writing webhook logs failed: {e}")
+
+    async def flush(self) -> int:
+        """
+        Write every entry logged since the last flush
+
+        Returns:
+            Number of entries written
+        """
+        settings = get_settings()
+        written = 0
+        while True:
+            records = self.buffer.records_after(self.written_seq, settings["batch_size"])
+            if not records:
+                return written
+            if records[0].seq > self.written_seq + 1:
+                dropped = records[0].seq - self.written_seq - 1
+                self.entries_dropped += dropped
+                logger.warning(f"Webhook log store fell behind, {dropped} entries were not written")
+            started = time.perf_counter()
+            await asyncio.to_thread(get_store().insert_many, records)
+            self.flush_ms_histogram.observe((time.perf_counter() - started) * 1000)
+            self.written_seq = records[-1].seq
+            self.flushes += 1
+            self.entries_written += len(records)
+            written += len(records)
+
+    async def _prune(self) -> None:
+        retention_days = get_settings()["retention_days"]
+        if not retention_days or time.time() - self._last_prune < PRUNE_INTERVAL_SECONDS:
+            return
+        self._last_prune = time.time()
+        pruned = await asyncio.to_thread(get_store().prune, time.time() - retention_days * 86400)
+        if pruned:
+            logger.info(f"Pruned {pruned} webhook log entries older than {retention_days} days")
+
+    async def shutdown(self) -> None:
+        """Stop the background task and write what is left (app shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            if is_enabled():
+                try:
+                    await self.flush()
+                except Exception as e:
+                    logger.error(f"Writing webhook logs on shutdown failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get write counts, backlog and flush latency"""
+        return {
+            "enabled": is_enabled(),
+            "backlog": self.buffer.next_seq - 1 - self.written_seq,
+            "flushes": self.flushes,
+            "entries_written": self.entries_written,
+            "entries_dropped": self.entries_dropped,
+            "failed_flushes": self.failed_flushes,
+            "flush_ms": self.flush_ms_histogram.snapshot()
+        }
+
+# Global webhook log writer instance
+webhook_log_writer = WebhookLogWriter(webhook_log)
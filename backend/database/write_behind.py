@@ -0,0 +1,170 @@
+import asyncio
+import time
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+from services.config_manager import config_manager
+from services.metrics import Histogram, LATENCY_BUCKETS_MS
+from database.crm import save_many_to_crm
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WRITE_BEHIND_SETTINGS = {
+    "enabled": False,
+    "max_buffer": 10000,
+    "batch_size": 100,
+    "flush_interval_ms": 50,
+    # "flush": answer once the lead's batch is written; "enqueue": answer "queued" at once
+    "ack": "flush"
+}
+
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+WriteBatch = Callable[[List[dict]], Awaitable[List[str]]]
+
+class _BufferedLead:
+    """A lead waiting for the next group commit"""
+
+    def __init__(self, lead: dict, future: asyncio.Future):
+        self.lead = lead
+        self.future = future
+
+class WriteBehindBuffer:
+    """Bounded in-memory buffer that group-commits CRM saves in the background"""
+
+    def __init__(self, write_batch: WriteBatch):
+        """
+        Args:
+            write_batch: Saves a list of leads in one write/transaction,
+                returning "success" or "failure" for each lead
+        """
+        self._write_batch = write_batch
+        self._pending: List[_BufferedLead] = []
+        self._space_waiters: Deque[asyncio.Future] = deque()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.leads_flushed = 0
+        self.failed_leads = 0
+        self.max_depth = 0
+        self.batch_size_histogram = Histogram(BATCH_SIZE_BUCKETS)
+        self.flush_ms_histogram = Histogram(LATENCY_BUCKETS_MS)
+
+    def get_settings(self) -> Dict[str, Any]:
+        """Get write-behind settings merged over the defaults"""
+        crm_settings = config_manager.get_config("crm_settings")
+        return {**DEFAULT_WRITE_BEHIND_SETTINGS, **crm_settings.get("write_behind", {})}
+
+    def is_enabled(self) -> bool:
+        """Check whether write-behind is switched on"""
+        return bool(self.get_settings()["enabled"])
+
+    async def submit(self, lead: dict) -> str:
+        """
+        Buffer a lead for the next group commit
+
+        Waits for room when the buffer is full, so a stalled CRM slows callers
+        down instead of growing memory without bound.
+
+        Args:
+            lead: Lead data to save
+
+        Returns:
+            "queued" with ack-on-enqueue, otherwise the lead's "success"/"failure"
+        """
+        settings = self.get_settings()
+        loop = asyncio.get_running_loop()
+
+        while len(self._pending) >= settings["max_buffer"]:
+            waiter = loop.create_future()
+            self._space_waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._space_waiters:
+                    self._space_waiters.remove(waiter)
+
+        item = _BufferedLead(lead, loop.create_future())
+        self._pending.append(item)
+        self.max_depth = max(self.max_depth, len(self._pending))
+
+        if len(self._pending) >= settings["batch_size"]:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(settings["flush_interval_ms"] / 1000, self._start_flush)
+
+        if settings["ack"] == "enqueue":
+            return "queued"
+        return await asyncio.shield(item.future)
+
+    def _start_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # A running flush picks up whatever arrived while it was writing
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        if self._pending:
+            self._flush_task = asyncio.ensure_future(self._flush_pending())
+
+    def _wake_space_waiters(self, free_slots: int) -> None:
+        for waiter in list(self._space_waiters)[:free_slots]:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def _flush_pending(self) -> None:
+        while self._pending:
+            batch_size = self.get_settings()["batch_size"]
+            batch, self._pending = self._pending[:batch_size], self._pending[batch_size:]
+            self._wake_space_waiters(len(batch))
+
+            start = time.perf_counter()
+            try:
+                statuses = await self._write_batch([item.lead for item in batch])
+            except Exception as e:
+                logger.error(f"Write-behind flush failed: {e}")
+                statuses = ["failure"] * len(batch)
+            self.flush_ms_histogram.observe((time.perf_counter() - start) * 1000)
+            self.batch_size_histogram.observe(len(batch))
+            self.flushes += 1
+            self.leads_flushed += len(batch)
+            failed = sum(status != "success" for status in statuses)
+            if failed:
+                self.failed_leads += failed
+                logger.error(f"Write-behind flush: {failed} of {len(batch)} leads failed after retries")
+
+            for item, status in zip(batch, statuses):
+                if not item.future.done():
+                    item.future.set_result(status)
+
+    async def flush(self) -> None:
+        """Write everything buffered and wait until it is committed"""
+        self._start_flush()
+        while self._flush_task is not None and not self._flush_task.done():
+            await self._flush_task
+            self._start_flush()
+
+    async def shutdown(self) -> None:
+        """Flush the buffer before the app stops"""
+        if self._pending or self._flush_task is not None:
+            logger.info(f"Flushing {len(self._pending)} buffered CRM writes")
+        await self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get buffer depth, group-commit sizes and flush latency"""
+        settings = self.get_settings()
+        return {
+            "enabled": settings["enabled"],
+            "ack": settings["ack"],
+            "depth": len(self._pending),
+            "max_depth": self.max_depth,
+            "capacity": settings["max_buffer"],
+            "flushes": self.flushes,
+            "leads_flushed": self.leads_flushed,
+            "failed_leads": self.failed_leads,
+            "batch_size": self.batch_size_histogram.snapshot(),
+            "flush_ms": self.flush_ms_histogram.snapshot()
+        }
+
+# Global CRM write-behind buffer instance
+crm_write_buffer = WriteBehindBuffer(save_many_to_crm)
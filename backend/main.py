@@ -1,13 +1,50 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routes.webhook import router as webhook_router
+from routes.webhook import router as webhook_router, webhook_jobs
 from routes.config import router as config_router
 from routes.auth import router as auth_router
+from services.llm_client import llm_client
+from services.extraction_cache import extraction_cache
+from services.agent import extraction_batcher
+from services.circuit_breaker import llm_circuit_breaker
+from services.log_stream import log_broadcaster
+from database import mock_crm, sqlite_crm, webhook_log_store
+from database.webhook_log_store import webhook_log_writer
+from database.write_behind import crm_write_buffer
+from database.crm import build_query_index, rebuild_dedup_index
+from database.dedup_index import crm_dedup_index
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared resources on startup and release them on shutdown"""
+    await llm_client.startup()
+    extraction_cache.load()
+    if crm_dedup_index.is_enabled():
+        await asyncio.to_thread(rebuild_dedup_index)
+    await asyncio.to_thread(build_query_index)
+    webhook_log_writer.start()
+    yield
+    # End open log streams so the server doesn't wait on them
+    await log_broadcaster.shutdown()
+    # Queued jobs still need the batcher, write buffer and LLM client
+    await webhook_jobs.shutdown()
+    await extraction_batcher.shutdown()
+    await crm_write_buffer.shutdown()
+    # After the jobs, which still log what they process
+    await webhook_log_writer.shutdown()
+    extraction_cache.save()
+    await llm_client.shutdown()
+    mock_crm.close_all()
+    sqlite_crm.close_all()
+    webhook_log_store.close_all()
 
 app = FastAPI(
     title="Dragify AI Agent API",
     description="AI Agent for lead extraction and processing with JWT authentication",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -41,4 +78,10 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "dragify-ai-agent"}
+    llm_circuit = llm_circuit_breaker.get_stats()
+    return {
+        # Still serving (with local fallback extraction) while the LLM circuit is not closed
+        "status": "healthy" if llm_circuit["state"] == "closed" else "degraded",
+        "service": "dragify-ai-agent",
+        "llm_circuit": llm_circuit
+    }
@@ -6,6 +6,13 @@ class WebhookMessage(BaseModel):
     message: str
     user_id: Optional[str] = Field(default=None, description="User ID for multi-user support")
     session_id: Optional[str] = Field(default=None, description="Session ID for tracking")
+    callback_url: Optional[str] = Field(
+        default=None, pattern=r"^https?://", description="URL to POST the job to when it finishes (async mode)"
+    )
+    idempotency_key: Optional[str] = Field(
+        default=None, min_length=1, max_length=255,
+        description="Retries with the same key get the first delivery's response (or use the Idempotency-Key header)"
+    )
 
 class LeadResponse(BaseModel):
     name: str
@@ -1,28 +1,63 @@
-from fastapi import APIRouter, Request, HTTPException, Depends
+from fastapi import APIRouter, Request, HTTPException, Depends, Query, Header
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from models.lead import WebhookMessage, LeadResponse, WebhookLog
-from services.agent import extract_lead_info
+from services.agent import extract_lead_info, get_agent_stats
 from services.user_manager import user_manager
 from services.auth import get_current_user
-from database.mock_crm import save_to_crm, get_crm_stats
+from services.config_manager import config_manager
+from services.webhook_jobs import CallbackURLError, QueueFullError, WebhookJobQueue
+from services.idempotency import IdempotencyKeyReused, request_fingerprint, webhook_idempotency
+from services.webhook_log import EGYPT_TIMEZONE, webhook_log
+from services.log_stream import log_broadcaster
+from database.crm import save_to_crm, get_crm_stats, query_leads
+from database.write_behind import crm_write_buffer
+from database.lead_export import EXPORT_FORMATS, export_leads
+from database import webhook_log_store
+from database.webhook_log_store import webhook_log_writer
+import asyncio
 import json
-from datetime import datetime, timezone, timedelta
+import logging
+from collections import Counter
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import Awaitable, Callable, List, Literal, Optional, Tuple
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 security = HTTPBearer()
+# Browsers' EventSource can't send headers: streams also take ?token=
+optional_security = HTTPBearer(auto_error=False)
 
-# Store webhook logs in memory (in production, use a proper database)
-webhook_logs = []
+DEFAULT_BATCH_SETTINGS = {
+    "max_items": 500,
+    # Messages of one batch processed at the same time
+    "max_concurrency": 16
+}
 
-# Egypt timezone (UTC+2)
-EGYPT_TIMEZONE = timezone(timedelta(hours=2))
+# save_status -> retry_attempts text; a queued lead hasn't been attempted yet
+RETRY_ATTEMPTS_TEXT = {
+    "success": "Multiple attempts made",
+    "queued": "Queued for write-behind"
+}
 
-@router.post("/")
-async def webhook_endpoint(payload: WebhookMessage):
-    """Webhook endpoint for lead extraction - no authentication required"""
+def get_batch_settings() -> dict:
+    """Get batch webhook settings merged over the defaults"""
+    webhook_settings = config_manager.get_config("webhook_settings")
+    return {**DEFAULT_BATCH_SETTINGS, **webhook_settings.get("batch", {})}
+
+async def process_message(payload: WebhookMessage) -> dict:
+    """
+    Run one webhook message through extraction, CRM save and logging
+
+    Args:
+        payload: Incoming message
+
+    Returns:
+        Response body for the message
+    """
     # Use a default user_id if not provided
     user_id = payload.user_id or "default_user"
     session_id = payload.session_id
@@ -46,14 +81,19 @@ async def webhook_endpoint(payload: WebhookMessage):
     ])
     
     if has_contact_info:
-        save_status = save_to_crm(lead_data)
+        if crm_write_buffer.is_enabled():
+            save_status = await crm_write_buffer.submit(lead_data)
+        else:
+            save_status = await save_to_crm(lead_data)
     else:
         save_status = "no_contact_info"
     
-    # Create log entry with user/session info
+    # Store in the global log ring, then in the user's logs under the same id
+    timestamp = datetime.now(EGYPT_TIMEZONE)
+    record = webhook_log.append(user_id, session_id, message, lead_data, save_status, timestamp)
     log_entry = WebhookLog(
-        id=str(len(webhook_logs) + 1),
-        timestamp=datetime.now(EGYPT_TIMEZONE),
+        id=str(record.seq),
+        timestamp=timestamp,
         user_id=user_id,
         session_id=session_id,
         message=message,
@@ -65,8 +105,6 @@ async def webhook_endpoint(payload: WebhookMessage):
         }
     )
     
-    # Store in both global logs and user-specific logs
-    webhook_logs.append(log_entry.model_dump())
     user_manager.add_user_log(user_id, log_entry)
     
     # Prepare response message
@@ -74,6 +112,8 @@ async def webhook_endpoint(payload: WebhookMessage):
         response_message = "No contact information found in the message. Please include a name, email, or company."
     elif save_status == "success":
         response_message = "Lead information extracted and saved successfully!"
+    elif save_status == "queued":
+        response_message = "Lead information extracted and queued for saving."
     else:
         response_message = "Failed to save lead information."
     
@@ -81,39 +121,294 @@ async def webhook_endpoint(payload: WebhookMessage):
         "extracted": lead_data,
         "save_status": save_status,
         "message": response_message,
-        "retry_attempts": "Multiple attempts made" if save_status == "success" else "Failed after retries",
+        "retry_attempts": RETRY_ATTEMPTS_TEXT.get(save_status, "Failed after retries"),
         "user_id": user_id,
         "session_id": session_id
     }
 
+# Global webhook job queue instance
+webhook_jobs = WebhookJobQueue(process_message)
+
+async def run_idempotent(payload: WebhookMessage, key: Optional[str],
+                         deliver: Callable[[], Awaitable[Tuple[int, dict, dict]]]) -> Tuple[int, dict, dict]:
+    """
+    Deliver a message once per idempotency key
+
+    Args:
+        payload: Incoming message
+        key: Idempotency key, if the sender gave one
+        deliver: Processes the message, returning (status code, body, headers)
+
+    Returns:
+        (status code, body, headers) of the first delivery with the key;
+        replays carry an Idempotent-Replayed header
+
+    Raises:
+        HTTPException: 422 if the key was used for a different message
+    """
+    if not key or not webhook_idempotency.is_enabled():
+        return await deliver()
+    # Keys are scoped to the sender's user_id, so two senders can't collide
+    scoped_key = f"{payload.user_id or ''}:{key}"
+    try:
+        (status_code, body, headers), replayed = await webhook_idempotency.run(
+            scoped_key, request_fingerprint(payload.model_dump(exclude={"idempotency_key"})), deliver,
+            # A failed CRM save is worth running again on the next retry
+            cacheable=lambda response: response[1].get("save_status") != "failure"
+        )
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return status_code, body, {**headers, "Idempotent-Replayed": "true"} if replayed else headers
+
+@router.post("/")
+async def webhook_endpoint(
+    payload: WebhookMessage,
+    mode: Optional[Literal["sync", "async"]] = None,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", min_length=1, max_length=255)
+):
+    """Webhook endpoint for lead extraction - no authentication required"""
+    async def deliver() -> Tuple[int, dict, dict]:
+        if (mode or webhook_jobs.get_settings()["default_mode"]) == "sync":
+            return 200, await process_message(payload), {}
+
+        # Async: answer straight away and let the workers extract and save
+        if payload.callback_url:
+            try:
+                await webhook_jobs.check_callback_url(payload.callback_url)
+            except CallbackURLError as e:
+                raise HTTPException(status_code=422, detail=str(e))
+        try:
+            job = webhook_jobs.submit(payload, payload.callback_url)
+        except QueueFullError as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+        status_url = f"/webhook/jobs/{job.id}"
+        return 202, {"job_id": job.id, "status": job.status, "status_url": status_url}, {"Location": status_url}
+
+    status_code, body, headers = await run_idempotent(payload, idempotency_key or payload.idempotency_key, deliver)
+    return JSONResponse(status_code=status_code, content=body, headers=headers)
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Get the status and result of an async webhook job - the job id is the credential"""
+    job = webhook_jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job.to_dict()
+
+@router.get("/job-stats")
+async def get_job_statistics(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Get async job queue depth, worker utilization and latencies - requires authentication"""
+    current_user = get_current_user(credentials.credentials)
+    return webhook_jobs.get_stats()
+
+@router.post("/batch")
+async def webhook_batch_endpoint(payloads: List[WebhookMessage]):
+    """Process several webhook messages concurrently - no authentication required"""
+    settings = get_batch_settings()
+    if len(payloads) > settings["max_items"]:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {len(payloads)} messages exceeds the limit of {settings['max_items']}"
+        )
+
+    # Bounded so one big batch can't flood the LLM provider or the CRM
+    semaphore = asyncio.Semaphore(settings["max_concurrency"])
+
+    async def process_item(payload: WebhookMessage) -> dict:
+        async with semaphore:
+            async def deliver() -> Tuple[int, dict, dict]:
+                return 200, await process_message(payload), {}
+
+            try:
+                return (await run_idempotent(payload, payload.idempotency_key, deliver))[1]
+            except HTTPException as e:
+                return {
+                    "extracted": None,
+                    "save_status": "error",
+                    "message": e.detail,
+                    "user_id": payload.user_id or "default_user",
+                    "session_id": payload.session_id
+                }
+            except Exception as e:
+                logger.exception(f"Error processing batch message: {e}")
+                return {
+                    "extracted": None,
+                    "save_status": "error",
+                    "message": "Failed to process the message.",
+                    "user_id": payload.user_id or "default_user",
+                    "session_id": payload.session_id
+                }
+
+    results = await asyncio.gather(*(process_item(payload) for payload in payloads))
+    return {
+        "results": results,
+        "total": len(results),
+        "summary": dict(Counter(result["save_status"] for result in results))
+    }
+
 @router.get("/logs")
 async def get_logs(
     user_id: Optional[str] = None, 
-    limit: int = 50,
+    limit: int = Query(50, ge=1, le=1000),
+    after: Optional[int] = Query(None, ge=0, description="Only logs with a larger id (poll for new ones)"),
+    before: Optional[int] = Query(None, ge=1, description="Only logs with a smaller id (scroll back)"),
+    session_id: Optional[str] = None,
+    save_status: Optional[str] = None,
+    start: Optional[datetime] = Query(None, description="Only logs at or after this time (ISO 8601, UTC if no offset)"),
+    end: Optional[datetime] = Query(None, description="Only logs before this time"),
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
-    """Get webhook logs - requires authentication"""
+    """
+    Get webhook logs, oldest first - requires authentication
+
+    Log ids increase monotonically. Passing the last id seen as `after`
+    returns only newer logs; `before` pages back through older ones. With the
+    log store enabled, logs are served from it (indexed, across restarts and
+    workers) and show up there within webhook_settings.log_store.flush_interval_ms.
+    """
     current_user = get_current_user(credentials.credentials)
+    filters = {
+        "after": after, "before": before, "session_id": session_id, "save_status": save_status,
+        "start": _unix_time(start), "end": _unix_time(end)
+    }
     
     # Admin can see all logs, regular users only see their own
     if current_user["role"] == "admin":
         if user_id:
             # If specific user requested, get their logs
-            return user_manager.get_user_logs(user_id, limit)
+            return await asyncio.to_thread(user_manager.get_user_logs, user_id, limit, **filters)
+        elif webhook_log_store.is_enabled():
+            return await asyncio.to_thread(webhook_log_store.query_logs, limit=limit, **filters)
         else:
-            # Admin sees ALL logs from global webhook_logs (including Postman requests)
-            return webhook_logs[-limit:]
+            # Admin sees ALL logs from the global log ring (including Postman requests)
+            return webhook_log.page(limit, **filters)
     else:
         # Regular users can only see their own logs
         # Use email as user_id since that's what frontend sends
         user_identifier = current_user["email"]
-        return user_manager.get_user_logs(user_identifier, limit)
+        return await asyncio.to_thread(user_manager.get_user_logs, user_identifier, limit, **filters)
+
+@router.get("/stream")
+async def stream_logs(
+    user_id: Optional[str] = None,
+    token: Optional[str] = Query(None, description="Access token, for clients that can't send headers"),
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID", ge=0),
+    after: Optional[int] = Query(None, ge=0, description="Replay logs after this id first (like Last-Event-ID)"),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+):
+    """
+    Stream new webhook logs and stats deltas as Server-Sent Events - requires authentication
+
+    `log` events carry a WebhookLog with the same id as /webhook/logs;
+    `stats` events carry the requests and save statuses added since the
+    previous one. Admins see every user's logs (or one user's with user_id),
+    regular users only their own. Reconnecting with Last-Event-ID (or after)
+    replays what was missed.
+    """
+    if credentials is None and token is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    current_user = get_current_user(credentials.credentials if credentials is not None else token)
+    
+    # Same visibility as /logs: regular users only get their own (email-keyed) logs
+    if current_user["role"] != "admin":
+        user_id = current_user["email"]
+    try:
+        subscriber = await log_broadcaster.subscribe(user_id, last_event_id if last_event_id is not None else after)
+    except OverflowError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    return StreamingResponse(
+        log_broadcaster.stream(subscriber),
+        media_type="text/event-stream",
+        # Don't let proxies buffer or cache the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/log-stats")
+async def get_log_statistics(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Get webhook log buffer, store writer and stream statistics - requires authentication"""
+    current_user = get_current_user(credentials.credentials)
+    return {
+        "buffer": webhook_log.get_stats(),
+        "store": webhook_log_writer.get_stats(),
+        "stream": log_broadcaster.get_stats()
+    }
+
+@router.get("/idempotency-stats")
+async def get_idempotency_statistics(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Get idempotency key store statistics - requires authentication"""
+    current_user = get_current_user(credentials.credentials)
+    return webhook_idempotency.get_stats()
 
 @router.get("/crm-stats")
 async def get_crm_statistics(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Get CRM statistics - requires authentication"""
     current_user = get_current_user(credentials.credentials)
-    return get_crm_stats()
+    return {**await get_crm_stats(), "write_behind": crm_write_buffer.get_stats()}
+
+def _unix_time(value: Optional[datetime]) -> Optional[float]:
+    """Unix time of a query datetime; naive values are taken as UTC"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+def _iso_time(ts: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat() if ts is not None else None
+
+@router.get("/crm-export")
+async def export_crm_leads(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    company: Optional[str] = None,
+    gzip: bool = False,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Stream saved leads as NDJSON or CSV (admin only) - requires authentication"""
+    current_user = get_current_user(credentials.credentials)
+
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    filename = f"leads.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        export_leads(format, _unix_time(start), _unix_time(end), company, gzip),
+        media_type="application/gzip" if gzip else EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/crm-leads")
+async def get_crm_leads(
+    company: Optional[str] = None,
+    email_domain: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Page through saved leads by company, email domain and date (admin only) - requires authentication"""
+    current_user = get_current_user(credentials.credentials)
+
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    try:
+        page = await query_leads(company, email_domain, _unix_time(start), _unix_time(end), limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    page["leads"] = [
+        {"id": record["id"], "created_at": _iso_time(record["ts"]), "lead": record["lead"]}
+        for record in page["leads"]
+    ]
+    return page
+
+@router.get("/agent-stats")
+async def get_agent_statistics(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Get extraction pipeline statistics - requires authentication"""
+    current_user = get_current_user(credentials.credentials)
+    return get_agent_stats()
 
 @router.post("/session")
 async def create_session(
@@ -145,7 +440,7 @@ async def get_user_statistics(
     if current_user["role"] != "admin" and current_user["username"] != user_id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    return user_manager.get_user_stats(user_id)
+    return await asyncio.to_thread(user_manager.get_user_stats, user_id)
 
 @router.get("/users/stats")
 async def get_all_users_statistics(credentials: HTTPAuthorizationCredentials = Depends(security)):
@@ -155,7 +450,7 @@ async def get_all_users_statistics(credentials: HTTPAuthorizationCredentials = D
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    return user_manager.get_all_users_stats()
+    return await asyncio.to_thread(user_manager.get_all_users_stats)
 
 @router.get("/sessions/cleanup")
 async def cleanup_sessions(credentials: HTTPAuthorizationCredentials = Depends(security)):
@@ -3,9 +3,20 @@ import os
 import json
 import re
 import logging
-from typing import Dict, Optional
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 from models.lead import LeadResponse
+from services.llm_client import llm_client
+from services.config_manager import config_manager
+from services.extraction_cache import extraction_cache
+from services.fast_extractor import fast_extractor
+from services.llm_batcher import ExtractionBatcher
+from services.single_flight import SingleFlight
+from services.json_stream import JSONObjectStreamParser
+from services.rate_limiter import RateLimitPermit
+from services.llm_providers import provider_router, LLMProvider
+from services.circuit_breaker import llm_circuit_breaker, CircuitOpenError
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -19,6 +30,28 @@ if not GROQ_API_KEY:
     logger.error("GROQ_API_KEY environment variable is not set!")
     raise ValueError("GROQ_API_KEY environment variable is required")
 
+# Bump whenever the extraction prompt changes so cached results are not reused
+PROMPT_VERSION = "v1"
+
+# LLM call latency, used to report how much time the fast path saves
+llm_call_stats = {"calls": 0, "total_seconds": 0.0}
+
+# Streamed completions, and how many were cut short once the JSON object closed
+stream_stats = {"streams": 0, "early_terminations": 0}
+
+# Concurrent identical messages (e.g. upstream redeliveries) share one LLM call
+extraction_single_flight = SingleFlight()
+
+def _fallback_lead() -> Dict[str, str]:
+    """Default lead returned when extraction fails"""
+    return {"name": "Unknown", "email": "unknown@example.com", "company": "Unknown"}
+
+def _local_fallback(message: str) -> Dict[str, str]:
+    """Best-effort rule-based lead used while the LLM circuit is open"""
+    lead, _ = fast_extractor.extract(message)
+    fallback = _fallback_lead()
+    return {field: lead[field] or fallback[field] for field in fallback}
+
 async def extract_lead_info(message: str) -> Dict[str, str]:
     """
     Extract lead information from unstructured message using LLM
@@ -36,7 +69,7 @@ async def extract_lead_info(message: str) -> Dict[str, str]:
     # Input validation
     if not message or not message.strip():
         logger.warning("Empty message provided to extract_lead_info")
-        return {"name": "Unknown", "email": "unknown@example.com", "company": "Unknown"}
+        return _fallback_lead()
     
     # Sanitize input
     message = message.strip()
@@ -44,7 +77,52 @@ async def extract_lead_info(message: str) -> Dict[str, str]:
         logger.warning(f"Message too long ({len(message)} chars), truncating")
         message = message[:10000]
     
-    prompt = f"""
+    # Trivially parseable messages skip the LLM entirely
+    fast_result = fast_extractor.try_extract(message)
+    if fast_result is not None:
+        return fast_result
+
+    llm_settings = config_manager.get_config("llm_settings")
+
+    # Serve repeated/templated messages without an LLM round trip
+    cache_key = extraction_cache.make_key(message, llm_settings, PROMPT_VERSION)
+    cached = extraction_cache.get(cache_key)
+    if cached is not None:
+        logger.info("Extraction cache hit")
+        return cached
+
+    extracted_data = await extraction_single_flight.do(
+        cache_key, lambda: _extract_with_llm(message, llm_settings, cache_key)
+    )
+    # Coalesced callers share one result object, so hand each its own copy
+    return dict(extracted_data)
+
+async def _extract_with_llm(message: str, llm_settings: Dict, cache_key: str) -> Dict[str, str]:
+    """Run the LLM extraction for a cache miss and cache the result"""
+    if llm_circuit_breaker.is_open():
+        # Don't queue behind a provider that is known to be failing
+        logger.warning("LLM circuit open, using local fallback extraction")
+        return _local_fallback(message)
+
+    start = time.perf_counter()
+    if extraction_batcher.is_enabled():
+        extracted_data = await extraction_batcher.submit(message, llm_settings)
+    else:
+        extracted_data = await _request_extraction(message, llm_settings)
+    llm_call_stats["calls"] += 1
+    llm_call_stats["total_seconds"] += time.perf_counter() - start
+    if llm_circuit_breaker.is_open():
+        # The circuit opened during the call: the result may be the local fallback, which mustn't be cached
+        return extracted_data if extracted_data is not None else _local_fallback(message)
+    if extracted_data is None:
+        return _fallback_lead()
+
+    extraction_cache.put(cache_key, extracted_data)
+    return extracted_data
+
+def build_prompt(message: str) -> str:
+    """Build the extraction prompt for a single message"""
+    return f"""
 Extract the full name, email, and company name from the following message:
 \"\"\"{message}\"\"\"
 
@@ -60,8 +138,67 @@ Examples:
 - "Hi there" → {{ "name": "", "email": "", "company": "" }}
 """
 
+def build_batch_prompt(messages: List[str]) -> str:
+    """Build one extraction prompt covering several messages"""
+    numbered = "\n".join(f'[{index}] \"\"\"{message}\"\"\"' for index, message in enumerate(messages))
+    return f"""
+Extract the full name, email, and company name from each of the following messages:
+{numbered}
+
+For each message, extract any contact information (name, email, company) it contains.
+Use empty strings for missing fields.
+
+Return ONLY a valid JSON array with one object per message, keyed by the message index, in this exact format without any additional text:
+[{{ "index": 0, "name": "...", "email": "...", "company": "..." }}]
+"""
+
+def _estimate_tokens(prompt: str, max_tokens: int) -> int:
+    """Rough token budget for a call: ~4 characters per prompt token plus the completion"""
+    return len(prompt) // 4 + max_tokens
+
+async def _send_to_providers(send: Callable[[LLMProvider, RateLimitPermit], Awaitable[Any]],
+                             estimated_tokens: int) -> Any:
+    """
+    Run a call through the provider router and each provider's rate limiter
+    
+    The router handles failover and hedging across llm_settings.providers.
+    Within a provider, callers queue for capacity instead of failing, and a 429
+    re-queues the call (after the provider's retry-after) up to
+    rate_limit.max_retries times. The whole call is guarded by the LLM circuit
+    breaker, which only counts time spent past the rate limiters as latency.
+    
+    Args:
+        send: Performs the HTTP call to a provider, reporting the response through the permit
+        estimated_tokens: Token budget to reserve
+        
+    Returns:
+        Whatever send returns for the winning provider
+        
+    Raises:
+        CircuitOpenError: If the LLM circuit is open
+    """
+    async def call(provider: LLMProvider) -> Any:
+        limiter = provider.rate_limiter
+        max_retries = limiter.get_settings()["max_retries"]
+        for attempt in range(max_retries + 1):
+            try:
+                async with limiter.acquire(estimated_tokens) as permit:
+                    with timer.running():
+                        return await send(provider, permit)
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code != 429 or attempt >= max_retries:
+                    raise
+                logger.warning(f"Rate limited by {provider.name}, re-queueing request ({attempt + 1}/{max_retries})")
+
+    async with llm_circuit_breaker.guard() as timer:
+        return await provider_router.execute(call)
+
+def _build_request(prompt: str, llm_settings: Dict, max_tokens: Optional[int] = None,
+                   provider: Optional[LLMProvider] = None) -> Tuple[Dict, Dict]:
+    """Build headers and body for a chat-completions request to a provider"""
+    api_key = (provider.api_key if provider else None) or GROQ_API_KEY
     headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
+        "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json"
     }
 
@@ -69,68 +206,247 @@ Examples:
         "messages": [
             {"role": "user", "content": prompt}
         ],
-        "model": "llama3-70b-8192",
-        "temperature": 0.2,
-        "max_tokens": 200
+        "model": (provider.model if provider else None) or llm_settings.get("model", "llama3-70b-8192"),
+        "temperature": llm_settings.get("temperature", 0.2),
+        "max_tokens": max_tokens or llm_settings.get("max_tokens", 200)
     }
+    return headers, data
 
-    try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers=headers,
-                json=data
-            )
-            
-            # Check for HTTP errors
+async def _post_chat_completion(prompt: str, llm_settings: Dict, max_tokens: Optional[int] = None) -> str:
+    """
+    Send a prompt to the chat-completions endpoint
+    
+    Args:
+        prompt: User prompt to send
+        llm_settings: Active llm_settings section
+        max_tokens: Override for llm_settings max_tokens
+        
+    Returns:
+        The completion text
+        
+    Raises:
+        httpx.HTTPError: If the request fails
+        ValueError: If the response structure is invalid
+    """
+    async def send(provider: LLMProvider, permit: RateLimitPermit) -> httpx.Response:
+        headers, data = _build_request(prompt, llm_settings, max_tokens, provider)
+        # Shared pooled client: keep-alive connections are reused across calls
+        client = llm_client.get_client()
+        response = await client.post(
+            provider.api_url,
+            headers=headers,
+            json=data
+        )
+        permit.record_response(response)
+        
+        # Check for HTTP errors
+        response.raise_for_status()
+        return response
+
+    max_tokens = max_tokens or llm_settings.get("max_tokens", 200)
+    response = await _send_to_providers(send, _estimate_tokens(prompt, max_tokens))
+    result = response.json()
+    
+    # Validate response structure
+    if "choices" not in result or not result["choices"]:
+        logger.error("Invalid API response structure")
+        raise ValueError("Invalid API response")
+    
+    content = result["choices"][0]["message"]["content"]
+    
+    # Debug logging to see what the LLM actually returns
+    logger.info(f"LLM raw content: {content}")
+    print(f"LLM raw content: {content}")
+    return content
+
+async def _stream_lead(prompt: str, llm_settings: Dict) -> Optional[Dict[str, str]]:
+    """
+    Stream a chat completion and stop as soon as a complete lead object arrives
+    
+    Args:
+        prompt: User prompt to send
+        llm_settings: Active llm_settings section
+        
+    Returns:
+        The first complete lead object, or None if the stream ended without one
+        
+    Raises:
+        httpx.HTTPError: If the request fails
+    """
+    stream_stats["streams"] += 1
+
+    async def send(provider: LLMProvider, permit: RateLimitPermit) -> Optional[Dict[str, str]]:
+        headers, data = _build_request(prompt, llm_settings, provider=provider)
+        data["stream"] = True
+        parser = JSONObjectStreamParser()
+        client = llm_client.get_client()
+        lead = None
+        finished = False
+        async with client.stream("POST", provider.api_url, headers=headers, json=data) as response:
+            permit.record_response(response)
+            if response.is_error:
+                # Read the error body so it can be logged after the stream closes
+                await response.aread()
             response.raise_for_status()
-            
-            result = response.json()
-            
-            # Validate response structure
-            if "choices" not in result or not result["choices"]:
-                logger.error("Invalid API response structure")
-                raise ValueError("Invalid API response")
-            
-            content = result["choices"][0]["message"]["content"]
-            
-            # Debug logging to see what the LLM actually returns
-            logger.info(f"LLM raw content: {content}")
-            print(f"LLM raw content: {content}")
-            
-            # Extract JSON from response using regex
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if json_match:
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                payload = line[len("data:"):].strip()
+                if payload == "[DONE]":
+                    break
+
                 try:
-                    extracted_data = json.loads(json_match.group())
-                    
-                    # Validate extracted data structure
-                    required_fields = ["name", "email", "company"]
-                    if all(field in extracted_data for field in required_fields):
-                        logger.info(f"Successfully extracted lead data: {extracted_data['name']}")
-                        return extracted_data
-                    else:
-                        logger.warning("Extracted data missing required fields")
-                        
-                except json.JSONDecodeError as e:
-                    logger.error(f"Failed to parse JSON from LLM response: {e}")
-            
-            # Fallback: return default structure
+                    choice = json.loads(payload)["choices"][0]
+                    delta = choice.get("delta", {}).get("content") or ""
+                except (json.JSONDecodeError, KeyError, IndexError) as e:
+                    logger.warning(f"Skipping malformed stream chunk: {e}")
+                    continue
+                finished = choice.get("finish_reason") is not None
+
+                for candidate in parser.feed(delta):
+                    try:
+                        lead = _parse_lead(json.loads(candidate))
+                    except json.JSONDecodeError:
+                        continue
+                    if lead is not None:
+                        break
+                if lead is not None:
+                    break
+        # Leaving the context closed the response: if the completion hadn't
+        # finished, the rest of it was abandoned
+        if lead is not None and not finished:
+            stream_stats["early_terminations"] += 1
+        return lead
+
+    return await _send_to_providers(send, _estimate_tokens(prompt, llm_settings.get("max_tokens", 200)))
+
+def _parse_lead(extracted_data) -> Optional[Dict[str, str]]:
+    """Return the lead if it has all required fields, otherwise None"""
+    required_fields = ["name", "email", "company"]
+    if isinstance(extracted_data, dict) and all(field in extracted_data for field in required_fields):
+        return {field: extracted_data[field] for field in required_fields}
+    return None
+
+async def _request_extraction(message: str, llm_settings: Dict) -> Optional[Dict[str, str]]:
+    """
+    Ask the LLM to extract lead information from a message
+    
+    Args:
+        message: Sanitized message to process
+        llm_settings: Active llm_settings section
+        
+    Returns:
+        Extracted lead data, the local fallback if the LLM circuit is open
+        (or opens during the call), or None if the request or parsing failed
+    """
+    try:
+        if llm_settings.get("stream", False):
+            extracted_data = await _stream_lead(build_prompt(message), llm_settings)
+            if extracted_data is not None:
+                logger.info(f"Successfully extracted lead data: {extracted_data['name']}")
+                return extracted_data
             logger.warning("Using fallback values due to extraction failure")
-            return {"name": "Unknown", "email": "unknown@example.com", "company": "Unknown"}
-            
+            return None
+
+        content = await _post_chat_completion(build_prompt(message), llm_settings)
+        
+        # Extract JSON from response using regex
+        json_match = re.search(r'\{.*\}', content, re.DOTALL)
+        if json_match:
+            try:
+                extracted_data = _parse_lead(json.loads(json_match.group()))
+                
+                # Validate extracted data structure
+                if extracted_data is not None:
+                    logger.info(f"Successfully extracted lead data: {extracted_data['name']}")
+                    return extracted_data
+                else:
+                    logger.warning("Extracted data missing required fields")
+                    
+            except json.JSONDecodeError as e:
+                logger.error(f"Failed to parse JSON from LLM response: {e}")
+        
+        # Fallback: return default structure
+        logger.warning("Using fallback values due to extraction failure")
+        return None
+        
+    except CircuitOpenError as e:
+        logger.warning(f"{e}, using local fallback extraction")
+        return _local_fallback(message)
     except httpx.TimeoutException:
         logger.error("API request timed out")
-        return {"name": "Unknown", "email": "unknown@example.com", "company": "Unknown"}
+        return None
     except httpx.HTTPStatusError as e:
         logger.error(f"HTTP error {e.response.status_code}: {e.response.text}")
-        return {"name": "Unknown", "email": "unknown@example.com", "company": "Unknown"}
+        return None
     except httpx.RequestError as e:
         logger.error(f"Request error: {e}")
-        return {"name": "Unknown", "email": "unknown@example.com", "company": "Unknown"}
+        return None
     except Exception as e:
         logger.error(f"Unexpected error in extract_lead_info: {e}")
-        return {"name": "Unknown", "email": "unknown@example.com", "company": "Unknown"}
+        return None
+
+async def _request_batch_extraction(messages: List[str], llm_settings: Dict) -> List[Optional[Dict[str, str]]]:
+    """
+    Ask the LLM to extract lead information from several messages in one prompt
+    
+    Args:
+        messages: Sanitized messages to process
+        llm_settings: Active llm_settings section
+        
+    Returns:
+        One result per message, in order; None for items missing from or
+        malformed in the response
+        
+    Raises:
+        httpx.HTTPError: If the request fails
+    """
+    max_tokens = llm_settings.get("max_tokens", 200) * len(messages)
+    content = await _post_chat_completion(build_batch_prompt(messages), llm_settings, max_tokens)
+
+    results: List[Optional[Dict[str, str]]] = [None] * len(messages)
+    json_match = re.search(r'\[.*\]', content, re.DOTALL)
+    if not json_match:
+        logger.warning("No JSON array in batch extraction response")
+        return results
+
+    try:
+        items = json.loads(json_match.group())
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse JSON array from batch response: {e}")
+        return results
+
+    for item in items if isinstance(items, list) else []:
+        index = item.get("index") if isinstance(item, dict) else None
+        if isinstance(index, int) and 0 <= index < len(messages) and results[index] is None:
+            results[index] = _parse_lead(item)
+    return results
+
+extraction_batcher = ExtractionBatcher(_request_batch_extraction, _request_extraction)
+
+def get_agent_stats() -> Dict:
+    """
+    Get extraction pipeline statistics
+    
+    Returns:
+        Dictionary with per-stage counters
+    """
+    llm_calls = llm_call_stats["calls"]
+    avg_llm_seconds = llm_call_stats["total_seconds"] / llm_calls if llm_calls else 0.0
+    return {
+        "fast_path": fast_extractor.get_stats(avg_llm_seconds),
+        "cache": extraction_cache.get_stats(),
+        "batching": extraction_batcher.get_stats(),
+        "single_flight": extraction_single_flight.get_stats(),
+        "providers": provider_router.get_stats(),
+        "circuit_breaker": llm_circuit_breaker.get_stats(),
+        "llm": {
+            "calls": llm_calls,
+            "avg_latency_ms": round(avg_llm_seconds * 1000, 2),
+            "streams": stream_stats["streams"],
+            "stream_early_terminations": stream_stats["early_terminations"]
+        }
+    }
 
 def validate_lead_data(data: Dict[str, str]) -> bool:
     """
@@ -0,0 +1,240 @@
+import time
+import logging
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Any, Deque, Optional, Tuple
+from services.config_manager import config_manager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CIRCUIT_BREAKER_SETTINGS = {
+    "enabled": True,
+    # Sliding window of the most recent calls the thresholds are judged over
+    "window_size": 20,
+    "minimum_calls": 10,
+    "failure_rate_threshold": 0.5,
+    "slow_call_ms": 10000,
+    "slow_call_rate_threshold": 0.8,
+    "open_seconds": 30,
+    "half_open_max_calls": 2
+}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open"""
+
+class CallTimer:
+    """
+    Duration of a guarded call for slow-call accounting
+
+    Callers that queue before doing the work (e.g. for a rate limiter) wrap
+    the work in running(), so only the time some attempt of the call was
+    actually running counts; overlapping attempts (hedges) count once. A
+    call that never uses running() is timed as a whole.
+    """
+
+    def __init__(self):
+        self._created = time.perf_counter()
+        self._seconds = 0.0
+        self._active = 0
+        self._since: Optional[float] = None
+
+    @contextmanager
+    def running(self):
+        """Count the enclosed time as the call running"""
+        if self._active == 0:
+            self._since = time.perf_counter()
+        self._active += 1
+        try:
+            yield
+        finally:
+            self._active -= 1
+            if self._active == 0:
+                self._seconds += time.perf_counter() - self._since
+
+    def elapsed(self) -> float:
+        """Seconds the call has been running"""
+        now = time.perf_counter()
+        if self._since is None:
+            return now - self._created
+        return self._seconds + (now - self._since if self._active else 0.0)
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker over a sliding window of call outcomes"""
+
+    def __init__(self, name: str, section: str = "llm_settings"):
+        """
+        Args:
+            name: Name used in logs and stats
+            section: Config section holding the circuit_breaker settings
+        """
+        self.name = name
+        self.section = section
+        self.state = CLOSED
+        # (failed, slow) per call
+        self._window: Deque[Tuple[bool, bool]] = deque()
+        self._opened_at = 0.0
+        self._trial_calls = 0
+        self._trial_successes = 0
+        self.times_opened = 0
+        self.short_circuited = 0
+
+    def get_settings(self) -> Dict[str, Any]:
+        """Get breaker settings merged over the defaults"""
+        section = config_manager.get_config(self.section)
+        return {**DEFAULT_CIRCUIT_BREAKER_SETTINGS, **section.get("circuit_breaker", {})}
+
+    def _transition(self, state: str) -> None:
+        if state == self.state:
+            return
+        log = logger.warning if state == OPEN else logger.info
+        log(f"Circuit breaker '{self.name}' {self.state} -> {state}")
+        self.state = state
+        self._trial_calls = 0
+        self._trial_successes = 0
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.times_opened += 1
+        elif state == CLOSED:
+            self._window.clear()
+
+    def _retry_in(self, settings: Dict[str, Any]) -> float:
+        return max(self._opened_at + settings["open_seconds"] - time.monotonic(), 0.0)
+
+    def is_open(self) -> bool:
+        """Check, without claiming a trial call, whether calls are being rejected right now"""
+        settings = self.get_settings()
+        if not settings["enabled"]:
+            return False
+        if self.state == OPEN:
+            return self._retry_in(settings) > 0
+        if self.state == HALF_OPEN:
+            return self._trial_calls >= settings["half_open_max_calls"]
+        return False
+
+    def allow_request(self) -> bool:
+        """
+        Decide whether a call may go ahead
+
+        Returns:
+            True if the call may proceed (in half-open state it becomes a trial call)
+        """
+        settings = self.get_settings()
+        if not settings["enabled"]:
+            return True
+
+        if self.state == OPEN and self._retry_in(settings) <= 0:
+            self._transition(HALF_OPEN)
+
+        if self.state == OPEN or (
+            self.state == HALF_OPEN and self._trial_calls >= settings["half_open_max_calls"]
+        ):
+            self.short_circuited += 1
+            return False
+
+        if self.state == HALF_OPEN:
+            self._trial_calls += 1
+        return True
+
+    def _rates(self) -> Tuple[float, float]:
+        if not self._window:
+            return 0.0, 0.0
+        failures = sum(1 for failed, _ in self._window if failed)
+        slow = sum(1 for _, is_slow in self._window if is_slow)
+        return failures / len(self._window), slow / len(self._window)
+
+    def _record(self, failed: bool, seconds: float) -> None:
+        settings = self.get_settings()
+        slow = seconds * 1000 >= settings["slow_call_ms"]
+
+        if self.state == HALF_OPEN:
+            if failed or slow:
+                self._transition(OPEN)
+                return
+            self._trial_successes += 1
+            if self._trial_successes >= settings["half_open_max_calls"]:
+                self._transition(CLOSED)
+            return
+
+        if self.state == OPEN:
+            # A call admitted before the circuit opened; it doesn't change the verdict
+            return
+
+        self._window.append((failed, slow))
+        while len(self._window) > settings["window_size"]:
+            self._window.popleft()
+
+        if len(self._window) >= settings["minimum_calls"]:
+            failure_rate, slow_rate = self._rates()
+            if failure_rate >= settings["failure_rate_threshold"] or slow_rate >= settings["slow_call_rate_threshold"]:
+                logger.warning(
+                    f"Circuit breaker '{self.name}' tripped: failure rate {failure_rate:.0%}, "
+                    f"slow call rate {slow_rate:.0%} over {len(self._window)} calls"
+                )
+                self._transition(OPEN)
+
+    def record_success(self, seconds: float) -> None:
+        """Record a successful call and its latency"""
+        self._record(False, seconds)
+
+    def record_failure(self, seconds: float) -> None:
+        """Record a failed call and its latency"""
+        self._record(True, seconds)
+
+    @asynccontextmanager
+    async def guard(self):
+        """
+        Run the enclosed call through the breaker, recording its outcome
+
+        Yields:
+            CallTimer to mark when the call runs, so time spent queued
+            isn't counted towards slow calls
+
+        Raises:
+            CircuitOpenError: If the circuit is open and the call was not attempted
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuit breaker '{self.name}' is open")
+
+        trial = self.state == HALF_OPEN
+        timer = CallTimer()
+        try:
+            yield timer
+        except Exception:
+            self.record_failure(timer.elapsed())
+            raise
+        except BaseException:
+            # Cancelled: no verdict, but hand back the trial slot
+            if trial and self.state == HALF_OPEN:
+                self._trial_calls -= 1
+            raise
+        else:
+            self.record_success(timer.elapsed())
+
+    def reset(self) -> None:
+        """Close the circuit and forget recorded calls"""
+        self._transition(CLOSED)
+        self._window.clear()
+        self.times_opened = 0
+        self.short_circuited = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get breaker state and window rates"""
+        settings = self.get_settings()
+        failure_rate, slow_rate = self._rates()
+        return {
+            "enabled": settings["enabled"],
+            "state": self.state,
+            "window_calls": len(self._window),
+            "failure_rate": round(failure_rate, 3),
+            "slow_call_rate": round(slow_rate, 3),
+            "retry_in_seconds": round(self._retry_in(settings), 1) if self.state == OPEN else 0,
+            "times_opened": self.times_opened,
+            "short_circuited": self.short_circuited
+        }
+
+# Global LLM circuit breaker instance
+llm_circuit_breaker = CircuitBreaker("llm")
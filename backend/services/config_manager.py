@@ -4,6 +4,7 @@ from pathlib import Path
 from typing import Dict, Any, Optional
 from datetime import datetime
 import logging
+from services.file_io import atomic_write_text
 
 logger = logging.getLogger(__name__)
 
@@ -17,17 +18,123 @@ class ConfigManager:
             "llm_settings": {
                 "model": "llama3-70b-8192",
                 "temperature": 0.2,
-                "max_tokens": 200
+                "max_tokens": 200,
+                "api_url": "https://api.groq.com/openai/v1/chat/completions",
+                "stream": False,
+                "pool": {
+                    "max_connections": 100,
+                    "max_keepalive_connections": 20,
+                    "keepalive_expiry": 30.0,
+                    "http2": False
+                },
+                "timeouts": {
+                    "connect": 5.0,
+                    "read": 30.0,
+                    "write": 10.0,
+                    "pool": 5.0
+                },
+                "batching": {
+                    "enabled": False,
+                    "max_batch_size": 8,
+                    "max_wait_ms": 20
+                },
+                "rate_limit": {
+                    "enabled": True,
+                    "initial_concurrency": 8,
+                    "min_concurrency": 1,
+                    "max_concurrency": 64,
+                    "backoff_ratio": 0.5,
+                    "requests_per_minute": None,
+                    "tokens_per_minute": None,
+                    "max_retries": 3
+                },
+                "providers": [
+                    {"name": "groq", "api_key_env": "GROQ_API_KEY"}
+                ],
+                "hedging": {
+                    "enabled": False,
+                    "default_delay_ms": 2000,
+                    "min_delay_ms": 50,
+                    "min_samples": 20
+                },
+                "circuit_breaker": {
+                    "enabled": True,
+                    "window_size": 20,
+                    "minimum_calls": 10,
+                    "failure_rate_threshold": 0.5,
+                    "slow_call_ms": 10000,
+                    "slow_call_rate_threshold": 0.8,
+                    "open_seconds": 30,
+                    "half_open_max_calls": 2
+                }
             },
             "crm_settings": {
+                "backend": "json",
                 "retry_attempts": 3,
                 "retry_delay": 1,
-                "failure_rate": 0.1
+                "max_retry_delay": 30,
+                "failure_rate": 0.1,
+                "dedup": {
+                    "enabled": True,
+                    "match_name_company": False,
+                    "expected_leads": 1000000,
+                    "false_positive_rate": 0.01
+                },
+                "write_behind": {
+                    "enabled": False,
+                    "max_buffer": 10000,
+                    "batch_size": 100,
+                    "flush_interval_ms": 50,
+                    "ack": "flush"
+                },
+                "storage": {
+                    "fsync": "never",
+                    "fsync_interval_seconds": 1.0,
+                    "max_segment_bytes": 67108864,
+                    "max_segment_seconds": 86400,
+                    "index_interval": 1000,
+                    "compact_on_rotate": True
+                }
             },
             "webhook_settings": {
                 "rate_limit": 100,  # requests per hour
                 "message_max_length": 10000,
-                "enable_retry": True
+                "enable_retry": True,
+                "log_capacity": 10000,
+                "log_store": {
+                    "enabled": True,
+                    "flush_interval_ms": 200,
+                    "batch_size": 1000,
+                    "retention_days": 30
+                },
+                "idempotency": {
+                    "enabled": True,
+                    "ttl_seconds": 86400,
+                    "max_keys": 10000
+                },
+                "stream": {
+                    "poll_interval_ms": 250,
+                    "batch_size": 1000,
+                    "max_queue": 1000,
+                    "max_subscribers": 100,
+                    "heartbeat_seconds": 15.0,
+                    "max_replay": 1000
+                },
+                "batch": {
+                    "max_items": 500,
+                    "max_concurrency": 16
+                },
+                "jobs": {
+                    "default_mode": "sync",
+                    "workers": 8,
+                    "max_queue": 1000,
+                    "result_ttl_seconds": 3600,
+                    "max_results": 10000,
+                    "callback_timeout_seconds": 10.0,
+                    "callback_retries": 2,
+                    "callback_allowed_hosts": [],
+                    "shutdown_timeout_seconds": 30.0
+                }
             },
             "extraction_settings": {
                 "required_fields": ["name", "email", "company"],
@@ -35,6 +142,17 @@ class ConfigManager:
                     "name": "Unknown",
                     "email": "unknown@example.com",
                     "company": "Unknown"
+                },
+                "fast_path": {
+                    "enabled": True,
+                    "confidence_threshold": 0.9
+                },
+                "cache": {
+                    "enabled": True,
+                    "max_entries": 5000,
+                    "ttl_seconds": 3600,
+                    "negative_ttl_seconds": 300,
+                    "persist_path": None
                 }
             },
             "last_updated": datetime.now().isoformat()
@@ -60,8 +178,8 @@ class ConfigManager:
         """Save configuration to file"""
         try:
             self.config["last_updated"] = datetime.now().isoformat()
-            with open(self.config_file, 'w') as f:
-                json.dump(self.config, f, indent=2)
+            # Other workers may be reading the file; never let them see half of it
+            atomic_write_text(self.config_file, json.dumps(self.config, indent=2))
             logger.info("Configuration saved successfully")
             return True
         except Exception as e:
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import re
+import time
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+from services.config_manager import config_manager
+from services.file_io import atomic_write_text
+from services.llm_client import DEFAULT_API_URL
+from services.llm_providers import DEFAULT_PROVIDERS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SETTINGS = {
+    "enabled": True,
+    "max_entries": 5000,
+    "ttl_seconds": 3600,
+    "negative_ttl_seconds": 300,
+    "persist_path": None
+}
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def normalize_message(message: str) -> str:
+    """Normalize a message so trivially different copies share a cache key"""
+    return _WHITESPACE_RE.sub(" ", message).strip().lower()
+
+def provider_fingerprint(llm_settings: Dict[str, Any]) -> List[List[str]]:
+    """
+    The providers that may answer, in priority order, as [name, model, api_url]
+
+    Model and api_url are resolved the way LLMProvider.configure does, so an
+    entry inheriting them and one spelling them out give the same fingerprint.
+    """
+    fingerprint = []
+    for entry in llm_settings.get("providers") or DEFAULT_PROVIDERS:
+        model = entry.get("model") or llm_settings.get("model")
+        api_url = entry.get("api_url") or llm_settings.get("api_url", DEFAULT_API_URL)
+        fingerprint.append([
+            str(entry.get("name", "groq")).strip().lower(),
+            str(model or "").strip(),
+            str(api_url or "").strip().rstrip("/")
+        ])
+    return fingerprint
+
+def is_negative_result(lead: Dict[str, str]) -> bool:
+    """A negative result is one without any contact information"""
+    return not any(str(lead.get(field, "")).strip() for field in ("name", "email", "company"))
+
+class ExtractionCache:
+    """LRU + TTL cache of extraction results, keyed on message and LLM settings"""
+
+    def __init__(self):
+        # key -> (expires_at, lead); wall-clock expiry so entries survive restarts
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, str]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get_settings(self) -> Dict[str, Any]:
+        """Get cache settings merged over the defaults"""
+        extraction_settings = config_manager.get_config("extraction_settings")
+        return {**DEFAULT_CACHE_SETTINGS, **extraction_settings.get("cache", {})}
+
+    def make_key(self, message: str, llm_settings: Dict[str, Any], prompt_version: str) -> str:
+        """
+        Build a cache key from the normalized message and the active LLM settings
+
+        The providers, their models and their endpoints are part of the key, so
+        switching any of them doesn't serve results another model produced.
+
+        Args:
+            message: Raw inbound message
+            llm_settings: Active llm_settings section
+            prompt_version: Version of the extraction prompt
+
+        Returns:
+            Hex digest identifying the extraction
+        """
+        material = json.dumps({
+            "message": normalize_message(message),
+            "providers": provider_fingerprint(llm_settings),
+            "temperature": llm_settings.get("temperature"),
+            "max_tokens": llm_settings.get("max_tokens"),
+            "prompt_version": prompt_version
+        }, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        """Get a cached result, or None on miss or expiry"""
+        if not self.get_settings()["enabled"]:
+            return None
+
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, lead = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(lead)
+
+    def put(self, key: str, lead: Dict[str, str]) -> None:
+        """Store a result, using the negative TTL for results without contact info"""
+        settings = self.get_settings()
+        if not settings["enabled"]:
+            return
+
+        ttl = settings["negative_ttl_seconds"] if is_negative_result(lead) else settings["ttl_seconds"]
+        if ttl <= 0:
+            return
+
+        self._entries[key] = (time.time() + ttl, dict(lead))
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > settings["max_entries"]:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries and reset counters"""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def load(self) -> int:
+        """
+        Load unexpired entries from the persistence file, if configured
+
+        Returns:
+            Number of entries loaded
+        """
+        persist_path = self.get_settings()["persist_path"]
+        if not persist_path or not Path(persist_path).exists():
+            return 0
+
+        try:
+            stored = json.loads(Path(persist_path).read_text())
+        except Exception as e:
+            logger.error(f"Error loading extraction cache from {persist_path}: {e}")
+            return 0
+
+        now = time.time()
+        loaded = 0
+        # Stored oldest-first, so re-inserting preserves LRU order
+        for key, expires_at, lead in stored.get("entries", []):
+            if expires_at > now:
+                self._entries[key] = (expires_at, lead)
+                loaded += 1
+
+        max_entries = self.get_settings()["max_entries"]
+        while len(self._entries) > max_entries:
+            self._entries.popitem(last=False)
+
+        logger.info(f"Loaded {loaded} extraction cache entries from {persist_path}")
+        return loaded
+
+    def save(self) -> bool:
+        """Write unexpired entries to the persistence file, if configured"""
+        persist_path = self.get_settings()["persist_path"]
+        if not persist_path:
+            return False
+
+        now = time.time()
+        entries = [
+            [key, expires_at, lead]
+            for key, (expires_at, lead) in self._entries.items()
+            if expires_at > now
+        ]
+
+        try:
+            path = Path(persist_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_text(path, json.dumps({"entries": entries}))
+            logger.info(f"Saved {len(entries)} extraction cache entries to {persist_path}")
+            return True
+        except Exception as e:
+            logger.error(f"Error saving extraction cache to {persist_path}: {e}")
+            return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache counters"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.get_settings()["enabled"],
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0
+        }
+
+# Global extraction cache instance
+extraction_cache = ExtractionCache()
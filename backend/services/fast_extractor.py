@@ -0,0 +1,182 @@
+import re
+import time
+import logging
+from typing import Dict, Any, Optional, Tuple
+from services.config_manager import config_manager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FAST_PATH_SETTINGS = {
+    "enabled": True,
+    "confidence_threshold": 0.9
+}
+
+EMAIL_RE = re.compile(r"[\w.+\-]+@[\w\-]+(?:\.[\w\-]+)+")
+
+# Capitalized word, allowing accented letters, apostrophes and hyphens
+_CAP_WORD = r"[A-ZÀ-Þ][^\W\d_]*(?:['\-][^\W\d_]+)*"
+
+NAME_RE = re.compile(
+    r"\b(?:I'm|I am|my name is|My name is|this is|This is|name:|Name:)\s+"
+    rf"({_CAP_WORD}(?:\s+{_CAP_WORD}){{0,2}})"
+)
+
+# Company tokens stop at sentence punctuation so "TechCorp. My email" yields "TechCorp"
+_COMPANY_WORD = r"[A-ZÀ-Þ][\w&'\-]*"
+COMPANY_RE = re.compile(
+    r"\b(?:from|at|with|for|of|company:|Company:)\s+"
+    rf"({_COMPANY_WORD}(?:\s+{_COMPANY_WORD}){{0,3}})"
+)
+
+# A company cue the capitalized pattern could not read (e.g. "from abc")
+COMPANY_CUE_RE = re.compile(r"\b(?:from|company:|work(?:ing)? (?:at|for))\s+\S", re.IGNORECASE)
+
+# Free mail providers say nothing about the sender's company
+FREE_EMAIL_DOMAINS = {
+    "gmail", "googlemail", "yahoo", "hotmail", "outlook", "live", "msn",
+    "icloud", "me", "aol", "proton", "protonmail", "gmx", "mail", "yandex", "example"
+}
+
+# Words the name pattern can pick up that are not names
+_NOT_NAMES = {"Here", "Interested", "Looking", "Writing", "Reaching", "Contact", "The"}
+
+def _domain_label(email: str) -> Optional[str]:
+    """Get the organization label of an email domain (acme for jane@mail.acme.co.uk)"""
+    labels = email.rsplit("@", 1)[-1].lower().split(".")
+    # Drop the public suffix: one label, or two for ccTLD second levels like co.uk
+    if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in {"co", "com", "org", "net", "ac", "gov"}:
+        labels = labels[:-2]
+    else:
+        labels = labels[:-1]
+    return labels[-1] if labels else None
+
+def infer_company_from_email(email: str) -> Optional[str]:
+    """
+    Infer a company name from an email domain
+
+    Args:
+        email: Email address
+
+    Returns:
+        Company name, or None for free mail providers
+    """
+    label = _domain_label(email)
+    if not label or label in FREE_EMAIL_DOMAINS:
+        return None
+    return label.replace("-", " ").title()
+
+def _squash(value: str) -> str:
+    return re.sub(r"[\W_]", "", value.lower())
+
+def _name_in_email(name: str, email: str) -> bool:
+    """Check whether any part of a name appears in an email's local part"""
+    local = _squash(email.rsplit("@", 1)[0])
+    return any(len(part) > 1 and part in local for part in map(_squash, name.split()))
+
+class FastPathExtractor:
+    """Rule-based lead extraction for messages that don't need the LLM"""
+
+    def __init__(self):
+        self.attempts = 0
+        self.hits = 0
+        self.total_seconds = 0.0
+
+    def get_settings(self) -> Dict[str, Any]:
+        """Get fast-path settings merged over the defaults"""
+        extraction_settings = config_manager.get_config("extraction_settings")
+        return {**DEFAULT_FAST_PATH_SETTINGS, **extraction_settings.get("fast_path", {})}
+
+    def extract(self, message: str) -> Tuple[Dict[str, str], float]:
+        """
+        Extract lead fields with regular expressions
+
+        Args:
+            message: Sanitized message
+
+        Returns:
+            Tuple of (lead data, confidence between 0 and 1)
+        """
+        lead = {"name": "", "email": "", "company": ""}
+        confidence = 0.0
+
+        emails = {match.lower() for match in EMAIL_RE.findall(message)}
+        if len(emails) == 1:
+            lead["email"] = EMAIL_RE.search(message).group()
+            confidence += 0.4
+
+        company_match = COMPANY_RE.search(message)
+        name_match = NAME_RE.search(message)
+        if name_match and name_match.group(1).split()[0] not in _NOT_NAMES:
+            lead["name"] = name_match.group(1)
+            # "This is Urgent!" reads like a name too; only trust one the email address backs up
+            if _name_in_email(lead["name"], lead["email"]):
+                confidence += 0.3
+            else:
+                confidence += 0.15
+
+        inferred_company = infer_company_from_email(lead["email"]) if lead["email"] else None
+        if company_match:
+            lead["company"] = company_match.group(1)
+            # A stated company that disagrees with a corporate email domain is less certain
+            stated, inferred = _squash(lead["company"]), _squash(inferred_company or "")
+            if inferred and inferred not in stated:
+                confidence += 0.15
+            else:
+                confidence += 0.3
+        elif inferred_company:
+            lead["company"] = inferred_company
+            # The domain is a weak guess if the message names some other company
+            confidence += 0.1 if COMPANY_CUE_RE.search(message) else 0.2
+
+        return lead, round(confidence, 2)
+
+    def try_extract(self, message: str) -> Optional[Dict[str, str]]:
+        """
+        Run the fast path and return a result only if it is confident enough
+
+        Args:
+            message: Sanitized message
+
+        Returns:
+            Lead data, or None when the LLM should be used
+        """
+        settings = self.get_settings()
+        if not settings["enabled"]:
+            return None
+
+        start = time.perf_counter()
+        lead, confidence = self.extract(message)
+        self.total_seconds += time.perf_counter() - start
+        self.attempts += 1
+
+        if confidence >= settings["confidence_threshold"]:
+            self.hits += 1
+            logger.info(f"Fast-path extraction hit (confidence {confidence})")
+            return lead
+        return None
+
+    def get_stats(self, avg_llm_seconds: float = 0.0) -> Dict[str, Any]:
+        """
+        Get fast-path counters
+
+        Args:
+            avg_llm_seconds: Observed average LLM call latency, used to estimate time saved
+        """
+        avg_fast_seconds = self.total_seconds / self.attempts if self.attempts else 0.0
+        return {
+            "enabled": self.get_settings()["enabled"],
+            "attempts": self.attempts,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.attempts * 100, 2) if self.attempts else 0,
+            "avg_latency_ms": round(avg_fast_seconds * 1000, 3),
+            "estimated_latency_saved_ms": round(self.hits * max(avg_llm_seconds - avg_fast_seconds, 0) * 1000, 2)
+        }
+
+    def reset_stats(self) -> None:
+        """Reset counters"""
+        self.attempts = 0
+        self.hits = 0
+        self.total_seconds = 0.0
+
+# Global fast-path extractor instance
+fast_extractor = FastPathExtractor()
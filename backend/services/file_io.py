@@ -0,0 +1,59 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single-worker only
+    fcntl = None
+
+@contextmanager
+def file_lock(path: Path):
+    """
+    Hold an exclusive advisory lock on path across processes and threads
+
+    Every acquisition opens its own descriptor, so threads of one process
+    exclude each other as well as other uvicorn workers.
+
+    Args:
+        path: Lock file (created if missing; its contents are unused)
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        # Closing the descriptor releases the lock
+        os.close(fd)
+
+def atomic_write_text(path: Path, text: str, fsync: bool = False) -> None:
+    """
+    Replace a whole file so readers see either the old or the new contents
+
+    The temporary file has a unique name, so concurrent writers (threads or
+    worker processes) never write into each other's file; the last replace wins.
+
+    Args:
+        path: File to write
+        text: New contents (UTF-8)
+        fsync: Flush the data to disk before the replace
+    """
+    path = Path(path)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+from services.config_manager import config_manager
+from services.single_flight import SingleFlight
+
+DEFAULT_IDEMPOTENCY_SETTINGS = {
+    "enabled": True,
+    # Responses are replayed for this long after the first delivery, for up to max_keys keys
+    "ttl_seconds": 86400,
+    "max_keys": 10000
+}
+
+def request_fingerprint(data: Any) -> str:
+    """Hash of a request body, to tell a retry from a different request reusing its key"""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+class IdempotencyKeyReused(Exception):
+    """Raised when a key comes back with a different request than the one it was first used for"""
+
+class _StoredResponse(NamedTuple):
+    expires: float
+    fingerprint: str
+    response: Any
+
+class IdempotencyStore:
+    """
+    Bounded, expiring store of responses by idempotency key
+
+    The first request with a key runs; its response is kept for ttl_seconds
+    and returned to every retry with the same key instead of running again.
+    Retries that arrive while the first request is still running wait for
+    it and get its response. Responses the caller doesn't want kept (such
+    as failures worth retrying) are shared with the waiting retries but
+    not stored. Keys live in memory: each worker process has its own.
+    """
+
+    def __init__(self):
+        self._responses: "OrderedDict[str, _StoredResponse]" = OrderedDict()
+        self._running: Dict[str, str] = {}
+        self._single_flight = SingleFlight("request for the same idempotency key")
+        self.executions = 0
+        self.replays = 0
+        self.joined = 0
+        self.conflicts = 0
+
+    def get_settings(self) -> Dict[str, Any]:
+        """Get idempotency settings merged over the defaults"""
+        webhook_settings = config_manager.get_config("webhook_settings")
+        return {**DEFAULT_IDEMPOTENCY_SETTINGS, **webhook_settings.get("idempotency", {})}
+
+    def is_enabled(self) -> bool:
+        """Check whether idempotency keys are honoured"""
+        return bool(self.get_settings()["enabled"])
+
+    def _prune(self, settings: Dict[str, Any]) -> None:
+        now = time.time()
+        # Keys are stored in order and share one TTL, so expired ones are at the front
+        while self._responses:
+            stored = next(iter(self._responses.values()))
+            if stored.expires > now and len(self._responses) <= settings["max_keys"]:
+                break
+            self._responses.popitem(last=False)
+
+    async def run(self, key: str, fingerprint: str, fn: Callable[[], Awaitable[Any]],
+                  cacheable: Optional[Callable[[Any], bool]] = None) -> Tuple[Any, bool]:
+        """
+        Run fn once per key and replay its response to retries
+
+        Args:
+            key: Idempotency key
+            fingerprint: request_fingerprint of the request
+            fn: Zero-argument coroutine function producing the response
+            cacheable: Whether a response may be kept; all are kept if None
+
+        Returns:
+            (response, True if it came from an earlier or concurrent request)
+
+        Raises:
+            IdempotencyKeyReused: If the key was used for a different request
+        """
+        settings = self.get_settings()
+        self._prune(settings)
+        stored = self._responses.get(key)
+        if stored is not None and stored.expires <= time.time():
+            # Behind unexpired keys after a TTL change, so not pruned yet
+            del self._responses[key]
+            stored = None
+        running = self._running.get(key)
+        if (stored.fingerprint if stored else running) not in (None, fingerprint):
+            self.conflicts += 1
+            raise IdempotencyKeyReused("Idempotency key was already used for a different request")
+        if stored is not None:
+            self.replays += 1
+            return stored.response, True
+
+        async def execute() -> Any:
+            self.executions += 1
+            try:
+                response = await fn()
+            finally:
+                self._running.pop(key, None)
+            if cacheable is None or cacheable(response):
+                self._responses[key] = _StoredResponse(time.time() + settings["ttl_seconds"], fingerprint, response)
+                self._prune(settings)
+            return response
+
+        if running is not None:
+            self.joined += 1
+        else:
+            self._running[key] = fingerprint
+        return await self._single_flight.do(key, execute), running is not None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get stored keys and replay counters"""
+        return {
+            "stored_keys": len(self._responses),
+            "in_flight": len(self._running),
+            "executions": self.executions,
+            "replays": self.replays,
+            "joined": self.joined,
+            "conflicts": self.conflicts
+        }
+
+# Global webhook idempotency store instance
+webhook_idempotency = IdempotencyStore()
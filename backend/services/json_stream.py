@@ -0,0 +1,48 @@
+from typing import List
+
+class JSONObjectStreamParser:
+    """Finds complete top-level JSON objects in text that arrives in chunks"""
+
+    def __init__(self):
+        self._current: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text: str) -> List[str]:
+        """
+        Consume the next chunk of text
+
+        Args:
+            text: Next piece of the model output
+
+        Returns:
+            Source text of every top-level object closed within this chunk
+        """
+        completed = []
+        for char in text:
+            if self._depth == 0:
+                # Prose between objects is skipped until the next opening brace
+                if char == "{":
+                    self._current = [char]
+                    self._depth = 1
+                continue
+
+            self._current.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.append("".join(self._current))
+                    self._current = []
+        return completed
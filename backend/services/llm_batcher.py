@@ -0,0 +1,147 @@
+import asyncio
+import time
+import logging
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+from services.config_manager import config_manager
+from services.metrics import Histogram, LATENCY_BUCKETS_MS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCHING_SETTINGS = {
+    "enabled": False,
+    "max_batch_size": 8,
+    "max_wait_ms": 20
+}
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+SendBatch = Callable[[List[str], Dict[str, Any]], Awaitable[List[Optional[Dict[str, str]]]]]
+SendSingle = Callable[[str, Dict[str, Any]], Awaitable[Optional[Dict[str, str]]]]
+
+class _PendingExtraction:
+    """A message waiting to be sent as part of a batch"""
+
+    def __init__(self, message: str, llm_settings: Dict[str, Any], future: asyncio.Future):
+        self.message = message
+        self.llm_settings = llm_settings
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+class ExtractionBatcher:
+    """Collects concurrent extraction requests and sends them as one LLM prompt"""
+
+    def __init__(self, send_batch: SendBatch, send_single: SendSingle):
+        """
+        Args:
+            send_batch: Sends several messages in one prompt, returning one result
+                (or None when missing/malformed) per message, in order
+            send_single: Sends one message on its own, used for failed batch items
+        """
+        self._send_batch = send_batch
+        self._send_single = send_single
+        self._pending: List[_PendingExtraction] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+        self.batches_sent = 0
+        self.items_batched = 0
+        self.items_retried = 0
+        self.batch_size_histogram = Histogram(BATCH_SIZE_BUCKETS)
+        self.wait_ms_histogram = Histogram(LATENCY_BUCKETS_MS)
+
+    def get_settings(self) -> Dict[str, Any]:
+        """Get batching settings merged over the defaults"""
+        llm_settings = config_manager.get_config("llm_settings")
+        return {**DEFAULT_BATCHING_SETTINGS, **llm_settings.get("batching", {})}
+
+    def is_enabled(self) -> bool:
+        """Check whether batching is switched on"""
+        return bool(self.get_settings()["enabled"])
+
+    async def submit(self, message: str, llm_settings: Dict[str, Any]) -> Optional[Dict[str, str]]:
+        """
+        Queue a message for the next batch and wait for its result
+
+        Args:
+            message: Sanitized message
+            llm_settings: Active llm_settings section
+
+        Returns:
+            Extracted lead data, or None if extraction failed
+        """
+        settings = self.get_settings()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(_PendingExtraction(message, llm_settings, future))
+
+        if len(self._pending) >= settings["max_batch_size"]:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(settings["max_wait_ms"] / 1000, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        """Send everything pending as one batch"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        items, self._pending = self._pending, []
+        if not items:
+            return
+
+        task = asyncio.ensure_future(self._run_batch(items))
+        # Keep a reference so the task isn't garbage collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, items: List[_PendingExtraction]) -> None:
+        now = time.monotonic()
+        for item in items:
+            self.wait_ms_histogram.observe((now - item.enqueued_at) * 1000)
+        self.batch_size_histogram.observe(len(items))
+        self.batches_sent += 1
+        self.items_batched += len(items)
+
+        try:
+            if len(items) == 1:
+                results = [await self._send_single(items[0].message, items[0].llm_settings)]
+            else:
+                results = await self._send_batch([item.message for item in items], items[0].llm_settings)
+        except Exception as e:
+            logger.error(f"Batch extraction failed: {e}")
+            results = [None] * len(items)
+
+        # Only the items the batch couldn't answer pay for an individual request
+        failed = [index for index, result in enumerate(results) if result is None]
+        if failed and len(items) > 1:
+            self.items_retried += len(failed)
+            logger.warning(f"Retrying {len(failed)} of {len(items)} batch items individually")
+            retried = await asyncio.gather(
+                *(self._send_single(items[index].message, items[index].llm_settings) for index in failed),
+                return_exceptions=True
+            )
+            for index, result in zip(failed, retried):
+                results[index] = None if isinstance(result, Exception) else result
+
+        for item, result in zip(items, results):
+            if not item.future.done():
+                item.future.set_result(result)
+
+    async def shutdown(self) -> None:
+        """Send anything still pending and wait for in-flight batches"""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batching counters and histograms"""
+        return {
+            "enabled": self.is_enabled(),
+            "batches_sent": self.batches_sent,
+            "items_batched": self.items_batched,
+            "items_retried_individually": self.items_retried,
+            "pending": len(self._pending),
+            "batch_size": self.batch_size_histogram.snapshot(),
+            "wait_ms": self.wait_ms_histogram.snapshot()
+        }
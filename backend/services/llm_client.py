@@ -0,0 +1,98 @@
+import httpx
+import logging
+from typing import Dict, Any, Optional
+from services.config_manager import config_manager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+
+DEFAULT_POOL_SETTINGS = {
+    "max_connections": 100,
+    "max_keepalive_connections": 20,
+    "keepalive_expiry": 30.0,
+    "http2": False
+}
+
+DEFAULT_TIMEOUTS = {
+    "connect": 5.0,
+    "read": 30.0,
+    "write": 10.0,
+    "pool": 5.0
+}
+
+class LLMClientManager:
+    """Owns the shared, pooled HTTP client used for LLM provider calls"""
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def get_pool_settings(self) -> Dict[str, Any]:
+        """Get connection pool settings merged over the defaults"""
+        llm_settings = config_manager.get_config("llm_settings")
+        return {**DEFAULT_POOL_SETTINGS, **llm_settings.get("pool", {})}
+
+    def get_timeout_settings(self) -> Dict[str, float]:
+        """Get per-phase timeouts merged over the defaults"""
+        llm_settings = config_manager.get_config("llm_settings")
+        return {**DEFAULT_TIMEOUTS, **llm_settings.get("timeouts", {})}
+
+    def build_client(self) -> httpx.AsyncClient:
+        """
+        Build a pooled async client from the current llm_settings
+
+        Returns:
+            Configured httpx.AsyncClient
+        """
+        pool = self.get_pool_settings()
+        timeouts = self.get_timeout_settings()
+
+        http2 = bool(pool["http2"])
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("HTTP/2 requested but the 'h2' package is not installed, using HTTP/1.1")
+                http2 = False
+
+        limits = httpx.Limits(
+            max_connections=pool["max_connections"],
+            max_keepalive_connections=pool["max_keepalive_connections"],
+            keepalive_expiry=pool["keepalive_expiry"]
+        )
+        timeout = httpx.Timeout(
+            connect=timeouts["connect"],
+            read=timeouts["read"],
+            write=timeouts["write"],
+            pool=timeouts["pool"]
+        )
+
+        return httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
+
+    async def startup(self) -> None:
+        """Create the shared client (called from the app lifespan)"""
+        if self._client is None:
+            self._client = self.build_client()
+            logger.info(f"LLM client pool started: {self.get_pool_settings()}")
+
+    async def shutdown(self) -> None:
+        """Close the shared client and release pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("LLM client pool closed")
+
+    def get_client(self) -> httpx.AsyncClient:
+        """
+        Get the shared client, creating it lazily when used outside the app lifespan
+
+        Returns:
+            The shared httpx.AsyncClient
+        """
+        if self._client is None or self._client.is_closed:
+            logger.info("Creating LLM client outside of app lifespan")
+            self._client = self.build_client()
+        return self._client
+
+# Global LLM client manager instance
+llm_client = LLMClientManager()
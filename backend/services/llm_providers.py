@@ -0,0 +1,216 @@
+import asyncio
+import os
+import time
+import logging
+from collections import deque
+from typing import Dict, Any, List, Optional, Callable, Awaitable, TypeVar
+from services.config_manager import config_manager
+from services.llm_client import DEFAULT_API_URL
+from services.rate_limiter import AdaptiveRateLimiter
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_PROVIDERS = [
+    {"name": "groq", "api_key_env": "GROQ_API_KEY"}
+]
+
+DEFAULT_HEDGING_SETTINGS = {
+    "enabled": False,
+    # Used until a provider has enough samples for a meaningful p95
+    "default_delay_ms": 2000,
+    "min_delay_ms": 50,
+    "min_samples": 20
+}
+
+LATENCY_WINDOW = 200
+
+class LLMProvider:
+    """One OpenAI-compatible chat-completions endpoint and its observed latency"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.api_url = DEFAULT_API_URL
+        self.model: Optional[str] = None
+        self.api_key_env = "GROQ_API_KEY"
+        self.rate_limiter = AdaptiveRateLimiter()
+        self._latencies: deque = deque(maxlen=LATENCY_WINDOW)
+        self.calls = 0
+        self.failures = 0
+
+    def configure(self, entry: Dict[str, Any], llm_settings: Dict[str, Any]) -> None:
+        """Apply a providers[] entry, inheriting api_url/model from llm_settings"""
+        self.api_url = entry.get("api_url") or llm_settings.get("api_url", DEFAULT_API_URL)
+        self.model = entry.get("model") or llm_settings.get("model")
+        self.api_key_env = entry.get("api_key_env", "GROQ_API_KEY")
+
+    @property
+    def api_key(self) -> Optional[str]:
+        return os.getenv(self.api_key_env)
+
+    @property
+    def sample_count(self) -> int:
+        return len(self._latencies)
+
+    def record_success(self, seconds: float) -> None:
+        self.calls += 1
+        self._latencies.append(seconds)
+
+    def record_failure(self) -> None:
+        self.calls += 1
+        self.failures += 1
+
+    def latency_quantile(self, q: float) -> Optional[float]:
+        """Observed latency quantile in seconds, or None without samples"""
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def get_stats(self) -> Dict[str, Any]:
+        p50, p95 = self.latency_quantile(0.5), self.latency_quantile(0.95)
+        return {
+            "name": self.name,
+            "api_url": self.api_url,
+            "model": self.model,
+            "calls": self.calls,
+            "failures": self.failures,
+            "p50_ms": round(p50 * 1000, 2) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 2) if p95 is not None else None,
+            "rate_limit": self.rate_limiter.get_stats()
+        }
+
+class ProviderRouter:
+    """Routes LLM calls over an ordered provider list with failover and hedging"""
+
+    def __init__(self):
+        self._providers: Dict[str, LLMProvider] = {}
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    def get_hedging_settings(self) -> Dict[str, Any]:
+        """Get hedging settings merged over the defaults"""
+        llm_settings = config_manager.get_config("llm_settings")
+        return {**DEFAULT_HEDGING_SETTINGS, **llm_settings.get("hedging", {})}
+
+    def get_providers(self) -> List[LLMProvider]:
+        """Get the configured providers in priority order"""
+        llm_settings = config_manager.get_config("llm_settings")
+        providers = []
+        for entry in llm_settings.get("providers") or DEFAULT_PROVIDERS:
+            name = entry.get("name", "groq")
+            provider = self._providers.get(name)
+            if provider is None:
+                provider = self._providers[name] = LLMProvider(name)
+            provider.configure(entry, llm_settings)
+            providers.append(provider)
+        return providers
+
+    def hedge_delay(self, provider: LLMProvider) -> float:
+        """Seconds to wait on a provider before hedging: its observed p95"""
+        settings = self.get_hedging_settings()
+        if provider.sample_count >= settings["min_samples"]:
+            delay_ms = provider.latency_quantile(0.95) * 1000
+        else:
+            delay_ms = settings["default_delay_ms"]
+        return max(delay_ms, settings["min_delay_ms"]) / 1000
+
+    async def _timed(self, provider: LLMProvider, send: Callable[[LLMProvider], Awaitable[T]]) -> T:
+        start = time.perf_counter()
+        try:
+            result = await send(provider)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            provider.record_failure()
+            raise
+        provider.record_success(time.perf_counter() - start)
+        return result
+
+    def _start(self, provider: LLMProvider, send: Callable[[LLMProvider], Awaitable[T]]) -> asyncio.Task:
+        task = asyncio.ensure_future(self._timed(provider, send))
+        # Losers may fail after we stop watching; don't warn about unretrieved errors
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        return task
+
+    async def execute(self, send: Callable[[LLMProvider], Awaitable[T]]) -> T:
+        """
+        Run a call against the providers
+
+        The primary gets the call first. With hedging enabled, a second request
+        goes to the next provider once the primary exceeds its observed p95, and
+        whichever answers first wins while the other is cancelled. A provider
+        error fails over to the next provider in order.
+
+        Args:
+            send: Performs the call against the given provider
+
+        Returns:
+            The first successful result
+
+        Raises:
+            Exception: The last provider error if every provider failed
+        """
+        providers = self.get_providers()
+        primary = providers[0]
+        queue = providers[1:]
+        hedging = self.get_hedging_settings()["enabled"]
+        hedge_at = time.monotonic() + self.hedge_delay(primary) if hedging else None
+
+        pending: Dict[asyncio.Task, LLMProvider] = {self._start(primary, send): primary}
+        hedged_to: Optional[LLMProvider] = None
+        hedge_task: Optional[asyncio.Task] = None
+        last_error: Optional[BaseException] = None
+
+        try:
+            while pending:
+                timeout = None
+                if hedge_at is not None and hedged_to is None:
+                    timeout = max(hedge_at - time.monotonic(), 0)
+
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Primary is slower than usual: race a second request against it
+                    hedged_to = queue.pop(0) if queue else primary
+                    self.hedges += 1
+                    logger.info(f"Hedging LLM call to provider {hedged_to.name}")
+                    hedge_task = self._start(hedged_to, send)
+                    pending[hedge_task] = hedged_to
+                    continue
+
+                for task in done:
+                    provider = pending.pop(task)
+                    if task.exception() is None:
+                        if task is hedge_task:
+                            self.hedge_wins += 1
+                        return task.result()
+                    last_error = task.exception()
+                    logger.warning(f"LLM provider {provider.name} failed: {last_error}")
+
+                if not pending and queue:
+                    provider = queue.pop(0)
+                    self.failovers += 1
+                    logger.warning(f"Failing over to LLM provider {provider.name}")
+                    pending[self._start(provider, send)] = provider
+                    # Failover requests are not hedged again
+                    hedge_at = None
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise last_error
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-provider and hedging counters"""
+        return {
+            "hedging_enabled": self.get_hedging_settings()["enabled"],
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "providers": [provider.get_stats() for provider in self.get_providers()]
+        }
+
+# Global provider router instance
+provider_router = ProviderRouter()
@@ -0,0 +1,270 @@
+import asyncio
+import json
+import logging
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+from services.config_manager import config_manager
+from services.webhook_log import LogRecord, WebhookLogBuffer, webhook_log
+from database import webhook_log_store
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STREAM_SETTINGS = {
+    # How often new log entries are looked for and pushed
+    "poll_interval_ms": 250,
+    "batch_size": 1000,
+    # Events a subscriber may fall behind by before it is disconnected
+    "max_queue": 1000,
+    "max_subscribers": 100,
+    # Comment lines on idle streams keep proxies from closing them
+    "heartbeat_seconds": 15.0,
+    # Entries replayed to a reconnecting subscriber (Last-Event-ID)
+    "max_replay": 1000
+}
+
+def encode_event(event: str, data: Any, event_id: Optional[int] = None) -> bytes:
+    """Encode one Server-Sent Event"""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode()
+
+def encode_log(record: LogRecord) -> bytes:
+    """Encode a log entry as a `log` event in the WebhookLog shape"""
+    log = WebhookLogBuffer.to_dict(record)
+    log["timestamp"] = log["timestamp"].isoformat()
+    return encode_event("log", log, record.seq)
+
+class Subscriber:
+    """One open stream: a bounded queue of encoded events"""
+
+    def __init__(self, user_id: Optional[str], max_queue: int):
+        # None sees every user's entries (admins)
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.closed = False
+        # Live events held back while a reconnect's replay is read, so they follow it
+        self.held: Optional[List[bytes]] = None
+
+    def can_see(self, user_id: Optional[str]) -> bool:
+        return self.user_id is None or self.user_id == user_id
+
+    def send(self, event: Optional[bytes]) -> bool:
+        """Queue an event (None ends the stream); False if the subscriber fell too far behind"""
+        if self.held is not None and event is not None:
+            if len(self.held) >= self.queue.maxsize:
+                return False
+            self.held.append(event)
+            return True
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+class LogBroadcaster:
+    """
+    Pushes new webhook log entries and stats deltas to streaming subscribers
+
+    A single task per process follows the log store (or the in-memory ring
+    when the store is disabled) and fans out what it finds, so event ids are
+    the ids /webhook/logs returns and entries logged by other worker
+    processes are streamed too. Each entry is encoded at most once, however
+    many subscribers see it; stats deltas are encoded once for admins and
+    once per subscribed user. Subscribers that fall max_queue events behind
+    are disconnected and can resume with Last-Event-ID.
+    """
+
+    def __init__(self, buffer: WebhookLogBuffer):
+        self.buffer = buffer
+        self.subscribers: Set[Subscriber] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._from_store: Optional[bool] = None
+        self.last_id = 0
+        self.events_encoded = 0
+        self.events_sent = 0
+        self.disconnected_slow = 0
+
+    def get_settings(self) -> Dict[str, Any]:
+        """Get stream settings merged over the defaults"""
+        webhook_settings = config_manager.get_config("webhook_settings")
+        return {**DEFAULT_STREAM_SETTINGS, **webhook_settings.get("stream", {})}
+
+    async def _head(self, from_store: bool) -> int:
+        if from_store:
+            return await asyncio.to_thread(webhook_log_store.get_store().last_id)
+        return self.buffer.next_seq - 1
+
+    async def _records_after(self, from_store: bool, after: int, limit: int) -> List[LogRecord]:
+        if from_store:
+            return await asyncio.to_thread(webhook_log_store.get_store().records_after, after, limit)
+        return self.buffer.records_after(after, limit)
+
+    async def subscribe(self, user_id: Optional[str], last_event_id: Optional[int] = None) -> Subscriber:
+        """
+        Open a stream
+
+        Args:
+            user_id: Only this user's entries and stats; None for everything
+            last_event_id: Replay the entries after this id first (up to max_replay)
+
+        Returns:
+            The subscriber, to read with stream()
+
+        Raises:
+            OverflowError: If max_subscribers streams are already open
+        """
+        settings = self.get_settings()
+        if len(self.subscribers) >= settings["max_subscribers"]:
+            raise OverflowError(f"Too many log streams ({len(self.subscribers)} open)")
+        subscriber = Subscriber(user_id, settings["max_queue"])
+        if self._task is None or self._task.done():
+            self._from_store = webhook_log_store.is_enabled()
+            self.last_id = await self._head(self._from_store)
+            self._task = asyncio.ensure_future(self._run())
+        # Added before the replay is read, so nothing published meanwhile is missed;
+        # the live stream continues after replay_to and the replay stops there
+        replay_to = self.last_id
+        replaying = last_event_id is not None and last_event_id < replay_to
+        if replaying:
+            subscriber.held = []
+        self.subscribers.add(subscriber)
+        if replaying:
+            try:
+                replay = await self._records_after(
+                    self._from_store, max(last_event_id, replay_to - settings["max_replay"]), settings["max_replay"]
+                )
+            except Exception:
+                self.unsubscribe(subscriber)
+                raise
+            held, subscriber.held = subscriber.held, None
+            events = [encode_log(record) for record in replay
+                      if record.seq <= replay_to and subscriber.can_see(record.user_id)]
+            for event in events + held:
+                if subscriber.closed:
+                    break
+                if not subscriber.send(event):
+                    self._disconnect(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        """Close a stream; the tail task stops with the last one"""
+        subscriber.closed = True
+        self.subscribers.discard(subscriber)
+        if not self.subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def stream(self, subscriber: Subscriber) -> AsyncIterator[bytes]:
+        """Yield a subscriber's events as SSE bytes until it is closed"""
+        heartbeat = self.get_settings()["heartbeat_seconds"]
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    event = b": keep-alive\n\n"
+                if event is None:
+                    return
+                yield event
+        finally:
+            self.unsubscribe(subscriber)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.get_settings()["poll_interval_ms"] / 1000)
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.error(f"Streaming webhook logs failed: {e}")
+
+    async def poll(self) -> int:
+        """
+        Publish the entries logged since the last poll
+
+        Returns:
+            Number of entries found
+        """
+        settings = self.get_settings()
+        from_store = webhook_log_store.is_enabled()
+        if from_store != self._from_store:
+            # Store switched on or off: the other source has its own ids
+            self._from_store = from_store
+            self.last_id = await self._head(from_store)
+            return 0
+        records = await self._records_after(from_store, self.last_id, settings["batch_size"])
+        if not records:
+            return 0
+        self.last_id = records[-1].seq
+
+        totals: Counter = Counter()
+        per_user: Dict[Optional[str], Counter] = {}
+        for record in records:
+            totals[record.save_status] += 1
+            per_user.setdefault(record.user_id, Counter())[record.save_status] += 1
+            event = None
+            for subscriber in list(self.subscribers):
+                if subscriber.can_see(record.user_id):
+                    if event is None:
+                        event = encode_log(record)
+                        self.events_encoded += 1
+                    self._send(subscriber, event)
+
+        # Stats deltas: one encoding for admins, one per subscribed user
+        deltas: Dict[Optional[str], Optional[bytes]] = {}
+        for subscriber in list(self.subscribers):
+            if subscriber.user_id not in deltas:
+                counts = totals if subscriber.user_id is None else per_user.get(subscriber.user_id)
+                deltas[subscriber.user_id] = encode_event("stats", {
+                    "requests": sum(counts.values()),
+                    "save_status": dict(counts)
+                }) if counts else None
+                if counts:
+                    self.events_encoded += 1
+            if deltas[subscriber.user_id] is not None:
+                self._send(subscriber, deltas[subscriber.user_id])
+        return len(records)
+
+    def _send(self, subscriber: Subscriber, event: bytes) -> None:
+        if subscriber.closed:
+            return
+        if subscriber.send(event):
+            self.events_sent += 1
+            return
+        self._disconnect(subscriber)
+
+    def _disconnect(self, subscriber: Subscriber) -> None:
+        # Too far behind: drop what it has queued and end its stream
+        logger.warning("Disconnecting a webhook log stream that fell behind")
+        self.disconnected_slow += 1
+        subscriber.closed = True
+        self.subscribers.discard(subscriber)
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.send(None)
+
+    async def shutdown(self) -> None:
+        """End every stream and stop the tail task (app shutdown)"""
+        for subscriber in list(self.subscribers):
+            subscriber.closed = True
+            while not subscriber.queue.empty():
+                subscriber.queue.get_nowait()
+            subscriber.send(None)
+        self.subscribers.clear()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get subscriber and event counts"""
+        return {
+            "subscribers": len(self.subscribers),
+            "source": "store" if self._from_store else "memory",
+            "last_id": self.last_id,
+            "events_encoded": self.events_encoded,
+            "events_sent": self.events_sent,
+            "disconnected_slow": self.disconnected_slow
+        }
+
+# Global log broadcaster instance
+log_broadcaster = LogBroadcaster(webhook_log)
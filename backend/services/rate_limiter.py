@@ -0,0 +1,282 @@
+import asyncio
+import re
+import time
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, Deque
+import httpx
+from services.config_manager import config_manager
+from services.metrics import Histogram, LATENCY_BUCKETS_MS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RATE_LIMIT_SETTINGS = {
+    "enabled": True,
+    "initial_concurrency": 8,
+    "min_concurrency": 1,
+    "max_concurrency": 64,
+    "backoff_ratio": 0.5,
+    # None means "unknown until the provider's rate-limit headers tell us"
+    "requests_per_minute": None,
+    "tokens_per_minute": None,
+    "max_retries": 3
+}
+
+# Pause applied after a 429 that carries no retry-after header
+DEFAULT_RETRY_AFTER_SECONDS = 1.0
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a rate-limit reset/retry header into seconds
+
+    Args:
+        value: Header value such as "7.66s", "1m26.4s", "250ms" or "3"
+
+    Returns:
+        Seconds, or None if the value can't be parsed
+    """
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    if not isinstance(value, str):
+        return None
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+def _header_number(headers, name: str) -> Optional[float]:
+    try:
+        value = headers.get(name)
+        return float(value) if value is not None else None
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+class TokenBucket:
+    """Per-minute budget that refills continuously; an unset limit never blocks"""
+
+    def __init__(self, per_minute: Optional[float] = None):
+        self.capacity = per_minute
+        self.tokens = per_minute or 0.0
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.capacity:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.capacity / 60)
+        self._updated = now
+
+    def set_limit(self, per_minute: Optional[float]) -> None:
+        """Change the per-minute capacity (e.g. from a provider header)"""
+        if per_minute == self.capacity:
+            return
+        self._refill()
+        if self.capacity is None and per_minute:
+            self.tokens = per_minute
+        self.capacity = per_minute
+        if per_minute:
+            self.tokens = min(self.tokens, per_minute)
+
+    def sync_remaining(self, remaining: float) -> None:
+        """Trust the provider's view of what's left in the current window"""
+        if self.capacity:
+            self._refill()
+            self.tokens = min(self.tokens, remaining)
+
+    def delay_for(self, amount: float) -> float:
+        """Seconds until amount can be taken (0 if available now)"""
+        if not self.capacity:
+            return 0.0
+        self._refill()
+        # Requests larger than the whole bucket wait for a full bucket rather than forever
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) * 60 / self.capacity
+
+    def consume(self, amount: float) -> None:
+        """Take amount from the bucket"""
+        if self.capacity:
+            self._refill()
+            self.tokens -= min(amount, self.capacity)
+
+class RateLimitPermit:
+    """Handed to the caller holding a concurrency slot"""
+
+    def __init__(self, limiter: "AdaptiveRateLimiter"):
+        self._limiter = limiter
+        self.throttled = False
+
+    def record_response(self, response: httpx.Response) -> None:
+        """Feed rate-limit headers and 429s from a provider response back to the limiter"""
+        self._limiter.observe_headers(response.headers)
+        if response.status_code == 429:
+            self.throttled = True
+            self._limiter.on_throttled(parse_duration(response.headers.get("retry-after")))
+
+class AdaptiveRateLimiter:
+    """AIMD concurrency limit plus request/token buckets around LLM provider calls"""
+
+    def __init__(self):
+        settings = self.get_settings()
+        self.limit = float(settings["initial_concurrency"])
+        self.request_bucket = TokenBucket(settings["requests_per_minute"])
+        self.token_bucket = TokenBucket(settings["tokens_per_minute"])
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._paused_until = 0.0
+        self.throttled_responses = 0
+        self.timeouts = 0
+        self.wait_ms_histogram = Histogram(LATENCY_BUCKETS_MS)
+
+    def get_settings(self) -> Dict[str, Any]:
+        """Get rate limit settings merged over the defaults"""
+        llm_settings = config_manager.get_config("llm_settings")
+        return {**DEFAULT_RATE_LIMIT_SETTINGS, **llm_settings.get("rate_limit", {})}
+
+    def _apply_configured_limits(self, settings: Dict[str, Any]) -> None:
+        # Configured budgets win; otherwise keep whatever the headers taught us
+        if settings["requests_per_minute"]:
+            self.request_bucket.set_limit(settings["requests_per_minute"])
+        if settings["tokens_per_minute"]:
+            self.token_bucket.set_limit(settings["tokens_per_minute"])
+
+    async def _wait_for_slot(self, estimated_tokens: float) -> None:
+        settings = self.get_settings()
+        self._apply_configured_limits(settings)
+        loop = asyncio.get_running_loop()
+
+        # FIFO queue for a concurrency slot
+        while self.in_flight >= max(int(self.limit), 1) or self._waiters:
+            waiter = loop.create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # Pass on a wake-up this caller will no longer use
+                self._waiters.remove(waiter)
+                self._wake_waiters()
+                raise
+            self._waiters.remove(waiter)
+            if self.in_flight < max(int(self.limit), 1):
+                break
+        self.in_flight += 1
+
+        # Then for budget in the request and token buckets
+        try:
+            while True:
+                delay = max(
+                    self._paused_until - time.monotonic(),
+                    self.request_bucket.delay_for(1),
+                    self.token_bucket.delay_for(estimated_tokens)
+                )
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+        except BaseException:
+            self._release()
+            raise
+        self.request_bucket.consume(1)
+        self.token_bucket.consume(estimated_tokens)
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        # Already-woken waiters that haven't run yet still count against the free slots
+        free_slots = max(int(self.limit), 1) - self.in_flight
+        for waiter in self._waiters:
+            if free_slots <= 0:
+                break
+            if not waiter.done():
+                waiter.set_result(None)
+            free_slots -= 1
+
+    def _increase(self) -> None:
+        # Additive increase: roughly +1 slot per window of successful calls
+        max_concurrency = self.get_settings()["max_concurrency"]
+        self.limit = min(float(max_concurrency), self.limit + 1 / max(self.limit, 1))
+        self._wake_waiters()
+
+    def _decrease(self) -> None:
+        settings = self.get_settings()
+        new_limit = max(float(settings["min_concurrency"]), self.limit * settings["backoff_ratio"])
+        if int(new_limit) < int(self.limit):
+            logger.warning(f"LLM concurrency limit reduced {self.limit:.1f} -> {new_limit:.1f}")
+        self.limit = new_limit
+
+    def on_throttled(self, retry_after: Optional[float]) -> None:
+        """Back off after a 429 and hold new calls until retry-after passes"""
+        self.throttled_responses += 1
+        self._decrease()
+        pause = retry_after if retry_after is not None else DEFAULT_RETRY_AFTER_SECONDS
+        self._paused_until = max(self._paused_until, time.monotonic() + pause)
+
+    def observe_headers(self, headers) -> None:
+        """Update the request/token buckets from x-ratelimit-* response headers"""
+        settings = self.get_settings()
+        for bucket, kind, configured in (
+            (self.request_bucket, "requests", settings["requests_per_minute"]),
+            (self.token_bucket, "tokens", settings["tokens_per_minute"])
+        ):
+            limit = _header_number(headers, f"x-ratelimit-limit-{kind}")
+            remaining = _header_number(headers, f"x-ratelimit-remaining-{kind}")
+            if limit and not configured:
+                bucket.set_limit(limit)
+            if remaining is not None:
+                bucket.sync_remaining(remaining)
+
+    @asynccontextmanager
+    async def acquire(self, estimated_tokens: float = 0):
+        """
+        Wait (queued, never failing) for a concurrency slot and bucket budget
+
+        Args:
+            estimated_tokens: Prompt plus completion tokens the call may use
+
+        Yields:
+            RateLimitPermit to report the provider's response through
+        """
+        if not self.get_settings()["enabled"]:
+            yield RateLimitPermit(self)
+            return
+
+        start = time.monotonic()
+        await self._wait_for_slot(estimated_tokens)
+        self.wait_ms_histogram.observe((time.monotonic() - start) * 1000)
+
+        permit = RateLimitPermit(self)
+        try:
+            yield permit
+        except httpx.TimeoutException:
+            self.timeouts += 1
+            self._decrease()
+            raise
+        else:
+            if not permit.throttled:
+                self._increase()
+        finally:
+            self._release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get limiter state and wait-time distribution"""
+        return {
+            "enabled": self.get_settings()["enabled"],
+            "concurrency_limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+            "throttled_responses": self.throttled_responses,
+            "timeouts": self.timeouts,
+            "paused_for_ms": round(max(self._paused_until - time.monotonic(), 0) * 1000, 1),
+            "requests_per_minute": self.request_bucket.capacity,
+            "tokens_per_minute": self.token_bucket.capacity,
+            "wait_ms": self.wait_ms_histogram.snapshot()
+        }
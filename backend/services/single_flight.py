@@ -0,0 +1,55 @@
+import asyncio
+import logging
+from typing import Dict, Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """Shares one in-flight call between concurrent callers with the same key"""
+
+    def __init__(self, description: str = "extraction for identical message"):
+        """
+        Args:
+            description: What is being shared, for the log line when a caller joins
+        """
+        self.description = description
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn for key, or join the call already running for it
+
+        Args:
+            key: Identity of the call
+            fn: Zero-argument coroutine function performing the work
+
+        Returns:
+            The shared result of fn
+        """
+        task = self._inflight.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            # Run as its own task so a cancelled caller doesn't cancel the others
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self.executions += 1
+
+            def _forget(done_task: asyncio.Task) -> None:
+                if self._inflight.get(key) is done_task:
+                    del self._inflight[key]
+
+            task.add_done_callback(_forget)
+        else:
+            self.coalesced += 1
+            logger.info(f"Joined in-flight {self.description}")
+
+        return await asyncio.shield(task)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing counters"""
+        return {
+            "in_flight": len(self._inflight),
+            "executions": self.executions,
+            "coalesced_calls": self.coalesced
+        }
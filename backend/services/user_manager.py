@@ -2,6 +2,8 @@ import uuid
 from datetime import datetime, timedelta
 from typing import Dict, Optional, List
 from models.lead import UserSession, WebhookLog
+from database import webhook_log_store
+from services.webhook_log import EGYPT_TIMEZONE
 import logging
 
 logger = logging.getLogger(__name__)
@@ -95,15 +97,69 @@ class UserManager:
         if len(self.user_logs[user_id]) > 100:
             self.user_logs[user_id] = self.user_logs[user_id][-100:]
     
-    def get_user_logs(self, user_id: str, limit: int = 50) -> List[WebhookLog]:
-        """Get logs for a specific user"""
+    def get_user_logs(self, user_id: str, limit: int = 50, after: Optional[int] = None,
+                      before: Optional[int] = None, session_id: Optional[str] = None,
+                      save_status: Optional[str] = None, start: Optional[float] = None,
+                      end: Optional[float] = None) -> List:
+        """
+        Get logs for a specific user, oldest first
+
+        Served from the webhook log store when it is enabled (every log the
+        user ever sent, across restarts and workers), otherwise from the last
+        100 kept in memory.
+
+        Args:
+            user_id: User whose logs to get
+            limit: Maximum logs
+            after: Only logs with a larger id; returns the oldest of them
+            before: Only logs with a smaller id; without after, returns the newest of them
+            session_id: Only logs of this session
+            save_status: Only logs with this CRM save status
+            start: Only logs at or after this Unix time
+            end: Only logs before this Unix time
+        """
+        if webhook_log_store.is_enabled():
+            return webhook_log_store.query_logs(
+                limit=limit, after=after, before=before, user_id=user_id, session_id=session_id,
+                save_status=save_status, start=start, end=end
+            )
         if user_id not in self.user_logs:
             return []
         
-        return self.user_logs[user_id][-limit:]
+        logs = [
+            log for log in self.user_logs[user_id]
+            if (before is None or int(log.id) < before)
+            and (session_id is None or log.session_id == session_id)
+            and (save_status is None or log.save_status == save_status)
+            and (start is None or log.timestamp.timestamp() >= start)
+            and (end is None or log.timestamp.timestamp() < end)
+        ]
+        if after is not None:
+            return [log for log in logs if int(log.id) > after][:limit]
+        return logs[-limit:]
+    
+    def _active_sessions(self, user_id: str) -> int:
+        return len([
+            session for session in self.sessions.values() 
+            if session.user_id == user_id and 
+            datetime.now() - session.last_activity <= self.session_timeout
+        ])
+    
+    def _stored_user_stats(self, user_id: str, stored: Optional[Dict]) -> Dict:
+        total_requests = stored["total"] if stored else 0
+        success_rate = (stored["successful"] / total_requests * 100) if total_requests > 0 else 0
+        last_activity = datetime.fromtimestamp(stored["last_ts"], tz=EGYPT_TIMEZONE) if stored else None
+        return {
+            "total_requests": total_requests,
+            "success_rate": round(success_rate, 2),
+            "last_activity": last_activity.isoformat() if last_activity else None,
+            "active_sessions": self._active_sessions(user_id)
+        }
     
     def get_user_stats(self, user_id: str) -> Dict:
         """Get statistics for a specific user"""
+        if webhook_log_store.is_enabled():
+            return self._stored_user_stats(user_id, webhook_log_store.get_user_stats(user_id).get(user_id))
         if user_id not in self.user_logs:
             return {
                 "total_requests": 0,
@@ -118,11 +174,7 @@ class UserManager:
         success_rate = (successful_requests / total_requests * 100) if total_requests > 0 else 0
         
         # Count active sessions for this user
-        active_sessions = len([
-            session for session in self.sessions.values() 
-            if session.user_id == user_id and 
-            datetime.now() - session.last_activity <= self.session_timeout
-        ])
+        active_sessions = self._active_sessions(user_id)
         
         last_activity = max([log.timestamp for log in logs]) if logs else None
         
@@ -135,6 +187,12 @@ class UserManager:
     
     def get_all_users_stats(self) -> Dict:
         """Get statistics for all users"""
+        if webhook_log_store.is_enabled():
+            # One grouped query instead of one per user
+            return {
+                user_id: self._stored_user_stats(user_id, stored)
+                for user_id, stored in webhook_log_store.get_user_stats().items()
+            }
         user_ids = set(self.user_logs.keys())
         stats = {}
         
@@ -0,0 +1,330 @@
+import asyncio
+import ipaddress
+import socket
+import time
+import uuid
+import logging
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+from urllib.parse import urlsplit
+import httpx
+from services.config_manager import config_manager
+from services.metrics import Histogram, LATENCY_BUCKETS_MS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOB_SETTINGS = {
+    # "sync": answer with the result; "async": answer 202 with a job id (overridable per request)
+    "default_mode": "sync",
+    "workers": 8,
+    "max_queue": 1000,
+    # Finished jobs are kept for status lookups this long, up to max_results of them
+    "result_ttl_seconds": 3600,
+    "max_results": 10000,
+    "callback_timeout_seconds": 10.0,
+    "callback_retries": 2,
+    # Hosts callbacks may go to even when they resolve to private addresses;
+    # any other host must resolve to public addresses only
+    "callback_allowed_hosts": [],
+    # Queued jobs get this long to finish when the app stops
+    "shutdown_timeout_seconds": 30.0
+}
+
+# Queue waits and end-to-end latency can run past the request buckets
+JOB_LATENCY_BUCKETS_MS = LATENCY_BUCKETS_MS + (30000, 60000, 120000)
+
+ProcessMessage = Callable[[Any], Awaitable[Dict[str, Any]]]
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat() if ts is not None else None
+
+class QueueFullError(Exception):
+    """Raised when the job queue has no room for another message"""
+
+class CallbackURLError(ValueError):
+    """Raised when a callback URL points somewhere the server must not send data"""
+
+def check_callback_url(url: str, allowed_hosts: List[str]) -> None:
+    """
+    Make sure a callback URL can't be used to reach internal services
+
+    The webhook needs no authentication, so without this anyone could make
+    the server POST lead data to loopback, link-local (cloud metadata) or
+    private addresses. Resolves the host, which can block: call it off the
+    event loop.
+
+    Args:
+        url: Callback URL
+        allowed_hosts: Hosts accepted without the address check
+
+    Raises:
+        CallbackURLError: If the URL has no host, the host doesn't resolve or
+            it resolves to a non-public address
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if parts.scheme not in ("http", "https") or not host:
+        raise CallbackURLError("Callback URL must be an http(s) URL with a host")
+    if host in {allowed.lower() for allowed in allowed_hosts}:
+        return
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, parts.port or 443, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, UnicodeError, ValueError):
+        raise CallbackURLError(f"Callback host {host} does not resolve")
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%", 1)[0])
+        if not ip.is_global or ip.is_multicast:
+            raise CallbackURLError(f"Callback host {host} resolves to a non-public address")
+
+class WebhookJob:
+    """A webhook message being processed in the background"""
+
+    def __init__(self, payload: Any, callback_url: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.callback_url = callback_url
+        self.status = "queued"
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.callback_status: Optional[str] = "pending" if callback_url else None
+        self.callback_attempts = 0
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Status view of the job"""
+        job = {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": _iso(self.created_at),
+            "started_at": _iso(self.started_at),
+            "finished_at": _iso(self.finished_at),
+            "result": self.result,
+            "error": self.error
+        }
+        if self.callback_url:
+            job["callback"] = {
+                "url": self.callback_url,
+                "status": self.callback_status,
+                "attempts": self.callback_attempts
+            }
+        return job
+
+class WebhookJobQueue:
+    """
+    Bounded in-process queue of webhook messages worked off by a pool of
+    asyncio tasks
+
+    Senders get a job id straight away instead of holding the connection for
+    the LLM call and CRM save. Results are kept for a while for status
+    lookups and, when the sender gave a callback URL, POSTed back to it.
+    Jobs live in memory: a restart loses queued ones.
+    """
+
+    def __init__(self, process: ProcessMessage):
+        """
+        Args:
+            process: Runs one message through the webhook pipeline, returning
+                the response body
+        """
+        self._process = process
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._workers: List[asyncio.Task] = []
+        self._callback_tasks: set = set()
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self.jobs: "OrderedDict[str, WebhookJob]" = OrderedDict()
+        # Ids of finished jobs in the order they finished, for expiry
+        self._finished: Deque[str] = deque()
+        self.busy_workers = 0
+        self.busy_seconds = 0.0
+        self.started_at: Optional[float] = None
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.max_depth = 0
+        self.callbacks_sent = 0
+        self.callbacks_failed = 0
+        self.queue_wait_ms_histogram = Histogram(JOB_LATENCY_BUCKETS_MS)
+        self.run_ms_histogram = Histogram(JOB_LATENCY_BUCKETS_MS)
+        self.end_to_end_ms_histogram = Histogram(JOB_LATENCY_BUCKETS_MS)
+
+    def get_settings(self) -> Dict[str, Any]:
+        """Get job queue settings merged over the defaults"""
+        webhook_settings = config_manager.get_config("webhook_settings")
+        return {**DEFAULT_JOB_SETTINGS, **webhook_settings.get("jobs", {})}
+
+    def _ensure_workers(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # First use, or a new event loop (tests): the old tasks can't run here
+            settings = self.get_settings()
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=settings["max_queue"])
+            self._workers = [asyncio.ensure_future(self._work()) for _ in range(settings["workers"])]
+            self.started_at = time.perf_counter()
+            self.busy_seconds = 0.0
+        return self._queue
+
+    def _prune(self) -> None:
+        settings = self.get_settings()
+        expires = time.time() - settings["result_ttl_seconds"]
+        # Workers finish jobs out of submission order, so a slow job mustn't
+        # hold back the ones behind it: expiry follows the order jobs finished in
+        while self._finished:
+            job = self.jobs[self._finished[0]]
+            if len(self._finished) <= settings["max_results"] and job.finished_at >= expires:
+                break
+            del self.jobs[self._finished.popleft()]
+
+    async def check_callback_url(self, url: str) -> None:
+        """
+        Reject callback URLs that point at non-public addresses
+
+        Raises:
+            CallbackURLError: If the URL may not be used
+        """
+        await asyncio.to_thread(check_callback_url, url, self.get_settings()["callback_allowed_hosts"])
+
+    def submit(self, payload: Any, callback_url: Optional[str] = None) -> WebhookJob:
+        """
+        Queue a message for the workers
+
+        Args:
+            payload: Message for the pipeline
+            callback_url: Where to POST the job once it is finished
+
+        Returns:
+            The queued job
+
+        Raises:
+            QueueFullError: If max_queue messages are already waiting
+        """
+        queue = self._ensure_workers()
+        job = WebhookJob(payload, callback_url)
+        try:
+            queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFullError(f"Job queue is full ({queue.maxsize} messages waiting)")
+        self._prune()
+        self.jobs[job.id] = job
+        self.submitted += 1
+        self.max_depth = max(self.max_depth, queue.qsize())
+        return job
+
+    def get_job(self, job_id: str) -> Optional[WebhookJob]:
+        """Get a job that is queued, running or recently finished"""
+        return self.jobs.get(job_id)
+
+    async def _work(self) -> None:
+        queue = self._queue
+        while True:
+            job = await queue.get()
+            self.busy_workers += 1
+            job.started_at = time.time()
+            started = time.perf_counter()
+            self.queue_wait_ms_histogram.observe((job.started_at - job.created_at) * 1000)
+            job.status = "running"
+            try:
+                job.result = await self._process(job.payload)
+                job.status = "done"
+                self.completed += 1
+            except Exception as e:
+                logger.exception(f"Webhook job {job.id} failed: {e}")
+                job.error = str(e)
+                job.status = "failed"
+                self.failed += 1
+            finally:
+                job.finished_at = time.time()
+                self._finished.append(job.id)
+                elapsed = time.perf_counter() - started
+                self.busy_seconds += elapsed
+                self.busy_workers -= 1
+                self.run_ms_histogram.observe(elapsed * 1000)
+                self.end_to_end_ms_histogram.observe((job.finished_at - job.created_at) * 1000)
+                queue.task_done()
+            if job.callback_url:
+                # Don't hold a worker while a slow receiver answers
+                task = asyncio.ensure_future(self._send_callback(job))
+                self._callback_tasks.add(task)
+                task.add_done_callback(self._callback_tasks.discard)
+
+    async def _send_callback(self, job: WebhookJob) -> None:
+        settings = self.get_settings()
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(timeout=settings["callback_timeout_seconds"])
+        body = job.to_dict()
+        body.pop("callback", None)
+        try:
+            # Checked again at send time: DNS may have changed since the job was queued
+            await asyncio.to_thread(check_callback_url, job.callback_url, settings["callback_allowed_hosts"])
+        except CallbackURLError as e:
+            logger.warning(f"Not sending callback for job {job.id}: {e}")
+            job.callback_status = "rejected"
+            self.callbacks_failed += 1
+            return
+        for attempt in range(settings["callback_retries"] + 1):
+            job.callback_attempts += 1
+            try:
+                response = await self._http_client.post(job.callback_url, json=body)
+                response.raise_for_status()
+                job.callback_status = "sent"
+                self.callbacks_sent += 1
+                return
+            except httpx.HTTPError as e:
+                logger.warning(f"Callback for job {job.id} failed (attempt {attempt + 1}): {e}")
+                if attempt < settings["callback_retries"]:
+                    await asyncio.sleep(2 ** attempt)
+        job.callback_status = "failed"
+        self.callbacks_failed += 1
+
+    async def shutdown(self) -> None:
+        """Give queued jobs and callbacks a chance to finish, then stop the workers"""
+        if self._queue is not None and self._loop is asyncio.get_running_loop():
+            timeout = self.get_settings()["shutdown_timeout_seconds"]
+            if self._queue.qsize() or self.busy_workers:
+                logger.info(f"Waiting for {self._queue.qsize() + self.busy_workers} webhook jobs")
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+                if self._callback_tasks:
+                    await asyncio.wait(list(self._callback_tasks), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Stopping with {self._queue.qsize()} webhook jobs still queued")
+            for worker in self._workers:
+                worker.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        self._loop = None
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth, worker utilization and job latencies"""
+        settings = self.get_settings()
+        workers = len(self._workers)
+        uptime = time.perf_counter() - self.started_at if self.started_at is not None else 0.0
+        return {
+            "default_mode": settings["default_mode"],
+            "depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_depth": self.max_depth,
+            "capacity": settings["max_queue"],
+            "workers": workers,
+            "busy_workers": self.busy_workers,
+            # Share of worker time spent processing since the pool started
+            "utilization": round(self.busy_seconds / (workers * uptime), 3) if workers and uptime else 0.0,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "callbacks_sent": self.callbacks_sent,
+            "callbacks_failed": self.callbacks_failed,
+            "queue_wait_ms": self.queue_wait_ms_histogram.snapshot(),
+            "run_ms": self.run_ms_histogram.snapshot(),
+            "end_to_end_ms": self.end_to_end_ms_histogram.snapshot()
+        }
@@ -0,0 +1,169 @@
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional
+from services.config_manager import config_manager
+
+# Egypt timezone (UTC+2)
+EGYPT_TIMEZONE = timezone(timedelta(hours=2))
+
+DEFAULT_LOG_SETTINGS = {
+    # Webhook log entries kept in memory; older ones are overwritten
+    "log_capacity": 10000
+}
+
+class LogRecord(NamedTuple):
+    """One webhook log entry, stored as a tuple to keep the buffer small"""
+    seq: int
+    ts: float
+    user_id: Optional[str]
+    session_id: Optional[str]
+    message: str
+    extracted: Dict[str, Any]
+    save_status: str
+
+class WebhookLogBuffer:
+    """
+    Fixed-capacity ring buffer of webhook log entries
+
+    Entries get monotonic sequence ids, so readers page with after/before
+    cursors and dashboards can fetch only what is new. Appends overwrite the
+    oldest entry once the buffer is full, keeping memory constant under any
+    amount of traffic.
+    """
+
+    def __init__(self, capacity: Optional[int] = None):
+        """
+        Args:
+            capacity: Entries to keep; defaults to webhook_settings.log_capacity
+        """
+        self._fixed_capacity = capacity
+        self._records: List[Optional[LogRecord]] = []
+        self.next_seq = 1
+        self._resize(capacity or self._configured_capacity())
+
+    def _configured_capacity(self) -> int:
+        settings = {**DEFAULT_LOG_SETTINGS, **config_manager.get_config("webhook_settings")}
+        return max(1, int(settings["log_capacity"]))
+
+    @property
+    def capacity(self) -> int:
+        return len(self._records)
+
+    @property
+    def first_seq(self) -> int:
+        """Oldest sequence id still held"""
+        return max(1, self.next_seq - self.capacity)
+
+    def _resize(self, capacity: int) -> None:
+        kept = [record for record in self._records if record is not None]
+        kept.sort(key=lambda record: record.seq)
+        self._records = [None] * capacity
+        for record in kept[-capacity:]:
+            self._records[record.seq % capacity] = record
+
+    def append(self, user_id: Optional[str], session_id: Optional[str], message: str,
+               extracted: Dict[str, Any], save_status: str, timestamp: datetime) -> LogRecord:
+        """
+        Add an entry, overwriting the oldest one when full (O(1))
+
+        Returns:
+            The stored record, with its sequence id
+        """
+        if self._fixed_capacity is None:
+            # log_capacity can be changed at runtime through the config API
+            capacity = self._configured_capacity()
+            if capacity != self.capacity:
+                self._resize(capacity)
+        record = LogRecord(self.next_seq, timestamp.timestamp(), user_id, session_id, message, extracted, save_status)
+        self._records[record.seq % self.capacity] = record
+        self.next_seq += 1
+        return record
+
+    def _get(self, seq: int) -> Optional[LogRecord]:
+        record = self._records[seq % self.capacity]
+        return record if record is not None and record.seq == seq else None
+
+    def records_after(self, seq: int, limit: int) -> List[LogRecord]:
+        """Up to `limit` records with a larger id than `seq`, oldest first"""
+        return self._select(limit, after=seq)
+
+    def _select(self, limit: int, after: Optional[int] = None, before: Optional[int] = None,
+                matches=None) -> List[LogRecord]:
+        last = self.next_seq - 1 if before is None else min(self.next_seq - 1, before - 1)
+        records = []
+        if after is not None:
+            seq = max(after + 1, self.first_seq)
+            while seq <= last and len(records) < limit:
+                record = self._get(seq)
+                if record is not None and (matches is None or matches(record)):
+                    records.append(record)
+                seq += 1
+        else:
+            seq = last
+            while seq >= self.first_seq and len(records) < limit:
+                record = self._get(seq)
+                if record is not None and (matches is None or matches(record)):
+                    records.append(record)
+                seq -= 1
+            records.reverse()
+        return records
+
+    def page(self, limit: int = 50, after: Optional[int] = None, before: Optional[int] = None,
+             user_id: Optional[str] = None, session_id: Optional[str] = None,
+             save_status: Optional[str] = None, start: Optional[float] = None,
+             end: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Get entries oldest first
+
+        Args:
+            limit: Maximum entries
+            after: Only entries with a larger id; returns the oldest of them,
+                so polling with the last id seen fetches only new entries
+            before: Only entries with a smaller id; without after, returns
+                the newest of them (the previous page when scrolling back)
+            user_id: Only entries of this user
+            session_id: Only entries of this session
+            save_status: Only entries with this CRM save status
+            start: Only entries logged at or after this Unix time
+            end: Only entries logged before this Unix time
+
+        Returns:
+            Log entries as WebhookLog dicts
+        """
+        def matches(record: LogRecord) -> bool:
+            return ((user_id is None or record.user_id == user_id)
+                    and (session_id is None or record.session_id == session_id)
+                    and (save_status is None or record.save_status == save_status)
+                    and (start is None or record.ts >= start)
+                    and (end is None or record.ts < end))
+
+        filtered = any(value is not None for value in (user_id, session_id, save_status, start, end))
+        return [self.to_dict(record) for record in self._select(limit, after, before, matches if filtered else None)]
+
+    @staticmethod
+    def to_dict(record: LogRecord) -> Dict[str, Any]:
+        """Expand a record into the WebhookLog shape served by /webhook/logs"""
+        return {
+            "id": str(record.seq),
+            "timestamp": datetime.fromtimestamp(record.ts, tz=EGYPT_TIMEZONE),
+            "user_id": record.user_id,
+            "session_id": record.session_id,
+            "message": record.message,
+            "extracted": record.extracted,
+            "save_status": record.save_status,
+            "retry_info": {
+                "has_retries": record.save_status == "success" or "retry" in str(record.save_status),
+                "final_status": record.save_status
+            }
+        }
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get buffer capacity, entries held and the id range"""
+        return {
+            "capacity": self.capacity,
+            "entries": min(self.capacity, self.next_seq - 1),
+            "first_id": self.first_seq,
+            "last_id": self.next_seq - 1
+        }
+
+# Global webhook log instance
+webhook_log = WebhookLogBuffer()
@@ -1,11 +1,34 @@
+import asyncio
 import pytest
 import json
+import httpx
 from unittest.mock import patch, AsyncMock, Mock
-from services.agent import extract_lead_info
+from services.agent import extract_lead_info, extraction_batcher, extraction_single_flight, stream_stats
+from services.extraction_cache import extraction_cache
+from services.fast_extractor import FastPathExtractor
+from services.circuit_breaker import llm_circuit_breaker
+
+def _mock_llm_response(content):
+    mock_response_obj = Mock()
+    mock_response_obj.json.return_value = {"choices": [{"message": {"content": content}}]}
+    mock_response_obj.raise_for_status.return_value = None
+    return mock_response_obj
 
 class TestAgentService:
     """Test cases for the AI agent service"""
 
+    def setup_method(self):
+        extraction_cache.clear()
+        llm_circuit_breaker.reset()
+        # These tests exercise the LLM path, so keep the rule-based fast path out of the way
+        self.fast_path_patch = patch.object(
+            FastPathExtractor, 'get_settings', return_value={"enabled": False, "confidence_threshold": 0.9}
+        )
+        self.fast_path_patch.start()
+
+    def teardown_method(self):
+        self.fast_path_patch.stop()
+
     @pytest.mark.asyncio
     async def test_extract_lead_info_success(self):
         """Test successful lead information extraction"""
@@ -24,12 +47,12 @@ class TestAgentService:
             }]
         }
 
-        with patch('services.agent.httpx.AsyncClient') as mock_client:
+        with patch('services.agent.llm_client.get_client') as mock_get_client:
             mock_response_obj = Mock()
             mock_response_obj.json.return_value = mock_response
             mock_response_obj.raise_for_status.return_value = None
             
-            mock_client.return_value.__aenter__.return_value.post = AsyncMock(return_value=mock_response_obj)
+            mock_get_client.return_value.post = AsyncMock(return_value=mock_response_obj)
 
             result = await extract_lead_info(test_message)
 
@@ -56,12 +79,12 @@ class TestAgentService:
             }]
         }
 
-        with patch('services.agent.httpx.AsyncClient') as mock_client:
+        with patch('services.agent.llm_client.get_client') as mock_get_client:
             mock_response_obj = Mock()
             mock_response_obj.json.return_value = mock_response
             mock_response_obj.raise_for_status.return_value = None
             
-            mock_client.return_value.__aenter__.return_value.post = AsyncMock(return_value=mock_response_obj)
+            mock_get_client.return_value.post = AsyncMock(return_value=mock_response_obj)
 
             result = await extract_lead_info(test_message)
 
@@ -80,12 +103,12 @@ class TestAgentService:
             }]
         }
 
-        with patch('services.agent.httpx.AsyncClient') as mock_client:
+        with patch('services.agent.llm_client.get_client') as mock_get_client:
             mock_response_obj = Mock()
             mock_response_obj.json.return_value = mock_response
             mock_response_obj.raise_for_status.return_value = None
             
-            mock_client.return_value.__aenter__.return_value.post = AsyncMock(return_value=mock_response_obj)
+            mock_get_client.return_value.post = AsyncMock(return_value=mock_response_obj)
 
             result = await extract_lead_info(test_message)
 
@@ -99,8 +122,8 @@ class TestAgentService:
         """Test handling of API errors"""
         test_message = "Test message"
 
-        with patch('services.agent.httpx.AsyncClient') as mock_client:
-            mock_client.return_value.__aenter__.return_value.post = AsyncMock(side_effect=Exception("API Error"))
+        with patch('services.agent.llm_client.get_client') as mock_get_client:
+            mock_get_client.return_value.post = AsyncMock(side_effect=Exception("API Error"))
 
             result = await extract_lead_info(test_message)
 
@@ -126,12 +149,12 @@ class TestAgentService:
             }]
         }
 
-        with patch('services.agent.httpx.AsyncClient') as mock_client:
+        with patch('services.agent.llm_client.get_client') as mock_get_client:
             mock_response_obj = Mock()
             mock_response_obj.json.return_value = mock_response
             mock_response_obj.raise_for_status.return_value = None
             
-            mock_client.return_value.__aenter__.return_value.post = AsyncMock(return_value=mock_response_obj)
+            mock_get_client.return_value.post = AsyncMock(return_value=mock_response_obj)
 
             result = await extract_lead_info(test_message)
 
@@ -164,13 +187,197 @@ class TestAgentService:
             }]
         }
 
-        with patch('services.agent.httpx.AsyncClient') as mock_client:
+        with patch('services.agent.llm_client.get_client') as mock_get_client:
             mock_response_obj = Mock()
             mock_response_obj.json.return_value = mock_response
             mock_response_obj.raise_for_status.return_value = None
             
-            mock_client.return_value.__aenter__.return_value.post = AsyncMock(return_value=mock_response_obj)
+            mock_get_client.return_value.post = AsyncMock(return_value=mock_response_obj)
 
             result = await extract_lead_info(test_message)
 
-            assert result == expected_result 
\ No newline at end of file
+            assert result == expected_result 
+
+    @pytest.mark.asyncio
+    async def test_extract_lead_info_cache_hit(self):
+        """Test repeated messages are served from the cache"""
+        expected_result = {"name": "Jane Roe", "email": "jane@acme.com", "company": "Acme"}
+
+        with patch('services.agent.llm_client.get_client') as mock_get_client:
+            mock_get_client.return_value.post = AsyncMock(return_value=_mock_llm_response(json.dumps(expected_result)))
+
+            first = await extract_lead_info("Hi, I'm Jane Roe from Acme, jane@acme.com")
+            # Whitespace/case differences normalize to the same key
+            second = await extract_lead_info("  hi, I'm Jane Roe from  Acme, jane@acme.com ")
+
+            assert first == expected_result
+            assert second == expected_result
+            assert mock_get_client.return_value.post.await_count == 1
+            assert extraction_cache.hits == 1
+
+    @pytest.mark.asyncio
+    async def test_extract_lead_info_fallback_not_cached(self):
+        """Test failed extractions are retried instead of cached"""
+        with patch('services.agent.llm_client.get_client') as mock_get_client:
+            mock_get_client.return_value.post = AsyncMock(side_effect=Exception("API Error"))
+
+            await extract_lead_info("Retry me please")
+            await extract_lead_info("Retry me please")
+
+            assert mock_get_client.return_value.post.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_extract_lead_info_cache_keyed_on_model(self):
+        """Test changing the model does not reuse results from another model"""
+        result = {"name": "", "email": "", "company": ""}
+        settings_a = {"model": "model-a", "temperature": 0.2, "max_tokens": 200}
+        settings_b = {"model": "model-b", "temperature": 0.2, "max_tokens": 200}
+
+        with patch('services.agent.llm_client.get_client') as mock_get_client:
+            mock_get_client.return_value.post = AsyncMock(return_value=_mock_llm_response(json.dumps(result)))
+
+            with patch('services.agent.config_manager.get_config', return_value=settings_a):
+                await extract_lead_info("Hi there")
+                await extract_lead_info("Hi there")
+            with patch('services.agent.config_manager.get_config', return_value=settings_b):
+                await extract_lead_info("Hi there")
+
+            assert mock_get_client.return_value.post.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_extract_lead_info_fast_path_skips_llm(self):
+        """Test confidently parsed messages never reach the LLM"""
+        self.fast_path_patch.stop()
+        self.fast_path_patch = patch.object(
+            FastPathExtractor, 'get_settings', return_value={"enabled": True, "confidence_threshold": 0.9}
+        )
+        self.fast_path_patch.start()
+
+        with patch('services.agent.llm_client.get_client') as mock_get_client:
+            mock_get_client.return_value.post = AsyncMock()
+
+            result = await extract_lead_info("I'm Jane Roe from Acme, jane@acme.com")
+
+            assert result == {"name": "Jane Roe", "email": "jane@acme.com", "company": "Acme"}
+            mock_get_client.return_value.post.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_extract_lead_info_batched(self):
+        """Test concurrent calls share one batch prompt, retrying malformed items alone"""
+        async def fake_post(url, headers=None, json=None):
+            prompt = json["messages"][0]["content"]
+            if "[1]" in prompt:
+                # Batch answer where the second item is malformed
+                content = '[{"index": 0, "name": "A", "email": "a@a.com", "company": "A"}, {"index": 1, "name": "B"}]'
+            else:
+                content = '{"name": "B", "email": "b@b.com", "company": "B"}'
+            return _mock_llm_response(content)
+
+        batching = {"enabled": True, "max_batch_size": 2, "max_wait_ms": 1000}
+        with patch.object(type(extraction_batcher), 'get_settings', return_value=batching), \
+                patch('services.agent.llm_client.get_client') as mock_get_client:
+            mock_get_client.return_value.post = AsyncMock(side_effect=fake_post)
+
+            first, second = await asyncio.gather(
+                extract_lead_info("first batched message"),
+                extract_lead_info("second batched message")
+            )
+
+            assert first == {"name": "A", "email": "a@a.com", "company": "A"}
+            assert second == {"name": "B", "email": "b@b.com", "company": "B"}
+            assert mock_get_client.return_value.post.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_extract_lead_info_coalesces_identical_calls(self):
+        """Test concurrent deliveries of the same message issue one LLM request"""
+        expected_result = {"name": "Jane Roe", "email": "jane@acme.com", "company": "Acme"}
+
+        async def slow_post(*args, **kwargs):
+            await asyncio.sleep(0.01)
+            return _mock_llm_response(json.dumps(expected_result))
+
+        coalesced_before = extraction_single_flight.coalesced
+        with patch('services.agent.llm_client.get_client') as mock_get_client:
+            mock_get_client.return_value.post = AsyncMock(side_effect=slow_post)
+
+            results = await asyncio.gather(*(extract_lead_info("Same retried delivery") for _ in range(3)))
+
+            assert results == [expected_result] * 3
+            assert mock_get_client.return_value.post.await_count == 1
+            assert extraction_single_flight.coalesced - coalesced_before == 2
+
+    @pytest.mark.asyncio
+    async def test_extract_lead_info_streaming_stops_early(self):
+        """Test streamed completions return once the JSON object closes"""
+        expected_result = {"name": "Jane Roe", "email": "jane@acme.com", "company": "Acme"}
+        pieces = ['Here you go: {"name": "Jane Roe", ', '"email": "jane@acme.com", ', '"company": "Acme"}', ' Explanation', ' follows']
+        sent = []
+
+        async def sse_body():
+            for piece in pieces:
+                sent.append(piece)
+                event = {"choices": [{"delta": {"content": piece}}]}
+                yield f"data: {json.dumps(event)}\n\n".encode()
+            yield b"data: [DONE]\n\n"
+
+        def handler(request):
+            assert json.loads(request.content)["stream"] is True
+            return httpx.Response(200, content=sse_body(), headers={"content-type": "text/event-stream"})
+
+        llm_settings = {"model": "llama3-70b-8192", "temperature": 0.2, "max_tokens": 200, "stream": True}
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        early_terminations = stream_stats["early_terminations"]
+        with patch('services.agent.llm_client.get_client', return_value=client), \
+                patch('services.agent.config_manager.get_config', return_value=llm_settings):
+            result = await extract_lead_info("Please stream this message")
+
+        await client.aclose()
+        assert result == expected_result
+        # The trailing explanation was never read
+        assert len(sent) < len(pieces)
+        assert stream_stats["early_terminations"] == early_terminations + 1
+
+    @pytest.mark.asyncio
+    async def test_extract_lead_info_finished_stream_is_not_early(self):
+        """Test a stream whose object ends with the completion isn't counted as closed early"""
+        pieces = ['{"name": "Jane Roe", "email": "jane@acme.com", ', '"company": "Acme"}']
+
+        async def sse_body():
+            for index, piece in enumerate(pieces):
+                finish_reason = "stop" if index == len(pieces) - 1 else None
+                event = {"choices": [{"delta": {"content": piece}, "finish_reason": finish_reason}]}
+                yield f"data: {json.dumps(event)}\n\n".encode()
+            yield b"data: [DONE]\n\n"
+
+        def handler(request):
+            return httpx.Response(200, content=sse_body(), headers={"content-type": "text/event-stream"})
+
+        llm_settings = {"model": "llama3-70b-8192", "temperature": 0.2, "max_tokens": 200, "stream": True}
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        streams, early_terminations = stream_stats["streams"], stream_stats["early_terminations"]
+        with patch('services.agent.llm_client.get_client', return_value=client), \
+                patch('services.agent.config_manager.get_config', return_value=llm_settings):
+            result = await extract_lead_info("Please stream this other message")
+
+        await client.aclose()
+        assert result["name"] == "Jane Roe"
+        assert stream_stats["streams"] == streams + 1
+        assert stream_stats["early_terminations"] == early_terminations
+
+    @pytest.mark.asyncio
+    async def test_extract_lead_info_requeues_after_429(self):
+        """Test a rate-limited call is retried instead of returning the fallback"""
+        expected_result = {"name": "Jane Roe", "email": "jane@acme.com", "company": "Acme"}
+        responses = [
+            httpx.Response(429, headers={"retry-after": "0"}, request=httpx.Request("POST", "http://llm")),
+            httpx.Response(200, json={"choices": [{"message": {"content": json.dumps(expected_result)}}]},
+                           request=httpx.Request("POST", "http://llm"))
+        ]
+
+        with patch('services.agent.llm_client.get_client') as mock_get_client:
+            mock_get_client.return_value.post = AsyncMock(side_effect=responses)
+
+            result = await extract_lead_info("Rate limited message")
+
+            assert result == expected_result
+            assert mock_get_client.return_value.post.await_count == 2
@@ -0,0 +1,182 @@
+import asyncio
+import pytest
+from unittest.mock import patch, AsyncMock
+from fastapi.testclient import TestClient
+from services.circuit_breaker import (
+    CircuitBreaker, CircuitOpenError, DEFAULT_CIRCUIT_BREAKER_SETTINGS, CLOSED, OPEN, HALF_OPEN,
+    llm_circuit_breaker
+)
+from services.agent import extract_lead_info
+from services.extraction_cache import extraction_cache
+from services.fast_extractor import FastPathExtractor
+
+def _settings(**overrides):
+    return {**DEFAULT_CIRCUIT_BREAKER_SETTINGS, "window_size": 4, "minimum_calls": 4, **overrides}
+
+def _breaker(**overrides):
+    breaker = CircuitBreaker("test")
+    patcher = patch.object(CircuitBreaker, 'get_settings', return_value=_settings(**overrides))
+    patcher.start()
+    return breaker, patcher
+
+class TestCircuitBreaker:
+    """Test cases for the circuit breaker state machine"""
+
+    def test_opens_on_failure_rate(self):
+        """Test the circuit opens once the window's failure rate crosses the threshold"""
+        breaker, patcher = _breaker()
+        try:
+            breaker.record_success(0.1)
+            breaker.record_failure(0.1)
+            breaker.record_failure(0.1)
+            assert breaker.state == CLOSED  # below minimum_calls
+
+            breaker.record_failure(0.1)
+            assert breaker.state == OPEN
+            assert breaker.allow_request() is False
+            assert breaker.is_open() is True
+            assert breaker.get_stats()["short_circuited"] == 1
+        finally:
+            patcher.stop()
+
+    def test_opens_on_slow_calls(self):
+        """Test successful but slow calls trip the latency threshold"""
+        breaker, patcher = _breaker(slow_call_ms=100, slow_call_rate_threshold=0.75)
+        try:
+            for _ in range(3):
+                breaker.record_success(0.5)
+            breaker.record_success(0.01)
+            assert breaker.state == OPEN
+        finally:
+            patcher.stop()
+
+    def test_half_open_then_closed(self):
+        """Test the circuit probes after the cooldown and closes on successful trials"""
+        breaker, patcher = _breaker(open_seconds=0, half_open_max_calls=2)
+        try:
+            for _ in range(4):
+                breaker.record_failure(0.1)
+            assert breaker.state == OPEN
+
+            assert breaker.allow_request() is True
+            assert breaker.state == HALF_OPEN
+            assert breaker.allow_request() is True
+            # Only half_open_max_calls trial calls at a time
+            assert breaker.allow_request() is False
+
+            breaker.record_success(0.1)
+            breaker.record_success(0.1)
+            assert breaker.state == CLOSED
+            assert breaker.get_stats()["window_calls"] == 0
+        finally:
+            patcher.stop()
+
+    def test_half_open_failure_reopens(self):
+        """Test a failed trial call reopens the circuit"""
+        breaker, patcher = _breaker(open_seconds=0)
+        try:
+            for _ in range(4):
+                breaker.record_failure(0.1)
+            assert breaker.allow_request() is True
+            breaker.record_failure(0.1)
+            assert breaker.state == OPEN
+            assert breaker.times_opened == 2
+        finally:
+            patcher.stop()
+
+    @pytest.mark.asyncio
+    async def test_guard_records_and_rejects(self):
+        """Test guard records exceptions as failures and rejects calls while open"""
+        breaker, patcher = _breaker(open_seconds=60)
+        try:
+            for _ in range(4):
+                with pytest.raises(RuntimeError):
+                    async with breaker.guard():
+                        raise RuntimeError("provider down")
+
+            with pytest.raises(CircuitOpenError):
+                async with breaker.guard():
+                    pytest.fail("call should not run while the circuit is open")
+        finally:
+            patcher.stop()
+
+    @pytest.mark.asyncio
+    async def test_time_queued_before_running_is_not_slow(self):
+        """Test only the time marked as running counts towards slow calls"""
+        breaker, patcher = _breaker(slow_call_ms=50, slow_call_rate_threshold=0.5)
+        try:
+            for _ in range(4):
+                async with breaker.guard() as timer:
+                    await asyncio.sleep(0.06)  # queued behind a rate limiter
+                    with timer.running():
+                        pass
+            assert breaker.state == CLOSED
+
+            for _ in range(2):
+                async with breaker.guard():
+                    await asyncio.sleep(0.06)
+            assert breaker.state == OPEN
+        finally:
+            patcher.stop()
+
+class TestCircuitBreakerIntegration:
+    """Test cases for the LLM circuit breaker in the agent and on /health"""
+
+    def setup_method(self):
+        extraction_cache.clear()
+        llm_circuit_breaker.reset()
+        self.fast_path_patch = patch.object(
+            FastPathExtractor, 'get_settings', return_value={"enabled": False, "confidence_threshold": 0.9}
+        )
+        self.fast_path_patch.start()
+
+    def teardown_method(self):
+        self.fast_path_patch.stop()
+        llm_circuit_breaker.reset()
+
+    def _trip(self):
+        for _ in range(DEFAULT_CIRCUIT_BREAKER_SETTINGS["window_size"]):
+            llm_circuit_breaker.record_failure(0.1)
+        assert llm_circuit_breaker.state == OPEN
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_uses_local_fallback(self):
+        """Test extraction skips the LLM and fills what it can locally while open"""
+        self._trip()
+        with patch('services.agent.llm_client.get_client') as mock_get_client:
+            mock_get_client.return_value.post = AsyncMock()
+
+            result = await extract_lead_info("Hi, please reach me at jane@acme.com about pricing")
+
+            mock_get_client.return_value.post.assert_not_called()
+        assert result == {"name": "Unknown", "email": "jane@acme.com", "company": "Acme"}
+        # Degraded results are not cached
+        assert extraction_cache.get_stats()["size"] == 0
+
+    @pytest.mark.asyncio
+    async def test_circuit_opening_mid_call_uses_local_fallback(self):
+        """Test a call rejected because the circuit opened while it waited falls back locally, uncached"""
+        async def trip_and_reject(send, estimated_tokens):
+            self._trip()
+            raise CircuitOpenError("Circuit breaker 'llm' is open")
+
+        with patch('services.agent._send_to_providers', side_effect=trip_and_reject):
+            result = await extract_lead_info("Hi, please reach me at jane@acme.com about pricing")
+
+        assert result == {"name": "Unknown", "email": "jane@acme.com", "company": "Acme"}
+        assert extraction_cache.get_stats()["size"] == 0
+
+    def test_health_reports_circuit_state(self):
+        """Test /health exposes the breaker state"""
+        from main import app
+        client = TestClient(app)
+
+        response = client.get("/health")
+        assert response.json()["status"] == "healthy"
+        assert response.json()["llm_circuit"]["state"] == "closed"
+
+        self._trip()
+        response = client.get("/health")
+        assert response.status_code == 200
+        assert response.json()["status"] == "degraded"
+        assert response.json()["llm_circuit"]["state"] == "open"
@@ -4,7 +4,7 @@ import tempfile
 import os
 from pathlib import Path
 from unittest.mock import patch
-from database.mock_crm import save_to_crm
+from database.mock_crm import save_to_crm, save_many_to_crm, iter_leads, get_crm_stats
 
 class TestCRMStorage:
     """Test cases for CRM storage functionality"""
@@ -27,8 +27,8 @@ class TestCRMStorage:
                 assert result == "success"
                 
                 # Verify data was saved
-                if crm_file.exists():
-                    saved_data = json.loads(crm_file.read_text())
+                if crm_file.with_suffix(".jsonl").exists():
+                    saved_data = list(iter_leads())
                     assert len(saved_data) == 1
                     assert saved_data[0] == test_data
 
@@ -59,12 +59,25 @@ class TestCRMStorage:
                 assert result2 == "success"
                 
                 # Verify both entries were saved
-                if crm_file.exists():
-                    saved_data = json.loads(crm_file.read_text())
+                if crm_file.with_suffix(".jsonl").exists():
+                    saved_data = list(iter_leads())
                     assert len(saved_data) == 2
                     assert test_data_1 in saved_data
                     assert test_data_2 in saved_data
 
+    def test_save_many_to_crm_reports_each_lead(self):
+        """Test a batch save returns one status per lead, like database.crm"""
+        leads = [{"name": f"Lead {i}", "email": f"lead{i}@example.com", "company": "Bulk"} for i in range(3)]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with patch('database.mock_crm.CRM_FILE', Path(temp_dir) / "crm.json"):
+                assert save_many_to_crm(leads) == ["success"] * 3
+                assert list(iter_leads()) == leads
+
+                with patch('database.mock_crm.write_leads', side_effect=Exception("CRM down")), \
+                        patch('database.retry.time.sleep'):
+                    assert save_many_to_crm(leads) == ["failure"] * 3
+
     def test_save_to_crm_file_creation(self):
         """Test CRM file creation when it doesn't exist"""
         test_data = {
@@ -83,10 +96,10 @@ class TestCRMStorage:
                 result = save_to_crm(test_data)
                 
                 assert result == "success"
-                assert crm_file.exists()
+                assert crm_file.with_suffix(".jsonl").exists()
                 
                 # Verify data was saved
-                saved_data = json.loads(crm_file.read_text())
+                saved_data = list(iter_leads())
                 assert len(saved_data) == 1
                 assert saved_data[0] == test_data
 
@@ -115,9 +128,10 @@ class TestCRMStorage:
         with tempfile.TemporaryDirectory() as temp_dir:
             crm_file = Path(temp_dir) / "crm.json"
             
-            # Create a read-only file
-            crm_file.write_text("[]")
-            crm_file.chmod(0o444)  # Read-only
+            # Create a read-only lead log
+            crm_log = crm_file.with_suffix(".jsonl")
+            crm_log.write_text("")
+            crm_log.chmod(0o444)  # Read-only
             
             with patch('database.mock_crm.CRM_FILE', crm_file):
                 result = save_to_crm(test_data)
@@ -135,7 +149,7 @@ class TestCRMStorage:
         with tempfile.TemporaryDirectory() as temp_dir:
             crm_file = Path(temp_dir) / "crm.json"
             
-            # Create a corrupted JSON file
+            # Create a corrupted legacy JSON file that can't be migrated
             crm_file.write_text("invalid json content")
             
             with patch('database.mock_crm.CRM_FILE', crm_file):
@@ -160,8 +174,8 @@ class TestCRMStorage:
                 assert result == "success"
                 
                 # Verify empty data was saved
-                if crm_file.exists():
-                    saved_data = json.loads(crm_file.read_text())
+                if crm_file.with_suffix(".jsonl").exists():
+                    saved_data = list(iter_leads())
                     assert len(saved_data) == 1
                     assert saved_data[0] == empty_data
 
@@ -182,7 +196,58 @@ class TestCRMStorage:
                 assert result == "success"
                 
                 # Verify special characters were preserved
-                if crm_file.exists():
-                    saved_data = json.loads(crm_file.read_text())
+                if crm_file.with_suffix(".jsonl").exists():
+                    saved_data = list(iter_leads())
                     assert len(saved_data) == 1
-                    assert saved_data[0] == test_data 
\ No newline at end of file
+                    assert saved_data[0] == test_data 
+class TestCRMLogStorage:
+    """Test cases for the append-only lead log"""
+
+    def test_appends_one_line_per_lead(self):
+        """Test each save appends exactly one JSON line and never rewrites the file"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            crm_file = Path(temp_dir) / "crm.json"
+
+            with patch('database.mock_crm.CRM_FILE', crm_file), \
+                    patch('database.mock_crm.random.random', return_value=1.0):
+                save_to_crm({"name": "A", "email": "a@a.com", "company": "A"})
+                first_line = crm_file.with_suffix(".jsonl").read_text().splitlines()[0]
+                save_to_crm({"name": "B", "email": "b@b.com", "company": "B"})
+
+                lines = crm_file.with_suffix(".jsonl").read_text().splitlines()
+                assert len(lines) == 2
+                assert lines[0] == first_line
+                record = json.loads(lines[1])
+                assert record["lead"]["name"] == "B"
+                assert isinstance(record["ts"], float)
+
+    def test_migrates_legacy_json_array(self):
+        """Test leads in an existing crm.json are migrated once and kept in order"""
+        legacy = [
+            {"name": "Old One", "email": "one@old.com", "company": "Old"},
+            {"name": "Old Two", "email": "two@old.com", "company": "Old"}
+        ]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            crm_file = Path(temp_dir) / "crm.json"
+            crm_file.write_text(json.dumps(legacy, indent=2))
+
+            with patch('database.mock_crm.CRM_FILE', crm_file), \
+                    patch('database.mock_crm.random.random', return_value=1.0):
+                assert get_crm_stats()["total_leads"] == 2
+                assert save_to_crm({"name": "New", "email": "new@new.com", "company": "New"}) == "success"
+
+                assert list(iter_leads()) == legacy + [{"name": "New", "email": "new@new.com", "company": "New"}]
+                assert not crm_file.exists()
+                assert (Path(temp_dir) / "crm.json.migrated").exists()
+
+    def test_torn_final_line_is_skipped(self):
+        """Test a partially written last record doesn't break reads"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            crm_file = Path(temp_dir) / "crm.json"
+            crm_file.with_suffix(".jsonl").write_text(
+                json.dumps({"ts": 1.0, "lead": {"name": "Ok"}}) + "\n" + '{"ts": 2.0, "lead": {"na'
+            )
+
+            with patch('database.mock_crm.CRM_FILE', crm_file):
+                assert list(iter_leads()) == [{"name": "Ok"}]
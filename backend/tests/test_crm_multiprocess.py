@@ -0,0 +1,178 @@
+import asyncio
+import pytest
+import json
+import multiprocessing
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from unittest.mock import patch
+from services.config_manager import config_manager
+from services.file_io import atomic_write_text, file_lock
+from database import crm, mock_crm, sqlite_crm
+
+WORKERS = 4
+LEADS_PER_WORKER = 200
+SHARED_LEADS = 40
+
+def _use_backend(backend_name: str, path: str, storage: dict):
+    crm_settings = config_manager.get_config("crm_settings")
+    config_manager.config["crm_settings"] = {
+        **crm_settings, "failure_rate": 0, "backend": backend_name, "dedup": {"enabled": True},
+        "storage": {**crm_settings.get("storage", {}), **storage}
+    }
+    if backend_name == "json":
+        mock_crm.CRM_FILE = Path(path)
+        return mock_crm
+    sqlite_crm.CRM_DB_FILE = Path(path)
+    return sqlite_crm
+
+def _hammer(backend_name: str, path: str, worker: int, storage: dict) -> None:
+    """Worker process: save leads one by one and in small batches"""
+    backend = _use_backend(backend_name, path, storage)
+    leads = [{"name": f"w{worker}-{i}", "email": f"w{worker}-{i}@example.com", "company": "Stress"}
+             for i in range(LEADS_PER_WORKER)]
+    for start in range(0, LEADS_PER_WORKER, 10):
+        if start % 20:
+            backend.write_leads(leads[start:start + 10])
+        else:
+            for lead in leads[start:start + 10]:
+                backend.write_lead(lead)
+    backend.close_all()
+
+def _save_shared(backend_name: str, path: str, worker: int, storage: dict) -> None:
+    """Worker process: save the same emails as every other worker through the dedup facade"""
+    backend = _use_backend(backend_name, path, storage)
+    crm.rebuild_dedup_index()
+    leads = [{"name": f"w{worker}", "email": f"shared{i}@example.com", "company": "Race"}
+             for i in range(SHARED_LEADS)]
+
+    async def save():
+        for lead in leads[:SHARED_LEADS // 2]:
+            assert await crm.save_to_crm(lead) == "success"
+        for start in range(SHARED_LEADS // 2, SHARED_LEADS, 5):
+            assert await crm.save_many_to_crm(leads[start:start + 5]) == ["success"] * 5
+
+    asyncio.run(save())
+    backend.close_all()
+
+def _run_workers(backend_name: str, path: Path, storage: Optional[dict] = None, target=_hammer) -> None:
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=target, args=(backend_name, str(path), worker, storage or {}))
+        for worker in range(WORKERS)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=120)
+        assert process.exitcode == 0
+
+def _expected_names():
+    return {f"w{worker}-{i}" for worker in range(WORKERS) for i in range(LEADS_PER_WORKER)}
+
+class TestMultiProcessCRM:
+    """Stress tests: several worker processes writing the same CRM store"""
+
+    def setup_method(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.settings_patch = patch.dict(
+            config_manager.config,
+            {"crm_settings": {**config_manager.get_config("crm_settings"), "failure_rate": 0}}
+        )
+        self.settings_patch.start()
+
+    def teardown_method(self):
+        mock_crm.close_all()
+        sqlite_crm.close_all()
+        self.settings_patch.stop()
+        self.temp_dir.cleanup()
+
+    def test_json_log_loses_no_leads(self):
+        """Test concurrent appends from several processes keep every lead and whole lines"""
+        crm_file = Path(self.temp_dir.name) / "crm.json"
+        # A legacy file forces the workers to race for the migration too
+        crm_file.write_text(json.dumps([{"name": "legacy"}]))
+
+        _run_workers("json", crm_file)
+
+        with patch('database.mock_crm.CRM_FILE', crm_file):
+            lines = crm_file.with_suffix(".jsonl").read_bytes().splitlines()
+            assert all(json.loads(line) for line in lines)
+            names = [lead["name"] for lead in mock_crm.iter_leads()]
+            assert len(names) == WORKERS * LEADS_PER_WORKER + 1
+            assert set(names) == _expected_names() | {"legacy"}
+
+            assert mock_crm.check_stats() == []
+            assert mock_crm.get_crm_stats()["total_leads"] == len(names)
+
+    def test_segment_rotation_loses_no_leads(self):
+        """Test workers sealing segments under each other keep every lead and the counters"""
+        crm_file = Path(self.temp_dir.name) / "crm.json"
+
+        _run_workers("json", crm_file, {"max_segment_bytes": 8192})
+
+        with patch('database.mock_crm.CRM_FILE', crm_file):
+            assert len(mock_crm.get_store().sealed_numbers()) > 5
+            names = [lead["name"] for lead in mock_crm.iter_leads()]
+            assert len(names) == WORKERS * LEADS_PER_WORKER
+            assert set(names) == _expected_names()
+            assert mock_crm.check_stats() == []
+
+    def test_sqlite_loses_no_leads(self):
+        """Test concurrent transactions from several processes keep every lead and the counters"""
+        db_file = Path(self.temp_dir.name) / "crm.db"
+
+        _run_workers("sqlite", db_file)
+
+        with patch('database.sqlite_crm.CRM_DB_FILE', db_file):
+            names = [lead["name"] for lead in sqlite_crm.iter_leads()]
+            assert len(names) == WORKERS * LEADS_PER_WORKER
+            assert set(names) == _expected_names()
+            assert sqlite_crm.check_stats() == []
+
+    @pytest.mark.parametrize("backend_name", ["json", "sqlite"])
+    def test_dedup_stores_each_email_once(self, backend_name):
+        """Test workers saving the same emails through crm.save_to_crm/save_many_to_crm store each one once"""
+        path = Path(self.temp_dir.name) / ("crm.json" if backend_name == "json" else "crm.db")
+
+        _run_workers(backend_name, path, target=_save_shared)
+
+        with patch('database.mock_crm.CRM_FILE', path), patch('database.sqlite_crm.CRM_DB_FILE', path):
+            backend = mock_crm if backend_name == "json" else sqlite_crm
+            emails = [lead["email"] for lead in backend.iter_leads()]
+            assert sorted(emails) == sorted(f"shared{i}@example.com" for i in range(SHARED_LEADS))
+            assert backend.check_stats() == []
+
+class TestFileIO:
+    """Test cases for the cross-process file helpers"""
+
+    def test_file_lock_is_exclusive(self):
+        """Test a second holder waits until the first releases the lock"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            lock_path = Path(temp_dir) / "crm.lock"
+            events = []
+
+            def second_holder():
+                with file_lock(lock_path):
+                    events.append("second")
+
+            with file_lock(lock_path):
+                thread = threading.Thread(target=second_holder)
+                thread.start()
+                time.sleep(0.1)
+                events.append("first released")
+            thread.join(timeout=5)
+
+            assert events == ["first released", "second"]
+
+    def test_atomic_write_leaves_no_temp_files(self):
+        """Test a replace-on-write keeps only the final file"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "config.json"
+            atomic_write_text(path, "old")
+            atomic_write_text(path, "new")
+
+            assert path.read_text() == "new"
+            assert [p.name for p in Path(temp_dir).iterdir()] == ["config.json"]
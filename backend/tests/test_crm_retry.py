@@ -0,0 +1,88 @@
+import asyncio
+import time
+import tempfile
+import pytest
+import httpx
+from pathlib import Path
+from unittest.mock import patch, AsyncMock
+from services.config_manager import config_manager
+from database import crm
+from database.retry import backoff_delay, DEFAULT_RETRY_SETTINGS
+
+def _crm_settings(**overrides):
+    return {**config_manager.get_config("crm_settings"), "backend": "json", "failure_rate": 0,
+            "dedup": {"enabled": False}, **overrides}
+
+class TestCRMRetry:
+    """Test cases for async CRM saves with backoff"""
+
+    def test_backoff_is_exponential_capped_and_jittered(self):
+        """Test the backoff ceiling doubles per attempt, is capped, and is randomized below it"""
+        settings = {**DEFAULT_RETRY_SETTINGS, "retry_delay": 0.5, "max_retry_delay": 3}
+        with patch('database.retry.random.uniform', side_effect=lambda low, high: high):
+            assert [backoff_delay(attempt, settings) for attempt in range(5)] == [0.5, 1.0, 2.0, 3, 3]
+
+        samples = {backoff_delay(2, settings) for _ in range(50)}
+        assert all(0 <= sample <= 2.0 for sample in samples)
+        assert len(samples) > 1
+
+    @pytest.mark.asyncio
+    async def test_retries_use_crm_settings(self):
+        """Test retry_attempts from crm_settings bounds the attempts"""
+        write = Exception("CRM down")
+        with patch.dict(config_manager.config, {"crm_settings": _crm_settings(retry_attempts=1, retry_delay=0.01)}), \
+                patch('database.mock_crm.write_lead', side_effect=[write, write, None]) as mock_write:
+            assert await crm.save_to_crm({"name": "A"}) == "failure"
+            assert mock_write.call_count == 2
+
+        with patch.dict(config_manager.config, {"crm_settings": _crm_settings(retry_attempts=2, retry_delay=0.01)}), \
+                patch('database.mock_crm.write_lead', side_effect=[write, write, None]) as mock_write:
+            assert await crm.save_to_crm({"name": "A"}) == "success"
+            assert mock_write.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_save_writes_through_json_backend(self):
+        """Test the async save path lands in the lead log"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            crm_file = Path(temp_dir) / "crm.json"
+            with patch.dict(config_manager.config, {"crm_settings": _crm_settings()}), \
+                    patch('database.mock_crm.CRM_FILE', crm_file):
+                assert await crm.save_to_crm({"name": "Async"}) == "success"
+                assert (await crm.get_crm_stats())["total_leads"] == 1
+
+    @pytest.mark.asyncio
+    async def test_other_requests_served_while_save_retries(self):
+        """Test a slow, retrying CRM save doesn't stall the event loop"""
+        from main import app
+        attempts = []
+
+        def flaky_blocking_write(data):
+            attempts.append(time.monotonic())
+            time.sleep(0.1)  # blocking file I/O, now off the loop
+            if len(attempts) < 3:
+                raise Exception("CRM down")
+
+        lead = {"name": "John Doe", "email": "john@example.com", "company": "Example"}
+        transport = httpx.ASGITransport(app=app)
+        with patch.dict(config_manager.config, {"crm_settings": _crm_settings(retry_attempts=3, retry_delay=0.2)}), \
+                patch('database.retry.random.uniform', side_effect=lambda low, high: high), \
+                patch('database.mock_crm.write_lead', side_effect=flaky_blocking_write), \
+                patch('routes.webhook.extract_lead_info', AsyncMock(return_value=lead)):
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                webhook = asyncio.create_task(client.post("/webhook/", json={"message": "hello"}))
+
+                health_latencies = []
+                while not webhook.done():
+                    start = time.monotonic()
+                    response = await client.get("/health")
+                    health_latencies.append(time.monotonic() - start)
+                    assert response.status_code == 200
+                    await asyncio.sleep(0.01)
+
+                response = await webhook
+
+        assert response.json()["save_status"] == "success"
+        assert len(attempts) == 3
+        # ~0.6s of saving and backoff; health checks kept being answered throughout
+        assert len(health_latencies) > 10
+        assert max(health_latencies) < 0.1
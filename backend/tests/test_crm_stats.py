@@ -0,0 +1,137 @@
+import json
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+from services.config_manager import config_manager
+from database import crm, crm_stats, mock_crm, segmented_log, sqlite_crm
+from database.crm_stats import day_of
+
+def _crm_settings(backend="json"):
+    return {**config_manager.get_config("crm_settings"), "backend": backend, "failure_rate": 0}
+
+class TestJSONLStats:
+    """Test cases for the maintained JSONL lead counters"""
+
+    def setup_method(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.crm_file = Path(self.temp_dir.name) / "crm.json"
+        self.crm_patch = patch('database.mock_crm.CRM_FILE', self.crm_file)
+        self.settings_patch = patch.dict(config_manager.config, {"crm_settings": _crm_settings()})
+        self.crm_patch.start()
+        self.settings_patch.start()
+
+    def teardown_method(self):
+        mock_crm.close_all()
+        self.settings_patch.stop()
+        self.crm_patch.stop()
+        self.temp_dir.cleanup()
+
+    def test_stats_do_not_read_leads(self):
+        """Test stats come from the counters, not from re-reading the log"""
+        mock_crm.write_lead({"name": "A"})
+        mock_crm.write_leads([{"name": "B"}, {"name": "C"}])
+
+        with patch.object(segmented_log.SegmentSnapshot, 'lines', side_effect=AssertionError("log read")), \
+                patch.object(segmented_log.SegmentedLog, 'count_leads', side_effect=AssertionError("log read")):
+            stats = mock_crm.get_crm_stats()
+
+        assert stats["total_leads"] == 3
+        assert stats["leads_per_day"] == {day_of(time.time()): 3}
+        assert stats["file_size"] == mock_crm.get_crm_log_path().stat().st_size
+
+    def test_upserts_are_not_counted(self):
+        """Test a merged duplicate doesn't add to the lead count"""
+        mock_crm.write_lead({"name": "A", "email": "a@example.com"})
+        lead_id, _ = mock_crm.find_duplicate("email:a@example.com")
+        mock_crm.update_lead(lead_id, {"name": "A2", "email": "a@example.com"})
+
+        assert mock_crm.get_crm_stats()["total_leads"] == 1
+        assert mock_crm.check_stats() == []
+
+    def test_stale_sidecar_catches_up(self):
+        """Test leads appended behind the sidecar's back are counted from the tail"""
+        mock_crm.write_lead({"name": "A"})
+        # Another worker's append, which this process's log index hasn't seen
+        mock_crm.get_store().active.append({"id": "external", "ts": time.time(), "lead": {"name": "B"}})
+
+        assert mock_crm.get_crm_stats()["total_leads"] == 2
+
+    def test_missing_sidecar_is_rebuilt(self):
+        """Test sealed-segment totals are recounted from the indexes when the sidecar is gone"""
+        storage = {**mock_crm.get_storage_settings(), "max_segment_bytes": 1, "compact_on_rotate": False}
+        with patch.dict(config_manager.config["crm_settings"], {"storage": storage}):
+            for name in ("A", "B", "C"):
+                mock_crm.write_lead({"name": name})
+            assert mock_crm.get_crm_stats()["total_leads"] == 3
+            sidecar_path = self.crm_file.with_suffix(".stats.json")
+            assert json.loads(sidecar_path.read_text())["sealed"]["total_leads"] == 2
+
+            sidecar_path.unlink()
+            mock_crm.close_all()
+
+            assert mock_crm.get_crm_stats()["total_leads"] == 3
+            assert sidecar_path.exists()
+
+    def test_check_and_rebuild(self):
+        """Test check reports tampered counters and rebuild fixes them"""
+        mock_crm.write_leads([{"name": "A"}, {"name": "B"}])
+        mock_crm.get_stats_sidecar().sealed.total_leads = 3
+
+        assert mock_crm.check_stats() == ["total_leads: maintained 5, actual 2"]
+        assert crm_stats.main(["check"]) == 1
+
+        assert crm_stats.main(["rebuild"]) == 0
+        assert mock_crm.check_stats() == []
+        assert crm_stats.main(["check"]) == 0
+
+class TestSQLiteStats:
+    """Test cases for the maintained SQLite lead counters"""
+
+    def setup_method(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_file = Path(self.temp_dir.name) / "crm.db"
+        self.db_patch = patch('database.sqlite_crm.CRM_DB_FILE', self.db_file)
+        self.settings_patch = patch.dict(config_manager.config, {"crm_settings": _crm_settings("sqlite")})
+        self.db_patch.start()
+        self.settings_patch.start()
+
+    def teardown_method(self):
+        sqlite_crm.close_all()
+        self.settings_patch.stop()
+        self.db_patch.stop()
+        self.temp_dir.cleanup()
+
+    def test_counters_follow_inserts(self):
+        """Test single and batch inserts update the per-day counters"""
+        sqlite_crm.write_lead({"name": "A"})
+        sqlite_crm.write_leads([{"name": "B"}, {"name": "C"}])
+
+        stats = sqlite_crm.get_crm_stats()
+        assert stats["total_leads"] == 3
+        assert stats["leads_per_day"] == {day_of(time.time()): 3}
+        assert stats["last_updated"] is not None
+        assert sqlite_crm.check_stats() == []
+
+    def test_existing_database_is_counted_once(self):
+        """Test a database without counters gets them on open"""
+        sqlite_crm.write_leads([{"name": "A"}, {"name": "B"}])
+        db = sqlite_crm.get_db()
+        with db._conn:
+            db._conn.execute("DROP TABLE lead_counts")
+            db._conn.execute("DELETE FROM crm_meta")
+        sqlite_crm.close_all()
+
+        assert sqlite_crm.get_crm_stats()["total_leads"] == 2
+
+    def test_check_and_rebuild(self):
+        """Test the CLI detects drifted counters on the configured backend"""
+        sqlite_crm.write_leads([{"name": "A"}, {"name": "B"}])
+        db = sqlite_crm.get_db()
+        with db._conn:
+            db._conn.execute("UPDATE lead_counts SET leads = leads + 1")
+
+        assert crm.get_backend_name() == "sqlite"
+        assert crm_stats.main(["check"]) == 1
+        assert crm_stats.main(["rebuild"]) == 0
+        assert sqlite_crm.get_crm_stats()["total_leads"] == 2
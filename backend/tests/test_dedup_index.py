@@ -0,0 +1,164 @@
+import asyncio
+import tempfile
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+from services.config_manager import config_manager
+from database import crm, mock_crm, sqlite_crm
+from database.dedup_index import BloomFilter, dedup_key, merge_leads, crm_dedup_index
+
+def _crm_settings(backend="json", **dedup):
+    return {
+        **config_manager.get_config("crm_settings"),
+        "backend": backend,
+        "failure_rate": 0,
+        "dedup": {"enabled": True, "match_name_company": False, "expected_leads": 1000, **dedup}
+    }
+
+class TestBloomFilter:
+    """Test cases for the Bloom filter"""
+
+    def test_no_false_negatives_and_bounded_false_positives(self):
+        """Test every added key is found and non-members rarely are"""
+        bloom = BloomFilter(capacity=10000, false_positive_rate=0.01)
+        for i in range(10000):
+            bloom.add(f"email:lead{i}@example.com")
+
+        assert all(f"email:lead{i}@example.com" in bloom for i in range(10000))
+        false_positives = sum(f"email:other{i}@example.com" in bloom for i in range(10000))
+        assert false_positives / 10000 < 0.02
+        assert bloom.expected_false_positive_rate() == pytest.approx(0.01, abs=0.002)
+        # ~9.6 bits per key at 1%
+        assert 11000 < bloom.memory_bytes < 13000
+
+class TestDedupKeys:
+    """Test cases for lead identity keys and merging"""
+
+    def test_email_key_is_normalized(self):
+        """Test case and whitespace don't change the key, placeholders have none"""
+        assert dedup_key({"email": "  John@Example.COM "}) == "email:john@example.com"
+        assert dedup_key({"email": "unknown@example.com", "name": "Unknown"}) is None
+        assert dedup_key({"email": "", "name": "Jane", "company": "Acme"}) is None
+        assert dedup_key({"email": "", "name": "Jane  Roe", "company": "ACME"}, match_name_company=True) == \
+            "name_company:jane roe|acme"
+        assert dedup_key({"email": "", "name": "Unknown", "company": "Acme"}, match_name_company=True) is None
+
+    def test_merge_keeps_known_values(self):
+        """Test newer real values win and placeholders don't erase data"""
+        existing = {"name": "John Doe", "email": "john@acme.com", "company": "Acme"}
+        assert merge_leads(existing, {"name": "Unknown", "email": "john@acme.com", "company": "NewCo"}) == \
+            {"name": "John Doe", "email": "john@acme.com", "company": "NewCo"}
+
+class TestCRMDeduplication:
+    """Test cases for upserting duplicate leads through the CRM facade"""
+
+    def setup_method(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.patches = [
+            patch('database.mock_crm.CRM_FILE', Path(self.temp_dir.name) / "crm.json"),
+            patch('database.sqlite_crm.CRM_DB_FILE', Path(self.temp_dir.name) / "crm.db")
+        ]
+        for patcher in self.patches:
+            patcher.start()
+
+    def teardown_method(self):
+        sqlite_crm.close_all()
+        for patcher in self.patches:
+            patcher.stop()
+        self.temp_dir.cleanup()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("backend", ["json", "sqlite"])
+    async def test_duplicate_email_is_merged(self, backend):
+        """Test a repeated email updates the stored lead instead of adding one"""
+        with patch.dict(config_manager.config, {"crm_settings": _crm_settings(backend)}):
+            crm.rebuild_dedup_index()
+            assert await crm.save_to_crm({"name": "John Doe", "email": "john@acme.com", "company": "Unknown"}) == "success"
+            assert await crm.save_to_crm({"name": "Jane Roe", "email": "jane@acme.com", "company": "Acme"}) == "success"
+            assert await crm.save_to_crm({"name": "Unknown", "email": "JOHN@acme.com", "company": "Acme"}) == "success"
+
+            stats = await crm.get_crm_stats()
+            leads = list(crm.iter_leads())
+
+        assert stats["total_leads"] == 2
+        assert stats["dedup"]["confirmed_duplicates"] == 1
+        assert {"name": "John Doe", "email": "JOHN@acme.com", "company": "Acme"} in leads
+        assert {"name": "Jane Roe", "email": "jane@acme.com", "company": "Acme"} in leads
+
+    def test_json_duplicate_lookup_uses_the_index(self):
+        """Test the JSON backend finds duplicates by key, with their latest data, without scanning the log"""
+        with patch.dict(config_manager.config, {"crm_settings": _crm_settings()}), \
+                patch('database.mock_crm.iter_records', side_effect=AssertionError("scanned the log")):
+            mock_crm.write_leads([
+                {"name": "John", "email": "john@acme.com", "company": "Acme"},
+                {"name": "Jane Roe", "email": "", "company": "Acme"}
+            ])
+            lead_id, _ = mock_crm.find_duplicate("email:john@acme.com")
+            mock_crm.update_lead(lead_id, {"name": "John Doe", "email": "John@acme.com", "company": "Acme"})
+
+            assert mock_crm.find_duplicate("email:john@acme.com") == (
+                lead_id, {"name": "John Doe", "email": "John@acme.com", "company": "Acme"}
+            )
+            assert mock_crm.find_duplicate("email:jane@acme.com") is None
+            assert mock_crm.find_duplicate("name_company:jane roe|acme") is None
+            assert mock_crm.find_duplicate("name_company:jane roe|acme", True)[1]["name"] == "Jane Roe"
+
+            # Leads saved twice before dedup was on: the latest one wins until it changes email
+            mock_crm.write_leads([{"name": "J1", "email": "j@acme.com"}, {"name": "J2", "email": "j@acme.com"}])
+            latest_id, latest = mock_crm.find_duplicate("email:j@acme.com")
+            assert latest["name"] == "J2"
+            mock_crm.update_lead(latest_id, {"name": "J2", "email": "j2@acme.com"})
+            assert mock_crm.find_duplicate("email:j@acme.com")[1]["name"] == "J1"
+
+    @pytest.mark.asyncio
+    async def test_new_lead_skips_disk_lookup(self):
+        """Test a Bloom-filter miss inserts without looking for a duplicate"""
+        with patch.dict(config_manager.config, {"crm_settings": _crm_settings()}), \
+                patch('database.mock_crm.find_duplicate') as mock_find:
+            crm.rebuild_dedup_index()
+            for i in range(20):
+                assert await crm.save_to_crm({"name": f"Lead {i}", "email": f"lead{i}@new.com", "company": "New"}) == "success"
+
+        mock_find.assert_not_called()
+        assert crm_dedup_index.get_stats()["keys"] == 20
+
+    @pytest.mark.asyncio
+    async def test_rebuild_from_store_and_batch_dedup(self):
+        """Test the index is rebuilt from stored leads and batches dedupe against it"""
+        with patch.dict(config_manager.config, {"crm_settings": _crm_settings()}):
+            mock_crm.write_leads([{"name": "Old", "email": "old@acme.com", "company": "Acme"}])
+            assert crm.rebuild_dedup_index() == 1
+            assert crm_dedup_index.might_contain("email:old@acme.com")
+
+            assert await crm.save_many_to_crm([
+                {"name": "Old Again", "email": "old@acme.com", "company": "Acme"},
+                {"name": "New", "email": "new@acme.com", "company": "Acme"},
+                {"name": "New Again", "email": "NEW@acme.com", "company": "Acme"}
+            ]) == ["success"] * 3
+
+            leads = list(crm.iter_leads())
+
+        assert sorted(lead["name"] for lead in leads) == ["New Again", "Old Again"]
+
+    @pytest.mark.asyncio
+    async def test_batch_reports_each_lead_and_holds_key_locks(self):
+        """Test a batch reports per-lead failures and serializes with single saves of its emails"""
+        with patch.dict(config_manager.config, {"crm_settings": {**_crm_settings(), "retry_attempts": 0}}):
+            mock_crm.write_leads([{"name": "Old", "email": "old@acme.com", "company": "Acme"}])
+            crm.rebuild_dedup_index()
+
+            with patch('database.mock_crm.update_lead', side_effect=Exception("CRM down")):
+                assert await crm.save_many_to_crm([
+                    {"name": "New", "email": "new@acme.com", "company": "Acme"},
+                    {"name": "Old Again", "email": "old@acme.com", "company": "Acme"}
+                ]) == ["success", "failure"]
+
+            # A single save and a batch with the same new email: one inserts, the other merges
+            statuses = await asyncio.gather(
+                crm.save_to_crm({"name": "Race", "email": "race@acme.com", "company": "Unknown"}),
+                crm.save_many_to_crm([{"name": "Unknown", "email": "race@acme.com", "company": "Acme"}])
+            )
+            leads = [lead for lead in crm.iter_leads() if lead["email"] == "race@acme.com"]
+
+        assert statuses == ["success", ["success"]]
+        assert leads == [{"name": "Race", "email": "race@acme.com", "company": "Acme"}]
@@ -0,0 +1,92 @@
+import time
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+from services.extraction_cache import ExtractionCache, DEFAULT_CACHE_SETTINGS
+
+LEAD = {"name": "John Doe", "email": "john@techcorp.com", "company": "TechCorp"}
+EMPTY_LEAD = {"name": "", "email": "", "company": ""}
+
+def _settings(**overrides):
+    return {**DEFAULT_CACHE_SETTINGS, **overrides}
+
+class TestExtractionCache:
+    """Test cases for the extraction result cache"""
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted when full"""
+        cache = ExtractionCache()
+
+        with patch.object(ExtractionCache, 'get_settings', return_value=_settings(max_entries=2)):
+            cache.put("a", LEAD)
+            cache.put("b", LEAD)
+            cache.get("a")  # "a" is now most recently used
+            cache.put("c", LEAD)
+
+            assert cache.get("a") == LEAD
+            assert cache.get("b") is None
+            assert cache.get("c") == LEAD
+            assert cache.evictions == 1
+
+    def test_ttl_expiry_and_negative_ttl(self):
+        """Test entries expire after their TTL, with a separate TTL for negative results"""
+        cache = ExtractionCache()
+        settings = _settings(ttl_seconds=100, negative_ttl_seconds=10)
+
+        with patch.object(ExtractionCache, 'get_settings', return_value=settings):
+            now = time.time()
+            with patch('services.extraction_cache.time.time', return_value=now):
+                cache.put("positive", LEAD)
+                cache.put("negative", EMPTY_LEAD)
+
+            with patch('services.extraction_cache.time.time', return_value=now + 50):
+                assert cache.get("positive") == LEAD
+                assert cache.get("negative") is None
+                assert cache.expirations == 1
+
+    def test_persistence_roundtrip(self):
+        """Test entries survive a save/load cycle"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            settings = _settings(persist_path=str(Path(temp_dir) / "cache.json"))
+
+            with patch.object(ExtractionCache, 'get_settings', return_value=settings):
+                cache = ExtractionCache()
+                cache.put("key", LEAD)
+                assert cache.save()
+
+                restored = ExtractionCache()
+                assert restored.load() == 1
+                assert restored.get("key") == LEAD
+
+    def test_disabled_cache(self):
+        """Test a disabled cache never stores or returns entries"""
+        cache = ExtractionCache()
+
+        with patch.object(ExtractionCache, 'get_settings', return_value=_settings(enabled=False)):
+            cache.put("key", LEAD)
+            assert cache.get("key") is None
+            assert cache.get_stats()["size"] == 0
+
+    def test_key_covers_providers_models_and_endpoints(self):
+        """Test changing a provider, its model or its endpoint changes the key, and spelling out defaults doesn't"""
+        cache = ExtractionCache()
+        llm_settings = {
+            "model": "llama3-70b-8192", "temperature": 0.1, "max_tokens": 500,
+            "api_url": "https://api.groq.com/openai/v1/chat/completions",
+            "providers": [{"name": "groq", "api_key_env": "GROQ_API_KEY"}]
+        }
+        key = cache.make_key("Hi, I'm John", llm_settings, "v1")
+
+        spelled_out = {**llm_settings, "providers": [{
+            "name": "Groq", "model": "llama3-70b-8192",
+            "api_url": "https://api.groq.com/openai/v1/chat/completions/"
+        }]}
+        assert cache.make_key("hi,  I'm John ", spelled_out, "v1") == key
+
+        for providers in (
+            [{"name": "groq", "model": "llama3-8b-8192"}],
+            [{"name": "groq", "api_url": "https://llm.internal/v1/chat/completions"}],
+            [{"name": "openai", "model": "gpt-4o-mini", "api_url": "https://api.openai.com/v1/chat/completions"}],
+            [{"name": "groq"}, {"name": "backup", "model": "llama3-8b-8192"}]
+        ):
+            assert cache.make_key("Hi, I'm John", {**llm_settings, "providers": providers}, "v1") != key
@@ -0,0 +1,73 @@
+from unittest.mock import patch
+from services.fast_extractor import FastPathExtractor, infer_company_from_email
+
+class TestFastPathExtractor:
+    """Test cases for the rule-based fast-path extractor"""
+
+    def test_extract_complete_message(self):
+        """Test a message with name, company and email is fully confident"""
+        extractor = FastPathExtractor()
+
+        lead, confidence = extractor.extract("Hi, I'm John Doe from TechCorp. My email is john@techcorp.com")
+
+        assert lead == {"name": "John Doe", "email": "john@techcorp.com", "company": "TechCorp"}
+        assert confidence == 1.0
+
+    def test_extract_infers_company_from_domain(self):
+        """Test the company is inferred from a corporate email domain"""
+        extractor = FastPathExtractor()
+
+        lead, confidence = extractor.extract("My name is Bob Smith, bob@mail.bigco.co.uk")
+
+        assert lead["company"] == "Bigco"
+        assert confidence == 0.9
+
+    def test_free_mail_domain_not_a_company(self):
+        """Test free mail providers are never used as the company"""
+        assert infer_company_from_email("jane@gmail.com") is None
+        assert infer_company_from_email("jane@acme-labs.io") == "Acme Labs"
+
+    def test_low_confidence_falls_through(self):
+        """Test messages missing fields fall through to the LLM"""
+        extractor = FastPathExtractor()
+        settings = {"enabled": True, "confidence_threshold": 0.9}
+
+        with patch.object(FastPathExtractor, 'get_settings', return_value=settings):
+            assert extractor.try_extract("Hello, contact me at sarah@startup.io") is None
+            assert extractor.try_extract("Hi there") is None
+            assert extractor.try_extract("I'm Jane Roe from Acme, jane@acme.com") is not None
+
+            stats = extractor.get_stats(avg_llm_seconds=0.5)
+            assert stats["attempts"] == 3
+            assert stats["hits"] == 1
+            assert stats["estimated_latency_saved_ms"] > 0
+
+    def test_company_disagreeing_with_domain_is_less_confident(self):
+        """Test a stated company that doesn't match the email domain lowers confidence"""
+        extractor = FastPathExtractor()
+
+        _, confidence = extractor.extract("I'm Omar from Uber, omar@cloudilic.com")
+
+        assert confidence < 0.9
+
+    def test_unbacked_name_is_not_confident(self):
+        """Test a capitalized word after "this is" / "I am" can't carry a hit on its own"""
+        extractor = FastPathExtractor()
+
+        for message in ("This is Urgent! Please call me, bob@acme.com", "I am Very keen to talk. bob@acme.com"):
+            lead, confidence = extractor.extract(message)
+            assert confidence < 0.9, lead
+
+        # The same shape is trusted when the name matches the email
+        _, confidence = extractor.extract("This is Bob! Please call me, bob@acme.com")
+        assert confidence == 0.9
+
+    def test_stated_company_does_not_back_up_a_name(self):
+        """Test filler words next to a company still go to the LLM"""
+        extractor = FastPathExtractor()
+        settings = {"enabled": True, "confidence_threshold": 0.9}
+
+        with patch.object(FastPathExtractor, 'get_settings', return_value=settings):
+            for message in ("This is Urgent! Please reach me at Acme, bob@acme.com",
+                            "I am Happy to hear from Acme Corp. joe@acme.com"):
+                assert extractor.try_extract(message) is None, message
@@ -0,0 +1,148 @@
+import asyncio
+import uuid
+import httpx
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from main import app
+from services.config_manager import config_manager
+from services.idempotency import IdempotencyKeyReused, IdempotencyStore
+
+client = TestClient(app)
+
+EXTRACTED = {"name": "Jane", "email": "jane@acme.com", "company": "Acme"}
+
+def _idempotency_settings(**settings):
+    webhook_settings = config_manager.get_config("webhook_settings")
+    return {"webhook_settings": {**webhook_settings,
+                                 "idempotency": {**webhook_settings.get("idempotency", {}), **settings}}}
+
+class TestIdempotencyStore:
+    """Test cases for the idempotency key store"""
+
+    @pytest.mark.asyncio
+    async def test_retries_replay_the_first_response(self):
+        """Test a key runs once and later calls get the stored response"""
+        store = IdempotencyStore()
+        work = AsyncMock(return_value={"save_status": "success"})
+
+        assert await store.run("key", "fp", work) == ({"save_status": "success"}, False)
+        assert await store.run("key", "fp", work) == ({"save_status": "success"}, True)
+        assert work.await_count == 1
+        with pytest.raises(IdempotencyKeyReused):
+            await store.run("key", "other", work)
+        assert store.get_stats()["conflicts"] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_duplicates_wait_for_the_first(self):
+        """Test duplicates arriving mid-flight share the one execution"""
+        store = IdempotencyStore()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            return "response"
+
+        results = await asyncio.gather(*(store.run("key", "fp", work) for _ in range(5)))
+
+        assert len(calls) == 1
+        assert sorted(replayed for _, replayed in results) == [False, True, True, True, True]
+        assert store.get_stats() == {"stored_keys": 1, "in_flight": 0, "executions": 1, "replays": 0,
+                                     "joined": 4, "conflicts": 0}
+
+    @pytest.mark.asyncio
+    async def test_uncacheable_responses_and_errors_run_again(self):
+        """Test failures are not stored, so the next retry runs"""
+        store = IdempotencyStore()
+        work = AsyncMock(side_effect=[RuntimeError("boom"), "failure", "success"])
+
+        with pytest.raises(RuntimeError):
+            await store.run("key", "fp", work)
+        assert await store.run("key", "fp", work, cacheable=lambda r: r != "failure") == ("failure", False)
+        assert await store.run("key", "fp", work, cacheable=lambda r: r != "failure") == ("success", False)
+        assert await store.run("key", "fp", work) == ("success", True)
+
+    @pytest.mark.asyncio
+    async def test_keys_expire_and_are_bounded(self):
+        """Test keys are dropped after the TTL and beyond max_keys"""
+        store = IdempotencyStore()
+        work = AsyncMock(return_value="response")
+        with patch.dict(config_manager.config, _idempotency_settings(max_keys=2)):
+            for key in ("a", "b", "c"):
+                await store.run(key, "fp", work)
+            assert store.get_stats()["stored_keys"] == 2
+            assert (await store.run("a", "fp", work))[1] is False
+
+        with patch.dict(config_manager.config, _idempotency_settings(ttl_seconds=-1)):
+            await store.run("d", "fp", work)
+            assert (await store.run("d", "fp", work))[1] is False
+
+class TestIdempotentWebhook:
+    """Test cases for Idempotency-Key on the webhook endpoints"""
+
+    @patch("routes.webhook.save_to_crm", new_callable=AsyncMock, return_value="success")
+    @patch("routes.webhook.extract_lead_info", new_callable=AsyncMock, return_value=EXTRACTED)
+    def test_retry_returns_cached_response(self, mock_extract, mock_save):
+        """Test a retried delivery neither extracts nor saves again"""
+        key = uuid.uuid4().hex
+        message = {"message": "Hi, I'm Jane from Acme", "user_id": "sender"}
+        first = client.post("/webhook/", json=message, headers={"Idempotency-Key": key})
+        retry = client.post("/webhook/", json=message, headers={"Idempotency-Key": key})
+
+        assert first.status_code == retry.status_code == 200
+        assert retry.json() == first.json()
+        assert retry.headers["idempotent-replayed"] == "true"
+        assert "idempotent-replayed" not in first.headers
+        assert mock_extract.await_count == 1
+        assert mock_save.await_count == 1
+
+        # The key in the body works the same; a different message with it is rejected
+        assert client.post("/webhook/", json={**message, "idempotency_key": key}).headers["idempotent-replayed"] == "true"
+        conflict = client.post("/webhook/", json={**message, "message": "Something else"}, headers={"Idempotency-Key": key})
+        assert conflict.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_concurrent_duplicates_run_once(self):
+        """Test deliveries racing with the same key share one extraction and save"""
+        async def slow_extract(message):
+            await asyncio.sleep(0.05)
+            return EXTRACTED
+
+        key = uuid.uuid4().hex
+        with patch("routes.webhook.extract_lead_info", AsyncMock(side_effect=slow_extract)) as mock_extract, \
+                patch("routes.webhook.save_to_crm", AsyncMock(return_value="success")) as mock_save:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+                responses = await asyncio.gather(*(
+                    http.post("/webhook/", json={"message": "Hi from Jane"}, headers={"Idempotency-Key": key})
+                    for _ in range(5)
+                ))
+
+        assert {response.status_code for response in responses} == {200}
+        assert len({response.text for response in responses}) == 1
+        assert mock_extract.await_count == 1
+        assert mock_save.await_count == 1
+
+    @patch("routes.webhook.save_to_crm", new_callable=AsyncMock)
+    @patch("routes.webhook.extract_lead_info", new_callable=AsyncMock, return_value=EXTRACTED)
+    def test_failed_saves_are_retried(self, mock_extract, mock_save):
+        """Test a delivery whose CRM save failed runs again on retry"""
+        mock_save.side_effect = ["failure", "success"]
+        key = uuid.uuid4().hex
+        first = client.post("/webhook/", json={"message": "Hi from Jane"}, headers={"Idempotency-Key": key})
+        retry = client.post("/webhook/", json={"message": "Hi from Jane"}, headers={"Idempotency-Key": key})
+
+        assert first.json()["save_status"] == "failure"
+        assert retry.json()["save_status"] == "success"
+        assert mock_save.await_count == 2
+
+    @patch("routes.webhook.save_to_crm", new_callable=AsyncMock, return_value="success")
+    @patch("routes.webhook.extract_lead_info", new_callable=AsyncMock, return_value=EXTRACTED)
+    def test_batch_items_with_the_same_key_run_once(self, mock_extract, mock_save):
+        """Test duplicate keys inside a batch share one delivery"""
+        key = uuid.uuid4().hex
+        item = {"message": "Hi from Jane", "idempotency_key": key}
+        response = client.post("/webhook/batch", json=[item, item, {"message": "Hi from John"}])
+
+        assert response.json()["summary"] == {"success": 3}
+        assert mock_extract.await_count == 2
@@ -0,0 +1,31 @@
+import json
+from services.json_stream import JSONObjectStreamParser
+
+class TestJSONObjectStreamParser:
+    """Test cases for the incremental JSON object parser"""
+
+    def test_object_split_across_chunks(self):
+        """Test an object is returned only once its closing brace arrives"""
+        parser = JSONObjectStreamParser()
+
+        assert parser.feed('Sure! { "name": "Jo') == []
+        assert parser.feed('hn", "email": "j@x.com",') == []
+        completed = parser.feed(' "company": "X" } and more text')
+
+        assert [json.loads(obj) for obj in completed] == [{"name": "John", "email": "j@x.com", "company": "X"}]
+
+    def test_braces_inside_strings_are_ignored(self):
+        """Test braces and escaped quotes inside strings don't end the object"""
+        parser = JSONObjectStreamParser()
+
+        completed = parser.feed('{"name": "a } \\" {", "nested": {"k": 1}}')
+
+        assert json.loads(completed[0]) == {"name": 'a } " {', "nested": {"k": 1}}
+
+    def test_multiple_objects(self):
+        """Test consecutive objects are all returned"""
+        parser = JSONObjectStreamParser()
+
+        completed = parser.feed('{"a": 1} text {"b": 2}')
+
+        assert completed == ['{"a": 1}', '{"b": 2}']
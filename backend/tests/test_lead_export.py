@@ -0,0 +1,116 @@
+import csv
+import gzip
+import io
+import json
+import tempfile
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from main import app
+from services.auth import create_access_token
+from services.config_manager import config_manager
+from database import lead_export, mock_crm, sqlite_crm
+from database.lead_export import export_leads, iter_csv, iter_ndjson
+
+client = TestClient(app)
+
+DAY = 86400.0
+
+def _auth(username="admin"):
+    return {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+
+def _crm_settings(backend="json"):
+    return {**config_manager.get_config("crm_settings"), "backend": backend, "failure_rate": 0}
+
+class TestLeadExport:
+    """Test cases for streaming lead export"""
+
+    def setup_method(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.patches = [
+            patch('database.mock_crm.CRM_FILE', Path(self.temp_dir.name) / "crm.json"),
+            patch('database.sqlite_crm.CRM_DB_FILE', Path(self.temp_dir.name) / "crm.db")
+        ]
+        for patcher in self.patches:
+            patcher.start()
+
+    def teardown_method(self):
+        mock_crm.close_all()
+        sqlite_crm.close_all()
+        for patcher in self.patches:
+            patcher.stop()
+        self.temp_dir.cleanup()
+
+    def _seed_json(self):
+        mock_crm.get_store().append_many([
+            {"id": "a", "ts": 10 * DAY, "lead": {"name": "Ann", "email": "ann@acme.com", "company": "Acme"}},
+            {"id": "b", "ts": 11 * DAY, "lead": {"name": "Bob", "email": "bob@globex.com", "company": "Globex"}},
+            {"id": "c", "ts": 12 * DAY, "lead": {"name": "Cid", "email": "cid@acme.com", "company": "ACME"}}
+        ])
+
+    def test_ndjson_export_with_filters(self):
+        """Test time-range and company filters on the NDJSON stream"""
+        with patch.dict(config_manager.config, {"crm_settings": _crm_settings()}):
+            self._seed_json()
+            body = b"".join(export_leads("ndjson", start=10 * DAY, end=12 * DAY + 1, company="acme"))
+
+        rows = [json.loads(line) for line in body.splitlines()]
+        assert [row["id"] for row in rows] == ["a", "c"]
+        assert rows[0]["created_at"] == "1970-01-11T00:00:00+00:00"
+        assert rows[1]["lead"]["company"] == "ACME"
+
+    @pytest.mark.parametrize("backend", ["json", "sqlite"])
+    def test_csv_export_from_each_backend(self, backend):
+        """Test CSV export reads leads through the configured backend"""
+        with patch.dict(config_manager.config, {"crm_settings": _crm_settings(backend)}):
+            backend_module = mock_crm if backend == "json" else sqlite_crm
+            backend_module.write_leads([
+                {"name": "Ann", "email": "ann@acme.com", "company": "Acme"},
+                {"name": "Bob", "email": "bob@globex.com", "company": "Globex"}
+            ])
+            body = b"".join(export_leads("csv", company="ACME")).decode("utf-8")
+
+        rows = list(csv.DictReader(io.StringIO(body)))
+        assert [row["name"] for row in rows] == ["Ann"]
+        assert rows[0]["created_at"]
+
+    def test_csv_neutralizes_formulas(self):
+        """Test cells that a spreadsheet would run as formulas are quoted"""
+        records = [{"id": "x", "ts": None, "lead": {"name": "=HYPERLINK(\"http://evil\")", "email": "a,b@c.com", "company": "-1"}}]
+
+        rows = list(csv.reader(io.StringIO(b"".join(iter_csv(records)).decode("utf-8"))))
+
+        assert rows[1] == ["x", "", "'=HYPERLINK(\"http://evil\")", "a,b@c.com", "'-1"]
+
+    def test_output_is_chunked(self):
+        """Test rows are streamed in bounded chunks rather than one buffer"""
+        records = ({"id": str(i), "ts": i, "lead": {"name": "x" * 100}} for i in range(5000))
+
+        with patch.object(lead_export, 'CHUNK_BYTES', 4096):
+            chunks = list(iter_ndjson(records))
+
+        assert len(chunks) > 100
+        assert max(len(chunk) for chunk in chunks) < 4096 + 1024
+        assert sum(chunk.count(b"\n") for chunk in chunks) == 5000
+
+    def test_export_endpoint_gzip(self):
+        """Test the endpoint streams a gzip attachment to admins"""
+        with patch.dict(config_manager.config, {"crm_settings": _crm_settings()}):
+            self._seed_json()
+            response = client.get(
+                "/webhook/crm-export",
+                params={"format": "ndjson", "gzip": "true", "start": "1970-01-12T00:00:00"},
+                headers=_auth()
+            )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/gzip"
+        assert 'filename="leads.ndjson.gz"' in response.headers["content-disposition"]
+        rows = [json.loads(line) for line in gzip.decompress(response.content).splitlines()]
+        assert [row["id"] for row in rows] == ["b", "c"]
+
+    def test_export_endpoint_requires_admin(self):
+        """Test regular users and unknown formats are rejected"""
+        assert client.get("/webhook/crm-export", headers=_auth("user")).status_code == 403
+        assert client.get("/webhook/crm-export", params={"format": "xml"}, headers=_auth()).status_code == 422
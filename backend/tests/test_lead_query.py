@@ -0,0 +1,140 @@
+import tempfile
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from main import app
+from services.auth import create_access_token
+from services.config_manager import config_manager
+from database import crm, mock_crm, sqlite_crm
+from database.query_index import LeadQueryIndex
+
+client = TestClient(app)
+
+DAY = 86400.0
+
+def _auth(username="user"):
+    return {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+
+def _crm_settings(backend="json"):
+    return {**config_manager.get_config("crm_settings"), "backend": backend, "failure_rate": 0}
+
+def _lead(i):
+    return {"name": f"Lead {i}", "email": f"lead{i}@{'acme.com' if i % 2 else 'globex.org'}",
+            "company": "Acme" if i % 3 == 0 else "Initech"}
+
+class TestLeadQuery:
+    """Test cases for the paged lead query API"""
+
+    def setup_method(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.patches = [
+            patch('database.mock_crm.CRM_FILE', Path(self.temp_dir.name) / "crm.json"),
+            patch('database.sqlite_crm.CRM_DB_FILE', Path(self.temp_dir.name) / "crm.db")
+        ]
+        for patcher in self.patches:
+            patcher.start()
+
+    def teardown_method(self):
+        mock_crm.close_all()
+        sqlite_crm.close_all()
+        for patcher in self.patches:
+            patcher.stop()
+        self.temp_dir.cleanup()
+
+    async def _query_all(self, **filters):
+        names, cursor, pages = [], None, 0
+        while True:
+            page = await crm.query_leads(limit=3, cursor=cursor, **filters)
+            names += [record["lead"]["name"] for record in page["leads"]]
+            pages += 1
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return names, pages
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("backend", ["json", "sqlite"])
+    async def test_filters_and_cursor_pagination(self, backend):
+        """Test company and email domain filters page through every match exactly once"""
+        with patch.dict(config_manager.config, {"crm_settings": _crm_settings(backend)}):
+            backend_module = mock_crm if backend == "json" else sqlite_crm
+            backend_module.write_leads([_lead(i) for i in range(20)])
+
+            names, pages = await self._query_all(company="ACME")
+            assert names == [f"Lead {i}" for i in range(0, 20, 3)]
+            assert pages == 3
+
+            names, _ = await self._query_all(company="acme", email_domain="ACME.com")
+            assert names == ["Lead 3", "Lead 9", "Lead 15"]
+
+            names, _ = await self._query_all(email_domain="globex.org")
+            assert names == [f"Lead {i}" for i in range(0, 20, 2)]
+
+            assert (await crm.query_leads(company="Nobody")) == {"leads": [], "next_cursor": None}
+
+    @pytest.mark.asyncio
+    async def test_date_range_on_json_backend(self):
+        """Test start/end bounds select leads by save time"""
+        with patch.dict(config_manager.config, {"crm_settings": _crm_settings()}):
+            mock_crm.get_store().append_many([
+                {"id": str(day), "ts": day * DAY, "lead": _lead(day)} for day in range(10)
+            ])
+
+            names, _ = await self._query_all(start=3 * DAY, end=7 * DAY)
+            assert names == [f"Lead {day}" for day in range(3, 7)]
+            names, _ = await self._query_all(start=2 * DAY, company="Acme")
+            assert names == ["Lead 3", "Lead 6", "Lead 9"]
+
+    @pytest.mark.asyncio
+    async def test_updates_and_new_leads_are_picked_up(self):
+        """Test the JSON index follows updates and appends made after it was built"""
+        with patch.dict(config_manager.config, {"crm_settings": _crm_settings()}):
+            mock_crm.write_leads([{"name": "Ann", "email": "ann@acme.com", "company": "Unknown"}])
+            first = await crm.query_leads(company="Unknown")
+            assert [record["lead"]["name"] for record in first["leads"]] == ["Ann"]
+
+            mock_crm.update_lead(first["leads"][0]["id"], {"name": "Ann", "email": "ann@acme.com", "company": "Acme"})
+            mock_crm.write_lead({"name": "Bob", "email": "bob@acme.com", "company": "Acme"})
+
+            assert (await crm.query_leads(company="Unknown"))["leads"] == []
+            names = [record["lead"]["name"] for record in (await crm.query_leads(company="acme"))["leads"]]
+            assert names == ["Ann", "Bob"]
+
+    def test_index_survives_compaction(self):
+        """Test an index reading a segment that gets compacted keeps each lead once"""
+        crm_settings = _crm_settings()
+        crm_settings["storage"] = {**crm_settings.get("storage", {}), "max_segment_bytes": 1, "compact_on_rotate": False}
+        with patch.dict(config_manager.config, {"crm_settings": crm_settings}):
+            store = mock_crm.get_store()
+            store.append_many([{"id": "a", "ts": 1.0, "lead": {"name": "A", "company": "Acme"}}])
+            store.append_many([{"op": "upsert", "id": "a", "ts": 2.0, "lead": {"name": "A2", "company": "Acme"}}])
+            index = LeadQueryIndex(store)
+            index.refresh()
+
+            store.compact()
+            store.append_many([{"id": "b", "ts": 3.0, "lead": {"name": "B", "company": "Acme"}}])
+            records, _ = index.query(company="acme")
+
+            assert [record["lead"]["name"] for record in records] == ["A2", "B"]
+
+    def test_query_endpoint(self):
+        """Test the endpoint returns pages with ISO times and rejects bad cursors"""
+        with patch.dict(config_manager.config, {"crm_settings": _crm_settings()}):
+            mock_crm.write_leads([_lead(i) for i in range(5)])
+            response = client.get("/webhook/crm-leads", params={"email_domain": "acme.com", "limit": 1},
+                                  headers=_auth("admin"))
+            assert response.status_code == 200
+            page = response.json()
+            assert page["leads"][0]["lead"]["name"] == "Lead 1"
+            assert page["leads"][0]["created_at"].endswith("+00:00")
+
+            response = client.get("/webhook/crm-leads", params={"email_domain": "acme.com", "cursor": page["next_cursor"]},
+                                  headers=_auth("admin"))
+            assert [lead["lead"]["name"] for lead in response.json()["leads"]] == ["Lead 3"]
+
+            assert client.get("/webhook/crm-leads", params={"cursor": "bogus!"}, headers=_auth("admin")).status_code == 400
+            assert client.get("/webhook/crm-leads", params={"limit": 0}, headers=_auth("admin")).status_code == 422
+
+    def test_query_endpoint_is_admin_only(self):
+        """Test regular users can't page through every lead"""
+        assert client.get("/webhook/crm-leads", headers=_auth("user")).status_code == 403
@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from services.llm_batcher import ExtractionBatcher, DEFAULT_BATCHING_SETTINGS
+
+LLM_SETTINGS = {"model": "llama3-70b-8192", "temperature": 0.2, "max_tokens": 200}
+
+def _lead(message):
+    return {"name": message, "email": f"{message}@example.com", "company": "Example"}
+
+def _settings(**overrides):
+    return {**DEFAULT_BATCHING_SETTINGS, "enabled": True, **overrides}
+
+class TestExtractionBatcher:
+    """Test cases for LLM extraction micro-batching"""
+
+    @pytest.mark.asyncio
+    async def test_batches_by_size(self):
+        """Test a full batch is sent as one request and results fan back out in order"""
+        batch_calls = []
+
+        async def send_batch(messages, llm_settings):
+            batch_calls.append(list(messages))
+            return [_lead(message) for message in messages]
+
+        async def send_single(message, llm_settings):
+            raise AssertionError("single requests should not be needed")
+
+        batcher = ExtractionBatcher(send_batch, send_single)
+        with patch.object(ExtractionBatcher, 'get_settings', return_value=_settings(max_batch_size=3, max_wait_ms=1000)):
+            results = await asyncio.gather(*(batcher.submit(m, LLM_SETTINGS) for m in ["a", "b", "c"]))
+
+        assert batch_calls == [["a", "b", "c"]]
+        assert [result["name"] for result in results] == ["a", "b", "c"]
+        assert batcher.get_stats()["batch_size"]["count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_flushes_after_max_wait(self):
+        """Test a partial batch is sent once the wait window closes"""
+        async def send_batch(messages, llm_settings):
+            return [_lead(message) for message in messages]
+
+        async def send_single(message, llm_settings):
+            return _lead(message)
+
+        batcher = ExtractionBatcher(send_batch, send_single)
+        with patch.object(ExtractionBatcher, 'get_settings', return_value=_settings(max_batch_size=10, max_wait_ms=5)):
+            results = await asyncio.gather(batcher.submit("a", LLM_SETTINGS), batcher.submit("b", LLM_SETTINGS))
+
+        assert [result["name"] for result in results] == ["a", "b"]
+        assert batcher.batches_sent == 1
+        assert batcher.wait_ms_histogram.count == 2
+
+    @pytest.mark.asyncio
+    async def test_retries_only_failed_items(self):
+        """Test items missing from a partial batch response are retried individually"""
+        single_calls = []
+
+        async def send_batch(messages, llm_settings):
+            return [_lead(messages[0]), None, _lead(messages[2])]
+
+        async def send_single(message, llm_settings):
+            single_calls.append(message)
+            return _lead(message)
+
+        batcher = ExtractionBatcher(send_batch, send_single)
+        with patch.object(ExtractionBatcher, 'get_settings', return_value=_settings(max_batch_size=3)):
+            results = await asyncio.gather(*(batcher.submit(m, LLM_SETTINGS) for m in ["a", "b", "c"]))
+
+        assert single_calls == ["b"]
+        assert [result["name"] for result in results] == ["a", "b", "c"]
+        assert batcher.items_retried == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_request_retries_all(self):
+        """Test a failed batch request falls back to individual requests"""
+        async def send_batch(messages, llm_settings):
+            raise RuntimeError("boom")
+
+        async def send_single(message, llm_settings):
+            return None if message == "b" else _lead(message)
+
+        batcher = ExtractionBatcher(send_batch, send_single)
+        with patch.object(ExtractionBatcher, 'get_settings', return_value=_settings(max_batch_size=2)):
+            results = await asyncio.gather(batcher.submit("a", LLM_SETTINGS), batcher.submit("b", LLM_SETTINGS))
+
+        assert results[0]["name"] == "a"
+        assert results[1] is None
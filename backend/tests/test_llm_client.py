@@ -0,0 +1,51 @@
+import pytest
+from unittest.mock import patch
+from services.llm_client import LLMClientManager
+
+class TestLLMClientManager:
+    """Test cases for the shared LLM client pool"""
+
+    def test_build_client_uses_llm_settings(self):
+        """Test pool limits and timeouts are read from llm_settings"""
+        settings = {
+            "pool": {"max_connections": 7, "max_keepalive_connections": 3, "keepalive_expiry": 12.0},
+            "timeouts": {"connect": 1.5, "read": 9.0}
+        }
+
+        with patch('services.llm_client.config_manager.get_config', return_value=settings):
+            manager = LLMClientManager()
+            client = manager.build_client()
+
+            pool = client._transport._pool
+            assert pool._max_connections == 7
+            assert pool._max_keepalive_connections == 3
+            assert pool._keepalive_expiry == 12.0
+            assert client.timeout.connect == 1.5
+            assert client.timeout.read == 9.0
+            # Unspecified phases fall back to the defaults
+            assert client.timeout.write == 10.0
+
+    @pytest.mark.asyncio
+    async def test_get_client_is_shared(self):
+        """Test the same pooled client is reused across calls"""
+        manager = LLMClientManager()
+        await manager.startup()
+
+        try:
+            assert manager.get_client() is manager.get_client()
+        finally:
+            await manager.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_shutdown_closes_client(self):
+        """Test shutdown closes the client and a later call recreates it"""
+        manager = LLMClientManager()
+        await manager.startup()
+        client = manager.get_client()
+
+        await manager.shutdown()
+
+        assert client.is_closed
+        new_client = manager.get_client()
+        assert new_client is not client
+        await manager.shutdown()
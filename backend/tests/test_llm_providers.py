@@ -0,0 +1,105 @@
+import asyncio
+import json
+import pytest
+import httpx
+from unittest.mock import patch
+from services.config_manager import config_manager
+from services.llm_providers import ProviderRouter
+from services import agent
+
+LEAD = {"name": "Jane Roe", "email": "jane@acme.com", "company": "Acme"}
+
+def _llm_settings(hedging_enabled=False):
+    return {
+        **config_manager.get_config("llm_settings"),
+        "stream": False,
+        "providers": [
+            {"name": "primary", "api_url": "http://primary.local/v1/chat/completions"},
+            {"name": "secondary", "api_url": "http://secondary.local/v1/chat/completions", "model": "backup-model"}
+        ],
+        "hedging": {"enabled": hedging_enabled, "default_delay_ms": 20, "min_delay_ms": 1, "min_samples": 20},
+        "rate_limit": {"enabled": False}
+    }
+
+def _fake_servers(latency_s, status=None):
+    """Mock transport standing in for two local servers with per-host latency and status"""
+    seen = []
+
+    async def handler(request):
+        host = request.url.host.split(".")[0]
+        seen.append((host, json.loads(request.content)["model"]))
+        await asyncio.sleep(latency_s.get(host, 0))
+        if status and host in status:
+            return httpx.Response(status[host], json={"error": "down"})
+        return httpx.Response(200, json={"choices": [{"message": {"content": json.dumps({**LEAD, "company": host})}}]})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler)), seen
+
+class TestProviderRouter:
+    """Test cases for multi-provider failover and hedging"""
+
+    @pytest.mark.asyncio
+    async def test_failover_to_next_provider(self):
+        """Test a failing primary falls over to the secondary's model and URL"""
+        client, seen = _fake_servers({}, status={"primary": 503})
+        settings = _llm_settings()
+        router = ProviderRouter()
+
+        with patch.dict(config_manager.config, {"llm_settings": settings}), \
+                patch('services.agent.provider_router', router), \
+                patch('services.agent.llm_client.get_client', return_value=client):
+            result = await agent._request_extraction("Failover please", settings)
+
+        await client.aclose()
+        assert result["company"] == "secondary"
+        assert seen == [("primary", settings["model"]), ("secondary", "backup-model")]
+        assert router.failovers == 1
+
+    @pytest.mark.asyncio
+    async def test_hedge_wins_when_primary_is_slow(self):
+        """Test a slow primary is raced by a hedge and the loser is cancelled"""
+        client, seen = _fake_servers({"primary": 1.0, "secondary": 0.01})
+        settings = _llm_settings(hedging_enabled=True)
+        router = ProviderRouter()
+
+        with patch.dict(config_manager.config, {"llm_settings": settings}), \
+                patch('services.agent.provider_router', router), \
+                patch('services.agent.llm_client.get_client', return_value=client):
+            start = asyncio.get_running_loop().time()
+            result = await agent._request_extraction("Hedge please", settings)
+            elapsed = asyncio.get_running_loop().time() - start
+
+        await client.aclose()
+        assert result["company"] == "secondary"
+        assert elapsed < 0.5
+        assert router.hedges == 1
+        assert router.hedge_wins == 1
+
+    @pytest.mark.asyncio
+    async def test_no_hedge_when_primary_is_fast(self):
+        """Test a primary answering within its hedge delay is used alone"""
+        client, seen = _fake_servers({"primary": 0.0})
+        settings = _llm_settings(hedging_enabled=True)
+        router = ProviderRouter()
+
+        with patch.dict(config_manager.config, {"llm_settings": settings}), \
+                patch('services.agent.provider_router', router), \
+                patch('services.agent.llm_client.get_client', return_value=client):
+            result = await agent._request_extraction("Fast primary", settings)
+
+        await client.aclose()
+        assert result["company"] == "primary"
+        assert [host for host, _ in seen] == ["primary"]
+        assert router.hedges == 0
+
+    def test_hedge_delay_uses_observed_p95(self):
+        """Test the hedge delay tracks the provider's p95 once enough samples exist"""
+        router = ProviderRouter()
+        with patch.dict(config_manager.config, {"llm_settings": _llm_settings(hedging_enabled=True)}):
+            primary = router.get_providers()[0]
+            assert router.hedge_delay(primary) == pytest.approx(0.02)
+
+            for index in range(100):
+                primary.record_success((index + 1) / 1000)
+
+            assert router.hedge_delay(primary) == pytest.approx(0.096)
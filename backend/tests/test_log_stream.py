@@ -0,0 +1,156 @@
+import json
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from main import app
+from services.config_manager import config_manager
+from services.log_stream import LogBroadcaster
+from services.webhook_log import EGYPT_TIMEZONE, WebhookLogBuffer
+
+client = TestClient(app)
+
+@pytest.fixture(autouse=True)
+def memory_source():
+    """Stream from the in-memory ring; polls are run by the tests"""
+    webhook_settings = {
+        **config_manager.get_config("webhook_settings"),
+        "log_store": {"enabled": False},
+        "stream": {"poll_interval_ms": 60000, "max_queue": 10, "max_subscribers": 5}
+    }
+    with patch.dict(config_manager.config, {"webhook_settings": webhook_settings}):
+        yield
+
+def _log(buffer, user_id, save_status="success"):
+    return buffer.append(user_id, "session", f"hello from {user_id}", {"name": user_id}, save_status,
+                         datetime.now(EGYPT_TIMEZONE))
+
+def _drain(subscriber):
+    events = []
+    while not subscriber.queue.empty():
+        events.append(subscriber.queue.get_nowait())
+    return events
+
+def _parse(event):
+    fields = dict(line.split(": ", 1) for line in event.decode().strip().split("\n"))
+    return fields["event"], json.loads(fields["data"]), fields.get("id")
+
+class TestLogBroadcaster:
+    """Test cases for streaming webhook logs to subscribers"""
+
+    @pytest.mark.asyncio
+    async def test_fan_out_encodes_each_event_once(self):
+        """Test every admin gets the same encoded events and users only their own"""
+        buffer = WebhookLogBuffer(capacity=100)
+        broadcaster = LogBroadcaster(buffer)
+        admins = [await broadcaster.subscribe(None) for _ in range(3)]
+        alice = await broadcaster.subscribe("alice")
+        try:
+            _log(buffer, "alice")
+            _log(buffer, "bob", "failure")
+            assert await broadcaster.poll() == 2
+
+            admin_events = [_drain(admin) for admin in admins]
+            assert all(len(events) == 3 for events in admin_events)
+            # The very same bytes objects: encoded once, not per subscriber
+            assert all(a is b for a, b in zip(admin_events[0], admin_events[1]))
+            kind, log, event_id = _parse(admin_events[0][1])
+            assert (kind, log["user_id"], log["save_status"], event_id) == ("log", "bob", "failure", "2")
+            assert _parse(admin_events[0][2])[1] == {"requests": 2, "save_status": {"success": 1, "failure": 1}}
+
+            alice_events = [_parse(event) for event in _drain(alice)]
+            assert [kind for kind, _, _ in alice_events] == ["log", "stats"]
+            assert alice_events[0][1]["id"] == "1"
+            assert alice_events[1][1] == {"requests": 1, "save_status": {"success": 1}}
+            # 2 logs + the admin and alice stats deltas
+            assert broadcaster.get_stats()["events_encoded"] == 4
+        finally:
+            await broadcaster.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_slow_subscriber_is_disconnected(self):
+        """Test a subscriber that falls max_queue events behind gets its stream ended"""
+        buffer = WebhookLogBuffer(capacity=100)
+        broadcaster = LogBroadcaster(buffer)
+        subscriber = await broadcaster.subscribe(None)
+        try:
+            for _ in range(12):
+                _log(buffer, "alice")
+            await broadcaster.poll()
+
+            assert _drain(subscriber) == [None]
+            assert broadcaster.get_stats()["disconnected_slow"] == 1
+            assert broadcaster.get_stats()["subscribers"] == 0
+        finally:
+            await broadcaster.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_reconnect_replays_missed_logs(self):
+        """Test Last-Event-ID replays the visible entries logged since"""
+        buffer = WebhookLogBuffer(capacity=100)
+        broadcaster = LogBroadcaster(buffer)
+        first = await broadcaster.subscribe(None)
+        try:
+            for user_id in ("alice", "bob", "alice", "alice"):
+                _log(buffer, user_id)
+            await broadcaster.poll()
+
+            resumed = await broadcaster.subscribe("alice", last_event_id=1)
+            assert [_parse(event)[2] for event in _drain(resumed)] == ["3", "4"]
+        finally:
+            broadcaster.unsubscribe(first)
+            await broadcaster.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_logs_published_during_replay_follow_it(self):
+        """Test entries published while a reconnect's replay is read are neither lost nor reordered"""
+        buffer = WebhookLogBuffer(capacity=100)
+        broadcaster = LogBroadcaster(buffer)
+        first = await broadcaster.subscribe(None)
+        try:
+            for user_id in ("alice", "bob", "alice"):
+                _log(buffer, user_id)
+            await broadcaster.poll()
+            read_records = broadcaster._records_after
+
+            async def publish_during_replay(from_store, after, limit):
+                # The replay read sees the new entry too; the live stream must deliver it once, after the replay
+                replay = await read_records(from_store, after, limit)
+                with patch.object(broadcaster, "_records_after", read_records):
+                    _log(buffer, "alice")
+                    await broadcaster.poll()
+                return replay + await read_records(from_store, replay[-1].seq, limit)
+
+            with patch.object(broadcaster, "_records_after", publish_during_replay):
+                resumed = await broadcaster.subscribe("alice", last_event_id=1)
+
+            events = [_parse(event) for event in _drain(resumed)]
+            assert [(kind, event_id) for kind, _, event_id in events] == [("log", "3"), ("log", "4"), ("stats", None)]
+        finally:
+            broadcaster.unsubscribe(first)
+            await broadcaster.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_events_until_shutdown(self):
+        """Test the SSE body starts with a retry hint and ends when the app stops"""
+        buffer = WebhookLogBuffer(capacity=100)
+        broadcaster = LogBroadcaster(buffer)
+        subscriber = await broadcaster.subscribe(None)
+        stream = broadcaster.stream(subscriber)
+
+        assert await stream.__anext__() == b"retry: 3000\n\n"
+        _log(buffer, "alice")
+        await broadcaster.poll()
+        assert _parse(await stream.__anext__())[0] == "log"
+        assert _parse(await stream.__anext__())[0] == "stats"
+        await broadcaster.shutdown()
+        assert [chunk async for chunk in stream] == []
+        assert broadcaster.get_stats()["subscribers"] == 0
+
+class TestStreamEndpoint:
+    """Test cases for /webhook/stream"""
+
+    def test_requires_authentication(self):
+        """Test streams need a bearer token or ?token="""
+        assert client.get("/webhook/stream").status_code == 401
+        assert client.get("/webhook/stream", params={"token": "not-a-token"}).status_code == 401
@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+import httpx
+from unittest.mock import patch
+from services.rate_limiter import (
+    AdaptiveRateLimiter, TokenBucket, parse_duration, DEFAULT_RATE_LIMIT_SETTINGS
+)
+
+def _settings(**overrides):
+    return {**DEFAULT_RATE_LIMIT_SETTINGS, **overrides}
+
+class TestRateLimiter:
+    """Test cases for the adaptive LLM rate limiter"""
+
+    def test_parse_duration(self):
+        """Test provider reset/retry header formats"""
+        assert parse_duration("3") == 3.0
+        assert parse_duration("7.66s") == pytest.approx(7.66)
+        assert parse_duration("1m26.4s") == pytest.approx(86.4)
+        assert parse_duration("250ms") == pytest.approx(0.25)
+        assert parse_duration("soon") is None
+
+    def test_token_bucket_delay(self):
+        """Test an exhausted bucket reports how long until budget refills"""
+        bucket = TokenBucket(per_minute=60)
+        bucket.consume(60)
+
+        assert bucket.delay_for(1) == pytest.approx(1.0, abs=0.05)
+        assert TokenBucket(None).delay_for(10 ** 6) == 0.0
+
+    @pytest.mark.asyncio
+    async def test_callers_queue_at_the_concurrency_limit(self):
+        """Test callers beyond the limit wait instead of failing"""
+        with patch.object(AdaptiveRateLimiter, 'get_settings',
+                          return_value=_settings(initial_concurrency=2, max_concurrency=2)):
+            limiter = AdaptiveRateLimiter()
+            active = []
+            peak = []
+
+            async def call():
+                async with limiter.acquire():
+                    active.append(1)
+                    peak.append(len(active))
+                    await asyncio.sleep(0.01)
+                    active.pop()
+
+            await asyncio.gather(*(call() for _ in range(6)))
+
+            assert max(peak) == 2
+            assert limiter.in_flight == 0
+            assert limiter.wait_ms_histogram.count == 6
+
+    @pytest.mark.asyncio
+    async def test_throttling_halves_limit_and_reads_headers(self):
+        """Test a 429 backs the limit off and rate-limit headers size the buckets"""
+        with patch.object(AdaptiveRateLimiter, 'get_settings',
+                          return_value=_settings(initial_concurrency=8)):
+            limiter = AdaptiveRateLimiter()
+            response = httpx.Response(429, headers={
+                "retry-after": "0",
+                "x-ratelimit-limit-requests": "30",
+                "x-ratelimit-remaining-requests": "0",
+                "x-ratelimit-limit-tokens": "6000",
+                "x-ratelimit-remaining-tokens": "5000"
+            })
+
+            async with limiter.acquire(100) as permit:
+                permit.record_response(response)
+
+            assert limiter.limit == 4
+            assert limiter.throttled_responses == 1
+            assert limiter.request_bucket.capacity == 30
+            assert limiter.request_bucket.tokens < 1
+            assert limiter.token_bucket.capacity == 6000
+
+    @pytest.mark.asyncio
+    async def test_success_increases_limit(self):
+        """Test successful calls grow the limit additively"""
+        with patch.object(AdaptiveRateLimiter, 'get_settings',
+                          return_value=_settings(initial_concurrency=4)):
+            limiter = AdaptiveRateLimiter()
+
+            async with limiter.acquire():
+                pass
+
+            assert limiter.limit == pytest.approx(4.25)
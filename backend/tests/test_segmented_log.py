@@ -0,0 +1,117 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+from database import segmented_log
+from database.segmented_log import SegmentedLog
+
+def _record(lead_id, ts, name):
+    return {"id": lead_id, "ts": ts, "lead": {"name": name}}
+
+def _upsert(lead_id, ts, name):
+    return {"op": "upsert", "id": lead_id, "ts": ts, "lead": {"name": name}}
+
+class TestSegmentedLog:
+    """Test cases for the segmented CRM lead log"""
+
+    def setup_method(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "crm.jsonl"
+        # Seal after every append so each day below lands in its own segment
+        self.log = SegmentedLog(self.path, max_segment_bytes=1, index_interval=2, compact_on_rotate=False)
+
+    def teardown_method(self):
+        self.log.close()
+        self.temp_dir.cleanup()
+
+    def _names(self, **kwargs):
+        return [record["lead"]["name"] for record in self.log.iter_records(**kwargs)]
+
+    def test_rotation_seals_indexed_segments(self):
+        """Test full segments are sealed with an index and reads span all segments"""
+        self.log.append_many([_record("a", 100.0, "A"), _record("b", 150.0, "B")])
+        self.log.append_many([_record("c", 200.0, "C")])
+        self.log.append_many([_record("d", 300.0, "D")])
+
+        assert self.log.sealed_numbers() == [1, 2]
+        index = json.loads(self.log.index_path(1).read_text())
+        assert index["records"] == 2
+        assert (index["min_ts"], index["max_ts"]) == (100.0, 150.0)
+        assert index["counters"]["total_leads"] == 2
+        assert self._names() == ["A", "B", "C", "D"]
+
+    def test_time_range_reads_only_relevant_segments(self):
+        """Test a time-range read skips segments and chunks outside the range"""
+        for day in range(5):
+            self.log.append_many([_record(f"{day}-{i}", day * 86400.0 + i, f"{day}-{i}") for i in range(4)])
+
+        read = []
+        real_lines = segmented_log.SegmentSnapshot.lines
+
+        def spy(snapshot, start=0, end=None):
+            read.append((snapshot.number, start))
+            return real_lines(snapshot, start, end)
+
+        with patch.object(segmented_log.SegmentSnapshot, 'lines', spy):
+            names = self._names(start=2 * 86400.0 + 2, end=3 * 86400.0 + 1)
+
+        assert names == ["2-2", "2-3", "3-0"]
+        # Day 2's second chunk, day 3's first chunk and the unindexed active segment (day 4)
+        assert sorted({number for number, _ in read}) == [3, 4, 5]
+        assert len([entry for entry in read if entry[0] == 3]) == 1
+
+    def test_updated_leads_keep_their_position(self):
+        """Test an updated lead is read at its original position with its latest data"""
+        self.log.append_many([_record("a", 1.0, "A"), _record("b", 2.0, "B")])
+        self.log.append_many([_upsert("a", 3.0, "A2")])
+
+        assert self._names() == ["A2", "B"]
+        assert self._names(start=0.5, end=1.5) == ["A2"]
+
+    def test_compaction_drops_superseded_versions(self):
+        """Test compaction folds the newest sealed version into the original and drops upserts"""
+        self.log.append_many([_record("a", 1.0, "A"), _record("b", 2.0, "B")])
+        self.log.append_many([_upsert("a", 3.0, "A2")])
+        self.log.append_many([_upsert("a", 4.0, "A3"), _upsert("b", 5.0, "B2")])
+        self.log.append_many([_record("c", 6.0, "C")])
+        self.log.append_many([_upsert("b", 7.0, "B3")])  # stays in the active segment
+        before = self.log.total_size()
+
+        result = self.log.compact()
+
+        assert result["dropped"] == 3
+        assert self.log.total_size() < before
+        assert self._names() == ["A3", "B3", "C"]
+        sealed = [json.loads(self.log.index_path(number).read_text()) for number in self.log.sealed_numbers()]
+        assert sum(index["upserts"] for index in sealed) == 0
+        assert sum(index["counters"]["total_leads"] for index in sealed) == 3
+        assert self.log.compact() == {"segments": 0, "dropped": 0}
+
+    def test_snapshot_survives_compaction(self):
+        """Test a read started before a compaction finishes on the old segments"""
+        self.log.append_many([_record("a", 1.0, "A")])
+        self.log.append_many([_upsert("a", 2.0, "A2")])
+        self.log.append_many([_record("b", 3.0, "B")])
+
+        records = self.log.iter_records()
+        assert next(records)["lead"]["name"] == "A2"
+        self.log.compact()
+
+        assert [record["lead"]["name"] for record in records] == ["B"]
+
+    def test_age_based_rotation(self):
+        """Test the active segment is sealed once its first record is too old"""
+        log = SegmentedLog(self.path, max_segment_seconds=60, compact_on_rotate=False)
+        log.append_many([_record("a", 1.0, "A")])
+        log.append_many([_record("b", 2.0, "B")])
+
+        assert log.sealed_numbers() == [1]
+
+    def test_torn_tail_is_terminated_before_appending(self):
+        """Test a crashed partial write doesn't swallow the next record"""
+        log = SegmentedLog(self.path, compact_on_rotate=False)
+        self.path.write_text(json.dumps(_record("a", 1.0, "A")) + "\n" + '{"id": "b", "ts": 2.0, "le')
+
+        log.append_many([_record("c", 3.0, "C")])
+
+        assert [record["lead"]["name"] for record in log.iter_records()] == ["A", "C"]
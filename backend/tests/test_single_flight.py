@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+from services.single_flight import SingleFlight
+
+class TestSingleFlight:
+    """Test cases for in-flight request coalescing"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_execution(self):
+        """Test identical concurrent calls run the work once"""
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+
+        assert results == ["result"] * 5
+        assert len(calls) == 1
+        assert flight.get_stats() == {"in_flight": 0, "executions": 1, "coalesced_calls": 4}
+
+    @pytest.mark.asyncio
+    async def test_sequential_calls_run_again(self):
+        """Test a finished call is not reused by later callers"""
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            return len(calls)
+
+        assert await flight.do("key", work) == 1
+        assert await flight.do("key", work) == 2
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate_to_all_callers(self):
+        """Test every coalesced caller sees the shared failure"""
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        results = await asyncio.gather(flight.do("key", work), flight.do("key", work), return_exceptions=True)
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        """Test cancelling the first caller leaves the shared call running"""
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        first = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert await second == "done"
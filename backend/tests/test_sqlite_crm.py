@@ -0,0 +1,72 @@
+import pytest
+import sqlite3
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+from services.config_manager import config_manager
+from database import crm, sqlite_crm
+
+class TestSQLiteCRM:
+    """Test cases for the SQLite CRM backend"""
+
+    def setup_method(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_file = Path(self.temp_dir.name) / "crm.db"
+        self.db_patch = patch('database.sqlite_crm.CRM_DB_FILE', self.db_file)
+        self.db_patch.start()
+
+    def teardown_method(self):
+        sqlite_crm.close_all()
+        self.db_patch.stop()
+        self.temp_dir.cleanup()
+
+    def test_save_and_stats(self):
+        """Test saved leads are counted and the database runs in WAL mode"""
+        assert sqlite_crm.save_to_crm({"name": "John Doe", "email": "john@example.com", "company": "Example"}) == "success"
+        assert sqlite_crm.save_to_crm({"name": "Jane Roe", "email": "jane@example.com", "company": "Example"}) == "success"
+
+        stats = sqlite_crm.get_crm_stats()
+        assert stats["total_leads"] == 2
+        assert stats["last_updated"] is not None
+        assert stats["file_size"] > 0
+
+        journal_mode = sqlite3.connect(str(self.db_file)).execute("PRAGMA journal_mode").fetchone()[0]
+        assert journal_mode == "wal"
+
+    def test_indexed_lookups(self):
+        """Test email/company lookups are case-insensitive and use the indexes"""
+        sqlite_crm.save_many_to_crm([
+            {"name": "John Doe", "email": "John@Example.com", "company": "Example"},
+            {"name": "Jane Roe", "email": "jane@other.com", "company": "Other"},
+            {"name": "John Doe", "email": "john@example.com", "company": "Example Two"}
+        ])
+
+        assert [lead["company"] for lead in sqlite_crm.find_leads(email="john@example.com")] == ["Example", "Example Two"]
+        assert [lead["name"] for lead in sqlite_crm.find_leads(company="other")] == ["Jane Roe"]
+        assert len(sqlite_crm.find_leads(email="john@example.com", company="example")) == 1
+
+        plan = sqlite3.connect(str(self.db_file)).execute(
+            "EXPLAIN QUERY PLAN " + sqlite_crm.SELECT_BY_EMAIL_SQL, ("x",)
+        ).fetchall()
+        assert any("idx_leads_email" in row[-1] for row in plan)
+
+    def test_batch_insert(self):
+        """Test the executemany path stores every lead in order"""
+        leads = [{"name": f"Lead {i}", "email": f"lead{i}@example.com", "company": "Bulk"} for i in range(500)]
+
+        assert sqlite_crm.save_many_to_crm(leads) == ["success"] * 500
+
+        assert sqlite_crm.get_crm_stats()["total_leads"] == 500
+        assert sqlite_crm.find_leads(company="bulk") == leads
+
+    @pytest.mark.asyncio
+    async def test_backend_selected_from_config(self):
+        """Test crm_settings.backend routes saves to the SQLite backend"""
+        crm_settings = {**config_manager.get_config("crm_settings"), "backend": "sqlite"}
+        with patch.dict(config_manager.config, {"crm_settings": crm_settings}):
+            assert await crm.save_to_crm({"name": "Via Facade", "email": "f@f.com", "company": "F"}) == "success"
+            stats = await crm.get_crm_stats()
+
+        assert stats["backend"] == "sqlite"
+        assert stats["total_leads"] == 1
+        assert sqlite_crm.find_leads(email="f@f.com")[0]["name"] == "Via Facade"
@@ -1,8 +1,10 @@
+import asyncio
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import patch, AsyncMock
 from main import app
 from models.lead import WebhookMessage
+from services.config_manager import config_manager
 
 client = TestClient(app)
 
@@ -173,4 +175,63 @@ class TestWebhookEndpoints:
 
                 assert response.status_code == 200
                 data = response.json()
-                assert data["extracted"] == expected_extracted 
\ No newline at end of file
+                assert data["extracted"] == expected_extracted
+
+class TestWebhookBatch:
+    """Test cases for the batch webhook endpoint"""
+
+    def _batch_settings(self, **batch):
+        webhook_settings = config_manager.get_config("webhook_settings")
+        return {"webhook_settings": {**webhook_settings, "batch": {**webhook_settings.get("batch", {}), **batch}}}
+
+    def test_batch_results_in_order_with_bounded_concurrency(self):
+        """Test results come back in request order and at most max_concurrency run at once"""
+        in_flight = []
+        peak = []
+
+        async def slow_extract(message):
+            in_flight.append(message)
+            peak.append(len(in_flight))
+            # Later messages finish first
+            await asyncio.sleep(0.01 * (10 - int(message.split()[-1])))
+            in_flight.remove(message)
+            return {"name": f"Lead {message.split()[-1]}", "email": "", "company": ""}
+
+        payloads = [{"message": f"message {i}", "user_id": "batcher"} for i in range(10)]
+        with patch('routes.webhook.extract_lead_info', side_effect=slow_extract), \
+                patch('routes.webhook.save_to_crm', AsyncMock(return_value="success")), \
+                patch.dict(config_manager.config, self._batch_settings(max_concurrency=3)):
+            response = client.post("/webhook/batch", json=payloads)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [result["extracted"]["name"] for result in data["results"]] == [f"Lead {i}" for i in range(10)]
+        assert data["total"] == 10
+        assert data["summary"] == {"success": 10}
+        assert max(peak) == 3
+
+    def test_batch_item_failure_is_isolated(self):
+        """Test one failing message doesn't fail the rest of the batch"""
+        async def extract(message):
+            if message == "boom":
+                raise RuntimeError("extraction crashed")
+            return {"name": "Jane", "email": "jane@acme.com", "company": "Acme"}
+
+        payloads = [{"message": "ok"}, {"message": "boom"}, {"message": "ok too"}]
+        with patch('routes.webhook.extract_lead_info', side_effect=extract), \
+                patch('routes.webhook.save_to_crm', AsyncMock(return_value="success")):
+            response = client.post("/webhook/batch", json=payloads)
+
+        statuses = [result["save_status"] for result in response.json()["results"]]
+        assert statuses == ["success", "error", "success"]
+        assert response.json()["summary"] == {"success": 2, "error": 1}
+
+    def test_batch_size_limit(self):
+        """Test oversized batches are rejected before any processing"""
+        with patch('routes.webhook.extract_lead_info') as mock_extract, \
+                patch.dict(config_manager.config, self._batch_settings(max_items=2)):
+            response = client.post("/webhook/batch", json=[{"message": "m"}] * 3)
+
+        assert response.status_code == 413
+        mock_extract.assert_not_called()
+        assert client.post("/webhook/batch", json={"message": "not a list"}).status_code == 422
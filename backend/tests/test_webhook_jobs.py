@@ -0,0 +1,196 @@
+import asyncio
+import json
+import tempfile
+import time
+import httpx
+import pytest
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from main import app
+from services.config_manager import config_manager
+from services.webhook_jobs import CallbackURLError, QueueFullError, WebhookJobQueue, check_callback_url
+
+def _job_settings(**jobs):
+    webhook_settings = config_manager.get_config("webhook_settings")
+    return {"webhook_settings": {**webhook_settings, "jobs": {**webhook_settings.get("jobs", {}), **jobs}}}
+
+async def _wait_until_finished(jobs):
+    for _ in range(200):
+        if all(job.finished_at is not None for job in jobs):
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("jobs did not finish")
+
+class TestWebhookJobQueue:
+    """Test cases for the background webhook job queue"""
+
+    @pytest.mark.asyncio
+    async def test_workers_process_jobs_concurrently(self):
+        """Test jobs run on the worker pool and their results and metrics are recorded"""
+        running = []
+        peak = []
+
+        async def process(payload):
+            running.append(payload)
+            peak.append(len(running))
+            await asyncio.sleep(0.02)
+            running.remove(payload)
+            return {"echo": payload}
+
+        queue = WebhookJobQueue(process)
+        with patch.dict(config_manager.config, _job_settings(workers=3)):
+            jobs = [queue.submit(i) for i in range(9)]
+            await _wait_until_finished(jobs)
+            stats = queue.get_stats()
+            await queue.shutdown()
+
+        assert [job.result for job in jobs] == [{"echo": i} for i in range(9)]
+        assert all(job.status == "done" for job in jobs)
+        assert max(peak) == 3
+        assert stats["completed"] == 9
+        assert stats["workers"] == 3
+        assert stats["end_to_end_ms"]["count"] == 9
+        assert 0 < stats["utilization"] <= 1
+
+    @pytest.mark.asyncio
+    async def test_full_queue_rejects_and_failures_are_recorded(self):
+        """Test a full queue refuses work and a crashing message marks its job failed"""
+        async def process(payload):
+            raise RuntimeError("pipeline crashed")
+
+        queue = WebhookJobQueue(process)
+        with patch.dict(config_manager.config, _job_settings(workers=1, max_queue=1)):
+            job = queue.submit("first")
+            with pytest.raises(QueueFullError):
+                queue.submit("second")
+            await _wait_until_finished([job])
+            await queue.shutdown()
+
+        assert job.status == "failed"
+        assert job.error == "pipeline crashed"
+        assert queue.get_stats()["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_finished_jobs_expire(self):
+        """Test finished jobs beyond max_results are dropped oldest first"""
+        queue = WebhookJobQueue(AsyncMock(return_value={}))
+        with patch.dict(config_manager.config, _job_settings(max_results=2)):
+            jobs = [queue.submit(i) for i in range(3)]
+            await _wait_until_finished(jobs)
+            latest = queue.submit(3)
+            await queue.shutdown()
+
+        assert queue.get_job(jobs[0].id) is None
+        assert queue.get_job(latest.id) is latest
+
+    @pytest.mark.asyncio
+    async def test_slow_job_does_not_hold_back_expiry(self):
+        """Test jobs that finished behind a still-running one expire on time"""
+        release = asyncio.Event()
+
+        async def process(payload):
+            if payload == "slow":
+                await release.wait()
+            return {}
+
+        queue = WebhookJobQueue(process)
+        with patch.dict(config_manager.config, _job_settings(workers=3, result_ttl_seconds=0)):
+            slow = queue.submit("slow")
+            fast = [queue.submit(i) for i in range(2)]
+            await _wait_until_finished(fast)
+            latest = queue.submit("latest")
+
+            assert [queue.get_job(job.id) for job in fast] == [None, None]
+            assert queue.get_job(slow.id) is slow
+            release.set()
+            await _wait_until_finished([slow, latest])
+            await queue.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_callback_is_posted(self):
+        """Test the finished job is POSTed to its callback URL"""
+        received = []
+
+        def handler(request):
+            received.append((str(request.url), json.loads(request.content)))
+            return httpx.Response(200)
+
+        queue = WebhookJobQueue(AsyncMock(return_value={"save_status": "success"}))
+        queue._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with patch.dict(config_manager.config, _job_settings(callback_allowed_hosts=["sender.test"])):
+            job = queue.submit("message", "http://sender.test/done")
+            await _wait_until_finished([job])
+            await queue.shutdown()
+
+        url, body = received[0]
+        assert url == "http://sender.test/done"
+        assert (body["job_id"], body["status"], body["result"]) == (job.id, "done", {"save_status": "success"})
+        assert job.callback_status == "sent"
+
+    @pytest.mark.asyncio
+    async def test_callback_to_internal_address_is_not_sent(self):
+        """Test the address is checked again when the callback is sent"""
+        received = []
+        queue = WebhookJobQueue(AsyncMock(return_value={"save_status": "success"}))
+        queue._http_client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: received.append(1)))
+        job = queue.submit("message", "http://169.254.169.254/latest/meta-data/")
+        await _wait_until_finished([job])
+        await queue.shutdown()
+
+        assert received == []
+        assert job.callback_status == "rejected"
+
+    def test_callback_urls_must_resolve_to_public_addresses(self):
+        """Test loopback, private, link-local and unresolvable hosts are refused unless allowed"""
+        for url in ("http://127.0.0.1/", "http://localhost:8000/", "https://10.0.0.5/hook",
+                    "http://169.254.169.254/", "http://[::1]/", "http://0.0.0.0/", "http://no-such-host.invalid/"):
+            with pytest.raises(CallbackURLError):
+                check_callback_url(url, [])
+        check_callback_url("http://8.8.8.8/hook", [])
+        check_callback_url("http://localhost:8000/", ["LOCALHOST"])
+
+class TestAsyncWebhookEndpoint:
+    """Test cases for the webhook's async mode"""
+
+    def test_async_mode_returns_202_and_job_status(self):
+        """Test mode=async answers 202 and the status endpoint reports the result"""
+        extracted = {"name": "Jane", "email": "jane@acme.com", "company": "Acme"}
+        # The client runs the app's startup, which opens the CRM and the log store
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                patch('database.mock_crm.CRM_FILE', Path(temp_dir) / "crm.json"), \
+                patch('database.webhook_log_store.WEBHOOK_LOG_DB_FILE', Path(temp_dir) / "webhook_logs.db"), \
+                patch('routes.webhook.extract_lead_info', AsyncMock(return_value=extracted)), \
+                patch('routes.webhook.save_to_crm', AsyncMock(return_value="success")), \
+                TestClient(app) as client:
+            response = client.post("/webhook/", params={"mode": "async"}, json={"message": "Hi from Jane"})
+            assert response.status_code == 202
+            status_url = response.json()["status_url"]
+            assert response.headers["location"] == status_url
+
+            for _ in range(100):
+                job = client.get(status_url).json()
+                if job["status"] == "done":
+                    break
+                time.sleep(0.01)
+
+            assert job["result"]["extracted"] == extracted
+            assert job["result"]["save_status"] == "success"
+            assert client.get("/webhook/jobs/unknown").status_code == 404
+
+    def test_loopback_callback_url_is_rejected(self):
+        """Test a callback to the server's own loopback is refused before anything is queued"""
+        client = TestClient(app)
+        with patch('routes.webhook.webhook_jobs.submit') as submit:
+            response = client.post("/webhook/", params={"mode": "async"},
+                                   json={"message": "hi", "callback_url": "http://127.0.0.1/"})
+        assert response.status_code == 422
+        assert "non-public" in response.json()["detail"]
+        submit.assert_not_called()
+
+    def test_invalid_callback_url_is_rejected(self):
+        """Test only http(s) callback URLs are accepted"""
+        client = TestClient(app)
+        response = client.post("/webhook/", params={"mode": "async"},
+                               json={"message": "hi", "callback_url": "file:///etc/passwd"})
+        assert response.status_code == 422
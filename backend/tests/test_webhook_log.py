@@ -0,0 +1,100 @@
+from datetime import datetime
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from main import app
+from services.auth import create_access_token
+from services.config_manager import config_manager
+from services.user_manager import user_manager
+from services.webhook_log import EGYPT_TIMEZONE, WebhookLogBuffer
+
+client = TestClient(app)
+
+def _auth(username="admin"):
+    return {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+
+def _fill(buffer, total, user_id="user"):
+    for index in range(total):
+        buffer.append(user_id, "session", f"message {index}", {"name": f"Lead {index}"}, "success",
+                      datetime.now(EGYPT_TIMEZONE))
+
+class TestWebhookLogBuffer:
+    """Test cases for the webhook log ring buffer"""
+
+    def test_keeps_only_the_newest_entries(self):
+        """Test appends past capacity overwrite the oldest entries"""
+        buffer = WebhookLogBuffer(capacity=5)
+        _fill(buffer, 12)
+
+        logs = buffer.page(limit=50)
+        assert [log["id"] for log in logs] == ["8", "9", "10", "11", "12"]
+        assert logs[-1]["message"] == "message 11"
+        assert logs[-1]["retry_info"] == {"has_retries": True, "final_status": "success"}
+        assert buffer.get_stats() == {"capacity": 5, "entries": 5, "first_id": 8, "last_id": 12}
+
+    def test_after_and_before_cursors(self):
+        """Test after returns the oldest newer entries and before the newest older ones"""
+        buffer = WebhookLogBuffer(capacity=100)
+        _fill(buffer, 30)
+
+        assert [log["id"] for log in buffer.page(limit=3)] == ["28", "29", "30"]
+        assert [log["id"] for log in buffer.page(limit=3, after=10)] == ["11", "12", "13"]
+        assert [log["id"] for log in buffer.page(limit=3, before=10)] == ["7", "8", "9"]
+        assert [log["id"] for log in buffer.page(limit=50, after=10, before=13)] == ["11", "12"]
+        assert buffer.page(limit=3, after=30) == []
+        # A cursor older than the buffer starts at the oldest entry held
+        buffer = WebhookLogBuffer(capacity=5)
+        _fill(buffer, 12)
+        assert [log["id"] for log in buffer.page(limit=2, after=1)] == ["8", "9"]
+
+    def test_user_filter(self):
+        """Test entries can be filtered by user"""
+        buffer = WebhookLogBuffer(capacity=100)
+        _fill(buffer, 3, "alice")
+        _fill(buffer, 3, "bob")
+
+        assert [log["id"] for log in buffer.page(limit=2, user_id="alice")] == ["2", "3"]
+        assert [log["id"] for log in buffer.page(limit=50, after=2, user_id="bob")] == ["4", "5", "6"]
+
+    def test_capacity_follows_config(self):
+        """Test changing log_capacity resizes the buffer and keeps the newest entries"""
+        buffer = WebhookLogBuffer()
+        webhook_settings = {**config_manager.get_config("webhook_settings"), "log_capacity": 4}
+        with patch.dict(config_manager.config, {"webhook_settings": webhook_settings}):
+            _fill(buffer, 6)
+            assert buffer.capacity == 4
+            assert [log["id"] for log in buffer.page()] == ["3", "4", "5", "6"]
+
+class TestWebhookLogsEndpoint:
+    """Test cases for cursors on /webhook/logs"""
+
+    @patch("routes.webhook.save_to_crm", new_callable=AsyncMock, return_value="success")
+    @patch("routes.webhook.extract_lead_info", new_callable=AsyncMock)
+    def test_poll_for_new_logs(self, mock_extract, mock_save):
+        """Test a dashboard polling with after gets only logs it has not seen (in-memory logs)"""
+        webhook_settings = {**config_manager.get_config("webhook_settings"), "log_store": {"enabled": False}}
+        with patch.dict(config_manager.config, {"webhook_settings": webhook_settings}):
+            self._poll_for_new_logs(mock_extract)
+
+    def _poll_for_new_logs(self, mock_extract):
+        mock_extract.return_value = {"name": "Ahmed", "email": "", "company": "Dragify"}
+        session = {"user_id": "user@dragify.com", "session_id": user_manager.create_session("user@dragify.com")}
+        client.post("/webhook/", json={"message": "first", **session})
+        last_id = client.get("/webhook/logs", params={"limit": 1}, headers=_auth()).json()[-1]["id"]
+
+        client.post("/webhook/", json={"message": "second", **session})
+        client.post("/webhook/", json={"message": "third", **session})
+        new_logs = client.get("/webhook/logs", params={"after": last_id}, headers=_auth()).json()
+        assert [log["message"] for log in new_logs] == ["second", "third"]
+        assert [int(log["id"]) for log in new_logs] == [int(last_id) + 1, int(last_id) + 2]
+
+        # Regular users page their own logs with the same ids
+        own_logs = client.get("/webhook/logs", params={"after": last_id}, headers=_auth("user")).json()
+        assert [log["id"] for log in own_logs] == [log["id"] for log in new_logs]
+        older = client.get("/webhook/logs", params={"before": new_logs[0]["id"], "limit": 1},
+                           headers=_auth("user")).json()
+        assert [log["id"] for log in older] == [last_id]
+
+    def test_invalid_limit(self):
+        """Test the page size is bounded"""
+        response = client.get("/webhook/logs", params={"limit": 0}, headers=_auth())
+        assert response.status_code == 422
@@ -0,0 +1,150 @@
+import asyncio
+import tempfile
+import time
+import pytest
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from main import app
+from services.auth import create_access_token
+from services.config_manager import config_manager
+from services.user_manager import user_manager
+from services.webhook_log import EGYPT_TIMEZONE, LogRecord, WebhookLogBuffer
+from database import webhook_log_store
+from database.webhook_log_store import WebhookLogStore, WebhookLogWriter, webhook_log_writer
+
+client = TestClient(app)
+
+def _auth(username="admin"):
+    return {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+
+def _record(seq, user_id="alice", session_id="s1", save_status="success", ts=None):
+    return LogRecord(seq, ts if ts is not None else time.time(), user_id, session_id, f"message {seq}",
+                     {"name": f"Lead {seq}"}, save_status)
+
+@pytest.fixture
+def store_path():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "webhook_logs.db"
+        with patch.object(webhook_log_store, "WEBHOOK_LOG_DB_FILE", path):
+            yield path
+        webhook_log_store.close_all()
+
+class TestWebhookLogStore:
+    """Test cases for the SQLite webhook log store"""
+
+    def test_filters_and_cursors(self, store_path):
+        """Test pages filter on the indexed fields and follow after/before cursors"""
+        store = WebhookLogStore(store_path)
+        store.insert_many([
+            _record(i, user_id="alice" if i % 2 else "bob", session_id=f"s{i % 3}",
+                    save_status="success" if i % 4 else "failure")
+            for i in range(1, 21)
+        ])
+
+        assert [log["id"] for log in store.query(limit=3)] == ["18", "19", "20"]
+        assert [log["id"] for log in store.query(limit=3, after=5)] == ["6", "7", "8"]
+        assert [log["id"] for log in store.query(limit=2, before=5)] == ["3", "4"]
+        assert [log["id"] for log in store.query(limit=50, user_id="bob", save_status="failure")] == \
+            ["4", "8", "12", "16", "20"]
+        assert [log["id"] for log in store.query(limit=2, session_id="s0", after=3)] == ["6", "9"]
+
+        log = store.query(limit=1)[0]
+        assert log["extracted"] == {"name": "Lead 20"}
+        assert log["timestamp"].utcoffset() == EGYPT_TIMEZONE.utcoffset(None)
+        assert log["retry_info"] == {"has_retries": False, "final_status": "failure"}
+        store.close()
+
+    def test_time_filters_and_prune(self, store_path):
+        """Test time bounds filter through the ts index and old entries are pruned"""
+        store = WebhookLogStore(store_path)
+        now = time.time()
+        store.insert_many([_record(i, ts=now - (10 - i) * 86400) for i in range(10)])
+
+        assert [log["id"] for log in store.query(start=now - 3.5 * 86400, end=now - 0.5 * 86400)] == \
+            ["8", "9", "10"]
+        assert store.query(start=now + 60) == []
+        assert store.prune(now - 5.5 * 86400) == 5
+        assert [log["id"] for log in store.query(limit=2, after=0)] == ["6", "7"]
+        store.close()
+
+    def test_time_filters_do_not_assume_ids_follow_time(self, store_path):
+        """Test entries written out of time order (several workers) are filtered by their own ts"""
+        store = WebhookLogStore(store_path)
+        now = time.time()
+        store.insert_many([_record(i, ts=now + offset) for i, offset in enumerate((2, 1, 4, 3), 1)])
+
+        assert [log["id"] for log in store.query(start=now + 1.5, end=now + 3.5)] == ["1", "4"]
+        assert store.prune(now + 2.5) == 2
+        assert [log["id"] for log in store.query()] == ["3", "4"]
+        store.close()
+
+    def test_user_stats(self, store_path):
+        """Test per-user counts come from one grouped query"""
+        store = WebhookLogStore(store_path)
+        store.insert_many([_record(1, "alice", ts=100.0), _record(2, "alice", save_status="failure", ts=200.0),
+                           _record(3, "bob", ts=300.0)])
+
+        assert store.user_stats() == {
+            "alice": {"total": 2, "successful": 1, "last_ts": 200.0},
+            "bob": {"total": 1, "successful": 1, "last_ts": 300.0}
+        }
+        assert store.user_stats("carol") == {}
+        store.close()
+
+class TestWebhookLogWriter:
+    """Test cases for the background writer"""
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_new_entries_in_batches(self, store_path):
+        """Test flush copies what the ring gained since the last flush"""
+        buffer = WebhookLogBuffer(capacity=100)
+        writer = WebhookLogWriter(buffer)
+        for index in range(5):
+            buffer.append(f"user{index}", "s", f"m{index}", {}, "success", datetime.now(EGYPT_TIMEZONE))
+
+        webhook_settings = {**config_manager.get_config("webhook_settings"),
+                            "log_store": {"enabled": True, "batch_size": 2}}
+        with patch.dict(config_manager.config, {"webhook_settings": webhook_settings}):
+            assert await writer.flush() == 5
+            assert await writer.flush() == 0
+        assert writer.flushes == 3
+        assert [log["message"] for log in webhook_log_store.query_logs(limit=10)] == ["m0", "m1", "m2", "m3", "m4"]
+
+    @pytest.mark.asyncio
+    async def test_entries_overwritten_before_flush_are_counted(self, store_path):
+        """Test a writer that falls behind the ring reports the dropped entries"""
+        buffer = WebhookLogBuffer(capacity=3)
+        writer = WebhookLogWriter(buffer)
+        for index in range(7):
+            buffer.append("user", "s", f"m{index}", {}, "success", datetime.now(EGYPT_TIMEZONE))
+
+        assert await writer.flush() == 3
+        assert writer.get_stats()["entries_dropped"] == 4
+        assert writer.get_stats()["backlog"] == 0
+
+class TestStoredLogsEndpoint:
+    """Test cases for /webhook/logs and user stats served from the store"""
+
+    @patch("routes.webhook.save_to_crm", new_callable=AsyncMock, return_value="success")
+    @patch("routes.webhook.extract_lead_info", new_callable=AsyncMock)
+    def test_logs_are_filtered_from_the_store(self, mock_extract, mock_save, store_path):
+        """Test logs written by the writer are filtered by session and status and count in user stats"""
+        mock_extract.return_value = {"name": "Ahmed", "email": "", "company": "Dragify"}
+        session_id = user_manager.create_session("user@dragify.com")
+        webhook_log_writer.written_seq = webhook_log_writer.buffer.next_seq - 1
+        client.post("/webhook/", json={"message": "first", "user_id": "user@dragify.com", "session_id": session_id})
+        client.post("/webhook/", json={"message": "no lead", "user_id": "someone-else"})
+        asyncio.run(webhook_log_writer.flush())
+
+        logs = client.get("/webhook/logs", params={"session_id": session_id}, headers=_auth()).json()
+        assert [log["message"] for log in logs] == ["first"]
+        own = client.get("/webhook/logs", headers=_auth("user")).json()
+        assert [log["message"] for log in own] == ["first"]
+        assert client.get("/webhook/logs", params={"save_status": "failure"}, headers=_auth()).json() == []
+        assert user_manager.get_user_stats("user@dragify.com")["total_requests"] == 1
+        assert set(user_manager.get_all_users_stats()) == {"user@dragify.com", "someone-else"}
+
+        stats = client.get("/webhook/log-stats", headers=_auth()).json()
+        assert stats["store"]["backlog"] == 0
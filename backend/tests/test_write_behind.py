@@ -0,0 +1,134 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from database.write_behind import WriteBehindBuffer, DEFAULT_WRITE_BEHIND_SETTINGS
+
+def _settings(**overrides):
+    return {**DEFAULT_WRITE_BEHIND_SETTINGS, "enabled": True, **overrides}
+
+class RecordingWriter:
+    """Fake CRM batch write that records each group commit"""
+
+    def __init__(self, status="success"):
+        self.batches = []
+        self.status = status
+        self.release = None
+
+    async def __call__(self, leads):
+        if self.release is not None:
+            await self.release.wait()
+        self.batches.append(list(leads))
+        if callable(self.status):
+            return [self.status(lead) for lead in leads]
+        return [self.status] * len(leads)
+
+class TestWriteBehindBuffer:
+    """Test cases for the CRM write-behind buffer"""
+
+    @pytest.mark.asyncio
+    async def test_group_commit_by_size(self):
+        """Test concurrent saves are committed in batch_size groups"""
+        writer = RecordingWriter()
+        buffer = WriteBehindBuffer(writer)
+        with patch.object(WriteBehindBuffer, 'get_settings', return_value=_settings(batch_size=3, flush_interval_ms=1000)):
+            results = await asyncio.gather(*(buffer.submit({"name": f"Lead {i}"}) for i in range(6)))
+
+        assert results == ["success"] * 6
+        assert [len(batch) for batch in writer.batches] == [3, 3]
+        assert buffer.get_stats()["flushes"] == 2
+
+    @pytest.mark.asyncio
+    async def test_flush_after_interval(self):
+        """Test a lone save is committed once flush_interval_ms passes"""
+        writer = RecordingWriter()
+        buffer = WriteBehindBuffer(writer)
+        with patch.object(WriteBehindBuffer, 'get_settings', return_value=_settings(batch_size=100, flush_interval_ms=10)):
+            result = await asyncio.wait_for(buffer.submit({"name": "Solo"}), timeout=1)
+
+        assert result == "success"
+        assert writer.batches == [[{"name": "Solo"}]]
+
+    @pytest.mark.asyncio
+    async def test_ack_on_enqueue_and_shutdown_flush(self):
+        """Test ack-on-enqueue answers at once and shutdown commits what's buffered"""
+        writer = RecordingWriter()
+        buffer = WriteBehindBuffer(writer)
+        with patch.object(WriteBehindBuffer, 'get_settings', return_value=_settings(ack="enqueue", flush_interval_ms=60000)):
+            assert await buffer.submit({"name": "A"}) == "queued"
+            assert await buffer.submit({"name": "B"}) == "queued"
+            assert writer.batches == []
+            assert buffer.get_stats()["depth"] == 2
+
+            await buffer.shutdown()
+
+        assert writer.batches == [[{"name": "A"}, {"name": "B"}]]
+        assert buffer.get_stats()["depth"] == 0
+
+    @pytest.mark.asyncio
+    async def test_full_buffer_applies_backpressure(self):
+        """Test submitters wait for room instead of growing the buffer past max_buffer"""
+        writer = RecordingWriter()
+        writer.release = asyncio.Event()
+        buffer = WriteBehindBuffer(writer)
+        with patch.object(WriteBehindBuffer, 'get_settings',
+                          return_value=_settings(ack="enqueue", max_buffer=2, batch_size=2, flush_interval_ms=60000)):
+            await buffer.submit({"name": "A"})
+            await buffer.submit({"name": "B"})  # fills a batch; its flush blocks on the writer
+            await buffer.submit({"name": "C"})
+            await buffer.submit({"name": "D"})
+
+            blocked = asyncio.ensure_future(buffer.submit({"name": "E"}))
+            await asyncio.sleep(0.02)
+            assert not blocked.done()
+            assert buffer.get_stats()["depth"] == 2
+
+            writer.release.set()
+            assert await asyncio.wait_for(blocked, timeout=1) == "queued"
+            await buffer.shutdown()
+
+        assert [lead["name"] for batch in writer.batches for lead in batch] == ["A", "B", "C", "D", "E"]
+        assert buffer.get_stats()["max_depth"] == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_is_reported(self):
+        """Test a failed group commit is returned to waiters and counted"""
+        buffer = WriteBehindBuffer(RecordingWriter(status="failure"))
+        with patch.object(WriteBehindBuffer, 'get_settings', return_value=_settings(batch_size=2)):
+            results = await asyncio.gather(buffer.submit({"name": "A"}), buffer.submit({"name": "B"}))
+
+        assert results == ["failure", "failure"]
+        assert buffer.get_stats()["failed_leads"] == 2
+        assert buffer.get_stats()["flush_ms"]["count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_each_lead_gets_its_own_status(self):
+        """Test one lead failing in a group commit doesn't fail the others"""
+        buffer = WriteBehindBuffer(RecordingWriter(status=lambda lead: "failure" if lead["name"] == "B" else "success"))
+        with patch.object(WriteBehindBuffer, 'get_settings', return_value=_settings(batch_size=3)):
+            results = await asyncio.gather(*(buffer.submit({"name": name}) for name in "ABC"))
+
+        assert results == ["success", "failure", "success"]
+        assert buffer.get_stats()["failed_leads"] == 1
+
+class TestWebhookWriteBehind:
+    """Test cases for the webhook using the write-behind buffer"""
+
+    def test_webhook_acks_queued_lead(self):
+        """Test the webhook hands leads to the buffer when write-behind is enabled"""
+        from fastapi.testclient import TestClient
+        from unittest.mock import AsyncMock
+        from main import app
+        from database.write_behind import crm_write_buffer
+
+        lead = {"name": "John Doe", "email": "john@example.com", "company": "Example"}
+        with patch('routes.webhook.extract_lead_info', AsyncMock(return_value=lead)), \
+                patch.object(crm_write_buffer, 'is_enabled', return_value=True), \
+                patch.object(crm_write_buffer, 'submit', AsyncMock(return_value="queued")) as mock_submit, \
+                patch('routes.webhook.save_to_crm') as mock_save:
+            response = TestClient(app).post("/webhook/", json={"message": "Hi"})
+
+        assert response.json()["save_status"] == "queued"
+        assert response.json()["message"] == "Lead information extracted and queued for saving."
+        assert response.json()["retry_attempts"] == "Queued for write-behind"
+        mock_submit.assert_awaited_once_with(lead)
+        mock_save.assert_not_called()
@@ -20,7 +20,7 @@ const LeadCard = ({ log }) => {
           </div>
         </div>
         <span className={`lead-card__status lead-card__status--${save_status}`}>
-          {save_status === 'success' ? '✓' : '✗'}
+          {save_status === 'success' ? '✓' : save_status === 'queued' ? '…' : '✗'}
         </span>
       </div>
       
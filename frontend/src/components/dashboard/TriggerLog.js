@@ -59,7 +59,7 @@ const TriggerLog = ({ logs }) => {
                 </td>
                 <td className="trigger-log__td trigger-log__td--status">
                   <span className={`trigger-log__status trigger-log__status--${log.save_status}`}>
-                    {log.save_status === 'success' ? '✓' : '✗'}
+                    {log.save_status === 'success' ? '✓' : log.save_status === 'queued' ? '…' : '✗'}
                   </span>
                 </td>
               </tr>
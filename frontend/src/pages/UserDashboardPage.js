@@ -46,7 +46,7 @@ const UserDashboardPage = () => {
       // Show success or warning message
       if (result.save_status === 'no_contact_info') {
         setSubmitError('No contact information found. Please include a name, email, or company in your message.');
-      } else if (result.save_status === 'success') {
+      } else if (result.save_status === 'success' || result.save_status === 'queued') {
         // Show success message briefly
         setSubmitError(''); // Clear any previous errors
         // You could add a success message here if needed
@@ -7,7 +7,7 @@
  * @property {string} extracted.name
  * @property {string} extracted.email
  * @property {string} extracted.company
- * @property {'success'|'failure'} save_status
+ * @property {'success'|'failure'|'queued'|'no_contact_info'} save_status
  */
 
 /**